@@ -136,6 +136,10 @@ module "dynamodb_billing_enforcer" {
   # Exempt infrastructure tables if any
   exempt_table_prefixes = var.dynamodb_exempt_prefixes
 
+  # Reconciliation sweep scope (only used when enable_reconciliation_sweep = true)
+  sandbox_ou_id   = var.sandbox_ou_id
+  managed_regions = var.managed_regions
+
   tags = {
     Component = "DynamoDB-Billing-Enforcer"
   }
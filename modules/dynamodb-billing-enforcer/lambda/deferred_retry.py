@@ -0,0 +1,83 @@
+"""
+Deferred retry for tables that cannot be deleted yet.
+
+Right after CreateTable the table is usually still CREATING, and DeleteTable
+fails with ResourceInUseException. Rather than sleeping inside the Lambda
+(billed duration), the event is re-enqueued on an SQS queue with a delivery
+delay that grows exponentially per attempt. The Lambda consumes that queue
+like any other batch, and only the last attempt reports DELETE_FAILED.
+
+The attempt number travels with the event under RETRY_KEY, so a retried
+event is recognisable (and not mistaken for a redelivery of the original).
+"""
+import json
+import time
+
+# Remediation errors that clear up on their own: the table or stream is
+# CREATING or UPDATING, too many control-plane operations are running in the
+# account, or provisioned concurrency is still being allocated (Lambda)
+RETRYABLE_DELETE_ERRORS = ('ResourceInUseException', 'LimitExceededException', 'ResourceConflictException')
+
+# SQS caps DelaySeconds at 15 minutes
+MAX_DELAY_SECONDS = 900
+
+RETRY_KEY = 'enforcerRetry'
+
+
+def is_retryable_delete_error(error: Exception) -> bool:
+    """Return True for botocore ClientErrors that a later DeleteTable may not hit."""
+    response = getattr(error, 'response', None) or {}
+    return response.get('Error', {}).get('Code') in RETRYABLE_DELETE_ERRORS
+
+
+def retry_attempt(event: dict) -> int:
+    """Retries already made for this event (0 for an event straight from CloudTrail)."""
+    return (event.get(RETRY_KEY) or {}).get('attempt', 0)
+
+
+def retry_event(event: dict, attempt: int) -> dict:
+    """Copy of event marked as retry number attempt."""
+    return {**event, RETRY_KEY: {'attempt': attempt}}
+
+
+def backoff_delay(attempt: int, base_seconds: int) -> int:
+    """Delay before retry number attempt (1-based): base, 2x base, 4x base... capped."""
+    return min(MAX_DELAY_SECONDS, base_seconds * 2 ** (attempt - 1))
+
+
+class SQSRetryScheduler:
+    """Schedules retries as delayed messages on the enforcer's retry queue."""
+
+    def __init__(self, queue_url: str, client_getter):
+        self.queue_url = queue_url
+        self._client_getter = client_getter
+
+    def schedule(self, event: dict, delay_seconds: int):
+        self._client_getter().send_message(
+            QueueUrl=self.queue_url,
+            MessageBody=json.dumps(event),
+            DelaySeconds=delay_seconds,
+        )
+
+
+class LocalRetryScheduler:
+    """
+    In-memory stand-in for SQSRetryScheduler, for tests and local runs.
+
+    Scheduled events are kept with their due time; due() hands back the ones
+    whose delay has passed, ready to be fed to the handler.
+    """
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self.scheduled = []
+
+    def schedule(self, event: dict, delay_seconds: int):
+        self.scheduled.append((self._clock() + delay_seconds, delay_seconds, event))
+
+    def due(self, now: float = None) -> list:
+        """Remove and return the events whose delay has elapsed by now (default: current time)."""
+        now = self._clock() if now is None else now
+        ready = [event for due_at, _, event in self.scheduled if due_at <= now]
+        self.scheduled = [item for item in self.scheduled if item[0] > now]
+        return ready
@@ -0,0 +1,166 @@
+"""
+EventBridge pattern for the enforcer, generated from the enforcement rules.
+
+Matching on eventSource and eventName alone invokes the enforcer for every
+CreateTable and UpdateTable, most of which it only logs and drops: tables
+created PROVISIONED, failed calls, exempt names. The pattern built here adds
+content filters so EventBridge drops those before they cost an invocation or
+a slot in the batch queue.
+
+SAFETY:
+    A filter may only leave out events enforce_event would not act on.
+    Anything a filter cannot rule out from the event alone is let through and
+    decided by the function as before. tests/test_event_pattern.py checks the
+    pattern against the enforcer's decisions on a corpus of sample events.
+
+FILTERS:
+    errorCode       Failed calls (the 'request_failed' decision)
+    mode            Requests that prove a compliant mode, per rule
+                    (Rule.request_filter), e.g. CreateTable without billingMode
+    name            Names matched by exemptions for every account: prefix and
+                    suffix rules, and glob rules using only '*'. Per-account
+                    and tag exemptions are left to the function.
+
+    With a policy source (POLICY_PARAMETER or POLICY_APPCONFIG), exemptions
+    and MAX_PROVISIONED_CONCURRENCY can change without a deploy, so filters
+    built from them are left out.
+
+USAGE:
+    Terraform runs this as an external data source: it reads the enforcer's
+    settings, keyed by environment variable name, as a JSON object on stdin
+    and writes {"pattern": "<pattern JSON>"}.
+
+        echo '{"ENFORCED_RULES": "dynamodb-on-demand", "EXEMPT_TABLE_PREFIXES": "terraform-"}' \\
+            | python3 event_pattern.py
+"""
+import json
+import re
+import sys
+
+from exemptions import parse_rules
+from rules import DEFAULT_RULE_NAMES, build_engine
+
+DETAIL_TYPE = 'AWS API Call via CloudTrail'
+
+# EventBridge's limit on the length of an event pattern
+MAX_PATTERN_LENGTH = 2048
+
+_WILDCARD_SPECIAL = re.compile(r'([*\\])')
+
+
+def _escape(text: str) -> str:
+    return _WILDCARD_SPECIAL.sub(r'\\\1', text)
+
+
+def name_wildcards(exemption_rules) -> list:
+    """
+    EventBridge wildcards for the name exemptions that apply to every account
+    and can be expressed as one; the rest are left to the function.
+    """
+    wildcards = set()
+    for rule in exemption_rules:
+        if rule['accounts'] or rule['type'] == 'tag':
+            continue
+        pattern = rule['pattern']
+        if rule['type'] == 'prefix':
+            wildcards.add(_escape(pattern) + '*')
+        elif rule['type'] == 'suffix':
+            wildcards.add('*' + _escape(pattern))
+        elif not any(char in pattern for char in '?['):
+            # EventBridge rejects consecutive wildcards; '**' matches what '*' does
+            wildcard = '*'.join(_escape(part) for part in pattern.split('*'))
+            wildcards.add(re.sub(r'\*{2,}', '*', wildcard))
+    return sorted(wildcards)
+
+
+def build_pattern(enforced_rules: tuple = DEFAULT_RULE_NAMES, max_provisioned_concurrency: int = 0,
+                  exemption_rules: tuple = (), hot_reload: bool = False) -> dict:
+    """
+    Build the event pattern for the enforced rules.
+
+    Args:
+        enforced_rules: Rule names (ENFORCED_RULES)
+        max_provisioned_concurrency: MAX_PROVISIONED_CONCURRENCY
+        exemption_rules: Rules from exemptions.parse_rules
+        hot_reload: A policy source can change exemptions and limits after
+            deployment, so leave out the filters built from them
+
+    Raises:
+        ValueError: for an unknown rule name, or no rules
+    """
+    rules = build_engine(enforced_rules, max_provisioned_concurrency).rules
+    if not rules:
+        raise ValueError('No rules to build an event pattern for')
+
+    wildcards = [] if hot_reload else name_wildcards(exemption_rules)
+    pattern = _pattern(rules, wildcards, hot_reload)
+    if wildcards and len(_compact(pattern)) > MAX_PATTERN_LENGTH:
+        # Too many exemptions to spell out: let the function match them
+        pattern = _pattern(rules, [], hot_reload)
+    return pattern
+
+
+def _pattern(rules, wildcards: list, hot_reload: bool) -> dict:
+    # Calls with the same source and filter share a branch, e.g. both Lambda event names
+    branches = {}
+    for rule in rules:
+        for event_source, event_name in rule.triggers:
+            request = {} if hot_reload and rule.request_filter_uses_policy else rule.request_filter(event_name)
+            if wildcards and rule.name_parameter:
+                request[rule.name_parameter] = [{'anything-but': {'wildcard': wildcards}}, {'exists': False}]
+            key = (event_source, json.dumps(request, sort_keys=True))
+            branches.setdefault(key, (request, []))[1].append(event_name)
+
+    calls = []
+    for (event_source, _), (request, event_names) in branches.items():
+        call = {'eventSource': [event_source], 'eventName': event_names}
+        if request:
+            call['requestParameters'] = request
+        calls.append(call)
+
+    detail = {'errorCode': [{'exists': False}]}
+    if len(calls) == 1:
+        detail.update(calls[0])
+    else:
+        detail['$or'] = calls
+
+    sources = dict.fromkeys('aws.' + event_source.split('.')[0] for event_source, _ in branches)
+    return {
+        'source': list(sources),
+        'detail-type': [DETAIL_TYPE],
+        'detail': detail,
+    }
+
+
+def _compact(pattern: dict) -> str:
+    return json.dumps(pattern, separators=(',', ':'))
+
+
+def pattern_from_settings(settings: dict) -> dict:
+    """Build the pattern from the enforcer's settings, keyed by environment variable name."""
+    enforced_rules = tuple(
+        name.strip() for name in settings.get('ENFORCED_RULES', '').split(',') if name.strip()
+    )
+    return build_pattern(
+        enforced_rules or DEFAULT_RULE_NAMES,
+        int(settings.get('MAX_PROVISIONED_CONCURRENCY') or 0),
+        parse_rules(settings.get('EXEMPT_TABLE_PREFIXES', ''),
+                    settings.get('EXEMPT_TABLE_RULES', ''),
+                    settings.get('EXEMPT_TAGS', '')),
+        hot_reload=bool(settings.get('POLICY_PARAMETER') or settings.get('POLICY_APPCONFIG')),
+    )
+
+
+def main(stdin=None, stdout=None) -> int:
+    stdin, stdout = stdin or sys.stdin, stdout or sys.stdout
+    try:
+        pattern = pattern_from_settings(json.load(stdin) or {})
+    except ValueError as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 2
+    json.dump({'pattern': _compact(pattern)}, stdout)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Table exemption rules for the DynamoDB Billing Mode Enforcer.
+
+Rules are compiled once (at container init, via get_config) into a single
+regular expression per scope - one for rules that apply to every account and
+one per account with account-specific rules - so checking a table name costs
+at most two regex matches however many rules there are.
+
+Tag rules exempt resources by their tags instead of their name. The tags come
+from the CloudTrail request or a cached lookup (tags.py), and are only needed
+when no name rule matched and a tag rule applies to the account.
+
+RULE FORMAT:
+    EXEMPT_TABLE_PREFIXES (comma-separated) become prefix rules for all accounts.
+    EXEMPT_TAGS (comma-separated "key=value" or "key") become tag rules for
+    all accounts.
+
+    EXEMPT_TABLE_RULES is a JSON list of rule objects:
+        {"type": "prefix", "pattern": "terraform-"}
+        {"type": "suffix", "pattern": "-lock"}
+        {"type": "glob",   "pattern": "scenario-*-state"}
+        {"type": "prefix", "pattern": "demo-", "accounts": ["123456789012"]}
+        {"type": "tag",    "pattern": "ndx:billing-exempt=true"}
+
+    A tag pattern "key=value" matches that exact tag; "key" alone matches the
+    key with any value.
+
+    Rules without "accounts" (or with an empty list) apply to every account.
+"""
+import fnmatch
+import json
+import re
+
+RULE_TYPES = ('prefix', 'suffix', 'glob', 'tag')
+
+
+def parse_rules(prefixes: str = '', rules_json: str = '', tags: str = '') -> tuple:
+    """
+    Parse exemption rules from the environment variable formats.
+
+    Args:
+        prefixes: Comma-separated table name prefixes (EXEMPT_TABLE_PREFIXES)
+        rules_json: JSON list of rule objects (EXEMPT_TABLE_RULES)
+        tags: Comma-separated "key=value" or "key" tag patterns (EXEMPT_TAGS)
+
+    Returns:
+        Tuple of rule dicts with type, pattern and accounts keys
+
+    Raises:
+        ValueError: if rules_json is not valid JSON or a rule is malformed
+    """
+    rules = [
+        {'type': 'prefix', 'pattern': prefix.strip(), 'accounts': ()}
+        for prefix in prefixes.split(',')
+        if prefix.strip()
+    ]
+    rules.extend(
+        {'type': 'tag', 'pattern': tag.strip(), 'accounts': ()}
+        for tag in tags.split(',')
+        if tag.strip()
+    )
+
+    if rules_json.strip():
+        try:
+            raw_rules = json.loads(rules_json)
+        except ValueError as e:
+            raise ValueError(f"EXEMPT_TABLE_RULES is not valid JSON: {e}") from e
+        if not isinstance(raw_rules, list):
+            raise ValueError("EXEMPT_TABLE_RULES must be a JSON list")
+
+        for raw in raw_rules:
+            if not isinstance(raw, dict):
+                raise ValueError(f"Exemption rule must be an object: {raw!r}")
+            if raw.get('type') not in RULE_TYPES:
+                raise ValueError(f"Exemption rule type must be one of {RULE_TYPES}: {raw!r}")
+            if not isinstance(raw.get('pattern'), str) or not raw['pattern']:
+                raise ValueError(f"Exemption rule needs a non-empty pattern: {raw!r}")
+            rules.append({
+                'type': raw['type'],
+                'pattern': raw['pattern'],
+                'accounts': tuple(raw.get('accounts') or ()),
+            })
+
+    for rule in rules:
+        if rule['type'] == 'tag' and not parse_tag(rule['pattern'])[0]:
+            raise ValueError(f"Tag exemption rule needs a tag key: {rule['pattern']!r}")
+    return tuple(rules)
+
+
+def parse_tag(pattern: str) -> tuple:
+    """Split a tag pattern into (key, value), with value None for a bare key."""
+    key, sep, value = pattern.partition('=')
+    return key.strip(), (value.strip() if sep else None)
+
+
+def _rule_regex(rule: dict) -> str:
+    """Translate one rule into a regex fragment matched against the whole name."""
+    if rule['type'] == 'prefix':
+        return re.escape(rule['pattern']) + '.*'
+    if rule['type'] == 'suffix':
+        return '.*' + re.escape(rule['pattern'])
+    return fnmatch.translate(rule['pattern'])
+
+
+def _compile(rules: list):
+    """Compile rules into one alternation with a named group per rule."""
+    if not rules:
+        return None, ()
+    pattern = '|'.join(f'(?P<r{i}>{_rule_regex(rule)})' for i, rule in enumerate(rules))
+    return re.compile(pattern, re.DOTALL), tuple(rules)
+
+
+class ExemptionMatcher:
+    """
+    Immutable, precompiled set of exemption rules.
+
+    match() returns the first rule that exempts a table, or None;
+    match_tags() does the same for tag rules given the resource's tags.
+    """
+
+    __slots__ = ('rules', '_global', '_global_rules', '_by_account', '_global_tags', '_tags_by_account')
+
+    def __init__(self, rules=()):
+        self.rules = tuple(rules)
+        name_rules = [r for r in self.rules if r['type'] != 'tag']
+        tag_rules = [r for r in self.rules if r['type'] == 'tag']
+
+        self._global, self._global_rules = _compile([r for r in name_rules if not r['accounts']])
+
+        per_account = {}
+        for rule in name_rules:
+            for account_id in rule['accounts']:
+                per_account.setdefault(account_id, []).append(rule)
+        self._by_account = {
+            account_id: _compile(account_rules)
+            for account_id, account_rules in per_account.items()
+        }
+
+        self._global_tags = tuple((*parse_tag(r['pattern']), r) for r in tag_rules if not r['accounts'])
+        tags_by_account = {}
+        for rule in tag_rules:
+            for account_id in rule['accounts']:
+                tags_by_account.setdefault(account_id, []).append((*parse_tag(rule['pattern']), rule))
+        self._tags_by_account = {account_id: tuple(rules) for account_id, rules in tags_by_account.items()}
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def match(self, table_name: str, account_id: str = None):
+        """
+        Return the rule exempting table_name in account_id, or None.
+
+        Args:
+            table_name: DynamoDB table name
+            account_id: Sandbox account the table lives in
+        """
+        for regex, rules in (
+            (self._global, self._global_rules),
+            self._by_account.get(account_id, (None, ())),
+        ):
+            if regex is None:
+                continue
+            found = regex.fullmatch(table_name)
+            if found:
+                return rules[int(found.lastgroup[1:])]
+        return None
+
+    def has_tag_rules(self, account_id: str = None) -> bool:
+        """Return True if a tag rule applies in account_id, so tags are worth looking up."""
+        return bool(self._global_tags or self._tags_by_account.get(account_id))
+
+    def match_tags(self, tags: dict, account_id: str = None):
+        """
+        Return the tag rule exempting a resource with these tags in account_id, or None.
+
+        Args:
+            tags: The resource's tags as {key: value}
+            account_id: Sandbox account the resource lives in
+        """
+        for key, value, rule in self._global_tags + self._tags_by_account.get(account_id, ()):
+            if key in tags and (value is None or tags[key] == value):
+                return rule
+        return None
+
+
+def describe_rule(rule: dict) -> str:
+    """Short human-readable form of a rule for logs and messages."""
+    text = f"{rule['type']}: {rule['pattern']}"
+    if rule['accounts']:
+        text += f" (accounts: {', '.join(rule['accounts'])})"
+    return text
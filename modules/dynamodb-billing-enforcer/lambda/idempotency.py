@@ -0,0 +1,285 @@
+"""
+Idempotency store for the DynamoDB Billing Mode Enforcer.
+
+EventBridge delivers at least once, and CreateTable followed by UpdateTable
+produces two events for one table. Without deduplication each delivery
+repeats DescribeTable, DeleteTable and the notifications.
+
+Two kinds of record are kept, both expiring after the window:
+
+    event#<eventID>
+        Claimed before an event is enforced and released again if enforcement
+        raises, so a redelivery of the same CloudTrail event is skipped but a
+        retry after a failure is not.
+
+    table#<account>#<region>#<table>
+        The time the table was deleted. Events for that table that happened
+        BEFORE the deletion are stale (e.g. the UpdateTable that followed the
+        CreateTable we acted on) and are skipped. A table re-created after the
+        deletion has a later eventTime and is enforced as normal.
+
+Every lookup goes to an in-container LRU first; the optional backend
+(DynamoDB conditional writes with TTL, or a JSON file for tests and local
+runs) shares records between concurrent containers.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe LRU of key -> (value, expires_at)."""
+
+    def __init__(self, max_entries: int = 1024, clock=time.time):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the unexpired value for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, expires_at: float):
+        with self._lock:
+            self._put(key, value, expires_at)
+
+    def put_if_absent(self, key, value, expires_at: float) -> bool:
+        """Store value unless an unexpired entry exists; return True if stored."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > self._clock():
+                return False
+            self._put(key, value, expires_at)
+            return True
+
+    def increment(self, key, expires_at: float) -> int:
+        """Add one to a counter (created at 0 with expires_at) and return the new count."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= self._clock():
+                entry = (0, expires_at)
+            count = entry[0] + 1
+            self._put(key, count, entry[1])
+            return count
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _put(self, key, value, expires_at):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DynamoDBBackend:
+    """
+    Records in a DynamoDB table with partition key 'id' and TTL on 'expires_at'.
+
+    Claims use a conditional put, so only one container wins a given key.
+    """
+
+    def __init__(self, table_name: str, client_getter, clock=time.time):
+        self.table_name = table_name
+        self._client_getter = client_getter
+        self._clock = clock
+
+    def put_if_absent(self, key, value, expires_at: float) -> bool:
+        client = self._client_getter()
+        try:
+            client.put_item(
+                TableName=self.table_name,
+                Item=self._item(key, value, expires_at),
+                ConditionExpression='attribute_not_exists(id) OR expires_at < :now',
+                ExpressionAttributeValues={':now': {'N': str(int(self._clock()))}},
+            )
+        except client.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
+    def put(self, key, value, expires_at: float):
+        self._client_getter().put_item(TableName=self.table_name, Item=self._item(key, value, expires_at))
+
+    def get(self, key):
+        item = self._client_getter().get_item(
+            TableName=self.table_name,
+            Key={'id': {'S': key}},
+            ConsistentRead=True,
+        ).get('Item')
+        # TTL deletion is lazy, so expired items can still be returned
+        if not item or float(item['expires_at']['N']) <= self._clock():
+            return None
+        return float(item['value']['N'])
+
+    def increment(self, key, expires_at: float) -> int:
+        """Atomically add one to a counter item; expires_at is set when it is created."""
+        response = self._client_getter().update_item(
+            TableName=self.table_name,
+            Key={'id': {'S': key}},
+            UpdateExpression='ADD #value :one SET expires_at = if_not_exists(expires_at, :expires_at)',
+            ExpressionAttributeNames={'#value': 'value'},
+            ExpressionAttributeValues={':one': {'N': '1'}, ':expires_at': {'N': str(int(expires_at))}},
+            ReturnValues='UPDATED_NEW',
+        )
+        return int(response['Attributes']['value']['N'])
+
+    def delete(self, key):
+        self._client_getter().delete_item(TableName=self.table_name, Key={'id': {'S': key}})
+
+    @staticmethod
+    def _item(key, value, expires_at):
+        return {
+            'id': {'S': key},
+            'value': {'N': str(value)},
+            'expires_at': {'N': str(int(expires_at))},
+        }
+
+
+class FileBackend:
+    """
+    Records in a local JSON file - a stand-in for DynamoDBBackend in tests and
+    local runs. Safe across threads of one process only.
+    """
+
+    def __init__(self, path: str, clock=time.time):
+        self.path = path
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as f:
+            records = json.load(f)
+        now = self._clock()
+        return {key: record for key, record in records.items() if record['expires_at'] > now}
+
+    def _save(self, records: dict):
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(records, f)
+        os.replace(tmp_path, self.path)
+
+    def put_if_absent(self, key, value, expires_at: float) -> bool:
+        with self._lock:
+            records = self._load()
+            if key in records:
+                return False
+            records[key] = {'value': value, 'expires_at': expires_at}
+            self._save(records)
+            return True
+
+    def put(self, key, value, expires_at: float):
+        with self._lock:
+            records = self._load()
+            records[key] = {'value': value, 'expires_at': expires_at}
+            self._save(records)
+
+    def get(self, key):
+        with self._lock:
+            record = self._load().get(key)
+        return record['value'] if record else None
+
+    def increment(self, key, expires_at: float) -> int:
+        with self._lock:
+            records = self._load()
+            record = records.setdefault(key, {'value': 0, 'expires_at': expires_at})
+            record['value'] += 1
+            self._save(records)
+            return record['value']
+
+    def delete(self, key):
+        with self._lock:
+            records = self._load()
+            if records.pop(key, None) is not None:
+                self._save(records)
+
+
+class IdempotencyStore:
+    """
+    In-container LRU in front of an optional shared backend.
+
+    Args:
+        backend: DynamoDBBackend, FileBackend, or None for the LRU only
+        window_seconds: How long records suppress repeated work
+        cache_size: Maximum entries in the in-container LRU
+    """
+
+    def __init__(self, backend=None, window_seconds: int = 3600, cache_size: int = 1024, clock=time.time):
+        self.backend = backend
+        self.window_seconds = window_seconds
+        self._clock = clock
+        self._cache = LRUCache(cache_size, clock)
+
+    @staticmethod
+    def event_key(event_id: str) -> str:
+        return f'event#{event_id}'
+
+    @staticmethod
+    def table_key(account_id: str, region: str, table_name: str) -> str:
+        return f'table#{account_id}#{region}#{table_name}'
+
+    def claim_event(self, event_id: str) -> bool:
+        """
+        Claim an event for processing.
+
+        Returns:
+            True if this caller should enforce the event, False if it is a
+            duplicate seen within the window
+        """
+        key = self.event_key(event_id)
+        now = self._clock()
+        expires_at = now + self.window_seconds
+        if not self._cache.put_if_absent(key, now, expires_at):
+            return False
+        if self.backend is not None and not self.backend.put_if_absent(key, now, expires_at):
+            return False
+        return True
+
+    def seen_event(self, event_id: str) -> bool:
+        """Return True if event_id was claimed within the window, without claiming it."""
+        key = self.event_key(event_id)
+        if self._cache.get(key) is not None:
+            return True
+        return self.backend is not None and self.backend.get(key) is not None
+
+    def release_event(self, event_id: str):
+        """Forget a claim so a retry of a failed event is not treated as a duplicate."""
+        key = self.event_key(event_id)
+        self._cache.pop(key)
+        if self.backend is not None:
+            self.backend.delete(key)
+
+    def record_enforcement(self, account_id: str, region: str, table_name: str, enforced_at: float = None):
+        """Remember that a table was deleted at enforced_at (default now)."""
+        key = self.table_key(account_id, region, table_name)
+        enforced_at = self._clock() if enforced_at is None else enforced_at
+        expires_at = enforced_at + self.window_seconds
+        self._cache.put(key, enforced_at, expires_at)
+        if self.backend is not None:
+            self.backend.put(key, enforced_at, expires_at)
+
+    def enforced_since(self, account_id: str, region: str, table_name: str, event_time: float) -> bool:
+        """Return True if the table was deleted at or after event_time (the event is stale)."""
+        key = self.table_key(account_id, region, table_name)
+        enforced_at = self._cache.get(key)
+        if enforced_at is None and self.backend is not None:
+            enforced_at = self.backend.get(key)
+            if enforced_at is not None:
+                self._cache.put(key, enforced_at, enforced_at + self.window_seconds)
+        return enforced_at is not None and enforced_at >= event_time
@@ -23,33 +23,576 @@ EVENT FLOW:
     2. CloudTrail logs the CreateTable API call
     3. EventBridge rule (in sandbox) forwards to Hub account event bus
     4. This Lambda is triggered
-    5. Lambda deletes the table (cross-account via IAM role)
+    5. Lambda deletes the table (cross-account via IAM role, SANDBOX_ROLE_NAME)
     6. Lambda broadcasts event and sends SNS notification
+
+    If the table is still CREATING, step 5 is retried later from the retry
+    queue (RETRY_QUEUE_URL) and step 6 happens after the final attempt.
+
+RULES:
+    Other uncapped capacity modes (Kinesis On-Demand streams, Lambda
+    provisioned concurrency) are enforced by the same function. rules.py
+    defines one rule per mode; the rule matching the event's eventSource and
+    eventName detects and remediates, and everything else here is shared.
+
+DRY RUN:
+    With DRY_RUN=true the full decision path runs (exemptions, idempotency,
+    mode detection) but violating resources are only reported as
+    'would_delete': nothing is remediated, retried or notified, and the
+    idempotency store is kept in memory so a shadow deployment cannot mark
+    events as handled. scripts/enforcer_replay.py uses this to replay
+    archived CloudTrail logs.
+
+BATCH MODE:
+    When the EventBridge rule targets an SQS queue instead of the Lambda,
+    records arrive in batches and are enforced concurrently. Failed records
+    are reported via batchItemFailures so only they are retried.
+
+POLICY:
+    Exemptions, enabled rules and notification settings can be changed
+    without a deploy by putting them in an SSM parameter or AppConfig
+    profile (policy.py); get_config() picks up new versions within
+    POLICY_TTL_SECONDS.
+
+RUNAWAY ACCOUNTS:
+    throttle.py rate-limits events per account so one account looping on
+    CreateTable cannot starve the others, and opens a circuit breaker that
+    replaces its per-table alerts with one escalated alert. Tables found by
+    the reconciliation sweep do not count toward the breaker.
+
+TAG EXEMPTIONS:
+    Resources can be exempted by tag (EXEMPT_TAGS, or "tag" rules in
+    EXEMPT_TABLE_RULES) instead of by name. Tags come from the CloudTrail
+    request or a per-container cache (tags.py); a lookup that misses its
+    TAG_LOOKUP_TIMEOUT_MS budget or fails is retried through the retry queue
+    (or the event fails and is redelivered); a resource is never enforced
+    while its tags are unknown.
 """
 import json
 import os
-from datetime import datetime, timezone
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from types import MappingProxyType
 
+from deferred_retry import (MAX_DELAY_SECONDS, SQSRetryScheduler, backoff_delay,
+                            is_retryable_delete_error, retry_attempt, retry_event)
+from exemptions import ExemptionMatcher, describe_rule, parse_rules
+from idempotency import DynamoDBBackend, FileBackend, IdempotencyStore
+from metrics import MetricsLogger
+from policy import AppConfigPolicySource, PolicyCache, SSMPolicySource, parse_appconfig
+from rules import DEFAULT_RULE_NAMES, build_engine
+from structured_log import LEVELS, StructuredLogger
+from tags import TagCache, TagLookupError
+from throttle import CLOSED, OPEN, OPENED, AccountGuard, deferred_event, was_deferred
 
-def get_config():
-    """Get configuration from environment variables."""
-    return {
-        'sns_topic_arn': os.environ.get('SNS_TOPIC_ARN', ''),
-        'exempt_table_prefixes': os.environ.get('EXEMPT_TABLE_PREFIXES', '').split(','),
-        'event_bus_name': os.environ.get('EVENT_BUS_NAME', 'default'),
-        'eventbridge_source': os.environ.get('EVENTBRIDGE_SOURCE', 'sandbox.dynamodb-billing-enforcer'),
-    }
+# Configured from LOG_LEVEL / LOG_PAYLOAD_SAMPLE_RATE when config is first loaded
+log = StructuredLogger()
+
+# Per-phase timers and outcome counters, written as EMF when each handler returns.
+# Configured from METRICS_NAMESPACE / METRICS_ENABLED when config is first loaded.
+metrics = MetricsLogger()
+
+
+def _positive_int(env, name: str, default: str) -> int:
+    value = env.get(name, default)
+    try:
+        parsed = int(value)
+    except ValueError:
+        parsed = 0
+    if parsed < 1:
+        raise ValueError(f"{name} must be a positive integer, got {value!r}")
+    return parsed
+
+
+def _non_negative_int(env, name: str, default: str) -> int:
+    value = env.get(name, default)
+    try:
+        parsed = int(value)
+    except ValueError:
+        parsed = -1
+    if parsed < 0:
+        raise ValueError(f"{name} must be a non-negative integer, got {value!r}")
+    return parsed
+
+
+def _sample_rate(env, name: str, default: str) -> float:
+    value = env.get(name, default)
+    try:
+        parsed = float(value)
+    except ValueError:
+        parsed = -1.0
+    if not 0.0 <= parsed <= 1.0:
+        raise ValueError(f"{name} must be a number between 0 and 1, got {value!r}")
+    return parsed
+
+
+def _csv(env, name: str) -> tuple:
+    return tuple(item.strip() for item in env.get(name, '').split(',') if item.strip())
+
+
+def load_config(overrides: dict = None) -> MappingProxyType:
+    """
+    Parse and validate configuration from environment variables.
+
+    Exemption rules are compiled here so the per-event check is a single
+    precompiled match, and enforcement rules are indexed by the CloudTrail
+    calls they handle so dispatch is a single lookup.
+
+    Args:
+        overrides: Variables that take precedence over the environment (the
+            policy document, see policy.py)
+
+    Returns:
+        Read-only mapping of configuration values
+
+    Raises:
+        ValueError: if a setting is malformed, so a bad deployment fails at init
+    """
+    env = {**os.environ, **(overrides or {})}
+
+    sns_topic_arn = env.get('SNS_TOPIC_ARN', '')
+    if sns_topic_arn and not sns_topic_arn.startswith('arn:'):
+        raise ValueError(f"SNS_TOPIC_ARN must be an ARN, got {sns_topic_arn!r}")
+
+    log_level = env.get('LOG_LEVEL', 'INFO').upper()
+    if log_level not in LEVELS:
+        raise ValueError(f"LOG_LEVEL must be one of {', '.join(LEVELS)}, got {log_level!r}")
+
+    policy_appconfig = env.get('POLICY_APPCONFIG', '')
+    if policy_appconfig:
+        parse_appconfig(policy_appconfig)
+
+    exemptions = ExemptionMatcher(parse_rules(
+        env.get('EXEMPT_TABLE_PREFIXES', ''),
+        env.get('EXEMPT_TABLE_RULES', ''),
+        env.get('EXEMPT_TAGS', ''),
+    ))
+
+    return MappingProxyType({
+        'sns_topic_arn': sns_topic_arn,
+        'exemptions': exemptions,
+        # Enforcement rules (rules.py); DynamoDB only unless ENFORCED_RULES opts in to others
+        'rules': build_engine(_csv(env, 'ENFORCED_RULES') or DEFAULT_RULE_NAMES,
+                              _non_negative_int(env, 'MAX_PROVISIONED_CONCURRENCY', '0')),
+        'event_bus_name': env.get('EVENT_BUS_NAME', 'default') or 'default',
+        'eventbridge_source': env.get('EVENTBRIDGE_SOURCE', 'sandbox.dynamodb-billing-enforcer'),
+        'batch_max_workers': _positive_int(env, 'BATCH_MAX_WORKERS', '10'),
+        'sns_digest': env.get('SNS_DIGEST_MODE', 'false').lower() == 'true',
+        'sandbox_role_name': env.get('SANDBOX_ROLE_NAME', ''),
+        'hub_account_id': env.get('HUB_ACCOUNT_ID', ''),
+        'log_level': log_level,
+        'log_payload_sample_rate': _sample_rate(env, 'LOG_PAYLOAD_SAMPLE_RATE', '0'),
+        'metrics_namespace': env.get('METRICS_NAMESPACE', 'DynamoDBBillingEnforcer'),
+        'metrics_enabled': env.get('METRICS_ENABLED', 'true').lower() == 'true',
+        'dry_run': env.get('DRY_RUN', 'false').lower() == 'true',
+        # Reconciliation sweep (sweep.py)
+        'sandbox_account_ids': _csv(env, 'SANDBOX_ACCOUNT_IDS'),
+        'sandbox_ou_id': env.get('SANDBOX_OU_ID', ''),
+        'managed_regions': _csv(env, 'MANAGED_REGIONS') or (env.get('AWS_REGION', 'us-east-1'),),
+        'sweep_max_workers': _positive_int(env, 'SWEEP_MAX_WORKERS', '32'),
+        # Idempotency (idempotency.py); the LRU is always on, the table/file is optional
+        'idempotency_table': env.get('IDEMPOTENCY_TABLE', ''),
+        'idempotency_file': env.get('IDEMPOTENCY_FILE', ''),
+        'idempotency_window_seconds': _positive_int(env, 'IDEMPOTENCY_WINDOW_SECONDS', '3600'),
+        'idempotency_cache_size': _positive_int(env, 'IDEMPOTENCY_CACHE_SIZE', '1024'),
+        # Deferred retry (deferred_retry.py); disabled without a queue
+        'retry_queue_url': env.get('RETRY_QUEUE_URL', ''),
+        'retry_max_attempts': _positive_int(env, 'RETRY_MAX_ATTEMPTS', '5'),
+        'retry_base_delay_seconds': _positive_int(env, 'RETRY_BASE_DELAY_SECONDS', '30'),
+        # Runaway accounts (throttle.py); 0 disables the rate limit or the breaker
+        'account_rate_per_minute': _non_negative_int(env, 'ACCOUNT_RATE_PER_MINUTE', '60'),
+        'account_burst': _positive_int(env, 'ACCOUNT_BURST', '20'),
+        'throttle_delay_seconds': _positive_int(env, 'THROTTLE_DELAY_SECONDS', '60'),
+        'breaker_threshold': _non_negative_int(env, 'BREAKER_THRESHOLD', '10'),
+        'breaker_window_seconds': _positive_int(env, 'BREAKER_WINDOW_SECONDS', '300'),
+        'breaker_open_seconds': _positive_int(env, 'BREAKER_OPEN_SECONDS', '900'),
+        # Hot-reloadable policy (policy.py); the environment alone without a source
+        'policy_parameter': env.get('POLICY_PARAMETER', ''),
+        'policy_appconfig': policy_appconfig,
+        'policy_ttl_seconds': _positive_int(env, 'POLICY_TTL_SECONDS', '60'),
+        # Tag exemptions (tags.py); only looked up when a tag rule applies
+        'tag_cache_ttl_seconds': _positive_int(env, 'TAG_CACHE_TTL_SECONDS', '300'),
+        'tag_lookup_timeout_ms': _positive_int(env, 'TAG_LOOKUP_TIMEOUT_MS', '500'),
+    })
+
+
+_CONFIG = None
+_POLICY = None
+_POLICY_SOURCE = None
+# Reentrant: fetching the policy builds a client, which reads the config
+_CONFIG_LOCK = threading.RLock()
+
+
+def get_config() -> MappingProxyType:
+    """
+    Get configuration, parsed once per container.
+
+    The environment of a Lambda container never changes, so the first call
+    loads and caches it; warm invocations reuse the same object. With a
+    policy source (POLICY_PARAMETER or POLICY_APPCONFIG) its settings override
+    the environment; the source is checked at most once per
+    POLICY_TTL_SECONDS and the config is rebuilt only when the policy version
+    changes. If the source fails, the last good config is kept (the
+    environment alone until a policy has loaded).
+    """
+    global _CONFIG, _POLICY
+    with _CONFIG_LOCK:
+        if _CONFIG is None:
+            config = load_config()
+            log.configure(config['log_level'], config['log_payload_sample_rate'])
+            metrics.configure(config['metrics_namespace'], config['metrics_enabled'])
+            _CONFIG = config
+            _POLICY = policy_cache(config)
+        if _POLICY is not None:
+            _CONFIG = reload_policy(_POLICY, _CONFIG)
+        return _CONFIG
+
+
+def policy_cache(config: dict):
+    """The PolicyCache for the configured policy source, or None without one."""
+    if _POLICY_SOURCE is not None:
+        source = _POLICY_SOURCE
+    elif config['policy_parameter']:
+        source = SSMPolicySource(config['policy_parameter'], lambda: get_boto3_client('ssm'))
+    elif config['policy_appconfig']:
+        source = AppConfigPolicySource(config['policy_appconfig'], lambda: get_boto3_client('appconfigdata'))
+    else:
+        return None
+    return PolicyCache(source, config['policy_ttl_seconds'])
+
+
+def reload_policy(policy: PolicyCache, config: MappingProxyType) -> MappingProxyType:
+    """Return config rebuilt with the policy's overrides if a new version is out, else config."""
+    try:
+        if not policy.refresh():
+            return config
+        reloaded = load_config(policy.overrides)
+        check_deployed_rules(reloaded)
+    except Exception as e:
+        log.error('policy_reload_failed', policy_version=policy.version, error=str(e))
+        return config
+    log.info('policy_loaded', policy_version=policy.version, settings=sorted(policy.overrides))
+    return reloaded
+
+
+def check_deployed_rules(config: dict):
+    """
+    Reject rules enabled by a policy but not deployed: their EventBridge
+    triggers and IAM permissions come from ENFORCED_RULES at deploy time,
+    so they would never see an event or could not act on one.
+
+    Raises:
+        ValueError: naming the rules that are not deployed
+    """
+    deployed = _csv(os.environ, 'ENFORCED_RULES') or DEFAULT_RULE_NAMES
+    undeployed = [rule.name for rule in config['rules'].rules if rule.name not in deployed]
+    if undeployed:
+        raise ValueError(f"Policy enables rules not deployed with ENFORCED_RULES: {', '.join(undeployed)}")
+
+
+def set_policy_source(source=None):
+    """
+    Install a policy source (e.g. LocalPolicySource) in place of SSM/AppConfig.
+    Pass None to go back to POLICY_PARAMETER / POLICY_APPCONFIG. Takes effect
+    at the next reset_config(). Intended for tests and local runs.
+    """
+    global _POLICY_SOURCE
+    _POLICY_SOURCE = source
+
+
+def reset_config():
+    """Discard the cached configuration and the stores/schedulers built from it."""
+    global _CONFIG, _POLICY, _IDEMPOTENCY_STORE, _RETRY_SCHEDULER, _ACCOUNT_GUARD, _TAG_CACHE
+    _CONFIG = None
+    _POLICY = None
+    _IDEMPOTENCY_STORE = None
+    _RETRY_SCHEDULER = None
+    _ACCOUNT_GUARD = None
+    _TAG_CACHE = None
+
+
+_IDEMPOTENCY_STORE = None
+_IDEMPOTENCY_LOCK = threading.Lock()
 
 
-def get_boto3_client(service_name):
+def get_idempotency_store() -> IdempotencyStore:
     """
-    Create boto3 client lazily.
+    Get the container's idempotency store, created on first use.
 
-    This allows Lambda container reuse while making the code testable.
-    Clients are cached by boto3 internally when running in Lambda.
+    Backed by IDEMPOTENCY_TABLE (DynamoDB) or IDEMPOTENCY_FILE when set, so
+    duplicates are also caught across containers; otherwise (and in dry-run
+    mode) LRU only.
     """
+    global _IDEMPOTENCY_STORE
+    with _IDEMPOTENCY_LOCK:
+        if _IDEMPOTENCY_STORE is None:
+            config = get_config()
+            _IDEMPOTENCY_STORE = IdempotencyStore(
+                shared_backend(config),
+                window_seconds=config['idempotency_window_seconds'],
+                cache_size=config['idempotency_cache_size'],
+            )
+        return _IDEMPOTENCY_STORE
+
+
+def shared_backend(config: dict):
+    """
+    The backend shared between containers (IDEMPOTENCY_TABLE or
+    IDEMPOTENCY_FILE), or None. Never used in dry-run mode.
+    """
+    if config['dry_run']:
+        log.debug('shared_backend_disabled', reason='dry_run')
+        return None
+    if config['idempotency_table']:
+        return DynamoDBBackend(config['idempotency_table'], lambda: get_boto3_client('dynamodb'))
+    if config['idempotency_file']:
+        return FileBackend(config['idempotency_file'])
+    return None
+
+
+_ACCOUNT_GUARD = None
+_ACCOUNT_GUARD_LOCK = threading.Lock()
+
+
+def get_account_guard() -> AccountGuard:
+    """Get the container's per-account rate limiter and circuit breaker, created on first use."""
+    global _ACCOUNT_GUARD
+    with _ACCOUNT_GUARD_LOCK:
+        if _ACCOUNT_GUARD is None:
+            config = get_config()
+            _ACCOUNT_GUARD = AccountGuard(
+                shared_backend(config),
+                rate_per_minute=config['account_rate_per_minute'],
+                burst=config['account_burst'],
+                breaker_threshold=config['breaker_threshold'],
+                breaker_window_seconds=config['breaker_window_seconds'],
+                breaker_open_seconds=config['breaker_open_seconds'],
+                cache_size=config['idempotency_cache_size'],
+            )
+        return _ACCOUNT_GUARD
+
+
+_TAG_CACHE = None
+_TAG_CACHE_LOCK = threading.Lock()
+
+
+def get_tag_cache() -> TagCache:
+    """Get the container's resource tag cache, created on first use."""
+    global _TAG_CACHE
+    with _TAG_CACHE_LOCK:
+        if _TAG_CACHE is None:
+            config = get_config()
+            _TAG_CACHE = TagCache(config['tag_cache_ttl_seconds'], config['idempotency_cache_size'])
+        return _TAG_CACHE
+
+
+_RETRY_SCHEDULER = None
+
+
+def get_retry_scheduler():
+    """
+    Get the scheduler for deferred retries, or None if retries are disabled.
+
+    Uses the SQS queue in RETRY_QUEUE_URL unless a scheduler was installed
+    with set_retry_scheduler().
+    """
+    global _RETRY_SCHEDULER
+    if _RETRY_SCHEDULER is None and get_config()['retry_queue_url']:
+        _RETRY_SCHEDULER = SQSRetryScheduler(get_config()['retry_queue_url'], lambda: get_boto3_client('sqs'))
+    return _RETRY_SCHEDULER
+
+
+def set_retry_scheduler(scheduler=None):
+    """
+    Install a retry scheduler (e.g. LocalRetryScheduler) in place of the SQS one.
+    Pass None to go back to RETRY_QUEUE_URL. Intended for tests and local runs.
+    """
+    global _RETRY_SCHEDULER
+    _RETRY_SCHEDULER = scheduler
+
+
+def schedule_retry(event: dict, config: dict, error: Exception) -> int:
+    """
+    Re-enqueue an event whose DeleteTable hit a transient error, or whose
+    resource's tags could not be read.
+
+    Returns:
+        The delay in seconds, or 0 if the error is not retryable, retries are
+        disabled or exhausted, or the retry could not be enqueued - in which
+        case the caller reports DELETE_FAILED as before.
+    """
+    if not (isinstance(error, TagLookupError) or is_retryable_delete_error(error)):
+        return 0
+    scheduler = get_retry_scheduler()
+    attempt = retry_attempt(event) + 1
+    if scheduler is None or attempt >= config['retry_max_attempts']:
+        return 0
+
+    delay = backoff_delay(attempt, config['retry_base_delay_seconds'])
+    try:
+        scheduler.schedule(retry_event(event, attempt), delay)
+    except Exception as e:
+        log.error('retry_schedule_failed', event_id=event.get('id'), attempt=attempt, error=str(e))
+        return 0
+    return delay
+
+
+def idempotency_call(operation: str, default, *args):
+    """
+    Call an IdempotencyStore method, failing open.
+
+    A backend outage must not stop enforcement, so errors are logged and
+    default is returned (i.e. the event is treated as new).
+    """
+    try:
+        return getattr(get_idempotency_store(), operation)(*args)
+    except Exception as e:
+        log.warning('idempotency_store_error', operation=operation, error=str(e))
+        return default
+
+
+def account_guard_call(operation: str, default, *args):
+    """Call an AccountGuard method, failing open like idempotency_call."""
+    try:
+        return getattr(get_account_guard(), operation)(*args)
+    except Exception as e:
+        log.warning('account_guard_error', operation=operation, error=str(e))
+        return default
+
+
+# Refresh assumed-role credentials this long before they actually expire
+CREDENTIAL_REFRESH_MARGIN = timedelta(minutes=5)
+ASSUME_ROLE_SESSION_NAME = 'dynamodb-billing-enforcer'
+
+# Module-level pools survive across warm invocations of the same container.
+# Keyed by (service_name, account_id, region); values are (client, expiration).
+_CLIENT_POOL = {}
+_CREDENTIALS_CACHE = {}
+_KEY_LOCKS = {}
+_POOL_LOCK = threading.Lock()
+# boto3's default session is not thread-safe for client creation
+_FACTORY_LOCK = threading.Lock()
+
+
+def _default_client_factory(service_name, region=None, credentials=None):
+    """Build a real boto3 client, optionally in a region and with STS credentials."""
     import boto3
-    return boto3.client(service_name)
+
+    kwargs = {}
+    if region:
+        kwargs['region_name'] = region
+    if credentials:
+        kwargs['aws_access_key_id'] = credentials['AccessKeyId']
+        kwargs['aws_secret_access_key'] = credentials['SecretAccessKey']
+        kwargs['aws_session_token'] = credentials['SessionToken']
+    with _FACTORY_LOCK:
+        return boto3.client(service_name, **kwargs)
+
+
+_client_factory = _default_client_factory
+
+
+def set_client_factory(factory=None):
+    """
+    Replace the function used to build clients and clear the pool.
+
+    The factory is called as factory(service_name, region, credentials), where
+    credentials is None for hub-account clients. Pass None to restore boto3.
+    Intended for tests and local stand-ins.
+    """
+    global _client_factory
+    _client_factory = factory or _default_client_factory
+    reset_client_pool()
+
+
+def reset_client_pool():
+    """Drop all pooled clients and cached credentials."""
+    with _POOL_LOCK:
+        _CLIENT_POOL.clear()
+        _CREDENTIALS_CACHE.clear()
+        _KEY_LOCKS.clear()
+
+
+def _key_lock(key):
+    with _POOL_LOCK:
+        return _KEY_LOCKS.setdefault(key, threading.Lock())
+
+
+def _is_fresh(expiration) -> bool:
+    return expiration is None or expiration - CREDENTIAL_REFRESH_MARGIN > datetime.now(timezone.utc)
+
+
+def _sandbox_role_arn(account_id):
+    """Role to assume in the sandbox account, or None to use the hub credentials."""
+    config = get_config()
+    role_name = config['sandbox_role_name']
+    if not role_name or not account_id or account_id == 'unknown':
+        return None
+    if account_id == config['hub_account_id']:
+        return None
+    return f"arn:aws:iam::{account_id}:role/{role_name}"
+
+
+def get_sandbox_credentials(role_arn: str) -> dict:
+    """
+    Assume the sandbox role, reusing cached credentials until shortly before expiry.
+
+    Concurrent callers for the same role wait on a per-role lock so a burst of
+    events from one account results in a single AssumeRole call.
+    """
+    cached = _CREDENTIALS_CACHE.get(role_arn)
+    if cached and _is_fresh(cached['Expiration']):
+        return cached
+
+    with _key_lock(('sts', role_arn)):
+        cached = _CREDENTIALS_CACHE.get(role_arn)
+        if cached and _is_fresh(cached['Expiration']):
+            return cached
+
+        sts = get_boto3_client('sts')
+        credentials = sts.assume_role(
+            RoleArn=role_arn,
+            RoleSessionName=ASSUME_ROLE_SESSION_NAME,
+        )['Credentials']
+        _CREDENTIALS_CACHE[role_arn] = credentials
+        return credentials
+
+
+def get_boto3_client(service_name, account_id=None, region=None):
+    """
+    Return a pooled boto3 client for a service, account and region.
+
+    Clients are created lazily and kept in a module-level pool keyed by
+    (service_name, account_id, region), so warm invocations reuse them. When
+    SANDBOX_ROLE_NAME is set, clients for a sandbox account use credentials
+    from assuming that role; they are rebuilt when the credentials near expiry.
+
+    Args:
+        service_name: boto3 service name (e.g. 'dynamodb')
+        account_id: Sandbox account to act in, or None for the hub account
+        region: Region for the client, or None for the Lambda's default region
+    """
+    if region == 'unknown':
+        region = None
+    role_arn = _sandbox_role_arn(account_id)
+    key = (service_name, account_id if role_arn else None, region)
+
+    pooled = _CLIENT_POOL.get(key)
+    if pooled and _is_fresh(pooled[1]):
+        return pooled[0]
+
+    with _key_lock(key):
+        pooled = _CLIENT_POOL.get(key)
+        if pooled and _is_fresh(pooled[1]):
+            return pooled[0]
+
+        credentials = get_sandbox_credentials(role_arn) if role_arn else None
+        client = _client_factory(service_name, region, credentials)
+        _CLIENT_POOL[key] = (client, credentials['Expiration'] if credentials else None)
+        return client
 
 
 def extract_event_metadata(event: dict) -> dict:
@@ -62,8 +605,8 @@ def extract_event_metadata(event: dict) -> dict:
     Returns:
         Dictionary with extracted metadata
     """
-    detail = event.get('detail', {})
-    user_identity = detail.get('userIdentity', {})
+    detail = event.get('detail') or {}
+    user_identity = detail.get('userIdentity') or {}
 
     return {
         'account_id': detail.get('recipientAccountId', event.get('account', 'unknown')),
@@ -78,62 +621,456 @@ def extract_event_metadata(event: dict) -> dict:
     }
 
 
-def lambda_handler(event, context):
+# Notification fan-out: default budget without a Lambda context, and time
+# reserved at the end of the invocation so the handler can still return
+NOTIFY_TIMEOUT_SECONDS = 10
+NOTIFY_TIMEOUT_MARGIN_MS = 1000
+
+# PutEvents accepts at most 10 entries per call; failed entries are resent
+PUT_EVENTS_MAX_ENTRIES = 10
+PUT_EVENTS_MAX_ATTEMPTS = 3
+PUT_EVENTS_RETRY_BACKOFF_SECONDS = 0.1
+
+# Source of the events sweep.py builds for the tables it finds
+SWEEP_EVENT_SOURCE = 'reconciliation-sweep'
+
+# Shared across invocations so warm containers don't pay thread start-up.
+# Sized for a full batch fanning out EventBridge + SNS at the same time.
+_NOTIFY_EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix='notify')
+
+# How often each decision path is taken: 'request' (fast path) or the rule's
+# lookup of the resource, named after its API call (Rule.describe_call).
+# Lives for the container's lifetime; logged per decision for tuning.
+DECISION_PATH_COUNTS = Counter()
+_DECISION_PATH_LOCK = threading.Lock()
+
+
+def record_decision_path(path: str):
+    """Count a billing mode decision made via the given path."""
+    with _DECISION_PATH_LOCK:
+        DECISION_PATH_COUNTS[path] += 1
+        counts = dict(DECISION_PATH_COUNTS)
+    log.debug('decision_path', path=path, container_totals=counts)
+
+
+def event_timestamp(event_time: str) -> float:
+    """CloudTrail eventTime as epoch seconds, or now if it cannot be parsed."""
+    try:
+        return datetime.fromisoformat(event_time.replace('Z', '+00:00')).timestamp()
+    except (AttributeError, ValueError):
+        return time.time()
+
+
+def chunked(items: list, size: int) -> list:
+    """Split a list into consecutive chunks of at most size items."""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def put_events_chunk(entries: list, config: dict):
     """
-    Enforces DynamoDB billing mode policy by DELETING On-Demand tables.
-    Triggered by EventBridge when CreateTable or UpdateTable is called.
+    Send up to PUT_EVENTS_MAX_ENTRIES entries in one PutEvents call.
+
+    PutEvents can partially fail: entries with an ErrorCode are split out and
+    resent, up to PUT_EVENTS_MAX_ATTEMPTS calls in total.
+
+    Raises:
+        RuntimeError: if some entries still fail after the last attempt
+    """
+    events_client = get_boto3_client('events')
+    pending = entries
+
+    for attempt in range(PUT_EVENTS_MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(PUT_EVENTS_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+
+        with metrics.timer('PutEventsLatency'):
+            response = events_client.put_events(Entries=pending)
+        if not response.get('FailedEntryCount'):
+            log.debug('eventbridge_broadcast', entries=len(entries))
+            return
+
+        results = response.get('Entries', [])
+        failed = [entry for entry, result in zip(pending, results) if result.get('ErrorCode')]
+        if not failed:
+            return
+        errors = sorted({result['ErrorCode'] for result in results if result.get('ErrorCode')})
+        log.warning('put_events_partial_failure', attempt=attempt + 1,
+                    failed=len(failed), sent=len(pending), error_codes=errors)
+        pending = failed
+
+    raise RuntimeError(f"{len(pending)} of {len(entries)} event(s) not delivered after "
+                       f"{PUT_EVENTS_MAX_ATTEMPTS} attempts")
+
+
+def notification_rule(event_detail: dict, config: dict):
+    """
+    The rule behind an enforcement action and the resource name it acted on.
+
+    Actions without a resourceType come from the DynamoDB rule.
+    """
+    rule = config['rules'].rule_for_resource_type(event_detail.get('resourceType'))
+    return rule, event_detail.get('resourceName') or event_detail[f'{rule.noun}Name']
+
+
+def notification_attributes(account_id: str, region: str, resource_name: str, action: str,
+                            rule) -> dict:
+    """
+    SNS MessageAttributes used for subscription filter policies.
+
+    The resource name goes under '<noun>Name' (e.g. tableName), and
+    resourceType tells the rules apart.
+    """
+    return {
+        'accountId': {
+            'DataType': 'String',
+            'StringValue': account_id
+        },
+        'region': {
+            'DataType': 'String',
+            'StringValue': region
+        },
+        f'{rule.noun}Name': {
+            'DataType': 'String',
+            'StringValue': resource_name
+        },
+        'resourceType': {
+            'DataType': 'String',
+            'StringValue': rule.resource_type
+        },
+        'action': {
+            'DataType': 'String',
+            'StringValue': action
+        }
+    }
+
+
+def publish_notification(event_detail: dict, message: str, config: dict):
+    """Send the human-readable enforcement alert for one resource to SNS."""
+    rule, resource_name = notification_rule(event_detail, config)
+    subject = f"[COST ALERT] {rule.detail_type}: {resource_name}"
+    if event_detail.get('circuitBreaker') == OPENED.upper():
+        subject = f"[COST ALERT] ESCALATED: repeated {rule.plural_label} in {event_detail['accountId']}"
+    sns_client = get_boto3_client('sns')
+    with metrics.timer('SNSPublishLatency'):
+        sns_client.publish(
+            TopicArn=config['sns_topic_arn'],
+            Subject=subject,
+            Message=message,
+            MessageAttributes=notification_attributes(
+                event_detail['accountId'], event_detail['region'],
+                resource_name, event_detail['action'], rule,
+            )
+        )
+    log.debug('sns_sent', resource_name=resource_name)
+
+
+def publish_digest(account_id: str, actions: list, config: dict):
+    """
+    Send one SNS alert summarising several enforcement actions in one account.
+
+    The action attribute is DELETED only if every resource was deleted, so
+    filter policies on DELETE_FAILED still see partial failures. Digests are
+    sent per rule, so each names one kind of resource.
+    """
+    details = [event_detail for event_detail, _ in actions]
+    rule = notification_rule(details[0], config)[0]
+    names = [notification_rule(d, config)[1] for d in details]
+    regions = sorted({d['region'] for d in details})
+    deleted = sum(1 for d in details if d['action'] == 'DELETED')
+
+    message = (
+        f"{len(actions)} {rule.plural_label} detected in account {account_id} "
+        f"({deleted} deleted, {len(actions) - deleted} failed).\n\n"
+        + "\n\n---\n\n".join(message for _, message in actions)
+    )
+
+    sns_client = get_boto3_client('sns')
+    with metrics.timer('SNSPublishLatency'):
+        sns_client.publish(
+            TopicArn=config['sns_topic_arn'],
+            Subject=f"[COST ALERT] {len(actions)} {rule.plural_label} {rule.remediation} in {account_id}",
+            Message=message,
+            MessageAttributes=notification_attributes(
+                account_id, ','.join(regions), ','.join(names),
+                'DELETED' if deleted == len(actions) else 'DELETE_FAILED', rule,
+            )
+        )
+    log.debug('sns_digest_sent', account_id=account_id, actions=len(actions))
+
+
+def notification_timeout(context) -> float:
+    """
+    Seconds the notification fan-out may take.
+
+    Tied to the Lambda's remaining time (less a margin to return cleanly), or
+    NOTIFY_TIMEOUT_SECONDS when there is no Lambda context.
+    """
+    if context is None or not hasattr(context, 'get_remaining_time_in_millis'):
+        return NOTIFY_TIMEOUT_SECONDS
+    return max(0.0, (context.get_remaining_time_in_millis() - NOTIFY_TIMEOUT_MARGIN_MS) / 1000)
+
+
+def send_notifications(actions: list, config: dict, context=None) -> dict:
+    """
+    Send the EventBridge broadcasts and SNS alerts for a set of enforcement actions.
+
+    EventBridge entries are grouped into PutEvents calls of up to 10 entries,
+    each with its rule's DetailType. SNS gets one message per action, or with
+    SNS_DIGEST_MODE one message per account and rule for all actions in this
+    invocation (the batch is the digest window, so per-event invocations
+    never combine anything).
+
+    Actions from an account whose circuit breaker is open (circuitBreaker
+    OPEN) are broadcast but get no SNS alert; the escalated alert sent when
+    it opened (circuitBreaker OPENED) covers them.
+
+    All calls run concurrently and share one timeout budget from
+    notification_timeout(). Failures (and timeouts) are reported per call and
+    never raised, matching the previous best-effort behaviour.
 
     Args:
-        event: CloudTrail event from EventBridge containing DynamoDB API call details
-        context: Lambda context object
+        actions: List of (event_detail, message) pairs from enforce_event
 
     Returns:
-        dict with statusCode and body describing the action taken
+        dict of channel name ('eventbridge', 'sns') to a list of error strings
     """
-    print(f"Received event: {json.dumps(event)}")
+    entries = [
+        {
+            'Source': config['eventbridge_source'],
+            'DetailType': notification_rule(event_detail, config)[0].detail_type,
+            'Detail': json.dumps(event_detail),
+            'EventBusName': config['event_bus_name']
+        }
+        for event_detail, _ in actions
+    ]
+    tasks = [
+        ('eventbridge', put_events_chunk, (chunk, config))
+        for chunk in chunked(entries, PUT_EVENTS_MAX_ENTRIES)
+    ]
 
-    # Get configuration
-    config = get_config()
+    if config['sns_topic_arn']:
+        by_account = {}
+        for event_detail, message in actions:
+            breaker = event_detail.get('circuitBreaker')
+            if breaker == OPEN.upper():
+                continue
+            if breaker == OPENED.upper():
+                # The escalation always goes out on its own, never inside a digest
+                tasks.append(('sns', publish_notification, (event_detail, message, config)))
+                continue
+            key = (event_detail['accountId'], notification_rule(event_detail, config)[0].name)
+            by_account.setdefault(key, []).append((event_detail, message))
+
+        for (account_id, _), account_actions in by_account.items():
+            if config['sns_digest'] and len(account_actions) > 1:
+                tasks.append(('sns', publish_digest, (account_id, account_actions, config)))
+            else:
+                tasks.extend(('sns', publish_notification, (event_detail, message, config))
+                             for event_detail, message in account_actions)
+
+    futures = {
+        _NOTIFY_EXECUTOR.submit(func, *args): channel
+        for channel, func, args in tasks
+    }
+    done, _ = wait(futures, timeout=notification_timeout(context))
+
+    results = {'eventbridge': [], 'sns': []} if config['sns_topic_arn'] else {'eventbridge': []}
+    for future, channel in futures.items():
+        if future not in done:
+            results[channel].append('timed out')
+        elif future.exception() is not None:
+            results[channel].append(str(future.exception()))
+
+    for channel, errors in results.items():
+        for error in errors:
+            log.error('notify_failed', channel=channel, error=error)
+            metrics.increment('NotifyFailed', Channel=channel)
+
+    return results
+
+
+def metric_dimensions(metadata: dict) -> dict:
+    """EMF dimensions for per-event metrics: the source account and region."""
+    return {'AccountId': metadata['account_id'], 'Region': metadata['region']}
 
+
+def tag_exemption(rule, detail: dict, resource_name: str, metadata: dict, config: dict):
+    """
+    The tag rule exempting the resource, or None.
+
+    Tags come from the request when it carries them (and are cached for later
+    events), otherwise from the container's TagCache or a lookup bounded by
+    TAG_LOOKUP_TIMEOUT_MS.
+
+    Raises:
+        TagLookupError: if the lookup failed or ran out of time, so the caller
+            does not enforce on tags it has not seen
+    """
+    account_id, region = metadata['account_id'], metadata['region']
+    arn = rule.resource_arn(resource_name, account_id, region)
+    cache = get_tag_cache()
+
+    tags = rule.tags_from_request(detail)
+    if tags is not None:
+        cache.put(arn, tags)
+    else:
+        tags = cache.get(arn)
+    if tags is None:
+        def fetch():
+            return rule.list_tags(get_boto3_client(rule.service, account_id, region), resource_name, arn)
+        try:
+            with metrics.timer('TagLookupLatency', **metric_dimensions(metadata)):
+                tags = cache.lookup(arn, fetch, config['tag_lookup_timeout_ms'] / 1000)
+        except Exception as e:
+            log.warning('tag_lookup_failed', resource_arn=arn, error=str(e))
+            metrics.increment('TagLookupFailed', **metric_dimensions(metadata))
+            raise TagLookupError(f'Tags of {arn} could not be read: {e}') from e
+        if tags is None:
+            log.warning('tag_lookup_timeout', resource_arn=arn, timeout_ms=config['tag_lookup_timeout_ms'])
+            metrics.increment('TagLookupTimeout', **metric_dimensions(metadata))
+            raise TagLookupError(f"Tags of {arn} not read within {config['tag_lookup_timeout_ms']}ms")
+    return config['exemptions'].match_tags(tags, account_id)
+
+
+def log_decision(decision: str, event: dict, metadata: dict, level: str = 'INFO', **fields):
+    """
+    Write the single structured record describing what happened to one event,
+    and count the outcome (e.g. 'delete_failed' -> DeleteFailed metric).
+
+    The raw event is attached only when sampled (or on errors), and nothing is
+    encoded at all if the level is disabled.
+    """
+    log.log(level, 'decision', decision=decision, event_id=event.get('id'),
+            payload=event, **metadata, **fields)
+    metrics.increment(decision.title().replace('_', ''), **metric_dimensions(metadata))
+
+
+def enforce_event(event: dict, config: dict, context=None, notifications=None) -> dict:
+    """
+    Apply the matching enforcement rule to a single CloudTrail event.
+
+    Shared by the single-event and batch entry points. The rule (rules.py)
+    supplies detection and remediation for its resource type; exemptions,
+    idempotency, retries and notifications are the same for every rule.
+
+    Args:
+        event: CloudTrail event from EventBridge containing the API call details
+        config: Configuration from get_config()
+        context: Lambda context object, used to bound notification time
+        notifications: Optional list to append (event_detail, message) to instead
+            of notifying immediately, so callers can send a batch together
+
+    Returns:
+        dict with statusCode, decision (e.g. 'deleted', 'exempt') and a body
+        describing the action taken
+    """
+    claimed_event_id = None
     try:
-        detail = event.get('detail', {})
+        detail = event.get('detail') or {}
         metadata = extract_event_metadata(event)
 
-        # Extract table name from the API call
-        request_params = detail.get('requestParameters', {})
-        table_name = request_params.get('tableName', '')
+        rule = config['rules'].rule_for(detail)
+        if rule is None:
+            log_decision('no_rule', event, metadata, event_source=detail.get('eventSource'))
+            return {'statusCode': 200, 'decision': 'no_rule',
+                    'body': f"No rule for {detail.get('eventSource')} {detail.get('eventName')}"}
+        noun = rule.noun
 
-        if not table_name:
-            print("No table name found in event")
-            return {'statusCode': 200, 'body': 'No table name'}
+        # Extract the resource name from the API call (null for some malformed events)
+        request_params = detail.get('requestParameters') or {}
+        resource_name = rule.resource_name(request_params)
+        name_field = {f'{noun}_name': resource_name}
 
-        print(f"Processing table '{table_name}' in account {metadata['account_id']}, "
-              f"region {metadata['region']}, triggered by {metadata['user_arn']}")
+        if not resource_name:
+            log_decision(f'no_{noun}_name', event, metadata, rule=rule.name)
+            return {'statusCode': 200, 'decision': f'no_{noun}_name', 'body': f'No {noun} name'}
 
-        # Check if table is exempt
-        for prefix in config['exempt_table_prefixes']:
-            if prefix and table_name.startswith(prefix.strip()):
-                print(f"Table {table_name} is exempt (prefix: {prefix})")
-                return {'statusCode': 200, 'body': f'Table {table_name} exempt'}
+        # A failed API call did not create or change the resource
+        if detail.get('errorCode'):
+            log_decision('request_failed', event, metadata, **name_field,
+                         error_code=detail['errorCode'])
+            return {'statusCode': 200, 'decision': 'request_failed',
+                    'body': f"Request failed ({detail['errorCode']})"}
 
-        # Get DynamoDB client
-        dynamodb = get_boto3_client('dynamodb')
+        # The mode the request proves, if any (a retry re-checks the resource instead)
+        requested_mode = None if retry_attempt(event) else rule.mode_from_request(detail)
+        compliant_request = requested_mode is not None and not rule.violates(requested_mode)
 
-        # Get current table status
-        try:
-            response = dynamodb.describe_table(TableName=table_name)
-            table = response['Table']
-            billing_mode = table.get('BillingModeSummary', {}).get('BillingMode', 'PROVISIONED')
-        except dynamodb.exceptions.ResourceNotFoundException:
-            print(f"Table {table_name} not found (may have been deleted)")
-            return {'statusCode': 200, 'body': 'Table not found'}
+        # Check if the resource is exempt, by name and then by tags (not worth
+        # looking up for a request that is compliant anyway)
+        exemption = config['exemptions'].match(resource_name, metadata['account_id'])
+        if not exemption and not compliant_request and config['exemptions'].has_tag_rules(metadata['account_id']):
+            try:
+                exemption = tag_exemption(rule, detail, resource_name, metadata, config)
+            except TagLookupError as e:
+                # Unknown tags may be exempt ones: try again later, or fail the event
+                # so it is redelivered, rather than enforce
+                delay = schedule_retry(event, config, e)
+                if not delay:
+                    raise
+                attempt = retry_attempt(event)
+                log_decision('tag_lookup_deferred', event, metadata, **name_field,
+                             attempt=attempt + 1, delay_seconds=delay, error=str(e))
+                return {'statusCode': 200, 'decision': 'tag_lookup_deferred',
+                        'body': f'Tags of {noun} {resource_name} unknown, retry {attempt + 1} in {delay}s'}
+        if exemption:
+            log_decision('exempt', event, metadata, **name_field,
+                         exemption=lambda: describe_rule(exemption))
+            return {'statusCode': 200, 'decision': 'exempt',
+                    'body': f'{noun.capitalize()} {resource_name} exempt'}
+
+        # Skip redeliveries of the same CloudTrail event (each retry is its own delivery)
+        event_id = detail.get('eventID')
+        attempt = retry_attempt(event)
+        if event_id and attempt:
+            event_id = f'{event_id}#retry{attempt}'
+        if event_id:
+            if not idempotency_call('claim_event', True, event_id):
+                log_decision('duplicate', event, metadata, **name_field)
+                return {'statusCode': 200, 'decision': 'duplicate', 'body': f'Duplicate event {event_id}'}
+            claimed_event_id = event_id
+
+        # Skip events that happened before we last remediated this resource
+        # (e.g. the UpdateTable that followed the CreateTable we acted on)
+        record_key = rule.record_key(resource_name)
+        if idempotency_call('enforced_since', False, metadata['account_id'], metadata['region'],
+                            record_key, event_timestamp(metadata['event_time'])):
+            log_decision('already_enforced', event, metadata, **name_field)
+            return {'statusCode': 200, 'decision': 'already_enforced',
+                    'body': f'{noun.capitalize()} {resource_name} already deleted after this event'}
 
-        print(f"Table {table_name} has billing mode: {billing_mode}")
+        # Client in the sandbox account and region that owns the resource
+        client = get_boto3_client(rule.service, metadata['account_id'], metadata['region'])
+        not_found_errors = rule.not_found_errors(client)
 
-        # If table is On-Demand, DELETE it
-        if billing_mode == 'PAY_PER_REQUEST':
+        # Decide from the request when it proves the mode (fast path),
+        # otherwise fall back to the resource's current state
+        # A retry re-checks the resource, which may have changed since the request
+        mode = requested_mode
+        decision_path = 'request' if mode is not None else rule.describe_call
+        record_decision_path(decision_path)
+        if mode is None:
+            try:
+                with metrics.timer(rule.describe_metric, **metric_dimensions(metadata)):
+                    mode = rule.current_mode(client, resource_name)
+            except not_found_errors:
+                log_decision('not_found', event, metadata, **name_field,
+                             decision_path=decision_path)
+                return {'statusCode': 200, 'decision': 'not_found', 'body': f'{noun.capitalize()} not found'}
+
+        # Dry run: report what would be remediated and stop there. Nothing was
+        # deleted, so nothing is recorded that would make later events look stale
+        # (a replay of historical events would report them 'already_enforced')
+        if rule.violates(mode) and config['dry_run']:
+            log_decision('would_delete', event, metadata, **name_field,
+                         **{rule.mode_field: mode}, decision_path=decision_path)
+            return {'statusCode': 200, 'decision': 'would_delete',
+                    'body': f"{rule.resource_label} '{resource_name}' detected with {rule.violation} (dry run)"}
+
+        # If the resource violates the rule, remediate (e.g. DELETE the table)
+        if rule.violates(mode):
             message = (
-                f"DynamoDB table '{table_name}' detected with On-Demand billing mode.\n"
+                f"{rule.resource_label} '{resource_name}' detected with {rule.violation}.\n"
                 f"Account: {metadata['account_id']}\n"
                 f"Region: {metadata['region']}\n"
                 f"Created by: {metadata['user_arn']}\n"
@@ -141,21 +1078,62 @@ def lambda_handler(event, context):
             )
 
             delete_success = False
+            delete_error = None
             try:
-                dynamodb.delete_table(TableName=table_name)
-                message += "\n\nACTION: TABLE DELETED."
+                with metrics.timer(rule.remediate_metric, **metric_dimensions(metadata)):
+                    rule.remediate(client, resource_name)
+                message += f"\n\nACTION: {rule.action_taken}"
                 delete_success = True
-                print(message)
+                idempotency_call('record_enforcement', None, metadata['account_id'],
+                                 metadata['region'], record_key)
+
+            except not_found_errors:
+                # Only reachable on the fast path, where the lookup was skipped
+                log_decision('not_found', event, metadata, **name_field,
+                             decision_path=decision_path)
+                return {'statusCode': 200, 'decision': 'not_found', 'body': f'{noun.capitalize()} not found'}
 
             except Exception as e:
-                message += f"\n\nACTION FAILED: {str(e)}"
-                print(message)
+                # Resource still CREATING/UPDATING: try again later instead of failing now
+                delay = schedule_retry(event, config, e)
+                if delay:
+                    log_decision('retry_scheduled', event, metadata, **name_field,
+                                 attempt=attempt + 1, delay_seconds=delay, error=str(e))
+                    return {'statusCode': 200, 'decision': 'retry_scheduled',
+                            'body': f'{noun.capitalize()} {resource_name} not deletable yet, '
+                                    f'retry {attempt + 1} in {delay}s'}
+                delete_error = str(e)
+                message += f"\n\nACTION FAILED: {delete_error}"
+                if attempt:
+                    message += f" (after {attempt + 1} attempts)"
+
+            # Repeated violations from one account collapse into one escalated alert.
+            # Sweep findings are leftovers found in bulk, not an account running away.
+            breaker = CLOSED
+            if event.get('source') != SWEEP_EVENT_SOURCE:
+                breaker = account_guard_call('record_violation', CLOSED, metadata['account_id'])
+            if breaker == OPENED:
+                message = (
+                    f"ESCALATED: {config['breaker_threshold']} or more {rule.plural_label} in account "
+                    f"{metadata['account_id']} within {config['breaker_window_seconds']}s. Further "
+                    f"alerts for this account are paused for {config['breaker_open_seconds']}s; "
+                    f"enforcement continues.\n\n{message}"
+                )
+                metrics.increment('CircuitOpened', **metric_dimensions(metadata))
+
+            decision = 'deleted' if delete_success else 'delete_failed'
+            log_decision(decision, event, metadata,
+                         level='INFO' if delete_success else 'ERROR', **name_field,
+                         **{rule.mode_field: mode}, decision_path=decision_path, error=delete_error,
+                         **({'circuit_breaker': breaker} if breaker != CLOSED else {}))
 
             # Broadcast to EventBridge with full metadata
             event_detail = {
-                'tableName': table_name,
+                **rule.notification_fields(resource_name),
+                'resourceType': rule.resource_type,
+                'resourceName': resource_name,
                 'action': 'DELETED' if delete_success else 'DELETE_FAILED',
-                'reason': 'On-Demand billing mode not allowed',
+                'reason': rule.reason,
                 'accountId': metadata['account_id'],
                 'region': metadata['region'],
                 'eventTime': metadata['event_time'],
@@ -167,58 +1145,241 @@ def lambda_handler(event, context):
                 },
                 'enforcementTimestamp': datetime.now(timezone.utc).isoformat(),
             }
+            if breaker != CLOSED:
+                event_detail['circuitBreaker'] = breaker.upper()
 
-            try:
-                events_client = get_boto3_client('events')
-                events_client.put_events(
-                    Entries=[
-                        {
-                            'Source': config['eventbridge_source'],
-                            'DetailType': 'DynamoDB On-Demand Table Deleted',
-                            'Detail': json.dumps(event_detail),
-                            'EventBusName': config['event_bus_name']
-                        }
-                    ]
-                )
-                print(f"EventBridge event broadcast: {json.dumps(event_detail)}")
-            except Exception as e:
-                print(f"Failed to broadcast EventBridge event: {str(e)}")
-
-            # Send SNS notification
-            if config['sns_topic_arn']:
-                try:
-                    sns_client = get_boto3_client('sns')
-                    sns_client.publish(
-                        TopicArn=config['sns_topic_arn'],
-                        Subject=f"[COST ALERT] DynamoDB On-Demand Table Deleted: {table_name}",
-                        Message=message,
-                        MessageAttributes={
-                            'accountId': {
-                                'DataType': 'String',
-                                'StringValue': metadata['account_id']
-                            },
-                            'region': {
-                                'DataType': 'String',
-                                'StringValue': metadata['region']
-                            },
-                            'tableName': {
-                                'DataType': 'String',
-                                'StringValue': table_name
-                            },
-                            'action': {
-                                'DataType': 'String',
-                                'StringValue': 'DELETED' if delete_success else 'DELETE_FAILED'
-                            }
-                        }
-                    )
-                    print("SNS notification sent")
-                except Exception as e:
-                    print(f"Failed to send SNS notification: {str(e)}")
-
-            return {'statusCode': 200, 'body': message}
-
-        return {'statusCode': 200, 'body': f'Table {table_name} is already provisioned'}
+            if notifications is None:
+                send_notifications([(event_detail, message)], config, context)
+            else:
+                notifications.append((event_detail, message))
+
+            return {'statusCode': 200, 'decision': decision, 'body': message}
+
+        log_decision(rule.compliant_decision, event, metadata, **name_field,
+                     **{rule.mode_field: mode}, decision_path=decision_path)
+        return {'statusCode': 200, 'decision': rule.compliant_decision,
+                'body': f"{noun.capitalize()} {resource_name} is already {rule.compliant_decision.replace('_', ' ')}"}
 
     except Exception as e:
-        print(f"Error processing event: {str(e)}")
+        log.error('error', error=str(e), error_type=type(e).__name__,
+                  event_id=event.get('id'), payload=event)
+        # Let a retry of this event through
+        if claimed_event_id:
+            idempotency_call('release_event', None, claimed_event_id)
         raise
+
+
+def parse_batch_records(event) -> list:
+    """
+    Normalise a batch invocation into (item_identifier, cloudtrail_event) pairs.
+
+    Accepts an SQS batch (each record body is an EventBridge event), a plain
+    list of EventBridge events, or a single EventBridge event.
+
+    Records that are not an object, or whose body cannot be decoded to one,
+    are returned with an exception in place of the event so they are reported
+    as failures rather than dropped or failing the whole batch.
+    """
+    if isinstance(event, list):
+        return [
+            (item.get('id', str(index)), item) if isinstance(item, dict)
+            else (str(index), TypeError(f'Event {index} is not an object'))
+            for index, item in enumerate(event)
+        ]
+
+    if is_sqs_batch(event):
+        items = []
+        for record in event['Records']:
+            message_id = record.get('messageId', '') if isinstance(record, dict) else ''
+            try:
+                body = json.loads(record['body'])
+                if not isinstance(body, dict):
+                    raise TypeError(f'Body of message {message_id} is not an object')
+                items.append((record['messageId'], body))
+            except (KeyError, TypeError, ValueError) as e:
+                items.append((message_id, e))
+        return items
+
+    return [(event.get('id', '0'), event)]
+
+
+def is_sqs_batch(event) -> bool:
+    """Return True if the invocation payload is an SQS event source batch."""
+    records = event.get('Records') if isinstance(event, dict) else None
+    return isinstance(records, list) and any(
+        isinstance(record, dict) and record.get('eventSource') == 'aws:sqs' for record in records
+    )
+
+
+def defer_throttled(event: dict, config: dict) -> dict:
+    """
+    Put an event from a rate-limited account back on the retry queue.
+
+    Returns:
+        The 'throttled' outcome, or None if the event could not be deferred
+        (no retry queue, dry run, or the enqueue failed)
+    """
+    scheduler = None if config['dry_run'] else get_retry_scheduler()
+    if scheduler is None:
+        return None
+    delay = min(config['throttle_delay_seconds'], MAX_DELAY_SECONDS)
+    try:
+        scheduler.schedule(deferred_event(event), delay)
+    except Exception as e:
+        log.error('throttle_defer_failed', event_id=event.get('id'), error=str(e))
+        return None
+    log_decision('throttled', event, extract_event_metadata(event), delay_seconds=delay)
+    return {'statusCode': 200, 'decision': 'throttled', 'body': f'Account rate limited, deferred {delay}s'}
+
+
+def drops_without_work(event: dict, config: dict) -> bool:
+    """
+    Return True for an event enforce_event drops before any lookup: no rule,
+    no resource name, a failed call, a name exemption or a duplicate delivery.
+    """
+    try:
+        detail = event.get('detail') or {}
+        rule = config['rules'].rule_for(detail)
+        if rule is None or detail.get('errorCode'):
+            return True
+        resource_name = rule.resource_name(detail.get('requestParameters') or {})
+        if not resource_name:
+            return True
+        if config['exemptions'].match(resource_name, extract_event_metadata(event)['account_id']):
+            return True
+    except Exception:
+        # Malformed: let enforce_event report it
+        return False
+    event_id = detail.get('eventID')
+    return bool(event_id) and idempotency_call('seen_event', False, event_id)
+
+
+def admit_events(items: list, config: dict) -> tuple:
+    """
+    Apply the per-account token buckets to a batch.
+
+    Retries, events deferred once already and events dropped without work
+    (drops_without_work) are always admitted and take no token. Other
+    events from an account without tokens are deferred, or if that is not
+    possible moved behind the rest of the batch.
+
+    Returns:
+        (order, outcomes): indexes of items to run, admitted ones first, and
+        {index: outcome} for the deferred ones
+    """
+    admitted, late, outcomes = [], [], {}
+    for index, (_, event) in enumerate(items):
+        if (isinstance(event, Exception) or was_deferred(event) or retry_attempt(event)
+                or drops_without_work(event, config)
+                or account_guard_call('admit', True, extract_event_metadata(event)['account_id'])):
+            admitted.append(index)
+            continue
+        outcome = defer_throttled(event, config)
+        if outcome is None:
+            late.append(index)
+        else:
+            outcomes[index] = outcome
+    return admitted + late, outcomes
+
+
+def process_events(items: list, config: dict, context=None) -> list:
+    """
+    Run enforce_event over a batch of (item_identifier, event) pairs.
+
+    Records are processed concurrently on a thread pool - the work is almost
+    entirely network I/O, so threads overlap the DynamoDB calls. Notifications
+    for the whole batch are buffered and sent together afterwards, so PutEvents
+    calls are batched and SNS digests can group actions per account. Events
+    from accounts over their rate limit are deferred or run last
+    (admit_events), so other accounts are served first.
+
+    Returns:
+        List of (item_identifier, outcome) in input order, where outcome is the
+        enforce_event response or the exception raised while processing it.
+    """
+    notifications = []
+
+    def run(item):
+        item_id, event = item
+        if isinstance(event, Exception):
+            log.error('record_decode_failed', item_id=item_id, error=str(event))
+            return item_id, event
+        try:
+            with metrics.timer('EnforceLatency'):
+                return item_id, enforce_event(event, config, context, notifications)
+        except Exception as e:
+            return item_id, e
+
+    order, deferred = admit_events(items, config)
+    queued = [items[index] for index in order]
+    if len(queued) <= 1:
+        results = [run(item) for item in queued]
+    else:
+        max_workers = max(1, min(config['batch_max_workers'], len(queued)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(run, queued))
+
+    by_index = dict(zip(order, results))
+    outcomes = [by_index[index] if index in by_index else (items[index][0], deferred[index])
+                for index in range(len(items))]
+
+    if notifications:
+        send_notifications(notifications, config, context)
+
+    return outcomes
+
+
+@metrics.flush_after
+def batch_handler(event, context):
+    """
+    Batch entry point for SQS (or a list of EventBridge events).
+
+    Uses SQS partial batch responses: only records that failed are returned in
+    batchItemFailures, so successfully enforced records are not retried.
+
+    Args:
+        event: SQS event, or a list of CloudTrail events from EventBridge
+        context: Lambda context object
+
+    Returns:
+        dict with batchItemFailures listing the failed item identifiers
+    """
+    config = get_config()
+    items = parse_batch_records(event)
+    log.info('batch_received', records=len(items))
+
+    failures = [
+        {'itemIdentifier': item_id}
+        for item_id, outcome in process_events(items, config, context)
+        if isinstance(outcome, Exception)
+    ]
+
+    if failures:
+        log.warning('batch_failures', failed=len(failures), records=len(items))
+
+    return {'batchItemFailures': failures}
+
+
+@metrics.flush_after
+def lambda_handler(event, context):
+    """
+    Enforces DynamoDB billing mode policy by DELETING On-Demand tables.
+    Triggered by EventBridge when CreateTable or UpdateTable is called.
+
+    SQS batches (and lists of events) are routed to batch_handler, so the same
+    function can be targeted directly by EventBridge or through the batch queue.
+
+    Args:
+        event: CloudTrail event from EventBridge containing DynamoDB API call details
+        context: Lambda context object
+
+    Returns:
+        dict with statusCode and body describing the action taken
+    """
+    if isinstance(event, list) or is_sqs_batch(event):
+        return batch_handler(event, context)
+
+    [(_, outcome)] = process_events(parse_batch_records(event), get_config(), context)
+    if isinstance(outcome, Exception):
+        raise outcome
+    return outcome
@@ -0,0 +1,135 @@
+"""
+CloudWatch metrics via Embedded Metric Format (EMF).
+
+Metrics are buffered in memory during an invocation and written at the end
+as EMF JSON lines on stdout. CloudWatch Logs extracts them into metrics, so
+there are no PutMetricData calls on the hot path.
+
+One line is written per dimension set (e.g. per source account and region),
+and each metric carries all of its values for the invocation as an array,
+so a batch of 10 events costs a handful of log lines, not dozens.
+
+USAGE:
+    metrics = MetricsLogger('ndx/DynamoDBBillingEnforcer')
+
+    with metrics.timer('DescribeTableLatency', AccountId=account, Region=region):
+        dynamodb.describe_table(...)
+
+    @metrics.timed('PutEventsLatency')
+    def put_events_chunk(...): ...
+
+    metrics.increment('Deleted', AccountId=account, Region=region)
+
+    @metrics.flush_after
+    def lambda_handler(event, context): ...
+"""
+import functools
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# EMF limits per document
+MAX_METRICS_PER_DOCUMENT = 100
+MAX_VALUES_PER_METRIC = 100
+
+
+class MetricsLogger:
+    """Buffers metric values by dimension set and writes them as EMF on flush()."""
+
+    def __init__(self, namespace: str = 'DynamoDBBillingEnforcer', enabled: bool = True, stream=None):
+        self._lock = threading.Lock()
+        self._stream = stream
+        # {dimensions tuple: {metric name: (unit, [values])}}
+        self._buffer = {}
+        self.configure(namespace, enabled)
+
+    def configure(self, namespace: str = 'DynamoDBBillingEnforcer', enabled: bool = True):
+        self.namespace = namespace
+        self.enabled = enabled
+
+    def put_metric(self, name: str, value: float, unit: str = 'Count', **dimensions):
+        """Record one value; dimensions are name=value strings (e.g. AccountId='1234')."""
+        if not self.enabled:
+            return
+        key = tuple(sorted(dimensions.items()))
+        with self._lock:
+            metrics = self._buffer.setdefault(key, {})
+            metrics.setdefault(name, (unit, []))[1].append(value)
+
+    def increment(self, name: str, value: int = 1, **dimensions):
+        """Count an occurrence of name."""
+        self.put_metric(name, value, 'Count', **dimensions)
+
+    @contextmanager
+    def timer(self, name: str, **dimensions):
+        """Record the duration of the with-block in milliseconds, even if it raises."""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.put_metric(name, (time.perf_counter() - started) * 1000, 'Milliseconds', **dimensions)
+
+    def timed(self, name: str, **dimensions):
+        """Decorator form of timer()."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **dimensions):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def flush_after(self, handler):
+        """Decorator for Lambda handlers: flush buffered metrics when the handler returns or raises."""
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                self.flush()
+        return wrapper
+
+    def documents(self) -> list:
+        """Drain the buffer into EMF documents (one or more per dimension set)."""
+        with self._lock:
+            buffer, self._buffer = self._buffer, {}
+
+        timestamp = int(time.time() * 1000)
+        documents = []
+        for dimensions, metrics in buffer.items():
+            # Split so no document exceeds the EMF metric or value limits
+            pending = [(name, unit, values[i:i + MAX_VALUES_PER_METRIC])
+                       for name, (unit, values) in metrics.items()
+                       for i in range(0, len(values), MAX_VALUES_PER_METRIC)]
+            while pending:
+                document, remaining, definitions = dict(dimensions), [], []
+                for name, unit, values in pending:
+                    if name in document or len(definitions) >= MAX_METRICS_PER_DOCUMENT:
+                        remaining.append((name, unit, values))
+                        continue
+                    definitions.append({'Name': name, 'Unit': unit})
+                    document[name] = values[0] if len(values) == 1 else values
+                document['_aws'] = {
+                    'Timestamp': timestamp,
+                    'CloudWatchMetrics': [{
+                        'Namespace': self.namespace,
+                        'Dimensions': [[key for key, _ in dimensions]],
+                        'Metrics': definitions,
+                    }],
+                }
+                documents.append(document)
+                pending = remaining
+        return documents
+
+    def flush(self):
+        """Write all buffered metrics as EMF lines and clear the buffer."""
+        documents = self.documents()
+        if not documents:
+            return
+        lines = ''.join(json.dumps(document, separators=(',', ':')) + '\n' for document in documents)
+        (self._stream or sys.stdout).write(lines)
@@ -0,0 +1,203 @@
+"""
+Hot-reloadable enforcer policy.
+
+Exemptions, enabled rules and notification settings can live in a JSON
+policy document in SSM Parameter Store (POLICY_PARAMETER) or AppConfig
+(POLICY_APPCONFIG) instead of the Lambda environment, so changing them is a
+parameter update rather than a Terraform apply that restarts every container.
+
+DOCUMENT:
+    A JSON object with any of the keys in POLICY_SETTINGS, e.g.
+
+        {"exempt_table_prefixes": ["terraform-", "hackathon-"],
+         "exempt_table_rules": [{"type": "suffix", "pattern": "-lock"}],
+         "enforced_rules": ["dynamodb-on-demand"],
+         "sns_digest_mode": true}
+
+    Each key overrides the environment variable of the same name; keys left
+    out keep their environment value.
+
+    Settings that only take effect with a deploy stay in the environment:
+    the SNS topic (sns:Publish is granted on that topic alone), and the set
+    of deployed rules, whose EventBridge triggers and IAM permissions come
+    from ENFORCED_RULES. A policy may enable a subset of those rules; one
+    enabling any other is rejected when it loads (index.reload_policy).
+
+CACHING:
+    PolicyCache asks its source at most once per TTL. The source reports the
+    document's version (SSM parameter version, AppConfig version label), and
+    the document is only parsed, and the config only rebuilt, when the
+    version changes. Between checks the cached config is used as is.
+"""
+import hashlib
+import json
+import time
+
+# Policy document key -> environment variable it overrides
+POLICY_SETTINGS = {
+    'exempt_table_prefixes': 'EXEMPT_TABLE_PREFIXES',
+    'exempt_table_rules': 'EXEMPT_TABLE_RULES',
+    'exempt_tags': 'EXEMPT_TAGS',
+    'enforced_rules': 'ENFORCED_RULES',
+    'max_provisioned_concurrency': 'MAX_PROVISIONED_CONCURRENCY',
+    'sns_digest_mode': 'SNS_DIGEST_MODE',
+}
+
+
+def policy_overrides(document) -> dict:
+    """
+    Convert a policy document to environment-variable overrides for load_config().
+
+    Raises:
+        ValueError: if the document is not an object or has unknown keys
+    """
+    if not isinstance(document, dict):
+        raise ValueError("Policy document must be a JSON object")
+    unknown = sorted(set(document) - set(POLICY_SETTINGS))
+    if unknown:
+        raise ValueError(f"Unknown policy settings: {', '.join(unknown)}")
+
+    overrides = {}
+    for key, value in document.items():
+        if value is None:
+            value = ''
+        elif isinstance(value, bool):
+            value = 'true' if value else 'false'
+        elif key == 'exempt_table_rules' and not isinstance(value, str):
+            value = json.dumps(value)
+        elif isinstance(value, list):
+            value = ','.join(str(item) for item in value)
+        overrides[POLICY_SETTINGS[key]] = str(value)
+    return overrides
+
+
+class SSMPolicySource:
+    """Policy document stored in an SSM parameter (String or SecureString)."""
+
+    def __init__(self, name: str, client_factory):
+        self.name = name
+        self._client_factory = client_factory
+
+    def fetch(self, known_version):
+        """
+        Returns:
+            (version, document), with document None if the version is known_version
+        """
+        parameter = self._client_factory().get_parameter(Name=self.name, WithDecryption=True)['Parameter']
+        if parameter['Version'] == known_version:
+            return known_version, None
+        return parameter['Version'], json.loads(parameter['Value'])
+
+
+class AppConfigPolicySource:
+    """
+    Policy document from an AppConfig configuration profile.
+
+    Args:
+        identifier: 'application/environment/profile' (names or IDs)
+    """
+
+    def __init__(self, identifier: str, client_factory):
+        self.application, self.environment, self.profile = parse_appconfig(identifier)
+        self._client_factory = client_factory
+        self._token = None
+
+    def fetch(self, known_version):
+        """
+        Returns:
+            (version, document), with document None if AppConfig has nothing
+            newer for this session
+        """
+        client = self._client_factory()
+        if self._token is None:
+            self._token = client.start_configuration_session(
+                ApplicationIdentifier=self.application,
+                EnvironmentIdentifier=self.environment,
+                ConfigurationProfileIdentifier=self.profile,
+            )['InitialConfigurationToken']
+        try:
+            response = client.get_latest_configuration(ConfigurationToken=self._token)
+        except Exception:
+            # Tokens expire after 24 hours; start a new session next time
+            self._token = None
+            raise
+        self._token = response['NextPollConfigurationToken']
+
+        content = response['Configuration'].read()
+        if not content:
+            return known_version, None
+        version = response.get('VersionLabel') or hashlib.sha256(content).hexdigest()[:12]
+        return version, json.loads(content)
+
+
+def parse_appconfig(identifier: str) -> tuple:
+    """Split POLICY_APPCONFIG into (application, environment, profile)."""
+    parts = identifier.split('/')
+    if len(parts) != 3 or not all(parts):
+        raise ValueError(f"POLICY_APPCONFIG must be application/environment/profile, got {identifier!r}")
+    return tuple(parts)
+
+
+class LocalPolicySource:
+    """In-memory stand-in for the SSM and AppConfig sources, for tests and local runs."""
+
+    def __init__(self, document: dict = None):
+        self.version = 0
+        self.document = None
+        self.fetches = 0
+        if document is not None:
+            self.publish(document)
+
+    def publish(self, document: dict):
+        """Store a new version of the document."""
+        self.version += 1
+        self.document = document
+
+    def fetch(self, known_version):
+        self.fetches += 1
+        if self.document is None:
+            raise LookupError('No policy published')
+        if self.version == known_version:
+            return known_version, None
+        return self.version, self.document
+
+
+class PolicyCache:
+    """
+    Overrides from a policy source, checked at most once per ttl_seconds.
+
+    Not thread-safe; callers serialise refresh().
+    """
+
+    def __init__(self, source, ttl_seconds: int = 60, clock=time.monotonic):
+        self.source = source
+        self.ttl_seconds = ttl_seconds
+        self.version = None
+        self.overrides = {}
+        self._clock = clock
+        self._checked_at = None
+
+    def refresh(self) -> bool:
+        """
+        Check the source if the TTL has passed.
+
+        Returns:
+            True if a new version was loaded into overrides
+
+        Raises:
+            Whatever the source raised, or ValueError for an invalid document.
+            The next check is still a full TTL away, so a failing source is
+            not called on every invocation.
+        """
+        now = self._clock()
+        if self._checked_at is not None and now - self._checked_at < self.ttl_seconds:
+            return False
+        self._checked_at = now
+
+        version, document = self.source.fetch(self.version)
+        if document is None:
+            return False
+        # Record the version first so a bad document is not parsed again
+        self.version = version
+        self.overrides = policy_overrides(document)
+        return True
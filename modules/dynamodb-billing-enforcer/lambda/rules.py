@@ -0,0 +1,450 @@
+"""
+Enforcement rules for resource modes that bypass service quotas.
+
+SCPs can deny an API call but not a parameter value on most services, so
+uncapped capacity modes are enforced after the fact instead: CloudTrail
+reports the call, and the rule matching it decides whether the resource
+violates policy and how to remediate it.
+
+Each rule declares the CloudTrail (eventSource, eventName) pairs it handles.
+RuleEngine indexes them once (at container init, via get_config) so
+dispatching an event is a single dict lookup however many rules there are.
+Everything that is not resource specific - exemptions, idempotency, the
+client pool, retries and notifications - stays in index.enforce_event.
+Rules also say where a resource's tags are found, for tag exemptions, and
+which requests need no action at all, for the EventBridge pattern
+(event_pattern.py).
+
+RULES:
+    dynamodb-on-demand              DynamoDB tables in PAY_PER_REQUEST mode (deleted)
+    kinesis-on-demand               Kinesis streams in ON_DEMAND mode (deleted)
+    lambda-provisioned-concurrency  Provisioned concurrency above
+                                    MAX_PROVISIONED_CONCURRENCY (config deleted)
+
+ADDING A RULE:
+    Subclass Rule, set the class attributes, implement resource_name,
+    mode_from_request, current_mode, violates, remediate, resource_arn and
+    list_tags, and add the class to RULE_CLASSES. The EventBridge pattern is
+    generated from the triggers; override request_filter if the request alone
+    can show that a call needs no action.
+"""
+
+from tags import tags_to_dict
+
+# DynamoDB billing modes that can be acted on without calling DescribeTable
+KNOWN_BILLING_MODES = ('PAY_PER_REQUEST', 'PROVISIONED')
+
+# Kinesis stream modes that can be acted on without calling DescribeStreamSummary
+KNOWN_STREAM_MODES = ('ON_DEMAND', 'PROVISIONED')
+
+
+class Rule:
+    """
+    Base class for an enforcement rule.
+
+    Class attributes:
+        name: Identifier used in ENFORCED_RULES and logs
+        resource_type: CloudFormation type, carried in notifications
+        service: boto3 client used to check and remediate the resource
+        triggers: CloudTrail (eventSource, eventName) pairs the rule handles
+        noun: Resource noun for decisions, log fields and messages ('table')
+        resource_label: Resource as named in alert messages ('DynamoDB table')
+        mode_field: Log field the observed mode is recorded under
+        compliant_decision: Decision when the resource does not violate policy
+        label: Notification label, e.g. 'DynamoDB On-Demand Table'
+        plural_label: label for digests of several resources
+        remediation: Past-tense verb for what remediate() does ('Deleted')
+        violation: What was detected, completing "<noun> '<name>' detected with ..."
+        reason: Reason given in the EventBridge broadcast
+        describe_call: API call current_mode() makes, logged as the decision
+            path when the request does not prove the mode
+        describe_metric / remediate_metric: Latency timer names
+        name_parameter: Request parameter holding the resource name exemptions
+            match, for the EventBridge pattern ('' if no single one does)
+        request_filter_uses_policy: request_filter() depends on settings a
+            policy source can change after deployment
+    """
+
+    name = ''
+    resource_type = ''
+    service = ''
+    triggers = ()
+    noun = 'resource'
+    resource_label = 'Resource'
+    mode_field = 'mode'
+    compliant_decision = 'compliant'
+    label = ''
+    plural_label = ''
+    remediation = 'Deleted'
+    violation = ''
+    reason = ''
+    describe_call = ''
+    describe_metric = ''
+    remediate_metric = ''
+    name_parameter = ''
+    request_filter_uses_policy = False
+
+    def resource_name(self, request_params: dict) -> str:
+        """Name of the resource the API call acted on ('' if missing)."""
+        raise NotImplementedError
+
+    def mode_from_request(self, detail: dict):
+        """Return the mode proven by the CloudTrail request, or None if ambiguous."""
+        return None
+
+    def request_filter(self, event_name: str) -> dict:
+        """
+        EventBridge content filter on requestParameters for event_name calls,
+        leaving out requests that mode_from_request proves compliant. It must
+        match every other request; {} matches them all.
+        """
+        return {}
+
+    def current_mode(self, client, name: str):
+        """Look up the resource's mode; raises one of not_found_errors(client) if it is gone."""
+        raise NotImplementedError
+
+    def not_found_errors(self, client) -> tuple:
+        """Exception classes meaning the resource no longer exists."""
+        return (client.exceptions.ResourceNotFoundException,)
+
+    def violates(self, mode) -> bool:
+        raise NotImplementedError
+
+    def remediate(self, client, name: str):
+        raise NotImplementedError
+
+    def record_key(self, name: str) -> str:
+        """Name the enforcement is recorded under in the idempotency store."""
+        return f'{self.name}/{name}'
+
+    def resource_arn(self, name: str, account_id: str, region: str) -> str:
+        """ARN the resource's tags are cached under."""
+        raise NotImplementedError
+
+    def tags_from_request(self, detail: dict):
+        """Tags the CloudTrail request gave a new resource, or None if it does not tell."""
+        return None
+
+    def list_tags(self, client, name: str, arn: str) -> dict:
+        """Look up the resource's tags as {key: value}."""
+        raise NotImplementedError
+
+    def notification_fields(self, name: str) -> dict:
+        """Resource-specific fields for the EventBridge broadcast."""
+        return {f'{self.noun}Name': name}
+
+    @property
+    def action_taken(self) -> str:
+        """Upper-case summary of the remediation for alert messages."""
+        return f'{self.noun.upper()} DELETED.'
+
+    @property
+    def detail_type(self) -> str:
+        """EventBridge DetailType and SNS subject, e.g. 'DynamoDB On-Demand Table Deleted'."""
+        return f'{self.label} {self.remediation}'
+
+
+class DynamoDBOnDemandRule(Rule):
+    """Deletes DynamoDB tables using On-Demand billing, which bypasses WCU/RCU quotas."""
+
+    name = 'dynamodb-on-demand'
+    resource_type = 'AWS::DynamoDB::Table'
+    service = 'dynamodb'
+    triggers = (('dynamodb.amazonaws.com', 'CreateTable'), ('dynamodb.amazonaws.com', 'UpdateTable'))
+    noun = 'table'
+    resource_label = 'DynamoDB table'
+    mode_field = 'billing_mode'
+    compliant_decision = 'provisioned'
+    label = 'DynamoDB On-Demand Table'
+    plural_label = 'DynamoDB On-Demand Tables'
+    violation = 'On-Demand billing mode'
+    reason = 'On-Demand billing mode not allowed'
+    describe_call = 'describe_table'
+    describe_metric = 'DescribeTableLatency'
+    remediate_metric = 'DeleteTableLatency'
+    name_parameter = 'tableName'
+
+    def resource_name(self, request_params: dict) -> str:
+        return request_params.get('tableName', '')
+
+    def mode_from_request(self, detail: dict):
+        """
+        CreateTable and UpdateTable carry billingMode when the caller set it. A
+        CreateTable without billingMode gets the API default (PROVISIONED). An
+        UpdateTable without billingMode leaves the mode unchanged, so the table
+        must be described to know it.
+        """
+        request_params = detail.get('requestParameters') or {}
+        billing_mode = request_params.get('billingMode')
+
+        if billing_mode in KNOWN_BILLING_MODES:
+            return billing_mode
+        if billing_mode is None and detail.get('eventName') == 'CreateTable':
+            return 'PROVISIONED'
+        return None
+
+    def request_filter(self, event_name: str) -> dict:
+        # Unlike CreateTable, an UpdateTable without billingMode needs the table described
+        billing_mode = [{'anything-but': ['PROVISIONED']}]
+        if event_name != 'CreateTable':
+            billing_mode.append({'exists': False})
+        return {'billingMode': billing_mode}
+
+    def current_mode(self, client, name: str):
+        table = client.describe_table(TableName=name)['Table']
+        return table.get('BillingModeSummary', {}).get('BillingMode', 'PROVISIONED')
+
+    def violates(self, mode) -> bool:
+        return mode == 'PAY_PER_REQUEST'
+
+    def remediate(self, client, name: str):
+        client.delete_table(TableName=name)
+
+    def record_key(self, name: str) -> str:
+        # Plain table names, as recorded before there were other rules
+        return name
+
+    def resource_arn(self, name: str, account_id: str, region: str) -> str:
+        return f'arn:aws:dynamodb:{region}:{account_id}:table/{name}'
+
+    def tags_from_request(self, detail: dict):
+        """CreateTable carries the table's tags; a CreateTable without any made an untagged table."""
+        if detail.get('eventName') != 'CreateTable':
+            return None
+        return tags_to_dict((detail.get('requestParameters') or {}).get('tags'))
+
+    def list_tags(self, client, name: str, arn: str) -> dict:
+        tags, kwargs = {}, {'ResourceArn': arn}
+        while True:
+            response = client.list_tags_of_resource(**kwargs)
+            tags.update(tags_to_dict(response.get('Tags')))
+            if not response.get('NextToken'):
+                return tags
+            kwargs['NextToken'] = response['NextToken']
+
+
+class KinesisOnDemandRule(Rule):
+    """Deletes Kinesis streams in On-Demand mode, which scale past any shard budget."""
+
+    name = 'kinesis-on-demand'
+    resource_type = 'AWS::Kinesis::Stream'
+    service = 'kinesis'
+    triggers = (('kinesis.amazonaws.com', 'CreateStream'), ('kinesis.amazonaws.com', 'UpdateStreamMode'))
+    noun = 'stream'
+    resource_label = 'Kinesis stream'
+    mode_field = 'stream_mode'
+    compliant_decision = 'provisioned'
+    label = 'Kinesis On-Demand Stream'
+    plural_label = 'Kinesis On-Demand Streams'
+    violation = 'On-Demand stream mode'
+    reason = 'On-Demand stream mode not allowed'
+    describe_call = 'describe_stream_summary'
+    describe_metric = 'DescribeStreamSummaryLatency'
+    remediate_metric = 'DeleteStreamLatency'
+    # UpdateStreamMode only has streamARN, so the name filter lets it through
+    name_parameter = 'streamName'
+
+    def resource_name(self, request_params: dict) -> str:
+        # UpdateStreamMode identifies the stream by ARN only
+        if request_params.get('streamName'):
+            return request_params['streamName']
+        return request_params.get('streamARN', '').partition(':stream/')[2]
+
+    def mode_from_request(self, detail: dict):
+        """CreateStream without streamModeDetails creates a PROVISIONED stream."""
+        request_params = detail.get('requestParameters') or {}
+        stream_mode = (request_params.get('streamModeDetails') or {}).get('streamMode')
+
+        if stream_mode in KNOWN_STREAM_MODES:
+            return stream_mode
+        if stream_mode is None and detail.get('eventName') == 'CreateStream':
+            return 'PROVISIONED'
+        return None
+
+    def request_filter(self, event_name: str) -> dict:
+        stream_mode = [{'anything-but': ['PROVISIONED']}]
+        if event_name != 'CreateStream':
+            stream_mode.append({'exists': False})
+        return {'streamModeDetails': {'streamMode': stream_mode}}
+
+    def current_mode(self, client, name: str):
+        summary = client.describe_stream_summary(StreamName=name)['StreamDescriptionSummary']
+        return summary.get('StreamModeDetails', {}).get('StreamMode', 'PROVISIONED')
+
+    def violates(self, mode) -> bool:
+        return mode == 'ON_DEMAND'
+
+    def remediate(self, client, name: str):
+        client.delete_stream(StreamName=name, EnforceConsumerDeletion=True)
+
+    def resource_arn(self, name: str, account_id: str, region: str) -> str:
+        return f'arn:aws:kinesis:{region}:{account_id}:stream/{name}'
+
+    def tags_from_request(self, detail: dict):
+        """CreateStream carries the stream's tags; one without any made an untagged stream."""
+        if detail.get('eventName') != 'CreateStream':
+            return None
+        return tags_to_dict((detail.get('requestParameters') or {}).get('tags'))
+
+    def list_tags(self, client, name: str, arn: str) -> dict:
+        tags, kwargs = {}, {'StreamName': name}
+        while True:
+            response = client.list_tags_for_stream(**kwargs)
+            page = tags_to_dict(response.get('Tags'))
+            tags.update(page)
+            if not response.get('HasMoreTags') or not page:
+                return tags
+            kwargs['ExclusiveStartTagKey'] = list(page)[-1]
+
+
+class LambdaProvisionedConcurrencyRule(Rule):
+    """
+    Removes provisioned concurrency configs above max_executions.
+
+    Provisioned concurrency is billed per hour whether or not it is used, and
+    is not capped by the account's Lambda quotas the way on-demand invocations
+    are. The resource name is '<function>:<qualifier>'.
+    """
+
+    name = 'lambda-provisioned-concurrency'
+    resource_type = 'AWS::Lambda::ProvisionedConcurrencyConfig'
+    service = 'lambda'
+    # CloudTrail records Lambda API calls with and without the API version suffix
+    triggers = (('lambda.amazonaws.com', 'PutProvisionedConcurrencyConfig'),
+                ('lambda.amazonaws.com', 'PutProvisionedConcurrencyConfig20190930'))
+    noun = 'function'
+    resource_label = 'Lambda function'
+    mode_field = 'provisioned_concurrency'
+    compliant_decision = 'within_limit'
+    label = 'Lambda Provisioned Concurrency'
+    plural_label = 'Lambda Provisioned Concurrency Configs'
+    remediation = 'Removed'
+    reason = 'Provisioned concurrency above the sandbox limit'
+    describe_call = 'get_provisioned_concurrency_config'
+    describe_metric = 'GetProvisionedConcurrencyConfigLatency'
+    remediate_metric = 'DeleteProvisionedConcurrencyConfigLatency'
+    request_filter_uses_policy = True
+
+    def __init__(self, max_executions: int = 0):
+        self.max_executions = max_executions
+
+    @property
+    def violation(self) -> str:
+        return f'provisioned concurrency above {self.max_executions}'
+
+    @property
+    def action_taken(self) -> str:
+        return 'PROVISIONED CONCURRENCY REMOVED.'
+
+    def resource_name(self, request_params: dict) -> str:
+        function_name = request_params.get('functionName', '')
+        qualifier = request_params.get('qualifier', '')
+        return f'{function_name}:{qualifier}' if function_name and qualifier else ''
+
+    def mode_from_request(self, detail: dict):
+        executions = (detail.get('requestParameters') or {}).get('provisionedConcurrentExecutions')
+        return executions if isinstance(executions, int) else None
+
+    def request_filter(self, event_name: str) -> dict:
+        # CloudTrail records the count as a JSON number
+        return {'provisionedConcurrentExecutions': [{'numeric': ['>', self.max_executions]},
+                                                    {'exists': False}]}
+
+    def current_mode(self, client, name: str):
+        function_name, qualifier = name.rsplit(':', 1)
+        config = client.get_provisioned_concurrency_config(FunctionName=function_name, Qualifier=qualifier)
+        return config.get('RequestedProvisionedConcurrentExecutions', 0)
+
+    def not_found_errors(self, client) -> tuple:
+        return (client.exceptions.ProvisionedConcurrencyConfigNotFoundException,
+                client.exceptions.ResourceNotFoundException)
+
+    def violates(self, mode) -> bool:
+        return mode > self.max_executions
+
+    def remediate(self, client, name: str):
+        function_name, qualifier = name.rsplit(':', 1)
+        client.delete_provisioned_concurrency_config(FunctionName=function_name, Qualifier=qualifier)
+
+    def notification_fields(self, name: str) -> dict:
+        function_name, qualifier = name.rsplit(':', 1)
+        return {'functionName': function_name, 'qualifier': qualifier}
+
+    def resource_arn(self, name: str, account_id: str, region: str) -> str:
+        # Tags belong to the function, not the alias or version
+        function_name = name.rsplit(':', 1)[0]
+        if function_name.startswith('arn:'):
+            return function_name
+        return f'arn:aws:lambda:{region}:{account_id}:function:{function_name}'
+
+    def list_tags(self, client, name: str, arn: str) -> dict:
+        return tags_to_dict(client.list_tags(Resource=arn).get('Tags'))
+
+
+RULE_CLASSES = (DynamoDBOnDemandRule, KinesisOnDemandRule, LambdaProvisionedConcurrencyRule)
+RULE_NAMES = tuple(cls.name for cls in RULE_CLASSES)
+# Without ENFORCED_RULES only the original policy runs; the other rules are opt-in
+DEFAULT_RULE_NAMES = (DynamoDBOnDemandRule.name,)
+
+
+class RuleEngine:
+    """
+    Dispatches CloudTrail events to rules through a precomputed
+    (eventSource, eventName) index.
+
+    Events without an eventSource (reconciliation sweep events, hand-built
+    events) go to the default rule: DynamoDB, the enforcer's original policy.
+    """
+
+    def __init__(self, rules: tuple):
+        self.rules = tuple(rules)
+        self._index = {}
+        for rule in self.rules:
+            for trigger in rule.triggers:
+                if trigger in self._index:
+                    raise ValueError(f"Rules {self._index[trigger].name} and {rule.name} "
+                                     f"both handle {trigger}")
+                self._index[trigger] = rule
+        self._by_resource_type = {rule.resource_type: rule for rule in self.rules}
+        self.default = self._by_resource_type.get(DynamoDBOnDemandRule.resource_type)
+
+    def rule_for(self, detail: dict):
+        """The rule handling this event's API call, or None if no enabled rule does."""
+        event_source = detail.get('eventSource')
+        if not event_source:
+            return self.default
+        return self._index.get((event_source, detail.get('eventName')))
+
+    def rule_for_resource_type(self, resource_type: str):
+        """The rule that produced a notification, defaulting to DynamoDB."""
+        return self._by_resource_type.get(resource_type) or self.default or DynamoDBOnDemandRule()
+
+    def triggers(self) -> dict:
+        """{eventSource: [eventName, ...]} for every enabled rule, e.g. for an EventBridge pattern."""
+        by_source = {}
+        for event_source, event_name in self._index:
+            by_source.setdefault(event_source, []).append(event_name)
+        return by_source
+
+
+def build_engine(names: tuple = RULE_NAMES, max_provisioned_concurrency: int = 0) -> RuleEngine:
+    """
+    Build the engine for the named rules (ENFORCED_RULES).
+
+    Raises:
+        ValueError: for an unknown rule name
+    """
+    unknown = sorted(set(names) - set(RULE_NAMES))
+    if unknown:
+        raise ValueError(f"Unknown rule(s) {', '.join(unknown)}; expected some of {', '.join(RULE_NAMES)}")
+
+    rules = []
+    for cls in RULE_CLASSES:
+        if cls.name not in names:
+            continue
+        if cls is LambdaProvisionedConcurrencyRule:
+            rules.append(cls(max_provisioned_concurrency))
+        else:
+            rules.append(cls())
+    return RuleEngine(rules)
@@ -0,0 +1,90 @@
+"""
+Structured JSON logging for the DynamoDB Billing Mode Enforcer.
+
+Each log call writes one compact JSON object per line to stdout, which
+Lambda forwards to CloudWatch Logs where it can be queried with Logs
+Insights (e.g. `filter decision = "deleted" | stats count() by account_id`).
+
+COST CONTROLS:
+    - Records below LOG_LEVEL are dropped before anything is built or encoded.
+    - The raw CloudTrail payload is only attached to a record when sampled
+      (LOG_PAYLOAD_SAMPLE_RATE, e.g. 0.01 for 1%), at DEBUG level, or on errors.
+    - Field values may be zero-argument callables; they are only evaluated
+      when the record is actually written.
+"""
+import json
+import random
+import sys
+import threading
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+
+class StructuredLogger:
+    """Writes compact JSON log records, filtered by level with payload sampling."""
+
+    def __init__(self, level: str = 'INFO', payload_sample_rate: float = 0.0, stream=None):
+        self._lock = threading.Lock()
+        self._stream = stream
+        self.configure(level, payload_sample_rate)
+
+    def configure(self, level: str = 'INFO', payload_sample_rate: float = 0.0):
+        """
+        Set the minimum level and the fraction of records that carry the payload.
+
+        Raises:
+            ValueError: for an unknown level or a rate outside [0, 1]
+        """
+        level = level.upper()
+        if level not in LEVELS:
+            raise ValueError(f"LOG_LEVEL must be one of {', '.join(LEVELS)}, got {level!r}")
+        if not 0.0 <= payload_sample_rate <= 1.0:
+            raise ValueError(f"LOG_PAYLOAD_SAMPLE_RATE must be between 0 and 1, got {payload_sample_rate}")
+        self.level = level
+        self.payload_sample_rate = payload_sample_rate
+        self._threshold = LEVELS[level]
+
+    def enabled(self, level: str) -> bool:
+        """Return True if records at this level would be written."""
+        return LEVELS[level] >= self._threshold
+
+    def should_log_payload(self, level: str = 'INFO') -> bool:
+        """Decide whether a record at this level should include the raw payload."""
+        if level == 'ERROR' or self._threshold <= LEVELS['DEBUG']:
+            return True
+        return self.payload_sample_rate > 0 and random.random() < self.payload_sample_rate
+
+    def log(self, level: str, message: str, payload=None, **fields):
+        """
+        Write one JSON record if level is enabled.
+
+        Args:
+            level: DEBUG, INFO, WARNING or ERROR
+            message: Short machine-friendly event name (e.g. 'decision')
+            payload: Raw event; attached only when sampled, at DEBUG, or on ERROR
+            **fields: Extra fields; callables are evaluated only if written
+        """
+        if not self.enabled(level):
+            return
+
+        record = {'level': level, 'message': message}
+        for key, value in fields.items():
+            record[key] = value() if callable(value) else value
+        if payload is not None and self.should_log_payload(level):
+            record['payload'] = payload
+
+        line = json.dumps(record, separators=(',', ':'), default=str)
+        with self._lock:
+            (self._stream or sys.stdout).write(line + '\n')
+
+    def debug(self, message: str, **fields):
+        self.log('DEBUG', message, **fields)
+
+    def info(self, message: str, **fields):
+        self.log('INFO', message, **fields)
+
+    def warning(self, message: str, **fields):
+        self.log('WARNING', message, **fields)
+
+    def error(self, message: str, **fields):
+        self.log('ERROR', message, **fields)
@@ -0,0 +1,231 @@
+"""
+Scheduled reconciliation sweep for the DynamoDB Billing Mode Enforcer.
+
+The event-driven enforcer only sees tables whose CloudTrail events reach it.
+Anything EventBridge drops, delays or never forwards (missing cross-account
+rule, region not forwarded, throttled Lambda) leaves an On-Demand table
+running. This sweep lists every table in every sandbox account and managed
+region and runs the same enforcement as the event path on each one.
+
+ACCOUNTS:
+    SANDBOX_ACCOUNT_IDS (comma-separated) and/or every ACTIVE account under
+    SANDBOX_OU_ID, including nested OUs. A scheduled event may override both
+    with an "accounts" list (and "regions" for MANAGED_REGIONS).
+
+    Each account is reached through SANDBOX_ROLE_NAME. Without it every
+    client would use the hub account's credentials, and the sweep would list
+    and delete the hub's own tables once per sandbox account, so it refuses
+    to run.
+
+CONCURRENCY:
+    One bounded thread pool (SWEEP_MAX_WORKERS) runs both the paginated
+    ListTables calls per (account, region) and the per-table enforcement, so
+    tables from the first accounts are being checked while later accounts are
+    still being listed. Work not started before the Lambda deadline (less
+    SWEEP_TIMEOUT_MARGIN_MS) is cancelled and reported as skipped.
+"""
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+import index
+from index import get_config, log, metrics
+
+# Stop starting new work this long before the Lambda times out, leaving time
+# for in-flight calls, notifications and the summary
+SWEEP_TIMEOUT_MARGIN_MS = 15000
+
+# ListTables returns at most 100 names per page
+LIST_TABLES_PAGE_SIZE = 100
+
+
+def list_ou_accounts(ou_id: str) -> list:
+    """Return the IDs of all ACTIVE accounts under an OU, including nested OUs."""
+    organizations = index.get_boto3_client('organizations')
+    accounts = []
+    parents = [ou_id]
+
+    while parents:
+        parent_id = parents.pop()
+        for page in organizations.get_paginator('list_accounts_for_parent').paginate(ParentId=parent_id):
+            accounts.extend(a['Id'] for a in page['Accounts'] if a.get('Status') == 'ACTIVE')
+        for page in organizations.get_paginator('list_organizational_units_for_parent').paginate(
+                ParentId=parent_id):
+            parents.extend(ou['Id'] for ou in page['OrganizationalUnits'])
+
+    return accounts
+
+
+def list_sandbox_accounts(config: dict) -> list:
+    """Sandbox accounts to sweep: SANDBOX_ACCOUNT_IDS plus SANDBOX_OU_ID, de-duplicated."""
+    accounts = list(config['sandbox_account_ids'])
+    if config['sandbox_ou_id']:
+        accounts.extend(list_ou_accounts(config['sandbox_ou_id']))
+    return sorted(set(accounts))
+
+
+def list_tables(account_id: str, region: str) -> list:
+    """All table names in one account and region, following ListTables pagination."""
+    dynamodb = index.get_boto3_client('dynamodb', account_id, region)
+    paginator = dynamodb.get_paginator('list_tables')
+    names = []
+    for page in paginator.paginate(PaginationConfig={'PageSize': LIST_TABLES_PAGE_SIZE}):
+        names.extend(page.get('TableNames', []))
+    return names
+
+
+def sweep_event(sweep_id: str, account_id: str, region: str, table_name: str) -> dict:
+    """
+    Build the event enforce_event sees for a table found by the sweep.
+
+    It has no billingMode, so the enforcer describes the table exactly as it
+    would for an ambiguous UpdateTable.
+    """
+    return {
+        'id': f'{sweep_id}:{account_id}:{region}:{table_name}',
+        'source': index.SWEEP_EVENT_SOURCE,
+        'account': account_id,
+        'region': region,
+        'detail': {
+            'eventName': 'ReconciliationSweep',
+            'eventTime': datetime.now(timezone.utc).isoformat(),
+            'awsRegion': region,
+            'recipientAccountId': account_id,
+            'requestParameters': {'tableName': table_name},
+            'userIdentity': {'type': 'ReconciliationSweep'},
+        },
+    }
+
+
+def sweep_deadline(context):
+    """Monotonic time after which no new work is started, or None without a context."""
+    if context is None or not hasattr(context, 'get_remaining_time_in_millis'):
+        return None
+    return time.monotonic() + max(0, context.get_remaining_time_in_millis() - SWEEP_TIMEOUT_MARGIN_MS) / 1000
+
+
+def run_sweep(accounts: list, regions: list, config: dict, context=None) -> dict:
+    """
+    List and enforce every table in every (account, region).
+
+    Args:
+        accounts: Sandbox account IDs
+        regions: Regions to sweep in each account
+        config: Configuration from get_config()
+        context: Lambda context object, used for the deadline
+
+    Returns:
+        Summary dict with target, table and decision counts
+    """
+    sweep_id = f'sweep-{uuid.uuid4()}'
+    started = time.monotonic()
+    deadline = sweep_deadline(context)
+    targets = [(account_id, region) for account_id in accounts for region in regions]
+    log.info('sweep_started', sweep_id=sweep_id, accounts=len(accounts), regions=list(regions),
+             targets=len(targets))
+
+    notifications = []
+    decisions = Counter()
+    failed_targets = []
+    tables_scanned = 0
+    table_errors = 0
+    targets_scanned = 0
+    skipped = Counter()
+
+    def enforce(account_id, region, table_name):
+        event = sweep_event(sweep_id, account_id, region, table_name)
+        return index.enforce_event(event, config, context, notifications)
+
+    with ThreadPoolExecutor(max_workers=config['sweep_max_workers'],
+                            thread_name_prefix='sweep') as executor:
+        pending = {
+            executor.submit(list_tables, account_id, region): ('list', account_id, region)
+            for account_id, region in targets
+        }
+
+        while pending:
+            timeout = None
+            if deadline is not None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    # Out of time: drop queued work, only wait for calls in flight
+                    for future in [f for f in pending if f.cancel()]:
+                        skipped[pending.pop(future)[0]] += 1
+                    timeout = None
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                kind, account_id, region, *_ = pending.pop(future)
+                error = future.exception()
+
+                if kind == 'list':
+                    if error is not None:
+                        failed_targets.append({'account_id': account_id, 'region': region,
+                                               'error': str(error)})
+                        log.warning('sweep_target_failed', account_id=account_id, region=region,
+                                    error=str(error))
+                        continue
+                    targets_scanned += 1
+                    table_names = future.result()
+                    tables_scanned += len(table_names)
+                    if deadline is not None and time.monotonic() >= deadline:
+                        skipped['table'] += len(table_names)
+                        continue
+                    for table_name in table_names:
+                        pending[executor.submit(enforce, account_id, region, table_name)] = (
+                            'table', account_id, region, table_name)
+                elif error is not None:
+                    table_errors += 1
+                else:
+                    decisions[future.result()['decision']] += 1
+
+    notification_errors = index.send_notifications(notifications, config, context) if notifications else {}
+
+    summary = {
+        'sweep_id': sweep_id,
+        'accounts': len(accounts),
+        'regions': list(regions),
+        'targets': len(targets),
+        'targets_scanned': targets_scanned,
+        'targets_failed': failed_targets,
+        'targets_skipped': skipped['list'],
+        'tables_scanned': tables_scanned,
+        'tables_skipped': skipped['table'],
+        'table_errors': table_errors,
+        'decisions': dict(decisions),
+        'notification_errors': sum(len(errors) for errors in notification_errors.values()),
+        'duration_seconds': round(time.monotonic() - started, 3),
+    }
+    log.info('sweep_summary', **summary)
+    metrics.put_metric('SweepDuration', summary['duration_seconds'], 'Seconds')
+    metrics.increment('SweepTargetsFailed', len(failed_targets))
+    return summary
+
+
+@metrics.flush_after
+def sweep_handler(event, context):
+    """
+    Entry point for the scheduled reconciliation sweep.
+
+    Args:
+        event: EventBridge scheduled event; may carry "accounts" and "regions"
+            lists to sweep instead of the configured ones
+        context: Lambda context object
+
+    Returns:
+        Summary dict from run_sweep
+
+    Raises:
+        ValueError: if SANDBOX_ROLE_NAME is not set
+    """
+    config = get_config()
+    if not config['sandbox_role_name']:
+        raise ValueError("SANDBOX_ROLE_NAME must be set for the sweep; without it the sweep "
+                         "would enforce the hub account's tables instead of the sandboxes'")
+    event = event if isinstance(event, dict) else {}
+    accounts = event.get('accounts') or list_sandbox_accounts(config)
+    regions = event.get('regions') or config['managed_regions']
+    return run_sweep(accounts, regions, config, context)
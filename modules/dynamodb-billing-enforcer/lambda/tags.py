@@ -0,0 +1,115 @@
+"""
+Resource tags for tag-based exemptions, cached per container.
+
+A tag exemption (exemptions.py) needs the resource's tags, and looking them
+up (ListTagsOfResource, ListTagsForStream, ListTags) is another round trip on
+the hot path. TagCache keeps them per resource ARN for TAG_CACHE_TTL_SECONDS.
+
+FILLING:
+    CreateTable and CreateStream carry the new resource's tags in
+    requestParameters, so the cache is filled from the event and the first
+    event for a resource needs no lookup. Other events (UpdateTable,
+    provisioned concurrency) fall back to the lookup. The event pattern
+    (event_pattern.py) filters out CreateTable with a compliant billing mode,
+    so an UpdateTable that later switches such a table to on-demand nearly
+    always finds the cache cold and pays for a live lookup.
+
+LATENCY BUDGET:
+    A lookup waits at most TAG_LOOKUP_TIMEOUT_MS. If the API is slower the
+    event is retried later (TagLookupError), and the lookup finishes in the
+    background and fills the cache for the retry. Concurrent lookups for the
+    same ARN share one call.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from idempotency import LRUCache
+
+# Lookups run here so a slow call can outlive the event that started it
+_LOOKUP_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='tags')
+
+
+class TagLookupError(Exception):
+    """The resource's tags could not be read, so whether it is exempt is unknown."""
+
+
+def tags_to_dict(tags) -> dict:
+    """
+    Normalise tags to {key: value}.
+
+    Accepts a dict, or a list of {'Key', 'Value'} / {'key', 'value'} pairs as
+    used by the APIs and CloudTrail.
+    """
+    if isinstance(tags, dict):
+        return {str(key): str(value) for key, value in tags.items()}
+    result = {}
+    for tag in tags or ():
+        key = tag.get('Key', tag.get('key'))
+        if key is not None:
+            result[key] = tag.get('Value', tag.get('value', ''))
+    return result
+
+
+class TagCache:
+    """
+    Thread-safe TTL/LRU cache of resource ARN -> tags, with single-flight lookups.
+
+    Args:
+        ttl_seconds: How long tags are trusted before they are looked up again
+    """
+
+    def __init__(self, ttl_seconds: int = 300, max_entries: int = 1024, clock=time.time):
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._cache = LRUCache(max_entries, clock)
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def get(self, arn: str):
+        """Cached tags for arn, or None."""
+        return self._cache.get(arn)
+
+    def put(self, arn: str, tags: dict):
+        self._cache.put(arn, tags, self._clock() + self.ttl_seconds)
+
+    def lookup(self, arn: str, fetch, timeout_seconds: float):
+        """
+        Tags for arn from the cache, or from fetch() within timeout_seconds.
+
+        Args:
+            fetch: Callable returning the resource's tags as {key: value}
+
+        Returns:
+            The tags, or None if the lookup did not finish in time (it keeps
+            running and fills the cache)
+
+        Raises:
+            Whatever fetch raised
+        """
+        tags = self._cache.get(arn)
+        if tags is not None:
+            return tags
+
+        with self._lock:
+            future = self._pending.get(arn)
+            # A finished call whose callback has not run yet is not reused
+            started = future is None or future.done()
+            if started:
+                future = _LOOKUP_EXECUTOR.submit(fetch)
+                self._pending[arn] = future
+        if started:
+            # Outside the lock: the callback runs at once if fetch already finished
+            future.add_done_callback(lambda done: self._finish(arn, done))
+        try:
+            return future.result(timeout=timeout_seconds)
+        except FutureTimeoutError:
+            return None
+
+    def _finish(self, arn: str, future):
+        with self._lock:
+            if self._pending.get(arn) is future:
+                del self._pending[arn]
+        if not future.cancelled() and future.exception() is None:
+            self.put(arn, future.result())
@@ -0,0 +1,186 @@
+"""
+Per-account rate limiting and circuit breaking for the enforcer.
+
+A broken pipeline that creates tables in a loop sends a steady stream of
+events from one account. Each costs an invocation and a notification, and in
+a batch it competes with every other account's events.
+
+TOKEN BUCKET:
+    Every event takes a token from its account's bucket (ACCOUNT_BURST
+    tokens, refilled at ACCOUNT_RATE_PER_MINUTE). Events from an account with
+    an empty bucket are deferred on the retry queue (THROTTLE_DELAY_SECONDS)
+    so the rest of the batch is served first; without a retry queue they run
+    after the other accounts' events. A deferred event is admitted when it
+    comes back, so it is delayed at most once. Events the enforcer drops
+    without work (exempt names, duplicates) take no token (index.admit_events).
+
+    Without a shared backend the buckets live in the container, so N
+    concurrent containers admit up to N times the limit. With one, every
+    container counts the account's events in the same sliding one-minute
+    window and admits at most ACCOUNT_BURST + ACCOUNT_RATE_PER_MINUTE of
+    them, the most a single bucket admits in any minute.
+
+CIRCUIT BREAKER:
+    Violations are counted per account in a sliding window of
+    BREAKER_WINDOW_SECONDS, estimated from counters for the current and the
+    previous fixed window (the previous one weighted by how much of it still
+    falls inside the sliding window), so a burst straddling a window boundary
+    still opens the breaker. Tables deleted by the reconciliation sweep are
+    not counted.
+    At BREAKER_THRESHOLD the breaker opens for BREAKER_OPEN_SECONDS: the
+    violation that opened it sends a single escalated alert, and later ones
+    are still remediated and broadcast on EventBridge but get no SNS alert.
+    Counts and the open state go to the idempotency backend when one is
+    configured, so every container sees the same breaker and only one sends
+    the escalation.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from idempotency import LRUCache
+
+# Marks an event that was deferred by the rate limiter
+THROTTLE_KEY = 'enforcerThrottled'
+
+# Window of the shared (cross-container) rate limit
+RATE_WINDOW_SECONDS = 60
+
+# Breaker states returned by AccountGuard.record_violation
+CLOSED = 'closed'
+OPENED = 'opened'
+OPEN = 'open'
+
+
+def was_deferred(event: dict) -> bool:
+    """Return True if the rate limiter already deferred this event once."""
+    return bool(event.get(THROTTLE_KEY))
+
+
+def deferred_event(event: dict) -> dict:
+    """Copy of event marked as deferred by the rate limiter."""
+    return {**event, THROTTLE_KEY: {'deferred': True}}
+
+
+class TokenBucket:
+    """
+    Thread-safe token buckets keyed by account, least recently used evicted.
+
+    Args:
+        rate_per_second: Tokens added per second
+        burst: Bucket capacity (and the tokens a new account starts with)
+    """
+
+    def __init__(self, rate_per_second: float, burst: int, max_accounts: int = 1024, clock=time.monotonic):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_accounts = max_accounts
+        self._clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key) -> bool:
+        """Take one token for key; return False if its bucket is empty."""
+        now = self._clock()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate_per_second)
+            allowed = tokens >= 1
+            self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_accounts:
+                self._buckets.popitem(last=False)
+            return allowed
+
+
+class AccountGuard:
+    """
+    Token buckets plus circuit breaker, with an optional shared backend.
+
+    Args:
+        backend: DynamoDBBackend, FileBackend, or None for in-container state
+        rate_per_minute: Events per account per minute; 0 disables rate limiting
+        burst: Events an account can send at once
+        breaker_threshold: Violations per window that open the breaker; 0 disables it
+    """
+
+    def __init__(self, backend=None, rate_per_minute: int = 60, burst: int = 20,
+                 breaker_threshold: int = 10, breaker_window_seconds: int = 300,
+                 breaker_open_seconds: int = 900, cache_size: int = 1024, clock=time.time):
+        self.backend = backend
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.breaker_threshold = breaker_threshold
+        self.breaker_window_seconds = breaker_window_seconds
+        self.breaker_open_seconds = breaker_open_seconds
+        self._clock = clock
+        self._buckets = TokenBucket(rate_per_minute / 60, burst, cache_size) if rate_per_minute else None
+        self._cache = LRUCache(cache_size, clock)
+
+    def admit(self, account_id: str) -> bool:
+        """Take a token for an event from account_id; False means defer it."""
+        if self._buckets is None:
+            return True
+        if self.backend is None:
+            return self._buckets.take(account_id)
+        count = self.sliding_count(f'events#{account_id}', RATE_WINDOW_SECONDS, self._clock())
+        return count <= self.burst + self.rate_per_minute
+
+    @staticmethod
+    def breaker_key(account_id: str) -> str:
+        return f'breaker#{account_id}'
+
+    def sliding_count(self, prefix: str, window_seconds: int, now: float) -> float:
+        """
+        Count one more under prefix and return the estimated count over the
+        last window_seconds: this fixed window's count plus the previous one's,
+        weighted by its overlap with the sliding window.
+        """
+        window = int(now // window_seconds)
+        counts = self.backend if self.backend is not None else self._cache
+        # Kept a window longer, to weigh in while the next window fills
+        current = counts.increment(f'{prefix}#{window}', (window + 2) * window_seconds)
+
+        previous_key = f'{prefix}#{window - 1}'
+        previous = self._cache.get(previous_key)
+        if previous is None and self.backend is not None:
+            # The previous window is closed, so its count is final and can be cached
+            previous = self.backend.get(previous_key) or 0
+            self._cache.put(previous_key, previous, (window + 1) * window_seconds)
+        overlap = 1 - (now - window * window_seconds) / window_seconds
+        return current + (previous or 0) * overlap
+
+    def is_open(self, account_id: str) -> bool:
+        key = self.breaker_key(account_id)
+        if self._cache.get(key) is not None:
+            return True
+        if self.backend is not None:
+            opened_at = self.backend.get(key)
+            if opened_at is not None:
+                self._cache.put(key, opened_at, opened_at + self.breaker_open_seconds)
+                return True
+        return False
+
+    def record_violation(self, account_id: str) -> str:
+        """
+        Count a violation in account_id.
+
+        Returns:
+            CLOSED to notify as usual, OPENED if this violation opened the
+            breaker (send the escalated alert), or OPEN to suppress the alert
+        """
+        if not self.breaker_threshold:
+            return CLOSED
+        if self.is_open(account_id):
+            return OPEN
+
+        now = self._clock()
+        if self.sliding_count(f'violations#{account_id}', self.breaker_window_seconds, now) < self.breaker_threshold:
+            return CLOSED
+
+        key = self.breaker_key(account_id)
+        expires_at = now + self.breaker_open_seconds
+        opened = self._cache.put_if_absent(key, now, expires_at)
+        if self.backend is not None:
+            opened = self.backend.put_if_absent(key, now, expires_at)
+        return OPENED if opened else OPEN
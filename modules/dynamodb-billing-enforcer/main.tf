@@ -11,14 +11,20 @@ terraform {
       source  = "hashicorp/archive"
       version = ">= 2.0"
     }
+    external = {
+      source  = "hashicorp/external"
+      version = ">= 2.0"
+    }
   }
 }
 
+data "aws_caller_identity" "current" {}
+
 data "archive_file" "enforcer_lambda" {
   type        = "zip"
   output_path = "/tmp/dynamodb-billing-enforcer-lambda.zip"
   source_dir  = "${path.module}/lambda"
-  excludes    = ["__pycache__", "*.pyc", ".DS_Store"]
+  excludes    = ["__pycache__", "*.pyc", ".DS_Store", "event_pattern.py"]
 }
 
 # Lambda execution role
@@ -47,13 +53,14 @@ resource "aws_iam_role_policy" "enforcer_lambda" {
 
   policy = jsonencode({
     Version = "2012-10-17"
-    Statement = [
+    Statement = concat([
       {
         Sid    = "DynamoDBAccess"
         Effect = "Allow"
         Action = [
           "dynamodb:DescribeTable",
-          "dynamodb:DeleteTable"
+          "dynamodb:DeleteTable",
+          "dynamodb:ListTagsOfResource"
         ]
         Resource = "arn:aws:dynamodb:*:*:table/*"
       },
@@ -79,8 +86,178 @@ resource "aws_iam_role_policy" "enforcer_lambda" {
         ]
         Resource = "arn:aws:logs:*:*:*"
       }
-    ]
+      ], var.sandbox_role_name != null ? [
+      {
+        Sid      = "AssumeSandboxEnforcerRole"
+        Effect   = "Allow"
+        Action   = "sts:AssumeRole"
+        Resource = "arn:aws:iam::*:role/${var.sandbox_role_name}"
+      }
+      ] : [], var.enable_idempotency_table ? [
+      {
+        Sid    = "IdempotencyTable"
+        Effect = "Allow"
+        Action = [
+          "dynamodb:GetItem",
+          "dynamodb:PutItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:DeleteItem"
+        ]
+        Resource = aws_dynamodb_table.idempotency[0].arn
+      }
+      ] : [], var.enable_deferred_retry ? [
+      {
+        Sid    = "SQSRetryQueue"
+        Effect = "Allow"
+        Action = [
+          "sqs:SendMessage",
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:GetQueueAttributes"
+        ]
+        Resource = aws_sqs_queue.enforcer_retry[0].arn
+      }
+      ] : [], var.enable_reconciliation_sweep ? [
+      # Tables are listed through the sandbox role (sandbox_role_name), never from the hub
+      {
+        Sid    = "ReconciliationSweepDiscoverAccounts"
+        Effect = "Allow"
+        Action = [
+          "organizations:ListAccountsForParent",
+          "organizations:ListOrganizationalUnitsForParent"
+        ]
+        Resource = "*"
+      }
+      ] : [], contains(var.enforced_rules, "kinesis-on-demand") ? [
+      {
+        Sid    = "KinesisOnDemandRule"
+        Effect = "Allow"
+        Action = [
+          "kinesis:DescribeStreamSummary",
+          "kinesis:DeleteStream",
+          "kinesis:ListTagsForStream"
+        ]
+        Resource = "arn:aws:kinesis:*:*:stream/*"
+      }
+      ] : [], contains(var.enforced_rules, "lambda-provisioned-concurrency") ? [
+      {
+        Sid    = "LambdaProvisionedConcurrencyRule"
+        Effect = "Allow"
+        Action = [
+          "lambda:GetProvisionedConcurrencyConfig",
+          "lambda:DeleteProvisionedConcurrencyConfig",
+          "lambda:ListTags"
+        ]
+        Resource = "arn:aws:lambda:*:*:function:*"
+      }
+      ] : [], var.enable_policy_parameter ? [
+      {
+        Sid      = "PolicyParameter"
+        Effect   = "Allow"
+        Action   = "ssm:GetParameter"
+        Resource = aws_ssm_parameter.policy[0].arn
+      }
+      ] : [], var.policy_appconfig != null ? [
+      {
+        Sid    = "PolicyAppConfig"
+        Effect = "Allow"
+        Action = [
+          "appconfig:StartConfigurationSession",
+          "appconfig:GetLatestConfiguration"
+        ]
+        Resource = "*"
+      }
+      ] : [], var.enable_batch_queue ? [
+      {
+        Sid    = "SQSBatchQueue"
+        Effect = "Allow"
+        Action = [
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:GetQueueAttributes"
+        ]
+        Resource = aws_sqs_queue.enforcer_batch[0].arn
+      }
+    ] : [])
+  })
+}
+
+# Shared by the event-driven enforcer and the reconciliation sweep
+locals {
+  enforcer_environment = {
+    SNS_TOPIC_ARN               = var.sns_topic_arn != null ? var.sns_topic_arn : ""
+    EXEMPT_TABLE_PREFIXES       = join(",", var.exempt_table_prefixes)
+    EXEMPT_TABLE_RULES          = jsonencode(var.exempt_table_rules)
+    EXEMPT_TAGS                 = join(",", var.exempt_tags)
+    ENFORCED_RULES              = join(",", var.enforced_rules)
+    MAX_PROVISIONED_CONCURRENCY = tostring(var.max_provisioned_concurrency)
+    EVENT_BUS_NAME              = "default"
+    EVENTBRIDGE_SOURCE          = "${var.namespace}.dynamodb-billing-enforcer"
+    BATCH_MAX_WORKERS           = tostring(var.batch_max_workers)
+    SNS_DIGEST_MODE             = tostring(var.sns_digest_mode)
+    LOG_LEVEL                   = var.log_level
+    LOG_PAYLOAD_SAMPLE_RATE     = tostring(var.log_payload_sample_rate)
+    METRICS_NAMESPACE           = "${var.namespace}/DynamoDBBillingEnforcer"
+    METRICS_ENABLED             = tostring(var.enable_metrics)
+    DRY_RUN                     = tostring(var.dry_run)
+    SANDBOX_ROLE_NAME           = var.sandbox_role_name != null ? var.sandbox_role_name : ""
+    HUB_ACCOUNT_ID              = data.aws_caller_identity.current.account_id
+    IDEMPOTENCY_TABLE           = var.enable_idempotency_table ? aws_dynamodb_table.idempotency[0].name : ""
+    IDEMPOTENCY_WINDOW_SECONDS  = tostring(var.idempotency_window_seconds)
+    RETRY_QUEUE_URL             = var.enable_deferred_retry ? aws_sqs_queue.enforcer_retry[0].url : ""
+    RETRY_MAX_ATTEMPTS          = tostring(var.retry_max_attempts)
+    RETRY_BASE_DELAY_SECONDS    = tostring(var.retry_base_delay_seconds)
+    ACCOUNT_RATE_PER_MINUTE     = tostring(var.account_rate_per_minute)
+    ACCOUNT_BURST               = tostring(var.account_burst)
+    BREAKER_THRESHOLD           = tostring(var.breaker_threshold)
+    BREAKER_WINDOW_SECONDS      = tostring(var.breaker_window_seconds)
+    BREAKER_OPEN_SECONDS        = tostring(var.breaker_open_seconds)
+    POLICY_PARAMETER            = var.enable_policy_parameter ? aws_ssm_parameter.policy[0].name : ""
+    POLICY_APPCONFIG            = var.policy_appconfig != null ? var.policy_appconfig : ""
+    POLICY_TTL_SECONDS          = tostring(var.policy_ttl_seconds)
+    TAG_CACHE_TTL_SECONDS       = tostring(var.tag_cache_ttl_seconds)
+    TAG_LOOKUP_TIMEOUT_MS       = tostring(var.tag_lookup_timeout_ms)
+  }
+}
+
+# EventBridge pattern for the enforced rules, generated from lambda/rules.py by
+# lambda/event_pattern.py. Besides the CloudTrail calls each rule handles, it
+# filters out failed calls, requests that set a compliant mode and exempt
+# names, so those never invoke the enforcer. Needs python3 where Terraform runs.
+data "external" "event_pattern" {
+  program = ["python3", "${path.module}/lambda/event_pattern.py"]
+
+  query = {
+    for name in [
+      "ENFORCED_RULES", "EXEMPT_TABLE_PREFIXES", "EXEMPT_TABLE_RULES", "EXEMPT_TAGS",
+      "MAX_PROVISIONED_CONCURRENCY", "POLICY_PARAMETER", "POLICY_APPCONFIG"
+    ] : name => local.enforcer_environment[name]
+  }
+}
+
+# Policy settings the enforcer re-reads at run time (lambda/policy.py). Seeded
+# from the variables on creation; later edits to the parameter take effect
+# within policy_ttl_seconds without a deploy, and Terraform leaves them alone.
+
+resource "aws_ssm_parameter" "policy" {
+  count = var.enable_policy_parameter ? 1 : 0
+
+  name = "/${var.namespace}/dynamodb-billing-enforcer/policy"
+  type = "String"
+  value = jsonencode({
+    exempt_table_prefixes       = var.exempt_table_prefixes
+    exempt_table_rules          = var.exempt_table_rules
+    exempt_tags                 = var.exempt_tags
+    enforced_rules              = var.enforced_rules
+    max_provisioned_concurrency = var.max_provisioned_concurrency
+    sns_digest_mode             = var.sns_digest_mode
   })
+
+  lifecycle {
+    ignore_changes = [value]
+  }
+
+  tags = var.tags
 }
 
 resource "aws_lambda_function" "enforcer" {
@@ -93,11 +270,13 @@ resource "aws_lambda_function" "enforcer" {
   timeout          = 30
 
   environment {
-    variables = {
-      SNS_TOPIC_ARN         = var.sns_topic_arn != null ? var.sns_topic_arn : ""
-      EXEMPT_TABLE_PREFIXES = join(",", var.exempt_table_prefixes)
-      EVENT_BUS_NAME        = "default"
-      EVENTBRIDGE_SOURCE    = "${var.namespace}.dynamodb-billing-enforcer"
+    variables = local.enforcer_environment
+  }
+
+  lifecycle {
+    precondition {
+      condition     = !var.sns_digest_mode || var.enable_batch_queue
+      error_message = "sns_digest_mode requires enable_batch_queue; without the queue each invocation handles one event and no alerts are combined."
     }
   }
 
@@ -106,27 +285,24 @@ resource "aws_lambda_function" "enforcer" {
 
 resource "aws_cloudwatch_event_rule" "dynamodb_table_changes" {
   name        = "${var.namespace}-dynamodb-billing-enforcer"
-  description = "Detects DynamoDB CreateTable and UpdateTable events for billing mode enforcement"
-
-  event_pattern = jsonencode({
-    source      = ["aws.dynamodb"]
-    detail-type = ["AWS API Call via CloudTrail"]
-    detail = {
-      eventSource = ["dynamodb.amazonaws.com"]
-      eventName   = ["CreateTable", "UpdateTable"]
-    }
-  })
+  description = "Detects the CloudTrail calls handled by the enforced rules (${join(", ", var.enforced_rules)})"
+
+  event_pattern = data.external.event_pattern.result.pattern
 
   tags = var.tags
 }
 
 resource "aws_cloudwatch_event_target" "invoke_enforcer_lambda" {
+  count = var.enable_batch_queue ? 0 : 1
+
   rule      = aws_cloudwatch_event_rule.dynamodb_table_changes.name
   target_id = "InvokeEnforcerLambda"
   arn       = aws_lambda_function.enforcer.arn
 }
 
 resource "aws_lambda_permission" "allow_eventbridge" {
+  count = var.enable_batch_queue ? 0 : 1
+
   statement_id  = "AllowExecutionFromEventBridge"
   action        = "lambda:InvokeFunction"
   function_name = aws_lambda_function.enforcer.function_name
@@ -134,6 +310,218 @@ resource "aws_lambda_permission" "allow_eventbridge" {
   source_arn    = aws_cloudwatch_event_rule.dynamodb_table_changes.arn
 }
 
+# -----------------------------------------------------------------------------
+# BATCH MODE (OPTIONAL)
+# -----------------------------------------------------------------------------
+# Buffers CloudTrail events in SQS so a burst of CreateTable calls is enforced
+# by a few batched invocations instead of one Lambda per table. Failed records
+# are reported individually (ReportBatchItemFailures) and retried from the queue.
+
+resource "aws_sqs_queue" "enforcer_batch_dlq" {
+  count = var.enable_batch_queue ? 1 : 0
+
+  name                      = "${var.namespace}-dynamodb-billing-enforcer-dlq"
+  message_retention_seconds = 1209600 # 14 days
+
+  tags = var.tags
+}
+
+resource "aws_sqs_queue" "enforcer_batch" {
+  count = var.enable_batch_queue ? 1 : 0
+
+  name                       = "${var.namespace}-dynamodb-billing-enforcer"
+  visibility_timeout_seconds = 180 # 6x Lambda timeout, as recommended for SQS event sources
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.enforcer_batch_dlq[0].arn
+    maxReceiveCount     = 5
+  })
+
+  tags = var.tags
+}
+
+resource "aws_sqs_queue_policy" "enforcer_batch" {
+  count = var.enable_batch_queue ? 1 : 0
+
+  queue_url = aws_sqs_queue.enforcer_batch[0].id
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Sid       = "AllowEventBridgeSend"
+        Effect    = "Allow"
+        Principal = { Service = "events.amazonaws.com" }
+        Action    = "sqs:SendMessage"
+        Resource  = aws_sqs_queue.enforcer_batch[0].arn
+        Condition = {
+          ArnEquals = { "aws:SourceArn" = aws_cloudwatch_event_rule.dynamodb_table_changes.arn }
+        }
+      }
+    ]
+  })
+}
+
+resource "aws_cloudwatch_event_target" "enforcer_batch_queue" {
+  count = var.enable_batch_queue ? 1 : 0
+
+  rule      = aws_cloudwatch_event_rule.dynamodb_table_changes.name
+  target_id = "EnforcerBatchQueue"
+  arn       = aws_sqs_queue.enforcer_batch[0].arn
+}
+
+resource "aws_lambda_event_source_mapping" "enforcer_batch" {
+  count = var.enable_batch_queue ? 1 : 0
+
+  event_source_arn                   = aws_sqs_queue.enforcer_batch[0].arn
+  function_name                      = aws_lambda_function.enforcer.arn
+  batch_size                         = var.batch_size
+  maximum_batching_window_in_seconds = var.batch_window_seconds
+  function_response_types            = ["ReportBatchItemFailures"]
+}
+
+# -----------------------------------------------------------------------------
+# DEFERRED RETRY (OPTIONAL)
+# -----------------------------------------------------------------------------
+# Tables are usually still CREATING when the CreateTable event arrives, so
+# DeleteTable fails with ResourceInUseException. The event is re-enqueued here
+# with an exponential delivery delay instead of holding the Lambda open.
+
+resource "aws_sqs_queue" "enforcer_retry_dlq" {
+  count = var.enable_deferred_retry ? 1 : 0
+
+  name                      = "${var.namespace}-dynamodb-billing-enforcer-retry-dlq"
+  message_retention_seconds = 1209600 # 14 days
+
+  tags = var.tags
+}
+
+resource "aws_sqs_queue" "enforcer_retry" {
+  count = var.enable_deferred_retry ? 1 : 0
+
+  name                       = "${var.namespace}-dynamodb-billing-enforcer-retry"
+  visibility_timeout_seconds = 180 # 6x Lambda timeout, as recommended for SQS event sources
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.enforcer_retry_dlq[0].arn
+    maxReceiveCount     = 5
+  })
+
+  tags = var.tags
+}
+
+resource "aws_lambda_event_source_mapping" "enforcer_retry" {
+  count = var.enable_deferred_retry ? 1 : 0
+
+  event_source_arn        = aws_sqs_queue.enforcer_retry[0].arn
+  function_name           = aws_lambda_function.enforcer.arn
+  batch_size              = 10
+  function_response_types = ["ReportBatchItemFailures"]
+}
+
+# -----------------------------------------------------------------------------
+# IDEMPOTENCY TABLE (OPTIONAL)
+# -----------------------------------------------------------------------------
+# Shares duplicate-suppression records between Lambda containers. Without it
+# each container only deduplicates what it has seen itself. Provisioned, like
+# every table the enforcer allows - an On-Demand table here would be deleted.
+
+resource "aws_dynamodb_table" "idempotency" {
+  count = var.enable_idempotency_table ? 1 : 0
+
+  name           = "${var.namespace}-dynamodb-billing-enforcer-idempotency"
+  billing_mode   = "PROVISIONED"
+  read_capacity  = 5
+  write_capacity = 5
+  hash_key       = "id"
+
+  attribute {
+    name = "id"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = var.tags
+}
+
+# -----------------------------------------------------------------------------
+# RECONCILIATION SWEEP (OPTIONAL)
+# -----------------------------------------------------------------------------
+# Periodically lists every table in every sandbox account and managed region
+# and enforces it, catching tables whose CloudTrail events never reached the
+# enforcer. Same code and role as the enforcer, different handler and timeout.
+
+resource "aws_lambda_function" "sweep" {
+  count = var.enable_reconciliation_sweep ? 1 : 0
+
+  filename         = data.archive_file.enforcer_lambda.output_path
+  function_name    = "${var.namespace}-dynamodb-billing-sweep"
+  role             = aws_iam_role.enforcer_lambda.arn
+  handler          = "sweep.sweep_handler"
+  source_code_hash = data.archive_file.enforcer_lambda.output_base64sha256
+  runtime          = "python3.11"
+  timeout          = var.sweep_timeout_seconds
+  memory_size      = 512
+
+  environment {
+    variables = merge(local.enforcer_environment, {
+      SANDBOX_ACCOUNT_IDS = join(",", var.sweep_account_ids)
+      SANDBOX_OU_ID       = var.sandbox_ou_id != null ? var.sandbox_ou_id : ""
+      MANAGED_REGIONS     = join(",", var.managed_regions)
+      SWEEP_MAX_WORKERS   = tostring(var.sweep_max_workers)
+    })
+  }
+
+  lifecycle {
+    precondition {
+      condition     = var.sandbox_role_name != null && var.sandbox_role_name != ""
+      error_message = "enable_reconciliation_sweep requires sandbox_role_name; without it the sweep would enforce the hub account's own tables."
+    }
+  }
+
+  tags = var.tags
+}
+
+resource "aws_cloudwatch_event_rule" "sweep_schedule" {
+  count = var.enable_reconciliation_sweep ? 1 : 0
+
+  name                = "${var.namespace}-dynamodb-billing-sweep"
+  description         = "Scheduled reconciliation sweep for DynamoDB On-Demand tables"
+  schedule_expression = var.sweep_schedule_expression
+
+  tags = var.tags
+}
+
+resource "aws_cloudwatch_event_target" "sweep" {
+  count = var.enable_reconciliation_sweep ? 1 : 0
+
+  rule      = aws_cloudwatch_event_rule.sweep_schedule[0].name
+  target_id = "ReconciliationSweep"
+  arn       = aws_lambda_function.sweep[0].arn
+}
+
+resource "aws_lambda_permission" "allow_sweep_schedule" {
+  count = var.enable_reconciliation_sweep ? 1 : 0
+
+  statement_id  = "AllowExecutionFromSweepSchedule"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.sweep[0].function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.sweep_schedule[0].arn
+}
+
+resource "aws_cloudwatch_log_group" "sweep_lambda" {
+  count = var.enable_reconciliation_sweep ? 1 : 0
+
+  name              = "/aws/lambda/${aws_lambda_function.sweep[0].function_name}"
+  retention_in_days = 7
+
+  tags = var.tags
+}
+
 resource "aws_cloudwatch_log_group" "enforcer_lambda" {
   name              = "/aws/lambda/${aws_lambda_function.enforcer.function_name}"
   retention_in_days = 7 # Short retention for cost control
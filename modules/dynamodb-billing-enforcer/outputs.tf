@@ -17,13 +17,36 @@ output "eventbridge_rule_arn" {
   value       = aws_cloudwatch_event_rule.dynamodb_table_changes.arn
 }
 
+output "eventbridge_event_pattern" {
+  description = "Generated event pattern of the EventBridge rule (lambda/event_pattern.py)"
+  value       = data.external.event_pattern.result.pattern
+}
+
+output "batch_queue_arn" {
+  description = "ARN of the SQS batch queue (null unless enable_batch_queue)"
+  value       = var.enable_batch_queue ? aws_sqs_queue.enforcer_batch[0].arn : null
+}
+
+output "sweep_lambda_function_name" {
+  description = "Name of the reconciliation sweep Lambda (null unless enable_reconciliation_sweep)"
+  value       = var.enable_reconciliation_sweep ? aws_lambda_function.sweep[0].function_name : null
+}
+
+output "policy_parameter_name" {
+  description = "SSM parameter holding the hot-reloadable policy (null unless enable_policy_parameter)"
+  value       = var.enable_policy_parameter ? aws_ssm_parameter.policy[0].name : null
+}
+
 output "enforcement_summary" {
   description = "Summary of DynamoDB billing enforcement configuration"
   value = {
     action          = "DELETE"
+    rules           = var.enforced_rules
     exempt_prefixes = var.exempt_table_prefixes
     notifications   = var.sns_topic_arn != null ? "Enabled" : "Disabled"
-    eventbridge     = "Broadcasts 'DynamoDB On-Demand Table Deleted' events"
+    eventbridge     = "Broadcasts '<rule label> Deleted' events, e.g. 'DynamoDB On-Demand Table Deleted'"
+    invocation      = var.enable_batch_queue ? "Batched via SQS" : "One invocation per event"
+    reconciliation  = var.enable_reconciliation_sweep ? var.sweep_schedule_expression : "Disabled"
     cost_protection = "On-Demand tables are DELETED to prevent unlimited costs"
   }
 }
@@ -25,6 +25,350 @@ variable "exempt_table_prefixes" {
   default     = []
 }
 
+variable "enforced_rules" {
+  description = <<-EOT
+    Enforcement rules run by the Lambda (see lambda/rules.py):
+      dynamodb-on-demand             - delete On-Demand DynamoDB tables
+      kinesis-on-demand              - delete On-Demand Kinesis streams
+      lambda-provisioned-concurrency - remove provisioned concurrency above
+                                       max_provisioned_concurrency
+    The EventBridge pattern and IAM permissions follow this list. With
+    sandbox_role_name, the sandbox role needs the same permissions.
+    The Kinesis and Lambda rules delete or remove resources, so they only
+    run when listed here.
+  EOT
+  type        = list(string)
+  default     = ["dynamodb-on-demand"]
+
+  validation {
+    condition = length(var.enforced_rules) > 0 && alltrue([
+      for rule in var.enforced_rules :
+      contains(["dynamodb-on-demand", "kinesis-on-demand", "lambda-provisioned-concurrency"], rule)
+    ])
+    error_message = "enforced_rules must list one or more of dynamodb-on-demand, kinesis-on-demand, lambda-provisioned-concurrency."
+  }
+}
+
+variable "max_provisioned_concurrency" {
+  description = "Provisioned concurrency allowed per function alias/version before it is removed (0 = none)"
+  type        = number
+  default     = 0
+}
+
+variable "sns_digest_mode" {
+  description = <<-EOT
+    Combine SNS alerts for several tables in the same account into one
+    message per invocation. Requires enable_batch_queue: batch_window_seconds
+    is the digest window, and without the queue each invocation handles one
+    event, so there would be nothing to combine.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "sandbox_role_name" {
+  description = <<-EOT
+    Name of the IAM role the enforcer assumes in each sandbox account to
+    describe and delete tables. The role must exist in every sandbox account
+    and trust the enforcer Lambda role. If null, the Lambda's own credentials
+    are used (only works for tables in the hub account).
+  EOT
+  type        = string
+  default     = null
+}
+
+variable "enable_batch_queue" {
+  description = <<-EOT
+    Route CloudTrail events through an SQS queue and enforce them in batches.
+    Reduces cold starts during bursts (e.g. a CDK stack creating many tables).
+    When false, EventBridge invokes the Lambda once per event.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "batch_size" {
+  description = "Maximum number of SQS records per batched invocation"
+  type        = number
+  default     = 10
+}
+
+variable "batch_window_seconds" {
+  description = "Maximum time (seconds) SQS waits to fill a batch before invoking the Lambda"
+  type        = number
+  default     = 5
+}
+
+variable "batch_max_workers" {
+  description = "Number of records enforced concurrently within one batched invocation"
+  type        = number
+  default     = 10
+}
+
+variable "exempt_table_rules" {
+  description = <<-EOT
+    Additional exemption rules, compiled once per Lambda container.
+    type is "prefix", "suffix" or "glob", matched against the table name, or
+    "tag" with a "key=value" or "key" pattern (see exempt_tags). If accounts
+    is set, the rule only applies to tables in those sandbox accounts.
+
+    Example:
+      [
+        { type = "suffix", pattern = "-terraform-lock" },
+        { type = "glob", pattern = "scenario-*-state" },
+        { type = "prefix", pattern = "demo-", accounts = ["123456789012"] },
+        { type = "tag", pattern = "ndx:billing-exempt=true" },
+      ]
+  EOT
+  type = list(object({
+    type     = string
+    pattern  = string
+    accounts = optional(list(string), [])
+  }))
+  default = []
+
+  validation {
+    condition     = alltrue([for rule in var.exempt_table_rules : contains(["prefix", "suffix", "glob", "tag"], rule.type)])
+    error_message = "Each exempt_table_rules entry must have type \"prefix\", \"suffix\", \"glob\" or \"tag\"."
+  }
+}
+
+variable "exempt_tags" {
+  description = <<-EOT
+    Tags that exempt a resource in every account, as "key=value" (that value
+    only) or "key" (any value), e.g. ["ndx:billing-exempt=true"]. Tags given
+    at creation come with the CloudTrail event; otherwise they are looked up
+    (ListTagsOfResource, ListTagsForStream, ListTags) and cached per container.
+    With sandbox_role_name, the sandbox role needs those permissions too.
+  EOT
+  type        = list(string)
+  default     = []
+}
+
+variable "tag_cache_ttl_seconds" {
+  description = "How long each Lambda container trusts a resource's cached tags"
+  type        = number
+  default     = 300
+}
+
+variable "tag_lookup_timeout_ms" {
+  description = <<-EOT
+    Longest an event waits for a tag lookup. A resource whose tags are not
+    back in time is not enforced: the event is retried (or fails and is
+    redelivered), and the lookup still fills the cache for the retry.
+    Compliant CreateTable calls are filtered out before the Lambda, so an
+    UpdateTable to on-demand almost always needs a live lookup within this
+    budget; raise it if those events are often retried (TagLookupTimeout).
+  EOT
+  type        = number
+  default     = 500
+}
+
+variable "log_level" {
+  description = "Minimum level for the enforcer's structured JSON logs (DEBUG, INFO, WARNING, ERROR)"
+  type        = string
+  default     = "INFO"
+
+  validation {
+    condition     = contains(["DEBUG", "INFO", "WARNING", "ERROR"], var.log_level)
+    error_message = "log_level must be DEBUG, INFO, WARNING or ERROR."
+  }
+}
+
+variable "log_payload_sample_rate" {
+  description = <<-EOT
+    Fraction of decision log records (0-1) that include the full CloudTrail
+    payload. Errors always include it. Keep low - payloads dominate log volume.
+  EOT
+  type        = number
+  default     = 0.01
+}
+
+variable "enable_metrics" {
+  description = <<-EOT
+    Emit per-phase latency (DescribeTable, DeleteTable, PutEvents, SNS) and
+    outcome counts (Exempt, Provisioned, Deleted, DeleteFailed, NotifyFailed...)
+    as CloudWatch Embedded Metric Format log lines, under the
+    "<namespace>/DynamoDBBillingEnforcer" namespace with AccountId and Region
+    dimensions. No extra API calls; each account/region pair is billed as
+    separate custom metrics.
+  EOT
+  type        = bool
+  default     = true
+}
+
+variable "dry_run" {
+  description = <<-EOT
+    Shadow mode: run the full decision path but only log "would_delete"
+    decisions. Nothing is deleted, retried or notified, and the idempotency
+    table is not written. Useful for validating exemption changes live.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "enable_deferred_retry" {
+  description = <<-EOT
+    Re-enqueue deletes of tables that are still CREATING (ResourceInUseException)
+    on an SQS delay queue with exponential backoff, instead of reporting
+    DELETE_FAILED straight away. Alerts are sent after the final attempt.
+  EOT
+  type        = bool
+  default     = true
+}
+
+variable "retry_max_attempts" {
+  description = "Total DeleteTable attempts (including the first) before reporting DELETE_FAILED"
+  type        = number
+  default     = 5
+}
+
+variable "retry_base_delay_seconds" {
+  description = "Delay before the first retry; doubles per attempt, capped at 900 (SQS maximum)"
+  type        = number
+  default     = 30
+}
+
+variable "account_rate_per_minute" {
+  description = <<-EOT
+    Events per sandbox account per minute before further events are deferred on
+    the retry queue (or run after other accounts' events), so one account
+    looping on CreateTable cannot starve the rest. Per container unless
+    enable_idempotency_table is set, which shares the limit between containers.
+    0 disables the limit.
+  EOT
+  type        = number
+  default     = 60
+}
+
+variable "account_burst" {
+  description = "Events an account can send at once before account_rate_per_minute applies"
+  type        = number
+  default     = 20
+}
+
+variable "breaker_threshold" {
+  description = <<-EOT
+    Violations from one account within breaker_window_seconds that open its
+    circuit breaker: one escalated alert is sent, and per-resource SNS alerts
+    are paused for breaker_open_seconds while enforcement continues. Tables
+    deleted by the reconciliation sweep do not count. 0 disables the breaker.
+  EOT
+  type        = number
+  default     = 10
+}
+
+variable "breaker_window_seconds" {
+  description = "Length of the window in which breaker_threshold violations from one account open its breaker"
+  type        = number
+  default     = 300
+
+  validation {
+    condition     = var.breaker_window_seconds >= 1
+    error_message = "breaker_window_seconds must be at least 1."
+  }
+}
+
+variable "breaker_open_seconds" {
+  description = "How long an account's per-resource alerts stay paused after its breaker opens"
+  type        = number
+  default     = 900
+}
+
+variable "enable_policy_parameter" {
+  description = <<-EOT
+    Create an SSM parameter holding the enforcer's policy (exemptions, enforced
+    rules, notification settings) as JSON, seeded from these variables. The
+    Lambda re-reads it every policy_ttl_seconds, so edits take effect without a
+    deploy. Terraform ignores later edits to its value. Rules enabled there
+    must already have their IAM permissions and EventBridge triggers from
+    enforced_rules. An sns_topic_arn set there must be allowed by the
+    sns_topic_arn variable.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "policy_appconfig" {
+  description = <<-EOT
+    Read the policy document from AppConfig instead, as
+    "application/environment/profile" (names or IDs). Ignored when
+    enable_policy_parameter is true.
+  EOT
+  type        = string
+  default     = null
+}
+
+variable "policy_ttl_seconds" {
+  description = "How often each Lambda container checks the policy source for a new version"
+  type        = number
+  default     = 60
+}
+
+variable "enable_idempotency_table" {
+  description = <<-EOT
+    Create a DynamoDB table that shares duplicate-event records between Lambda
+    containers. Each container always deduplicates in memory; the table also
+    catches redeliveries that land on a different container.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "idempotency_window_seconds" {
+  description = "How long a CloudTrail eventID or a deleted table suppresses repeated enforcement"
+  type        = number
+  default     = 3600
+}
+
+variable "enable_reconciliation_sweep" {
+  description = <<-EOT
+    Run a scheduled sweep that lists every table in every sandbox account and
+    managed region and enforces it, catching tables whose CloudTrail events
+    never reached the enforcer. Requires sandbox_role_name (checked at plan
+    time, and the sweep refuses to run without it), and that role needs
+    dynamodb:ListTables in addition to DescribeTable/DeleteTable.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "sweep_schedule_expression" {
+  description = "EventBridge schedule for the reconciliation sweep"
+  type        = string
+  default     = "rate(6 hours)"
+}
+
+variable "sandbox_ou_id" {
+  description = "OU whose ACTIVE accounts (including nested OUs) are swept, discovered at run time"
+  type        = string
+  default     = null
+}
+
+variable "sweep_account_ids" {
+  description = "Additional sandbox account IDs to sweep (combined with sandbox_ou_id)"
+  type        = list(string)
+  default     = []
+}
+
+variable "managed_regions" {
+  description = "Regions swept in each sandbox account"
+  type        = list(string)
+  default     = ["us-east-1", "us-west-2"]
+}
+
+variable "sweep_max_workers" {
+  description = "Concurrent ListTables/enforcement calls during the sweep"
+  type        = number
+  default     = 32
+}
+
+variable "sweep_timeout_seconds" {
+  description = "Timeout of the sweep Lambda; queued work is skipped shortly before it"
+  type        = number
+  default     = 300
+}
+
 variable "tags" {
   description = "Tags to apply to created resources"
   type        = map(string)
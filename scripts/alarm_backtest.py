@@ -0,0 +1,571 @@
+#!/usr/bin/env python3
+"""
+Backtest CloudWatch alarm definitions against exported metric history.
+
+Reads the aws_cloudwatch_metric_alarm resources of a Terraform module (or
+`terraform show -json` output) and replays exported time series through
+them, reporting how often each alarm would have fired and how long it took
+to notice a breach. Grids of thresholds, periods, evaluation_periods and
+datapoints_to_alarm are evaluated together, so alarms such as those in
+modules/ou-metrics-alarms can be tuned for noise and detection latency
+against a year of history instead of by trial and error in production.
+
+DATA:
+    CSV or Parquet exports of the raw datapoints, in either layout:
+        long: timestamp,metric,value        (one row per datapoint)
+        wide: timestamp,AvailableAccounts,EntryAccounts,...
+    Timestamps are ISO 8601 (UTC) or epoch seconds/milliseconds. Parquet
+    needs pandas and pyarrow.
+
+EVALUATION:
+    Datapoints are aggregated into period buckets aligned to the epoch with
+    the alarm's statistic; an empty bucket is a missing datapoint. At each
+    period the alarm looks at the last evaluation_periods datapoints and is
+    in ALARM when at least datapoints_to_alarm of them breach. Missing
+    datapoints follow treat_missing_data:
+        breaching / notBreaching  count as breaching / not breaching
+        ignore                    skipped: the last N present datapoints are used
+        missing                   INSUFFICIENT_DATA if the whole window is
+                                  missing, otherwise only present ones count
+    This is the documented CloudWatch behaviour without its look-back past
+    the evaluation range, which only matters for sparse data.
+
+    Every window is computed at once from cumulative sums over a
+    (thresholds x periods) array, so one grid point costs a few vector
+    operations over the series regardless of its length.
+
+REPORT:
+    alarms       transitions into ALARM (each one is a notification)
+    transitions  all state changes (ok_actions notify too)
+    alarm_pct    share of periods spent in ALARM
+    latency      median and p95 seconds from the start of the breach that
+                 triggered each alarm to the alarm, in whole periods
+
+USAGE:
+    python scripts/alarm_backtest.py modules/ou-metrics-alarms --data ou-metrics-2025.csv
+
+    # Sweep the low-available-accounts alarm
+    python scripts/alarm_backtest.py modules/ou-metrics-alarms --data ou-metrics-2025.parquet \\
+        --alarm low-available-accounts --threshold 10:40:5 --period 300,900 \\
+        --evaluation-periods 1,2,3 --datapoints-to-alarm 1,2,3
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import re
+import sys
+
+import numpy as np
+
+COMPARISONS = {
+    'GreaterThanThreshold': np.greater,
+    'GreaterThanOrEqualToThreshold': np.greater_equal,
+    'LessThanThreshold': np.less,
+    'LessThanOrEqualToThreshold': np.less_equal,
+}
+STATISTICS = ('Minimum', 'Maximum', 'Average', 'Sum', 'SampleCount')
+TREAT_MISSING = ('breaching', 'notBreaching', 'ignore', 'missing')
+
+# Alarm states; CloudWatch starts every alarm in INSUFFICIENT_DATA
+OK, ALARM, INSUFFICIENT_DATA = 0, 1, 2
+
+ALARM_FIELDS = ('alarm_name', 'metric_name', 'comparison_operator', 'threshold', 'statistic', 'period',
+                'evaluation_periods', 'datapoints_to_alarm', 'treat_missing_data')
+
+
+# -----------------------------------------------------------------------------
+# Alarm definitions
+# -----------------------------------------------------------------------------
+
+def _module_resources(module: dict):
+    yield from module.get('resources', [])
+    for child in module.get('child_modules', []):
+        yield from _module_resources(child)
+
+
+def alarms_from_terraform(data: dict) -> list:
+    """Alarms from `terraform show -json` state or plan output."""
+    root = (data.get('values') or data.get('planned_values') or {}).get('root_module', {})
+    return [
+        validate_alarm({field: (resource.get('values') or {}).get(field) for field in ALARM_FIELDS})
+        for resource in _module_resources(root)
+        if resource.get('type') == 'aws_cloudwatch_metric_alarm'
+    ]
+
+
+_BLOCK = re.compile(r'^(resource|variable|locals)\b\s*(?:"([^"]+)")?\s*(?:"([^"]+)")?\s*\{\s*$')
+_ASSIGNMENT = re.compile(r'^(\w+)\s*=\s*(.+?)\s*$')
+_REFERENCE = re.compile(r'\b(var|local)\.(\w+)\b')
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+
+
+def _hcl_blocks(text: str):
+    """(kind, labels, {attribute: raw value}) for each top-level block, top-level attributes only."""
+    block, depth = None, 0
+    for line in text.splitlines():
+        stripped = line.strip()
+        if block is None:
+            match = _BLOCK.match(stripped)
+            if match:
+                block, depth = (match.group(1), match.group(2, 3), {}), 1
+            continue
+        if depth == 1:
+            match = _ASSIGNMENT.match(stripped)
+            if match and not match.group(2).startswith(('{', '[', '<<')):
+                block[2][match.group(1)] = match.group(2)
+        code = _STRING.sub('', stripped)
+        depth += code.count('{') - code.count('}')
+        if depth <= 0:
+            yield block
+            block = None
+
+
+def _hcl_value(raw: str, scope: dict):
+    """Resolve a simple HCL value: number, bool, null, string (with interpolation) or reference."""
+    if raw.startswith('"'):
+        string = raw[1:raw.index('"', 1)]
+        return re.sub(r'\$\{(\w+)\.(\w+)\}', lambda m: str(scope[m.group(1)][m.group(2)]), string)
+    raw = raw.split('#', 1)[0].strip()
+    reference = _REFERENCE.fullmatch(raw)
+    if reference:
+        return scope[reference.group(1)][reference.group(2)]
+    if raw in ('true', 'false'):
+        return raw == 'true'
+    if raw == 'null':
+        return None
+    try:
+        return int(raw)
+    except ValueError:
+        return float(raw)
+
+
+def alarms_from_module(directory: str, variables: dict = None) -> list:
+    """
+    Alarms from a module's .tf files, with var.* taken from variable defaults
+    overridden by variables. Only literal and var./local. values are resolved,
+    which covers the alarm arguments backtested here.
+    """
+    blocks = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.tf'):
+            with open(os.path.join(directory, name)) as f:
+                blocks.extend(_hcl_blocks(f.read()))
+
+    scope = {'var': {}, 'local': {}}
+    for kind, labels, attributes in blocks:
+        if kind == 'variable' and 'default' in attributes:
+            scope['var'][labels[0]] = _hcl_value(attributes['default'], scope)
+    scope['var'].update(variables or {})
+    for kind, labels, attributes in blocks:
+        if kind == 'locals':
+            for name, raw in attributes.items():
+                scope['local'][name] = _hcl_value(raw, scope)
+
+    alarms = []
+    for kind, labels, attributes in blocks:
+        if kind == 'resource' and labels[0] == 'aws_cloudwatch_metric_alarm':
+            alarm = {field: _hcl_value(attributes[field], scope)
+                     for field in ALARM_FIELDS if field in attributes}
+            alarms.append(validate_alarm(alarm))
+    return alarms
+
+
+def validate_alarm(alarm: dict) -> dict:
+    """Fill CloudWatch defaults and check the arguments the backtest supports."""
+    alarm = dict(alarm)
+    alarm['threshold'] = float(alarm['threshold'])
+    alarm['period'] = int(alarm['period'])
+    alarm['evaluation_periods'] = int(alarm['evaluation_periods'])
+    alarm['datapoints_to_alarm'] = int(alarm.get('datapoints_to_alarm') or alarm['evaluation_periods'])
+    alarm['treat_missing_data'] = alarm.get('treat_missing_data') or 'missing'
+    if alarm['comparison_operator'] not in COMPARISONS:
+        raise ValueError(f"{alarm['alarm_name']}: unsupported comparison_operator {alarm['comparison_operator']!r}")
+    if alarm.get('statistic') not in STATISTICS:
+        raise ValueError(f"{alarm['alarm_name']}: unsupported statistic {alarm.get('statistic')!r}")
+    if alarm['treat_missing_data'] not in TREAT_MISSING:
+        raise ValueError(f"{alarm['alarm_name']}: unsupported treat_missing_data {alarm['treat_missing_data']!r}")
+    return alarm
+
+
+def load_alarms(path: str, variables: dict = None) -> list:
+    """Alarms from a module directory, a .tf file's module, or `terraform show -json` output."""
+    if os.path.isdir(path):
+        return alarms_from_module(path, variables)
+    if path.endswith('.tf'):
+        return alarms_from_module(os.path.dirname(path) or '.', variables)
+    with open(path) as f:
+        return alarms_from_terraform(json.load(f))
+
+
+# -----------------------------------------------------------------------------
+# Metric data
+# -----------------------------------------------------------------------------
+
+def parse_timestamps(values) -> np.ndarray:
+    """Epoch seconds (int64) from ISO 8601 strings or epoch seconds/milliseconds."""
+    values = list(values)
+    try:
+        epoch = np.asarray(values, dtype=float)
+    except ValueError:
+        # numpy parses naive ISO 8601; times are UTC, so drop the zone suffix
+        iso = [str(value).strip().replace(' ', 'T')[:19] for value in values]
+        return np.asarray(iso, dtype='datetime64[s]').astype(np.int64)
+    if len(epoch) and np.nanmax(epoch) > 1e11:
+        epoch = epoch / 1000
+    return epoch.astype(np.int64)
+
+
+def _columns_to_series(columns: dict) -> dict:
+    """{metric: (timestamps, values)} from long or wide columns."""
+    names = {name.lower(): name for name in columns}
+    time_column = next((names[key] for key in ('timestamp', 'time', 'datetime') if key in names),
+                       next(iter(columns)))
+    timestamps = parse_timestamps(columns[time_column])
+
+    metric_column = next((names[key] for key in ('metric', 'metric_name', 'metricname') if key in names), None)
+    if metric_column is not None:
+        value_column = names.get('value')
+        if value_column is None:
+            raise ValueError("Long-format data needs a 'value' column")
+        metrics = np.asarray(columns[metric_column], dtype=str)
+        values = np.asarray(columns[value_column], dtype=float)
+        return {str(metric): (timestamps[metrics == metric], values[metrics == metric])
+                for metric in np.unique(metrics)}
+
+    series = {}
+    for name, column in columns.items():
+        if name == time_column:
+            continue
+        values = np.asarray([np.nan if value in ('', None) else value for value in column], dtype=float)
+        present = ~np.isnan(values)
+        series[name] = (timestamps[present], values[present])
+    return series
+
+
+def _read_csv(path: str) -> dict:
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+    return {name: [row[i] if i < len(row) else '' for row in rows] for i, name in enumerate(header)}
+
+
+def _read_parquet(path: str) -> dict:
+    try:
+        import pandas
+    except ImportError as e:
+        raise ValueError('Reading Parquet needs pandas and pyarrow (pip install pandas pyarrow)') from e
+    frame = pandas.read_parquet(path)
+    columns = {}
+    for name in frame.columns:
+        column = frame[name]
+        if pandas.api.types.is_datetime64_any_dtype(column):
+            column = column.dt.tz_localize(None) if column.dt.tz is not None else column
+            column = column.astype('datetime64[s]').astype('int64')
+        columns[str(name)] = column.tolist()
+    return columns
+
+
+def load_series(paths: list) -> dict:
+    """{metric: (timestamps, values)} from CSV/Parquet files, sorted by time."""
+    merged = {}
+    for path in paths:
+        reader = _read_parquet if path.endswith(('.parquet', '.pq')) else _read_csv
+        for metric, (timestamps, values) in _columns_to_series(reader(path)).items():
+            merged.setdefault(metric, []).append((timestamps, values))
+
+    series = {}
+    for metric, parts in merged.items():
+        timestamps = np.concatenate([t for t, _ in parts])
+        values = np.concatenate([v for _, v in parts])
+        order = np.argsort(timestamps, kind='stable')
+        series[metric] = (timestamps[order], values[order])
+    return series
+
+
+# -----------------------------------------------------------------------------
+# Evaluation
+# -----------------------------------------------------------------------------
+
+def aggregate(timestamps: np.ndarray, values: np.ndarray, period: int, statistic: str) -> np.ndarray:
+    """
+    One value per period (aligned to the epoch) from the first to the last
+    datapoint; NaN where a period has no datapoints.
+    """
+    if not len(timestamps):
+        return np.empty(0)
+    buckets = timestamps // period
+    buckets = buckets - buckets[0]
+    size = int(buckets[-1]) + 1
+    counts = np.bincount(buckets, minlength=size).astype(float)
+
+    if statistic == 'SampleCount':
+        result = counts
+    elif statistic in ('Sum', 'Average'):
+        result = np.bincount(buckets, weights=values, minlength=size)
+        if statistic == 'Average':
+            with np.errstate(invalid='ignore'):
+                result = result / counts
+    else:
+        # Timestamps are sorted, so each bucket is one contiguous run
+        present, starts = np.unique(buckets, return_index=True)
+        reduce = np.minimum if statistic == 'Minimum' else np.maximum
+        result = np.full(size, np.nan)
+        result[present] = reduce.reduceat(values, starts)
+    result[counts == 0] = np.nan
+    return result
+
+
+def _row_percentiles(rows: np.ndarray, values: np.ndarray, row_count: int, q: float) -> np.ndarray:
+    """Linear-interpolated q-th percentile of values per row, NaN for rows without values."""
+    order = np.lexsort((values, rows))
+    values = values[order].astype(float)
+    counts = np.bincount(rows, minlength=row_count)
+    starts = np.cumsum(counts) - counts
+    result = np.full(row_count, np.nan)
+    has = counts > 0
+    position = starts[has] + (counts[has] - 1) * q / 100
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    result[has] = values[low] + (values[high] - values[low]) * (position - low)
+    return result
+
+
+class Windows:
+    """
+    Breach flags and their running totals for one aggregated series and a set
+    of thresholds, shared by every evaluation_periods/datapoints_to_alarm
+    pair: each pair's windows are then two slices of the same cumulative sum.
+
+    Args:
+        datapoints: Aggregated values, NaN for missing datapoints
+    """
+
+    def __init__(self, datapoints: np.ndarray, comparison_operator: str, thresholds,
+                 treat_missing_data: str):
+        self.thresholds = np.asarray(thresholds, dtype=float)
+        self.treat_missing_data = treat_missing_data
+        self.size = len(datapoints)
+        missing = np.isnan(datapoints)
+        with np.errstate(invalid='ignore'):
+            breaching = COMPARISONS[comparison_operator](datapoints[None, :], self.thresholds[:, None])
+        breaching &= ~missing
+
+        if treat_missing_data == 'ignore':
+            self.present = np.flatnonzero(~missing)
+            flags = breaching[:, self.present]
+            # Missing periods keep the state of the last present datapoint
+            last_present = np.maximum.accumulate(np.where(missing, -1, np.arange(self.size)))
+            self.filled = last_present >= 0
+            self.source = np.searchsorted(self.present, last_present[self.filled])
+        elif treat_missing_data == 'breaching':
+            flags = breaching | missing
+        else:
+            flags = breaching
+        self._totals = np.cumsum(flags, axis=1, dtype=np.int32)
+        self._missing_totals = np.cumsum(missing, dtype=np.int32)
+
+        # A breach starts after the last period that was clearly not breaching
+        if treat_missing_data == 'notBreaching':
+            resets = ~breaching
+        else:
+            resets = ~breaching & ~missing
+        self.last_reset = np.maximum.accumulate(np.where(resets, np.arange(self.size), -1), axis=1)
+
+    @staticmethod
+    def _trailing(totals: np.ndarray, width: int) -> np.ndarray:
+        """Sums over the trailing width columns (shorter at the start) from running totals."""
+        sums = totals.copy()
+        sums[..., width:] -= totals[..., :-width]
+        return sums
+
+    def states(self, evaluation_periods: int, datapoints_to_alarm: int) -> np.ndarray:
+        """int8 array (thresholds, periods) of OK/ALARM/INSUFFICIENT_DATA."""
+        alarm = self._trailing(self._totals, evaluation_periods) >= datapoints_to_alarm
+        compressed = np.where(alarm, ALARM, OK).astype(np.int8)
+        if self.treat_missing_data != 'ignore':
+            if self.treat_missing_data == 'missing':
+                all_missing = self._trailing(self._missing_totals, evaluation_periods) == evaluation_periods
+                compressed[:, all_missing] = INSUFFICIENT_DATA
+            return compressed
+
+        states = np.full((len(self.thresholds), self.size), INSUFFICIENT_DATA, dtype=np.int8)
+        states[:, self.filled] = compressed[:, self.source]
+        return states
+
+    def summarize(self, states: np.ndarray, period: int) -> list:
+        """Alarm count, transitions, time in alarm and detection latency per threshold."""
+        count = len(self.thresholds)
+        changed = np.empty_like(states, dtype=bool)
+        changed[:, 0] = states[:, 0] != INSUFFICIENT_DATA
+        np.not_equal(states[:, 1:], states[:, :-1], out=changed[:, 1:])
+        entered = changed & (states == ALARM)
+
+        rows, columns = np.nonzero(entered)
+        latency = (columns - self.last_reset[rows, columns]) * period
+        median = _row_percentiles(rows, latency, count, 50)
+        p95 = _row_percentiles(rows, latency, count, 95)
+
+        alarms = np.bincount(rows, minlength=count)
+        # The first state is CloudWatch leaving INSUFFICIENT_DATA at the start of the data
+        transitions = changed[:, 1:].sum(axis=1)
+        alarm_pct = (states == ALARM).mean(axis=1) * 100 if self.size else np.zeros(count)
+        return [
+            {
+                'threshold': float(self.thresholds[i]),
+                'alarms': int(alarms[i]),
+                'transitions': int(transitions[i]),
+                'alarm_pct': round(float(alarm_pct[i]), 3),
+                'median_latency_seconds': None if np.isnan(median[i]) else int(median[i]),
+                'p95_latency_seconds': None if np.isnan(p95[i]) else int(p95[i]),
+            }
+            for i in range(count)
+        ]
+
+
+def evaluate(datapoints: np.ndarray, comparison_operator: str, thresholds, evaluation_periods: int,
+             datapoints_to_alarm: int, treat_missing_data: str) -> np.ndarray:
+    """
+    Alarm state at every period for each threshold.
+
+    Returns:
+        int8 array (len(thresholds), len(datapoints)) of OK/ALARM/INSUFFICIENT_DATA
+    """
+    windows = Windows(datapoints, comparison_operator, thresholds, treat_missing_data)
+    return windows.states(evaluation_periods, datapoints_to_alarm)
+
+
+def backtest(alarm: dict, series: tuple, thresholds=None, periods=None, evaluation_periods=None,
+             datapoints_to_alarm=None) -> list:
+    """
+    Evaluate an alarm, or a grid of variations of it, over one metric's history.
+
+    Grid arguments default to the alarm's own setting. Combinations with
+    datapoints_to_alarm greater than evaluation_periods are skipped.
+
+    Returns:
+        One result dict per grid point, with the settings used and
+        'current' True for the alarm's own settings
+    """
+    timestamps, values = series
+    thresholds = list(thresholds or [alarm['threshold']])
+    results = []
+    for period in periods or [alarm['period']]:
+        datapoints = aggregate(timestamps, values, period, alarm['statistic'])
+        windows = Windows(datapoints, alarm['comparison_operator'], thresholds, alarm['treat_missing_data'])
+        for n, m in itertools.product(evaluation_periods or [alarm['evaluation_periods']],
+                                      datapoints_to_alarm or [alarm['datapoints_to_alarm']]):
+            if m > n:
+                continue
+            settings = {'period': period, 'evaluation_periods': n, 'datapoints_to_alarm': m}
+            is_current = all(alarm[key] == value for key, value in settings.items())
+            for summary in windows.summarize(windows.states(n, m), period):
+                results.append({'alarm_name': alarm['alarm_name'], **settings, **summary,
+                                'current': is_current and summary['threshold'] == alarm['threshold']})
+    return results
+
+
+# -----------------------------------------------------------------------------
+# CLI
+# -----------------------------------------------------------------------------
+
+def parse_numbers(text: str, cast=float) -> list:
+    """'1,2,5' or 'start:stop:step' (stop inclusive) into a list of numbers."""
+    if ':' in text:
+        start, stop, step = (float(part) for part in text.split(':'))
+        values = np.arange(start, stop + step / 2, step)
+    else:
+        values = [float(part) for part in text.split(',') if part.strip()]
+    return [cast(value) for value in values]
+
+
+def parse_variables(assignments: list) -> dict:
+    variables = {}
+    for assignment in assignments or []:
+        name, sep, value = assignment.partition('=')
+        if not sep:
+            raise ValueError(f'--var expects NAME=VALUE, got {assignment!r}')
+        try:
+            variables[name] = float(value) if '.' in value else int(value)
+        except ValueError:
+            variables[name] = value
+    return variables
+
+
+def format_table(results: list) -> str:
+    headers = ('alarm', 'period', 'N', 'M', 'threshold', 'alarms', 'transitions', 'alarm%', 'p50 latency', 'p95 latency')
+    rows = [(
+        ('* ' if result['current'] else '  ') + result['alarm_name'],
+        str(result['period']),
+        str(result['evaluation_periods']),
+        str(result['datapoints_to_alarm']),
+        f"{result['threshold']:g}",
+        str(result['alarms']),
+        str(result['transitions']),
+        f"{result['alarm_pct']:.2f}",
+        '-' if result['median_latency_seconds'] is None else f"{result['median_latency_seconds']}s",
+        '-' if result['p95_latency_seconds'] is None else f"{result['p95_latency_seconds']}s",
+    ) for result in results]
+    widths = [max(len(cell) for cell in column) for column in zip(headers, *rows)]
+    lines = ['  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+             for row in [headers, *rows]]
+    return '\n'.join(lines) + '\n\n* = current setting\n'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('alarms', help='Terraform module directory, .tf file, or `terraform show -json` output')
+    parser.add_argument('--data', nargs='+', required=True, help='exported datapoints (.csv, .parquet)')
+    parser.add_argument('--var', action='append', metavar='NAME=VALUE', help='override a module variable (repeatable)')
+    parser.add_argument('--alarm', action='append', metavar='NAME',
+                        help='only alarms whose name contains NAME (repeatable)')
+    parser.add_argument('--threshold', help="thresholds to try: '10,20,30' or '10:40:5'")
+    parser.add_argument('--period', help='periods in seconds to try')
+    parser.add_argument('--evaluation-periods', help='evaluation_periods values to try')
+    parser.add_argument('--datapoints-to-alarm', help='datapoints_to_alarm values to try')
+    parser.add_argument('--format', choices=('table', 'csv', 'json'), default='table')
+    args = parser.parse_args(argv)
+
+    try:
+        alarms = load_alarms(args.alarms, parse_variables(args.var))
+        grid = {
+            'thresholds': parse_numbers(args.threshold) if args.threshold else None,
+            'periods': parse_numbers(args.period, int) if args.period else None,
+            'evaluation_periods': parse_numbers(args.evaluation_periods, int) if args.evaluation_periods else None,
+            'datapoints_to_alarm': parse_numbers(args.datapoints_to_alarm, int) if args.datapoints_to_alarm else None,
+        }
+        series = load_series(args.data)
+    except (OSError, ValueError, KeyError) as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 2
+
+    if args.alarm:
+        alarms = [alarm for alarm in alarms if any(name in alarm['alarm_name'] for name in args.alarm)]
+    if not alarms:
+        print('error: no matching alarms', file=sys.stderr)
+        return 2
+
+    results = []
+    for alarm in alarms:
+        if alarm['metric_name'] not in series:
+            print(f"warning: no data for {alarm['metric_name']} ({alarm['alarm_name']})", file=sys.stderr)
+            continue
+        results.extend(backtest(alarm, series[alarm['metric_name']], **grid))
+
+    if args.format == 'json':
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    elif args.format == 'csv':
+        writer = csv.DictWriter(sys.stdout, fieldnames=list(results[0]) if results else ['alarm_name'])
+        writer.writeheader()
+        writer.writerows(results)
+    else:
+        sys.stdout.write(format_table(results))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,707 @@
+#!/usr/bin/env python3
+"""
+Budget threshold simulator over Cost and Usage Report exports.
+
+Replays historical spend from CUR (legacy or 2.0) or Cost Explorer exports
+through the AWS Budgets defined in Terraform (modules/budgets-manager) and
+reports which notifications would have fired, and how late, for the current
+limits or a candidate set. Service, LinkedAccount and UsageType filters and
+cost_types (standard_cost_types) are applied as Budgets applies them.
+
+DATA:
+    CSV (optionally .gz) or Parquet files, or directories of them. Columns are
+    recognised by their CUR, CUR 2.0 or plain names (see COLUMN_ALIASES).
+    Legacy CUR product names are mapped to the Cost Explorer service names
+    Budgets filters on ("Amazon Elastic Compute Cloud - Compute" vs
+    "EC2 - Other"). Rows without a usage end column are taken to cover
+    --row-hours hours from their start (use 24 for daily exports).
+
+SCALE:
+    Files are split into tasks - byte ranges of large uncompressed CSVs
+    (records must not contain line breaks), whole .gz files, Parquet row
+    groups - and read in worker processes, CHUNK_ROWS rows at a time. Each
+    worker reduces its chunks to spend per account, service, usage type,
+    line item type and hour with pandas group-bys, so memory depends on the
+    chunk size and the number of distinct groups, not on the file size.
+
+SIMULATION:
+    Spend is attributed to the budget period (UTC day or month) its usage
+    started in and counts from the end of its usage hour. A notification's
+    threshold is crossed in the first hour cumulative period spend exceeds
+    it; Budgets refreshes a few times a day after billing data lands, so the
+    alert is assumed to arrive --alert-delay-hours later. An alert is late if
+    it arrives after its period ended; spend_at_alert is how much had been
+    spent by then. FORECASTED notifications are not simulated.
+
+USAGE:
+    cd environments/ndx-production
+    terraform show -json > /tmp/state.json
+    python ../../scripts/budget_simulator.py /tmp/state.json --data /data/cur/2025/
+
+    # Would a $20 Bedrock budget with alerts at 25/50/100% have been earlier?
+    python scripts/budget_simulator.py /tmp/state.json --data /data/cur/ \\
+        --limit bedrock=20 --thresholds bedrock=25,50,100 --events alerts.csv
+"""
+import argparse
+import gzip
+import io
+import json
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# Rows read per chunk in each worker
+CHUNK_ROWS = 200_000
+
+# Uncompressed CSVs are split into ranges of at most this many bytes
+SPLIT_BYTES = 256 * 1024 * 1024
+MIN_SPLIT_BYTES = 4 * 1024 * 1024
+
+# Logical column -> names it has in CUR, CUR 2.0, Cost Explorer and plain exports
+COLUMN_ALIASES = {
+    'account': ('lineItem/UsageAccountId', 'line_item_usage_account_id', 'LinkedAccount', 'linked_account',
+                'account_id', 'account'),
+    'start': ('lineItem/UsageStartDate', 'line_item_usage_start_date', 'UsageStartDate', 'usage_start_date',
+              'Date', 'date', 'time'),
+    'end': ('lineItem/UsageEndDate', 'line_item_usage_end_date', 'UsageEndDate', 'usage_end_date'),
+    'product': ('product/ProductName', 'product_product_name', 'Service', 'service'),
+    'usage_type': ('lineItem/UsageType', 'line_item_usage_type', 'UsageType', 'usage_type'),
+    'line_item_type': ('lineItem/LineItemType', 'line_item_line_item_type', 'RecordType', 'record_type'),
+    'unblended': ('lineItem/UnblendedCost', 'line_item_unblended_cost', 'UnblendedCost', 'unblended_cost',
+                  'Cost', 'cost'),
+    'blended': ('lineItem/BlendedCost', 'line_item_blended_cost', 'BlendedCost', 'blended_cost'),
+}
+REQUIRED_COLUMNS = ('account', 'start', 'product')
+
+# Mirrors local.standard_cost_types in modules/budgets-manager/main.tf; used
+# for budgets given as plain JSON rather than Terraform output
+STANDARD_COST_TYPES = {
+    'include_credit': False,
+    'include_discount': True,
+    'include_other_subscription': True,
+    'include_recurring': True,
+    'include_refund': False,
+    'include_subscription': True,
+    'include_support': True,
+    'include_tax': True,
+    'include_upfront': True,
+    'use_blended': False,
+}
+
+# CUR line item types and Cost Explorer record types -> the cost_types flag
+# that includes them. Types not listed (Usage, DiscountedUsage,
+# SavingsPlanCoveredUsage) are always included.
+LINE_ITEM_COST_TYPES = {
+    'Credit': 'include_credit',
+    'Refund': 'include_refund',
+    'Tax': 'include_tax',
+    'Support': 'include_support',
+    'Fee': 'include_upfront',
+    'RIFee': 'include_recurring',
+    'SavingsPlanRecurringFee': 'include_recurring',
+    'SavingsPlanUpfrontFee': 'include_upfront',
+    'Recurring reservation fee': 'include_recurring',
+    'Upfront reservation fee': 'include_upfront',
+    'Discount': 'include_discount',
+    'BundledDiscount': 'include_discount',
+    'Bundled Discount': 'include_discount',
+    'EdpDiscount': 'include_discount',
+    'Enterprise Discount Program Discount': 'include_discount',
+    'PrivateRateDiscount': 'include_discount',
+    'SppDiscount': 'include_discount',
+    'DistributorDiscount': 'include_discount',
+    'SavingsPlanNegation': 'include_discount',
+    'Other out-of-cycle charges': 'include_other_subscription',
+    'Subscription': 'include_subscription',
+}
+
+# Budget cost_filter name -> aggregated column
+FILTER_COLUMNS = {'Service': 'service', 'LinkedAccount': 'account', 'UsageType': 'usage_type'}
+
+# Legacy CUR reports EC2 as one product; Cost Explorer splits instance hours out
+EC2_PRODUCT = 'Amazon Elastic Compute Cloud'
+EC2_COMPUTE_SERVICE = 'Amazon Elastic Compute Cloud - Compute'
+EC2_OTHER_SERVICE = 'EC2 - Other'
+EC2_COMPUTE_USAGE = r'BoxUsage|SpotUsage|DedicatedUsage|HostUsage|SchedUsage'
+
+GROUP_COLUMNS = ['account', 'service', 'usage_type', 'line_item_type', 'start', 'incurred']
+
+PERIOD_FREQUENCIES = {'DAILY': 'D', 'MONTHLY': 'M'}
+
+
+# -----------------------------------------------------------------------------
+# Budget definitions
+# -----------------------------------------------------------------------------
+
+def _module_resources(module: dict):
+    yield from module.get('resources', [])
+    for child in module.get('child_modules', []):
+        yield from _module_resources(child)
+
+
+def budgets_from_terraform(data: dict) -> list:
+    """Budgets from `terraform show -json` state or plan output."""
+    root = (data.get('values') or data.get('planned_values') or {}).get('root_module', {})
+    budgets = []
+    for resource in _module_resources(root):
+        if resource.get('type') != 'aws_budgets_budget':
+            continue
+        values = resource.get('values') or {}
+        if values.get('budget_type', 'COST') != 'COST':
+            continue
+        budgets.append(validate_budget({
+            'name': values['name'],
+            'key': str(resource.get('index', resource.get('name'))),
+            'limit': values['limit_amount'],
+            'time_unit': values.get('time_unit', 'DAILY'),
+            'filters': {f['name']: f['values'] for f in values.get('cost_filter') or []},
+            'cost_types': (values.get('cost_types') or [{}])[0],
+            'notifications': values.get('notification') or [],
+        }))
+    return budgets
+
+
+def validate_budget(budget: dict) -> dict:
+    """Fill defaults and check the settings the simulator supports."""
+    budget = dict(budget)
+    budget['key'] = budget.get('key') or budget['name']
+    budget['limit'] = float(budget['limit'])
+    budget['time_unit'] = budget.get('time_unit', 'DAILY')
+    budget['filters'] = dict(budget.get('filters') or {})
+    budget['cost_types'] = {**STANDARD_COST_TYPES, **(budget.get('cost_types') or {})}
+    budget['notifications'] = [
+        {'comparison_operator': 'GREATER_THAN', 'threshold_type': 'PERCENTAGE', 'notification_type': 'ACTUAL',
+         **notification}
+        for notification in budget.get('notifications') or []
+    ]
+    if budget['time_unit'] not in PERIOD_FREQUENCIES:
+        raise ValueError(f"{budget['name']}: time_unit {budget['time_unit']} is not supported")
+    unsupported = sorted(set(budget['filters']) - set(FILTER_COLUMNS))
+    if unsupported:
+        raise ValueError(f"{budget['name']}: cost_filter {', '.join(unsupported)} is not supported")
+    return budget
+
+
+def load_budgets(path: str) -> list:
+    """Budgets from `terraform show -json` output, or a JSON list of budgets."""
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return [validate_budget(budget) for budget in data]
+    return budgets_from_terraform(data)
+
+
+def apply_candidates(budgets: list, limits: dict = None, thresholds: dict = None) -> list:
+    """
+    Replace limits and ACTUAL percentage thresholds of budgets selected by
+    name or Terraform key (e.g. 'bedrock').
+
+    Raises:
+        ValueError: if a name matches no budget
+    """
+    names = {name for budget in budgets for name in (budget['name'], budget['key'])}
+    unknown = sorted((set(limits or {}) | set(thresholds or {})) - names)
+    if unknown:
+        raise ValueError(f"No budget named {', '.join(unknown)}")
+
+    result = []
+    for budget in budgets:
+        budget = dict(budget)
+        for name in (budget['key'], budget['name']):
+            if name in (limits or {}):
+                budget['limit'] = float(limits[name])
+            if name in (thresholds or {}):
+                kept = [n for n in budget['notifications']
+                        if not (n['notification_type'] == 'ACTUAL' and n['threshold_type'] == 'PERCENTAGE')]
+                budget['notifications'] = kept + [
+                    {'comparison_operator': 'GREATER_THAN', 'threshold': float(value),
+                     'threshold_type': 'PERCENTAGE', 'notification_type': 'ACTUAL'}
+                    for value in thresholds[name]
+                ]
+        result.append(budget)
+    return result
+
+
+# -----------------------------------------------------------------------------
+# Reading exports
+# -----------------------------------------------------------------------------
+
+def iter_data_files(paths: list):
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, names in sorted(os.walk(path)):
+                for name in sorted(names):
+                    if name.endswith(('.csv', '.csv.gz', '.parquet')):
+                        yield os.path.join(directory, name)
+        else:
+            yield path
+
+
+def resolve_columns(names: list) -> dict:
+    """
+    Map logical columns to the file's column names.
+
+    Raises:
+        ValueError: if a required column is missing
+    """
+    present = set(names)
+    columns = {}
+    for logical, aliases in COLUMN_ALIASES.items():
+        match = next((alias for alias in aliases if alias in present), None)
+        if match is not None:
+            columns[logical] = match
+    missing = [logical for logical in REQUIRED_COLUMNS if logical not in columns]
+    if 'unblended' not in columns and 'blended' not in columns:
+        missing.append('cost')
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)} (have {', '.join(names[:8])}...)")
+    return columns
+
+
+def _open_text(path: str):
+    return gzip.open(path, 'rt', newline='') if path.endswith('.gz') else open(path, newline='')
+
+
+def _csv_header(path: str) -> list:
+    with _open_text(path) as f:
+        return pd.read_csv(f, nrows=0).columns.tolist()
+
+
+def plan_tasks(paths: list, workers: int, split_bytes: int = SPLIT_BYTES) -> list:
+    """
+    Split the exports into independent read tasks:
+    ('csv', path, header, start, end) or ('parquet', path, row_group).
+    """
+    tasks = []
+    for path in iter_data_files(paths):
+        if path.endswith('.parquet'):
+            import pyarrow.parquet as pq
+            for row_group in range(pq.ParquetFile(path).num_row_groups):
+                tasks.append(('parquet', path, row_group))
+            continue
+
+        header = _csv_header(path)
+        if path.endswith('.gz'):
+            tasks.append(('csv', path, header, None, None))
+            continue
+
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            f.readline()
+            cuts = [f.tell()]
+            piece = max(MIN_SPLIT_BYTES, min(split_bytes, math.ceil(size / max(workers, 1))))
+            while cuts[-1] + piece < size:
+                f.seek(cuts[-1] + piece)
+                f.readline()
+                if f.tell() >= size:
+                    break
+                cuts.append(f.tell())
+        cuts.append(size)
+        tasks.extend(('csv', path, header, start, end) for start, end in zip(cuts, cuts[1:]) if end > start)
+    return tasks
+
+
+class _ByteRange(io.RawIOBase):
+    """Read-only view of length bytes of a binary file from its current position."""
+
+    def __init__(self, f, length: int):
+        self._f = f
+        self._remaining = length
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._remaining <= 0:
+            return 0
+        count = self._f.readinto(memoryview(buffer)[:min(len(buffer), self._remaining)])
+        self._remaining -= count
+        return count
+
+
+def _chunks(task: tuple, columns: dict):
+    """DataFrames of at most CHUNK_ROWS rows with the logical columns of a task."""
+    rename = {name: logical for logical, name in columns.items()}
+    if task[0] == 'parquet':
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(task[1])
+        for batch in parquet.iter_batches(batch_size=CHUNK_ROWS, row_groups=[task[2]],
+                                          columns=list(rename)):
+            yield batch.to_pandas().rename(columns=rename)
+        return
+
+    _, path, header, start, end = task
+    options = {'usecols': list(rename), 'chunksize': CHUNK_ROWS, 'dtype': str, 'keep_default_na': False}
+    if start is None:
+        with _open_text(path) as f:
+            for chunk in pd.read_csv(f, **options):
+                yield chunk.rename(columns=rename)
+        return
+    with open(path, 'rb') as f:
+        f.seek(start)
+        stream = io.BufferedReader(_ByteRange(f, end - start))
+        for chunk in pd.read_csv(stream, header=None, names=header, encoding='utf-8', **options):
+            yield chunk.rename(columns=rename)
+
+
+def _distinct(values: pd.Series, function) -> pd.Series:
+    """
+    Apply function to the distinct values of a column only.
+
+    Export columns repeat heavily (a few hundred usage types, one start time
+    per hour), so parsing and string matching on the distinct values is much
+    cheaper than on every row.
+    """
+    codes, uniques = pd.factorize(values)
+    return pd.Series(pd.Index(function(uniques)).take(codes), index=values.index)
+
+
+def normalize(chunk: pd.DataFrame, use_blended: bool, row_hours: int, usage_types: frozenset) -> pd.DataFrame:
+    """
+    Reduce a chunk of raw rows to GROUP_COLUMNS plus cost.
+
+    Usage types are only kept when a budget filters on them (exactly, or with a
+    region prefix such as "USW2-"), so grouping stays coarse.
+    """
+    cost_column = 'blended' if use_blended and 'blended' in chunk else (
+        'unblended' if 'unblended' in chunk else 'blended')
+    frame = pd.DataFrame({
+        'account': chunk['account'].astype(str),
+        'cost': pd.to_numeric(chunk[cost_column], errors='coerce').fillna(0.0),
+    })
+    frame['start'] = _distinct(chunk['start'], lambda u: pd.to_datetime(u, utc=True, format='ISO8601').floor('h'))
+    if 'end' in chunk:
+        frame['incurred'] = _distinct(chunk['end'],
+                                      lambda u: pd.to_datetime(u, utc=True, format='ISO8601').ceil('h'))
+    else:
+        frame['incurred'] = frame['start'] + pd.Timedelta(hours=row_hours)
+
+    usage = chunk['usage_type'].astype(str) if 'usage_type' in chunk else pd.Series('', index=chunk.index)
+    product = chunk['product'].astype(str)
+    is_ec2 = product == EC2_PRODUCT
+    is_compute = _distinct(usage, lambda u: u.str.contains(EC2_COMPUTE_USAGE, regex=True)).astype(bool)
+    service = product.where(~is_ec2, EC2_OTHER_SERVICE)
+    frame['service'] = service.mask(is_ec2 & is_compute, EC2_COMPUTE_SERVICE)
+
+    if usage_types:
+        keep = _distinct(usage, lambda u: u.isin(usage_types) | u.str.split('-', n=1).str[-1].isin(usage_types))
+        frame['usage_type'] = usage.where(keep.astype(bool), '')
+    else:
+        frame['usage_type'] = ''
+    frame['line_item_type'] = (chunk['line_item_type'].astype(str) if 'line_item_type' in chunk
+                               else 'Usage')
+    return frame
+
+
+def aggregate(frames: list) -> pd.DataFrame:
+    """Sum cost per GROUP_COLUMNS over several partial frames."""
+    frames = [frame for frame in frames if len(frame)]
+    if not frames:
+        return pd.DataFrame({column: pd.Series(dtype=object) for column in GROUP_COLUMNS + ['cost']})
+    combined = pd.concat(frames, ignore_index=True)
+    return combined.groupby(GROUP_COLUMNS, sort=False, observed=True)['cost'].sum().reset_index()
+
+
+# Partial aggregates are merged every this many chunks to bound memory
+MERGE_EVERY = 8
+
+_worker_options = None
+
+
+def _init_worker(options: dict):
+    global _worker_options
+    _worker_options = options
+
+
+def _read_task(task: tuple) -> pd.DataFrame:
+    options = _worker_options
+    header = task[2] if task[0] == 'csv' else _parquet_columns(task[1])
+    columns = resolve_columns(header)
+    partial = []
+    for chunk in _chunks(task, columns):
+        frame = normalize(chunk, options['use_blended'], options['row_hours'], options['usage_types'])
+        partial.append(frame.groupby(GROUP_COLUMNS, sort=False, observed=True)['cost'].sum().reset_index())
+        if len(partial) >= MERGE_EVERY:
+            partial = [aggregate(partial)]
+    return aggregate(partial)
+
+
+def _parquet_columns(path: str) -> list:
+    import pyarrow.parquet as pq
+    return pq.read_schema(path).names
+
+
+def load_spend(paths: list, budgets: list, workers: int = None, row_hours: int = 1,
+               split_bytes: int = SPLIT_BYTES) -> pd.DataFrame:
+    """
+    Hourly spend per account, service, usage type and line item type.
+
+    Args:
+        workers: worker processes (default: CPU count); 1 reads in this process
+    """
+    global _worker_options
+    workers = workers or os.cpu_count()
+    options = {
+        'use_blended': any(budget['cost_types'].get('use_blended') for budget in budgets),
+        'row_hours': row_hours,
+        'usage_types': frozenset(value for budget in budgets
+                                 for value in budget['filters'].get('UsageType', [])),
+    }
+    tasks = plan_tasks(paths, workers, split_bytes)
+    # Unrecognised files fail here, before any worker starts
+    for task in tasks:
+        if task[0] == 'csv':
+            resolve_columns(task[2])
+
+    if workers == 1:
+        _worker_options = options
+        return aggregate([aggregate([_read_task(task) for task in tasks])])
+
+    merged = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(options,)) as executor:
+        for frame in executor.map(_read_task, tasks):
+            merged.append(frame)
+            if len(merged) >= MERGE_EVERY:
+                merged = [aggregate(merged)]
+    return aggregate(merged)
+
+
+# -----------------------------------------------------------------------------
+# Simulation
+# -----------------------------------------------------------------------------
+
+def budget_spend(spend: pd.DataFrame, budget: dict) -> pd.DataFrame:
+    """The rows of spend the budget counts: its filters and cost_types applied."""
+    mask = pd.Series(True, index=spend.index)
+    for name, values in budget['filters'].items():
+        mask &= spend[FILTER_COLUMNS[name]].isin(values)
+
+    cost_types = budget['cost_types']
+    flags = spend['line_item_type'].map(LINE_ITEM_COST_TYPES)
+    flags = flags.mask(spend['service'].str.startswith('AWS Support'), 'include_support')
+    included = flags.map(lambda flag: cost_types.get(flag, True), na_action='ignore').fillna(True)
+    return spend[mask & included.astype(bool)]
+
+
+def _periods(times: pd.Series, time_unit: str) -> tuple:
+    """(period start, period end) for each time."""
+    if time_unit == 'DAILY':
+        start = times.dt.floor('D')
+        return start, start + pd.Timedelta(days=1)
+    naive = times.dt.tz_localize(None)
+    start = naive.dt.to_period('M').dt.start_time.dt.tz_localize('UTC')
+    return start, start + pd.DateOffset(months=1)
+
+
+def simulate_budget(spend: pd.DataFrame, budget: dict, alert_delay_hours: float = 8,
+                    per_account: bool = False) -> pd.DataFrame:
+    """
+    Alerts one budget would have sent.
+
+    Returns:
+        One row per alert: scope, period, threshold, crossed_at, alert_at,
+        spend_at_alert, period_spend and late
+    """
+    rows = budget_spend(spend, budget)
+    columns = ['budget', 'scope', 'period', 'threshold', 'threshold_type', 'amount', 'crossed_at', 'alert_at',
+               'spend_at_alert', 'period_spend', 'late']
+    notifications = [n for n in budget['notifications']
+                     if n['notification_type'] == 'ACTUAL' and n['comparison_operator'] == 'GREATER_THAN']
+    if rows.empty or not notifications:
+        return pd.DataFrame(columns=columns)
+
+    period, period_end = _periods(rows['start'], budget['time_unit'])
+    events = pd.DataFrame({
+        'scope': rows['account'] if per_account else '(all)',
+        'period': period,
+        'period_end': period_end,
+        # Usage billed for longer than its period (monthly fees) counts by the period end
+        'at': rows['incurred'].where(rows['incurred'] < period_end, period_end),
+        'cost': rows['cost'],
+    })
+    events = (events.groupby(['scope', 'period', 'period_end', 'at'], observed=True)['cost'].sum()
+              .reset_index().sort_values(['scope', 'period', 'at'], kind='stable'))
+    events['cumulative'] = events.groupby(['scope', 'period'], observed=True)['cost'].cumsum()
+    totals = events.groupby(['scope', 'period'], observed=True)['cumulative'].transform('last')
+    events['period_spend'] = totals
+
+    delay = pd.Timedelta(hours=alert_delay_hours)
+    alerts = []
+    for notification in notifications:
+        threshold = float(notification['threshold'])
+        amount = budget['limit'] * threshold / 100 if notification['threshold_type'] == 'PERCENTAGE' else threshold
+        crossed = events[events['cumulative'] > amount].groupby(['scope', 'period'], observed=True).first()
+        if crossed.empty:
+            continue
+        crossed = crossed.reset_index()
+        fired = pd.DataFrame({
+            'scope': crossed['scope'],
+            'period': crossed['period'],
+            'period_end': crossed['period_end'],
+            'threshold': threshold,
+            'threshold_type': notification['threshold_type'],
+            'amount': amount,
+            'crossed_at': crossed['at'],
+            'alert_at': crossed['at'] + delay,
+            'period_spend': crossed['period_spend'],
+        })
+        alerts.append(fired)
+    if not alerts:
+        return pd.DataFrame(columns=columns)
+
+    fired = pd.concat(alerts, ignore_index=True)
+    # Spend known by the time the alert arrived: the last cumulative value at or before it
+    lookup = events[['scope', 'period', 'at', 'cumulative']].sort_values('at', kind='stable')
+    fired = pd.merge_asof(fired.sort_values('alert_at', kind='stable'), lookup,
+                          left_on='alert_at', right_on='at', by=['scope', 'period'], direction='backward')
+    fired['spend_at_alert'] = fired['cumulative']
+    fired['late'] = fired['alert_at'] > fired['period_end']
+    fired['budget'] = budget['name']
+    return fired.sort_values(['scope', 'period', 'threshold'], kind='stable')[columns].reset_index(drop=True)
+
+
+def count_periods(spend: pd.DataFrame, time_unit: str) -> int:
+    """Budget periods covered by the data, including those without spend."""
+    if spend.empty:
+        return 0
+    first, last = spend['start'].min(), spend['start'].max()
+    if time_unit == 'DAILY':
+        return (last.floor('D') - first.floor('D')).days + 1
+    return (last.year - first.year) * 12 + last.month - first.month + 1
+
+
+def summarize(budget: dict, alerts: pd.DataFrame, periods: int) -> list:
+    """One summary row per notification threshold."""
+    summary = []
+    for notification in budget['notifications']:
+        threshold = float(notification['threshold'])
+        row = {'budget': budget['name'], 'key': budget['key'], 'limit': budget['limit'],
+               'threshold': threshold, 'threshold_type': notification['threshold_type'],
+               'notification_type': notification['notification_type'], 'periods': periods}
+        if notification['notification_type'] != 'ACTUAL' or notification['comparison_operator'] != 'GREATER_THAN':
+            summary.append({**row, 'simulated': False})
+            continue
+        fired = alerts[(alerts['threshold'] == threshold)
+                       & (alerts['threshold_type'] == notification['threshold_type'])] if len(alerts) else alerts
+        row.update({'simulated': True, 'alerts': int(len(fired)), 'late': int(fired['late'].sum()),
+                    'median_crossed_hours': None, 'median_spend_at_alert_pct': None,
+                    'max_spend_at_alert_pct': None})
+        if not fired.empty:
+            hours_in = (fired['crossed_at'] - fired['period']).dt.total_seconds() / 3600
+            at_alert = fired['spend_at_alert'] / budget['limit'] * 100
+            row.update({'median_crossed_hours': round(float(hours_in.median()), 1),
+                        'median_spend_at_alert_pct': round(float(at_alert.median()), 1),
+                        'max_spend_at_alert_pct': round(float(at_alert.max()), 1)})
+        summary.append(row)
+    return summary
+
+
+def filter_warnings(spend: pd.DataFrame, budgets: list) -> list:
+    """UsageType filters that miss spend recorded under region-prefixed usage types."""
+    warnings = []
+    for budget in budgets:
+        values = set(budget['filters'].get('UsageType', []))
+        if not values:
+            continue
+        prefixed = spend[~spend['usage_type'].isin(values) & (spend['usage_type'] != '')]
+        prefixed = prefixed[prefixed['usage_type'].str.split('-', n=1).str[-1].isin(values)]
+        if not prefixed.empty:
+            examples = ', '.join(sorted(prefixed['usage_type'].unique())[:3])
+            warnings.append(f"{budget['name']}: UsageType filter does not match ${prefixed['cost'].sum():,.2f} "
+                            f"of region-prefixed usage ({examples})")
+    return warnings
+
+
+def simulate(spend: pd.DataFrame, budgets: list, alert_delay_hours: float = 8,
+             per_account: bool = False) -> tuple:
+    """
+    Returns:
+        (summary rows, alert events DataFrame)
+    """
+    summary, events = [], []
+    for budget in budgets:
+        alerts = simulate_budget(spend, budget, alert_delay_hours, per_account)
+        periods = count_periods(spend, budget['time_unit'])
+        if per_account:
+            periods *= max(1, budget_spend(spend, budget)['account'].nunique())
+        summary.extend(summarize(budget, alerts, periods))
+        events.append(alerts)
+    events = [frame for frame in events if not frame.empty]
+    return summary, (pd.concat(events, ignore_index=True) if events else pd.DataFrame())
+
+
+# -----------------------------------------------------------------------------
+# CLI
+# -----------------------------------------------------------------------------
+
+def parse_assignments(assignments: list, option: str, many: bool = False) -> dict:
+    parsed = {}
+    for assignment in assignments or []:
+        name, sep, value = assignment.partition('=')
+        if not sep:
+            raise ValueError(f'{option} expects NAME=VALUE, got {assignment!r}')
+        parsed[name] = [float(v) for v in value.split(',') if v.strip()] if many else float(value)
+    return parsed
+
+
+def format_report(summary: list) -> str:
+    lines = [f"{'Budget':<44} {'Limit':>8} {'At':>6} {'Alerts':>7} {'Late':>5} {'Crossed':>8} "
+             f"{'Spent@alert':>12} {'Max':>7}"]
+    for row in summary:
+        at = f"{row['threshold']:g}%" if row['threshold_type'] == 'PERCENTAGE' else f"${row['threshold']:g}"
+        prefix = f"{row['budget'][:44]:<44} {row['limit']:>8g} {at:>6}"
+        if not row['simulated']:
+            lines.append(f"{prefix} {row['notification_type'].lower() + ' - not simulated':>40}")
+            continue
+        crossed = '-' if row['median_crossed_hours'] is None else f"{row['median_crossed_hours']:g}h"
+        spent = '-' if row['median_spend_at_alert_pct'] is None else f"{row['median_spend_at_alert_pct']:g}%"
+        peak = '-' if row['max_spend_at_alert_pct'] is None else f"{row['max_spend_at_alert_pct']:g}%"
+        lines.append(f"{prefix} {row['alerts']:>7} {row['late']:>5} {crossed:>8} {spent:>12} {peak:>7}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('budgets', help='terraform show -json output, or a JSON list of budgets')
+    parser.add_argument('--data', nargs='+', required=True, metavar='PATH',
+                        help='CUR / Cost Explorer exports or directories (.csv, .csv.gz, .parquet)')
+    parser.add_argument('--limit', action='append', metavar='NAME=USD',
+                        help='candidate limit for a budget, by name or key (repeatable)')
+    parser.add_argument('--thresholds', action='append', metavar='NAME=P1,P2',
+                        help='candidate ACTUAL percentage thresholds for a budget (repeatable)')
+    parser.add_argument('--alert-delay-hours', type=float, default=8,
+                        help='delay from crossing a threshold to the alert (default: 8)')
+    parser.add_argument('--per-account', action='store_true',
+                        help='evaluate each budget separately for every linked account')
+    parser.add_argument('--row-hours', type=int, default=1,
+                        help='hours a row covers when there is no usage end column (default: 1)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='worker processes (default: CPU count)')
+    parser.add_argument('--events', metavar='FILE', help='write every simulated alert to this CSV')
+    parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    args = parser.parse_args(argv)
+
+    try:
+        budgets = apply_candidates(load_budgets(args.budgets),
+                                   parse_assignments(args.limit, '--limit'),
+                                   parse_assignments(args.thresholds, '--thresholds', many=True))
+        spend = load_spend(args.data, budgets, args.workers, args.row_hours)
+    except (OSError, ValueError, KeyError) as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 2
+
+    summary, events = simulate(spend, budgets, args.alert_delay_hours, args.per_account)
+    for warning in filter_warnings(spend, budgets):
+        print(f'warning: {warning}', file=sys.stderr)
+    if args.events:
+        events.to_csv(args.events, index=False)
+    print(json.dumps(summary, indent=2) if args.json else format_report(summary))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
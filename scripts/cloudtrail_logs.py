@@ -0,0 +1,81 @@
+"""
+Lazy readers for archived CloudTrail logs, shared by the offline tools.
+
+CloudTrail delivers one gzip JSON object per file ({"Records": [...]}), a few
+MB at most, so a file is decoded in one go and its records yielded; memory is
+bounded by the largest file, not the archive. JSON lines files (one record or
+one EventBridge event per line, e.g. enforcer_loadtest --dump-events) are
+streamed line by line.
+
+Files are spread over a process pool with bounded_map, which keeps only a
+few files per worker in flight, so pending results do not pile up however
+large the archive.
+"""
+import gzip
+import json
+import os
+from collections import deque
+
+LOG_SUFFIXES = ('.json.gz', '.json', '.jsonl', '.jsonl.gz')
+
+# Files submitted to the pool ahead of the result being consumed, per worker
+FILES_AHEAD_PER_WORKER = 2
+
+
+def iter_log_files(paths):
+    """Yield log files under the given files and directories, in sorted order."""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(LOG_SUFFIXES):
+                    yield os.path.join(root, name)
+
+
+def _open(path: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def _unwrap(item: dict) -> dict:
+    """EventBridge events carry the CloudTrail record in 'detail'."""
+    if 'detail' in item and 'eventName' not in item:
+        return item['detail'] or {}
+    return item
+
+
+def iter_records(path: str):
+    """Yield the CloudTrail records in one log file."""
+    with _open(path) as f:
+        if '.jsonl' in os.path.basename(path):
+            for line in f:
+                if line.strip():
+                    yield _unwrap(json.loads(line))
+            return
+        data = json.load(f)
+
+    if isinstance(data, dict) and 'Records' in data:
+        yield from data['Records']
+    elif isinstance(data, list):
+        yield from (_unwrap(item) for item in data)
+    else:
+        yield _unwrap(data)
+
+
+def bounded_map(executor, func, items, workers: int = None):
+    """
+    executor.map, in order, that submits at most FILES_AHEAD_PER_WORKER items
+    per worker before their results are taken.
+    """
+    ahead = (workers or os.cpu_count()) * FILES_AHEAD_PER_WORKER
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= ahead:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Dry-run replay of archived CloudTrail logs through the enforcer.
+
+Every record handled by an enforced rule is wrapped as the EventBridge event
+the enforcer would have received and passed to lambda_handler with DRY_RUN
+set, so exemptions, idempotency and mode detection run exactly as deployed,
+but nothing is deleted, broadcast or sent to SNS. The output is one compact
+JSON line per decision; use it to check exemption changes (EXEMPT_TABLE_*)
+against months of history before rolling them out.
+
+MODE LOOKUPS:
+    When the request does not prove the mode (e.g. UpdateTable without
+    billingMode) the enforcer looks the resource up. Offline (the default)
+    those records are reported as 'lookup_skipped'. With --lookups aws the
+    lookups go to AWS through read-only clients (Describe/Get/List calls
+    only), using SANDBOX_ROLE_NAME for cross-account access as deployed;
+    resources deleted since are then reported as 'not_found'.
+
+    Tag lookups for tag exemptions are skipped the same way: offline, a
+    resource whose tags are not in the request is 'lookup_skipped', never
+    'would_delete', since it may be exempt.
+
+SCALE:
+    Log files are read lazily and replayed in parallel worker processes, at
+    most a few files ahead of the writer, so memory stays flat however large
+    the archive. Duplicate deliveries are only recognised within a worker.
+
+USAGE:
+    # Would the proposed exemptions have spared these tables?
+    python scripts/enforcer_replay.py /data/cloudtrail/ \\
+        --env EXEMPT_TABLE_PREFIXES=terraform-,infrastructure-,hackathon- --output decisions.jsonl
+
+    python scripts/enforcer_replay.py /data/cloudtrail/2026/09 --lookups aws --workers 8
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from cloudtrail_logs import bounded_map, iter_log_files, iter_records
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'modules',
+                          'dynamodb-billing-enforcer', 'lambda')
+
+# Always applied on top of the caller's environment: never act, notify or persist
+REPLAY_ENV = {
+    'DRY_RUN': 'true',
+    'SNS_TOPIC_ARN': '',
+    'RETRY_QUEUE_URL': '',
+    'IDEMPOTENCY_TABLE': '',
+    'IDEMPOTENCY_FILE': '',
+    'POLICY_PARAMETER': '',
+    'POLICY_APPCONFIG': '',
+    'METRICS_ENABLED': 'false',
+    'LOG_LEVEL': 'ERROR',
+}
+
+READ_ONLY_PREFIXES = ('describe_', 'get_', 'list_')
+
+
+class LookupSkipped(Exception):
+    """Raised by offline clients instead of calling AWS."""
+
+
+class _OfflineExceptions:
+    """Stands in for client.exceptions: every name is an exception nothing raises."""
+
+    def __init__(self):
+        self._classes = {}
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self._classes.setdefault(name, type(name, (Exception,), {}))
+
+
+class OfflineClient:
+    """A client that refuses every call, so mode lookups become 'lookup_skipped'."""
+
+    def __init__(self, service_name: str):
+        self.service_name = service_name
+        self.exceptions = _OfflineExceptions()
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            raise LookupSkipped(f'{self.service_name}.{name}')
+        return call
+
+
+class ReadOnlyClient:
+    """Wraps a boto3 client, allowing only Describe/Get/List calls."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if callable(attribute) and not name.startswith(READ_ONLY_PREFIXES):
+            raise PermissionError(f'{name} is not allowed during a dry-run replay')
+        return attribute
+
+
+def offline_factory(service_name, region=None, credentials=None):
+    return OfflineClient(service_name)
+
+
+def load_enforcer(env: dict = None, lookups: str = 'offline'):
+    """Import the enforcer configured for a dry-run replay."""
+    if LAMBDA_DIR not in sys.path:
+        sys.path.insert(0, LAMBDA_DIR)
+    os.environ.update({**(env or {}), **REPLAY_ENV})
+
+    import index
+    index.reset_config()
+    if lookups == 'aws':
+        index.set_client_factory(
+            lambda *args: ReadOnlyClient(index._default_client_factory(*args)))
+    else:
+        index.set_client_factory(offline_factory)
+    return index
+
+
+def eventbridge_event(record: dict) -> dict:
+    """The EventBridge event CloudTrail would have delivered for a record."""
+    return {
+        'version': '0',
+        'id': record.get('eventID', ''),
+        'detail-type': 'AWS API Call via CloudTrail',
+        'source': 'aws.' + (record.get('eventSource') or '').split('.')[0],
+        'account': record.get('recipientAccountId', ''),
+        'time': record.get('eventTime', ''),
+        'region': record.get('awsRegion', ''),
+        'resources': [],
+        'detail': record,
+    }
+
+
+def skipped_lookup(error: BaseException) -> bool:
+    """
+    Return True if an offline client's LookupSkipped caused the error, also
+    when the enforcer wrapped it (e.g. a failed tag lookup is a TagLookupError).
+    """
+    while error is not None:
+        if isinstance(error, LookupSkipped):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def replay_records(enforcer, records):
+    """
+    Run the enforcer over CloudTrail records, yielding one compact decision per
+    record an enforced rule handles. Other records are skipped.
+    """
+    config = enforcer.get_config()
+    for record in records:
+        rule = config['rules'].rule_for(record)
+        if rule is None or not record.get('eventSource'):
+            continue
+
+        try:
+            decision = enforcer.lambda_handler(eventbridge_event(record), None)['decision']
+            error = None
+        except Exception as e:
+            if skipped_lookup(e):
+                decision, error = 'lookup_skipped', None
+            else:
+                decision, error = 'error', str(e)
+
+        line = {
+            'time': record.get('eventTime'),
+            'id': record.get('eventID'),
+            'account': record.get('recipientAccountId'),
+            'region': record.get('awsRegion'),
+            'event': record.get('eventName'),
+            'rule': rule.name,
+            'resource': rule.resource_name(record.get('requestParameters') or {}),
+            'decision': decision,
+        }
+        if error:
+            line['error'] = error
+        yield line
+
+
+_worker = None
+_enforcer_log = None
+
+
+def _init_worker(env: dict, lookups: str, enforcer_log: str = None):
+    global _worker, _enforcer_log
+    _worker = load_enforcer(env, lookups)
+    _enforcer_log = open(enforcer_log or os.devnull, 'a')
+
+
+def _replay_file(path: str) -> list:
+    """(decision, JSON line) pairs for one file."""
+    # The enforcer's own JSON logs go to stdout and would drown the decision log
+    with contextlib.redirect_stdout(_enforcer_log):
+        return [(line['decision'], json.dumps(line, separators=(',', ':')))
+                for line in replay_records(_worker, iter_records(path))]
+
+
+def _write(results, output, totals: Counter):
+    for decisions in results:
+        totals['files'] += 1
+        for decision, line in decisions:
+            output.write(line + '\n')
+            totals[decision] += 1
+
+
+def replay(paths: list, output, env: dict = None, lookups: str = 'offline', workers: int = None,
+           enforcer_log: str = None) -> Counter:
+    """
+    Replay every log file under paths, writing decision lines to output.
+
+    Args:
+        workers: worker processes; 1 replays in this process
+
+    Returns:
+        Counter of decisions, plus 'files'
+    """
+    totals = Counter()
+    files = iter_log_files(paths)
+
+    if workers == 1:
+        _init_worker(env, lookups, enforcer_log)
+        _write(map(_replay_file, files), output, totals)
+        return totals
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(env, lookups, enforcer_log)) as executor:
+        _write(bounded_map(executor, _replay_file, files, workers), output, totals)
+    return totals
+
+
+def parse_env(assignments: list) -> dict:
+    env = {}
+    for assignment in assignments or []:
+        name, sep, value = assignment.partition('=')
+        if not sep:
+            raise ValueError(f'--env expects NAME=VALUE, got {assignment!r}')
+        env[name] = value
+    return env
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='CloudTrail log files or directories (.json.gz, .json, .jsonl)')
+    parser.add_argument('--env', action='append', metavar='NAME=VALUE',
+                        help='enforcer setting to replay with, e.g. EXEMPT_TABLE_PREFIXES=a-,b- (repeatable)')
+    parser.add_argument('--lookups', choices=('offline', 'aws'), default='offline',
+                        help='how to check modes the request does not prove (default: offline)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='worker processes (default: CPU count)')
+    parser.add_argument('--output', metavar='FILE', help='decision log (default: stdout)')
+    parser.add_argument('--enforcer-log', metavar='FILE', help="keep the enforcer's own JSON logs here")
+    args = parser.parse_args(argv)
+
+    try:
+        env = parse_env(args.env)
+    except ValueError as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 2
+
+    with (open(args.output, 'w') if args.output else contextlib.nullcontext(sys.stdout)) as output:
+        totals = replay(args.paths, output, env, args.lookups, args.workers, args.enforcer_log)
+
+    files = totals.pop('files', 0)
+    summary = ', '.join(f'{decision}={count}' for decision, count in totals.most_common())
+    print(f'{sum(totals.values())} decisions from {files} files: {summary or "none"}', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+SCP compiler: measures, minifies and packs Service Control Policies.
+
+Reads rendered policies (`terraform show -json` output, or plain policy JSON)
+and reports the exact serialized size of each against the 5,120 character
+SCP quota. It then compiles them with rewrites that keep the policy's
+meaning, and bin-packs the statements attached to each target (OU) into the
+fewest policies that fit both the size quota and the per-target policy limit.
+
+REWRITES (semantics-preserving within one policy):
+    - Duplicate actions, resources and condition values are removed; actions
+      compare case-insensitively, like IAM does.
+    - Entries already matched by a wildcard in the same list are removed
+      ("ec2:Purchase*" makes "ec2:PurchaseHostReservation" redundant). For
+      condition values this is only done for *Like operators.
+    - Statements with the same Effect, Resource and Condition and an Action
+      list are merged into one, so the shared Condition is written once.
+    - Statements whose actions and resources are all covered by another
+      statement with the same Effect and Condition are dropped.
+    - Single-element lists become scalars.
+    - With --action-catalog, runs of Deny actions are folded into a wildcard
+      ("textract:Get*") only when every catalogued action it matches is
+      already listed. Only Deny Action lists are folded: a wildcard also
+      matches actions AWS adds later, which a Deny then denies too (fail
+      closed). Allow and NotAction lists are never folded, because the same
+      future actions would become allowed.
+
+PACKING:
+    A Deny in any policy attached to a target denies the request, so Deny
+    statements from all of the target's policies are pooled, merged and
+    redistributed between them. Allow statements are not: a request must be
+    allowed by every policy on the target, so pooling the Allows of two
+    policies would grant what either one alone did not. Each policy's Allow
+    statements therefore stay together in an output policy of their own,
+    and Deny statements are packed around them first fit decreasing. A Deny
+    Action statement too large for one policy is split into several with the
+    same Resource and Condition. NotAction statements, and one policy's
+    Allow statements, cannot be split without changing their meaning.
+
+USAGE:
+    cd environments/ndx-production
+    terraform show -json > /tmp/state.json
+    python ../../scripts/scp_compiler.py /tmp/state.json
+
+    # Fold actions using a catalog of {"service": ["Action", ...]}
+    python scripts/scp_compiler.py /tmp/state.json --action-catalog actions.json
+
+    # Write the packed policies per target
+    python scripts/scp_compiler.py /tmp/state.json --write-dir /tmp/packed
+"""
+import argparse
+import json
+import os
+import re
+import sys
+
+SCP_MAX_CHARS = 5120
+MAX_POLICIES_PER_TARGET = 5
+# FullAWSAccess (or another policy this tool does not manage) usually takes one slot
+RESERVED_POLICIES_PER_TARGET = 1
+POLICY_VERSION = '2012-10-17'
+
+# Policies whose target cannot be resolved (plain files, planned attachments)
+UNKNOWN_TARGET = '(all)'
+
+
+def serialize(document: dict) -> str:
+    """Minified JSON, as Terraform's jsonencode and the Organizations API store it."""
+    return json.dumps(document, separators=(',', ':'), ensure_ascii=False)
+
+
+def policy_size(document: dict) -> int:
+    """Characters the policy counts against SCP_MAX_CHARS."""
+    return len(serialize(document))
+
+
+def as_list(value) -> list:
+    return value if isinstance(value, list) else [value]
+
+
+def compact(values: list):
+    """A single value is written as a scalar; IAM accepts both forms."""
+    return values[0] if len(values) == 1 else values
+
+
+# --- Loading -----------------------------------------------------------------
+
+def _module_resources(module: dict):
+    yield from module.get('resources', [])
+    for child in module.get('child_modules', []):
+        yield from _module_resources(child)
+
+
+def policies_from_terraform(data: dict) -> list:
+    """SCPs from `terraform show -json` state or plan output, with their attachment targets."""
+    root = (data.get('values') or data.get('planned_values') or {}).get('root_module', {})
+    resources = list(_module_resources(root))
+
+    targets = {}
+    for resource in resources:
+        if resource.get('type') == 'aws_organizations_policy_attachment':
+            values = resource.get('values') or {}
+            if values.get('policy_id') and values.get('target_id'):
+                targets.setdefault(values['policy_id'], []).append(values['target_id'])
+
+    policies = []
+    for resource in resources:
+        values = resource.get('values') or {}
+        if resource.get('type') != 'aws_organizations_policy':
+            continue
+        if values.get('type', 'SERVICE_CONTROL_POLICY') != 'SERVICE_CONTROL_POLICY' or not values.get('content'):
+            continue
+        policies.append({
+            'name': values.get('name') or resource['address'],
+            'document': json.loads(values['content']),
+            'rendered_size': len(values['content']),
+            'targets': targets.get(values.get('id')) or [UNKNOWN_TARGET],
+        })
+    return policies
+
+
+def load_policies(path: str) -> list:
+    """
+    Load SCPs from a file: `terraform show -json` output, one policy document,
+    or a {name: document or JSON string} map.
+    """
+    with open(path) as f:
+        text = f.read()
+    data = json.loads(text)
+
+    if 'values' in data or 'planned_values' in data:
+        return policies_from_terraform(data)
+    if 'Statement' in data:
+        name = os.path.splitext(os.path.basename(path))[0]
+        return [{'name': name, 'document': data, 'rendered_size': len(text.strip()),
+                 'targets': [UNKNOWN_TARGET]}]
+
+    policies = []
+    for name, content in data.items():
+        document = json.loads(content) if isinstance(content, str) else content
+        policies.append({'name': name, 'document': document,
+                         'rendered_size': len(content) if isinstance(content, str) else policy_size(document),
+                         'targets': [UNKNOWN_TARGET]})
+    return policies
+
+
+# --- Wildcards ---------------------------------------------------------------
+
+def _wildcard_regex(pattern: str, case_sensitive: bool):
+    """IAM wildcards: * matches any run of characters, ? any single character."""
+    regex = ''.join('.*' if c == '*' else '.' if c == '?' else re.escape(c) for c in pattern)
+    return re.compile(f'^{regex}$', 0 if case_sensitive else re.IGNORECASE)
+
+
+def covers(wildcard: str, pattern: str, case_sensitive: bool = False) -> bool:
+    """
+    True if every string pattern matches is also matched by wildcard.
+
+    Exact for literal patterns; for wildcard patterns only the provable case
+    of a trailing-* prefix containing the other is recognised.
+    """
+    if wildcard == pattern or (not case_sensitive and wildcard.lower() == pattern.lower()):
+        return True
+    if '*' not in wildcard and '?' not in wildcard:
+        return False
+    if '*' not in pattern and '?' not in pattern:
+        return bool(_wildcard_regex(wildcard, case_sensitive).match(pattern))
+    prefix = wildcard[:-1]
+    if wildcard.endswith('*') and '*' not in prefix and '?' not in prefix:
+        if not case_sensitive:
+            return pattern.lower().startswith(prefix.lower())
+        return pattern.startswith(prefix)
+    return False
+
+
+def remove_covered(values: list, case_sensitive: bool = False) -> list:
+    """Drop duplicates and values matched by another value in the list, keeping order."""
+    kept = []
+    for i, value in enumerate(values):
+        redundant = any(
+            covers(other, value, case_sensitive) and not (covers(value, other, case_sensitive) and j > i)
+            for j, other in enumerate(values) if j != i
+        )
+        if not redundant:
+            kept.append(value)
+    return kept
+
+
+def _words(action_name: str) -> list:
+    return re.findall(r'[A-Z][a-z0-9]*|[a-z0-9]+', action_name)
+
+
+def fold_actions(actions: list, catalog: dict) -> list:
+    """
+    Replace groups of listed actions with a wildcard when, according to the
+    catalog, the wildcard matches nothing that is not already listed.
+
+    Prefixes are tried at CamelCase word boundaries, shortest first, so the
+    widest safe wildcard wins ("textract:Get*" before "textract:GetDocument*").
+    """
+    present = {action.lower() for action in actions}
+    folded = list(actions)
+
+    for service, names in sorted(catalog.items()):
+        names = sorted(set(names))
+        listed = [name for name in names if f'{service}:{name}'.lower() in present]
+        if len(listed) < 2:
+            continue
+        if len(listed) == len(names):
+            folded.append(f'{service}:*')
+            continue
+
+        candidates = sorted({''.join(_words(name)[:n]) for name in listed
+                             for n in range(1, len(_words(name)))}, key=len)
+        for prefix in candidates:
+            matched = [name for name in names if name.startswith(prefix)]
+            wildcard = f'{service}:{prefix}*'
+            if (len(matched) > 1 and all(f'{service}:{name}'.lower() in present for name in matched)
+                    and not any(covers(existing, wildcard) for existing in folded)):
+                folded.append(wildcard)
+
+    return remove_covered(folded)
+
+
+# --- Statements --------------------------------------------------------------
+
+def compress_condition(condition: dict) -> dict:
+    """Deduplicate condition values; for *Like operators also drop values a wildcard covers."""
+    compressed = {}
+    for operator, keys in condition.items():
+        compressed[operator] = {}
+        for key, values in keys.items():
+            values = list(dict.fromkeys(as_list(values)))
+            if 'Like' in operator:
+                values = remove_covered(values, case_sensitive=True)
+            compressed[operator][key] = compact(values)
+    return compressed
+
+
+def compress_statement(statement: dict, catalog: dict = None) -> dict:
+    """Minify one statement without changing what it matches."""
+    compressed = dict(statement)
+    for key in ('Action', 'NotAction'):
+        if key in compressed:
+            actions = remove_covered(as_list(compressed[key]))
+            if catalog and key == 'Action' and compressed.get('Effect') == 'Deny':
+                actions = fold_actions(actions, catalog)
+            compressed[key] = compact(actions)
+    for key in ('Resource', 'NotResource'):
+        if key in compressed:
+            compressed[key] = compact(remove_covered(as_list(compressed[key]), case_sensitive=True))
+    if 'Condition' in compressed:
+        compressed['Condition'] = compress_condition(compressed['Condition'])
+    return compressed
+
+
+def _merge_key(statement: dict):
+    """Statements with equal keys differ only in Action and can share one statement."""
+    if 'Action' not in statement or 'NotResource' in statement:
+        return None
+    return (statement.get('Effect'), json.dumps(sorted(as_list(statement.get('Resource', '*')))),
+            json.dumps(statement.get('Condition', {}), sort_keys=True))
+
+
+def merge_statements(statements: list) -> list:
+    """Merge statements that share Effect, Resource and Condition; the first Sid is kept."""
+    merged, by_key = [], {}
+    for statement in statements:
+        key = _merge_key(statement)
+        if key is not None and key in by_key:
+            target = by_key[key]
+            target['Action'] = compact(remove_covered(as_list(target['Action']) + as_list(statement['Action'])))
+            continue
+        statement = dict(statement)
+        if key is not None:
+            by_key[key] = statement
+        merged.append(statement)
+    return merged
+
+
+def statement_covers(broad: dict, narrow: dict) -> bool:
+    """True if every request narrow applies to, broad applies to with the same effect."""
+    if broad is narrow or 'Action' not in broad or 'Action' not in narrow:
+        return False
+    if 'NotResource' in broad or 'NotResource' in narrow:
+        return False
+    if broad.get('Effect') != narrow.get('Effect'):
+        return False
+    if json.dumps(broad.get('Condition', {}), sort_keys=True) != json.dumps(narrow.get('Condition', {}), sort_keys=True):
+        return False
+    broad_actions, broad_resources = as_list(broad['Action']), as_list(broad.get('Resource', '*'))
+    return (all(any(covers(b, a) for b in broad_actions) for a in as_list(narrow['Action']))
+            and all(any(covers(b, r, True) for b in broad_resources) for r in as_list(narrow.get('Resource', '*'))))
+
+
+def drop_redundant(statements: list) -> list:
+    """Remove statements fully covered by another (the earlier of two equal statements is kept)."""
+    kept = []
+    for i, statement in enumerate(statements):
+        covered = any(
+            statement_covers(other, statement) and not (statement_covers(statement, other) and j > i)
+            for j, other in enumerate(statements) if j != i
+        )
+        if not covered:
+            kept.append(statement)
+    return kept
+
+
+def unique_sids(statements: list) -> list:
+    """Suffix repeated Sids (from different source policies) so each is unique."""
+    seen = {}
+    result = []
+    for statement in statements:
+        sid = statement.get('Sid')
+        if sid is not None:
+            count = seen.get(sid, 0)
+            seen[sid] = count + 1
+            if count:
+                statement = {**statement, 'Sid': f'{sid}{count + 1}'}
+        result.append(statement)
+    return result
+
+
+def compile_statements(statements: list, catalog: dict = None, merge: bool = True,
+                       strip_sids: bool = False) -> list:
+    """Apply every rewrite to a list of statements."""
+    statements = [compress_statement(s, catalog) for s in statements]
+    if merge:
+        statements = merge_statements(statements)
+    statements = drop_redundant(statements)
+    if strip_sids:
+        statements = [{k: v for k, v in s.items() if k != 'Sid'} for s in statements]
+    return unique_sids(statements)
+
+
+def document(statements: list) -> dict:
+    return {'Version': POLICY_VERSION, 'Statement': statements}
+
+
+# --- Packing -----------------------------------------------------------------
+
+def split_statement(statement: dict, max_chars: int) -> list:
+    """
+    Split a Deny/Allow Action statement into parts that each fit in a policy.
+
+    Raises:
+        ValueError: for statements that cannot be split (NotAction, or a
+            single action that does not fit on its own)
+    """
+    if policy_size(document([statement])) <= max_chars:
+        return [statement]
+    if 'Action' not in statement or not isinstance(statement['Action'], list):
+        raise ValueError(f"Statement {statement.get('Sid', '')!r} is {policy_size(document([statement]))} "
+                         f"characters and cannot be split (NotAction or a single action)")
+
+    parts, current = [], []
+    for action in statement['Action']:
+        candidate = {**statement, 'Action': current + [action]}
+        if current and policy_size(document([candidate])) > max_chars:
+            parts.append(current)
+            current = [action]
+        else:
+            current = current + [action]
+    parts.append(current)
+
+    result = []
+    for i, actions in enumerate(parts):
+        part = {**statement, 'Action': compact(actions)}
+        if 'Sid' in statement and i:
+            part['Sid'] = f"{statement['Sid']}{i + 1}"
+        if policy_size(document([part])) > max_chars:
+            raise ValueError(f"Statement {statement.get('Sid', '')!r} has an action that does not fit alone")
+        result.append(part)
+    return result
+
+
+def pack(statements: list, max_chars: int = SCP_MAX_CHARS, fixed: list = ()) -> list:
+    """
+    Bin-pack statements into as few policy documents of at most max_chars as
+    first fit decreasing finds. Statement order within a policy follows input order.
+
+    Args:
+        statements: Statements that may go into any policy (Deny)
+        fixed: Lists of statements that must each stay together, in a policy
+            not shared with another list (one source policy's Allow statements)
+
+    Raises:
+        ValueError: for a statement or fixed list that cannot fit in one policy
+    """
+    pieces, bins = [], []  # bins are lists of piece indexes
+    for group in fixed:
+        if policy_size(document(group)) > max_chars:
+            raise ValueError(f'Allow statements of one policy are {policy_size(document(group))} characters '
+                             f'and cannot be split between policies')
+        bins.append(list(range(len(pieces), len(pieces) + len(group))))
+        pieces.extend(group)
+
+    first = len(pieces)
+    pieces += [piece for statement in statements for piece in split_statement(statement, max_chars)]
+    order = sorted(range(first, len(pieces)), key=lambda i: -len(serialize(pieces[i])))
+
+    for index in order:
+        for members in bins:
+            if policy_size(document([pieces[i] for i in sorted(members + [index])])) <= max_chars:
+                members.append(index)
+                break
+        else:
+            bins.append([index])
+
+    return [document([pieces[i] for i in sorted(members)]) for members in bins]
+
+
+# --- Report ------------------------------------------------------------------
+
+def compile_policies(policies: list, catalog: dict = None, max_chars: int = SCP_MAX_CHARS,
+                     max_policies: int = MAX_POLICIES_PER_TARGET,
+                     reserved_policies: int = RESERVED_POLICIES_PER_TARGET,
+                     merge: bool = True, strip_sids: bool = False) -> dict:
+    """
+    Measure, compile and pack policies.
+
+    Returns:
+        dict with 'policies' (size before/after per input policy) and
+        'targets' (packing result per attachment target)
+    """
+    report = {'max_chars': max_chars, 'policies': [], 'targets': []}
+
+    for policy in policies:
+        statements = as_list(policy['document'].get('Statement', []))
+        compiled = compile_statements(statements, catalog, merge, strip_sids)
+        report['policies'].append({
+            'name': policy['name'],
+            'targets': policy['targets'],
+            'rendered_size': policy['rendered_size'],
+            'minified_size': policy_size(policy['document']),
+            'compiled_size': policy_size(document(compiled)),
+            'statements_before': len(statements),
+            'statements_after': len(compiled),
+            'over_limit': policy_size(policy['document']) > max_chars,
+        })
+
+    by_target = {}
+    for policy in policies:
+        for target in policy['targets']:
+            by_target.setdefault(target, []).append(policy)
+
+    slots = max_policies - reserved_policies
+    for target, target_policies in sorted(by_target.items()):
+        # Only Deny statements may move between policies (see PACKING)
+        denies, allows = [], []
+        for p in target_policies:
+            statements = as_list(p['document'].get('Statement', []))
+            denies += [s for s in statements if s.get('Effect') == 'Deny']
+            policy_allows = [s for s in statements if s.get('Effect') != 'Deny']
+            if policy_allows:
+                allows.append(compile_statements(policy_allows, catalog, merge, strip_sids))
+        compiled = compile_statements(denies, catalog, merge, strip_sids)
+
+        # Sids stay unique when a policy's Allows and pooled Denies share a document
+        sids = iter(unique_sids([s for group in allows for s in group] + compiled))
+        allows = [[next(sids) for _ in group] for group in allows]
+        compiled = list(sids)
+
+        packed = pack(compiled, max_chars, allows)
+        report['targets'].append({
+            'target': target,
+            'policies_before': [p['name'] for p in target_policies],
+            'sizes_before': [policy_size(p['document']) for p in target_policies],
+            'sizes_after': [policy_size(d) for d in packed],
+            'slots': slots,
+            'fits': len(packed) <= slots,
+            'packed': packed,
+        })
+
+    return report
+
+
+def format_report(report: dict) -> str:
+    """Human-readable size table and packing summary."""
+    limit = report['max_chars']
+    lines = [f"{'Policy':<50} {'Rendered':>8} {'Minified':>8} {'Compiled':>8} {'Stmts':>7}  Headroom"]
+    for p in report['policies']:
+        flag = '  OVER LIMIT' if p['over_limit'] else ''
+        lines.append(
+            f"{p['name'][:50]:<50} {p['rendered_size']:>8} {p['minified_size']:>8} {p['compiled_size']:>8} "
+            f"{p['statements_before']:>3}->{p['statements_after']:<3} {limit - p['compiled_size']:>6}{flag}"
+        )
+
+    for t in report['targets']:
+        before, after = t['sizes_before'], t['sizes_after']
+        lines += [
+            '',
+            f"Target {t['target']}: {len(before)} policies ({sum(before)} chars) -> "
+            f"{len(after)} policies ({sum(after)} chars), {t['slots']} slots available"
+            + ('' if t['fits'] else '  DOES NOT FIT'),
+            '  packed sizes: ' + ', '.join(f'{size}/{limit}' for size in after),
+        ]
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='terraform show -json output or policy JSON files')
+    parser.add_argument('--action-catalog', metavar='FILE',
+                        help='JSON {"service": ["Action", ...]} enabling wildcard folding of Deny actions')
+    parser.add_argument('--max-chars', type=int, default=SCP_MAX_CHARS)
+    parser.add_argument('--max-policies', type=int, default=MAX_POLICIES_PER_TARGET,
+                        help='SCPs that can be attached per target (default 5)')
+    parser.add_argument('--reserved-policies', type=int, default=RESERVED_POLICIES_PER_TARGET,
+                        help='slots used by policies not in the input, e.g. FullAWSAccess (default 1)')
+    parser.add_argument('--no-merge', action='store_true', help='keep statements with equal conditions separate')
+    parser.add_argument('--strip-sids', action='store_true', help='drop Sids to save characters')
+    parser.add_argument('--write-dir', metavar='DIR', help='write packed policies as <target>-<n>.json')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    policies = [policy for path in args.paths for policy in load_policies(path)]
+    catalog = None
+    if args.action_catalog:
+        with open(args.action_catalog) as f:
+            catalog = json.load(f)
+
+    try:
+        report = compile_policies(policies, catalog, args.max_chars, args.max_policies,
+                                  args.reserved_policies, merge=not args.no_merge,
+                                  strip_sids=args.strip_sids)
+    except ValueError as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 2
+
+    if args.write_dir:
+        os.makedirs(args.write_dir, exist_ok=True)
+        for target in report['targets']:
+            for i, packed in enumerate(target['packed'], 1):
+                name = re.sub(r'[^A-Za-z0-9_-]', '_', target['target'])
+                with open(os.path.join(args.write_dir, f'{name}-{i}.json'), 'w') as f:
+                    f.write(serialize(packed))
+
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 0 if all(t['fits'] for t in report['targets']) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
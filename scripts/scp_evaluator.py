@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+Offline SCP evaluator: which recorded API calls would these SCPs deny?
+
+Loads the SCP documents produced by scp-manager (`terraform show -json` state
+or plan output, or plain policy JSON, as for scp_compiler.py) and replays
+archived CloudTrail logs against their Deny statements, producing a report
+per statement Sid. Evaluate a plan rendered with new variable values (e.g.
+allowed_ec2_instance_types, denied_bedrock_model_patterns, managed_regions)
+to see what a change would have denied before applying it.
+
+EVALUATION:
+    Action/NotAction wildcards and Resource patterns are compiled into
+    regexes once, and the statements that can apply to an action are indexed
+    per action the first time it is seen, so most records cost one dict
+    lookup. Conditions support the String, Arn, Numeric, Bool and Null
+    operators with ForAnyValue:/ForAllValues: and IfExists.
+
+    Condition keys are read from the record (CONDITION_KEYS). A statement that
+    matches except for a key or resource CloudTrail does not record is counted
+    as indeterminate rather than denied. Allow statements are ignored; SCPs
+    are assumed to sit alongside FullAWSAccess.
+
+    Log files are spread over a process pool a few at a time
+    (cloudtrail_logs.bounded_map); each worker returns per-Sid counters for
+    its file, so memory stays flat however large the archive.
+
+USAGE:
+    cd environments/ndx-production
+    terraform plan -var 'managed_regions=["us-east-1"]' -out /tmp/plan
+    terraform show -json /tmp/plan > /tmp/plan.json
+    python ../../scripts/scp_evaluator.py /tmp/plan.json --logs /data/cloudtrail/
+
+    # JSON report, 16 worker processes
+    python scripts/scp_evaluator.py /tmp/state.json --logs /data/cloudtrail --workers 16 --json
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from cloudtrail_logs import bounded_map, iter_log_files, iter_records
+from scp_compiler import as_list, load_policies
+
+# eventSource prefixes that differ from the IAM service prefix
+SERVICE_PREFIXES = {
+    'monitoring': 'cloudwatch',
+    'bedrock-runtime': 'bedrock',
+    'email': 'ses',
+    'runtime.sagemaker': 'sagemaker',
+}
+
+# Lambda (and a few older APIs) record versioned event names: CreateFunction20150331v2
+_EVENT_NAME_VERSION = re.compile(r'20\d{6}(v\d+)?$')
+
+# CloudTrail errors that mean the call was already refused
+DENIED_ERRORS = ('AccessDenied', 'Client.UnauthorizedOperation', 'UnauthorizedOperation')
+
+SAMPLES_PER_STATEMENT = 5
+TOP_N = 10
+
+
+def action_of(record: dict) -> str:
+    """IAM action name ("ec2:RunInstances") for a CloudTrail record."""
+    service = (record.get('eventSource') or '').split('.amazonaws.com')[0]
+    service = SERVICE_PREFIXES.get(service, service)
+    return f"{service}:{_EVENT_NAME_VERSION.sub('', record.get('eventName') or '')}"
+
+
+def _params(record: dict) -> dict:
+    return record.get('requestParameters') or {}
+
+
+def principal_arn(record: dict):
+    """aws:PrincipalARN: the role for assumed-role sessions, else the identity's ARN."""
+    identity = record.get('userIdentity') or {}
+    if identity.get('type') == 'AssumedRole':
+        issuer = (identity.get('sessionContext') or {}).get('sessionIssuer') or {}
+        return issuer.get('arn')
+    return identity.get('arn')
+
+
+def _values(value):
+    """Request values as a list of strings; None if the key is absent."""
+    if value is None:
+        return None
+    values = [str(v).lower() if isinstance(v, bool) else str(v) for v in as_list(value) if v is not None]
+    return values or None
+
+
+def _block_devices(record: dict) -> list:
+    mapping = _params(record).get('blockDeviceMapping') or {}
+    return [item.get('ebs') or {} for item in mapping.get('items', [])]
+
+
+def _volume_types(record: dict):
+    if 'volumeType' in _params(record):
+        return _params(record)['volumeType']
+    return [ebs['volumeType'] for ebs in _block_devices(record) if 'volumeType' in ebs] or None
+
+
+def _volume_sizes(record: dict):
+    if 'size' in _params(record):
+        return _params(record)['size']
+    return [ebs['volumeSize'] for ebs in _block_devices(record) if 'volumeSize' in ebs] or None
+
+
+# Condition keys (lowercase, as IAM compares them) that can be read from a record.
+# Keys not listed here make a statement indeterminate.
+CONDITION_KEYS = {
+    'aws:principalarn': principal_arn,
+    'aws:requestedregion': lambda r: r.get('awsRegion'),
+    'aws:principalaccount': lambda r: (r.get('userIdentity') or {}).get('accountId'),
+    'ec2:instancetype': lambda r: _params(r).get('instanceType'),
+    'ec2:volumetype': _volume_types,
+    'ec2:volumesize': _volume_sizes,
+    'rds:databaseclass': lambda r: _params(r).get('dBInstanceClass'),
+    'rds:multiaz': lambda r: _params(r).get('multiAZ'),
+    'elasticache:cachenodetype': lambda r: _params(r).get('cacheNodeType'),
+    'eks:maxsize': lambda r: (_params(r).get('scalingConfig') or {}).get('maxSize'),
+    'autoscaling:maxsize': lambda r: _params(r).get('maxSize'),
+}
+
+
+def _bedrock_model(record: dict) -> list:
+    model = _params(record).get('modelId')
+    if not model:
+        return []
+    if model.startswith('arn:'):
+        return [model]
+    return [f"arn:aws:bedrock:{record.get('awsRegion')}::foundation-model/{model}"]
+
+
+def _new_ec2(*kinds):
+    def resources(record):
+        account = record.get('recipientAccountId') or (record.get('userIdentity') or {}).get('accountId')
+        return [f"arn:aws:ec2:{record.get('awsRegion')}:{account}:{kind}/new" for kind in kinds]
+    return resources
+
+
+# Resource ARNs for actions that create the resource (and so have no ARN in the record)
+ACTION_RESOURCES = {
+    'ec2:runinstances': _new_ec2('instance', 'volume'),
+    'ec2:createvolume': _new_ec2('volume'),
+    'bedrock:invokemodel': _bedrock_model,
+    'bedrock:invokemodelwithresponsestream': _bedrock_model,
+    'bedrock:converse': _bedrock_model,
+    'bedrock:conversestream': _bedrock_model,
+}
+
+
+def resources_of(record: dict, action: str) -> list:
+    """Resource ARNs the request touches, as far as the record shows."""
+    builder = ACTION_RESOURCES.get(action.lower())
+    if builder:
+        return builder(record)
+    return [r['ARN'] for r in record.get('resources') or [] if r.get('ARN')]
+
+
+# --- Compiled matchers -------------------------------------------------------
+
+def _glob(pattern: str, any_char: str = '.') -> str:
+    return ''.join(f'{any_char}*' if c == '*' else any_char if c == '?' else re.escape(c) for c in pattern)
+
+
+def compile_patterns(patterns: list, ignore_case: bool = False):
+    """One regex matching any of the IAM wildcard patterns."""
+    body = '|'.join(_glob(p) for p in patterns)
+    return re.compile(f'^(?:{body})$', re.IGNORECASE if ignore_case else 0)
+
+
+def compile_arn_patterns(patterns: list):
+    """ArnLike: wildcards in the partition..account fields do not cross ':'."""
+    alternatives = []
+    for pattern in patterns:
+        fields = pattern.split(':', 5)
+        head = [_glob(field, '[^:]') for field in fields[:5]]
+        alternatives.append(':'.join(head + [_glob(field) for field in fields[5:]]))
+    return re.compile('^(?:' + '|'.join(alternatives) + ')$')
+
+
+def _value_test(operator: str, policy_values: list):
+    """A function(value) -> bool for one operator without its Not/set/IfExists parts."""
+    if operator in ('StringEquals', 'StringNotEquals'):
+        allowed = set(policy_values)
+        return allowed.__contains__
+    if operator in ('StringEqualsIgnoreCase', 'StringNotEqualsIgnoreCase'):
+        allowed = {v.lower() for v in policy_values}
+        return lambda value: value.lower() in allowed
+    if operator in ('StringLike', 'StringNotLike'):
+        return lambda value, regex=compile_patterns(policy_values): bool(regex.match(value))
+    if operator.startswith('Arn'):
+        return lambda value, regex=compile_arn_patterns(policy_values): bool(regex.match(value))
+    if operator == 'Bool':
+        allowed = {v.lower() for v in policy_values}
+        return lambda value: value.lower() in allowed
+    if operator.startswith('Numeric'):
+        compare = {
+            'NumericEquals': float.__eq__, 'NumericNotEquals': float.__eq__,
+            'NumericLessThan': float.__lt__, 'NumericLessThanEquals': float.__le__,
+            'NumericGreaterThan': float.__gt__, 'NumericGreaterThanEquals': float.__ge__,
+        }[operator]
+        limits = [float(v) for v in policy_values]
+
+        def numeric(value):
+            try:
+                number = float(value)
+            except ValueError:
+                return False
+            return any(compare(number, limit) for limit in limits)
+        return numeric
+    raise ValueError(f'Unsupported condition operator: {operator}')
+
+
+class Condition:
+    """One compiled (operator, key, values) condition."""
+
+    __slots__ = ('key', 'resolve', 'test', 'negated', 'set_operator', 'if_exists', 'null')
+
+    def __init__(self, operator: str, key: str, policy_values: list):
+        self.key = key
+        self.resolve = CONDITION_KEYS.get(key.lower())
+        self.set_operator, _, base = operator.rpartition(':')
+        self.if_exists = base.endswith('IfExists')
+        base = base[:-len('IfExists')] if self.if_exists else base
+        policy_values = [str(v).lower() if isinstance(v, bool) else str(v) for v in as_list(policy_values)]
+        self.null = base == 'Null'
+        self.negated = 'Not' in base
+        self.test = None if self.null else _value_test(base, policy_values)
+        if self.null:
+            self.test = policy_values[0].lower() == 'true'
+
+    @property
+    def resolvable(self) -> bool:
+        return self.resolve is not None
+
+    def holds(self, record: dict) -> bool:
+        values = _values(self.resolve(record))
+        if self.null:
+            return (values is None) == self.test
+        if values is None:
+            # Absent keys: IfExists and ForAllValues hold, negated operators hold, the rest fail
+            return self.if_exists or self.set_operator == 'ForAllValues' or (
+                self.negated and self.set_operator != 'ForAnyValue')
+
+        results = (self.test(value) != self.negated for value in values)
+        return all(results) if self.set_operator == 'ForAllValues' else any(results)
+
+
+class Statement:
+    """A compiled Deny statement."""
+
+    __slots__ = ('policy', 'sid', 'not_action', 'actions', 'resources', 'conditions', 'unresolvable')
+
+    def __init__(self, policy: str, index: int, statement: dict):
+        self.policy = policy
+        self.sid = statement.get('Sid') or f'#{index}'
+        self.not_action = 'NotAction' in statement
+        self.actions = compile_patterns(as_list(statement.get('NotAction' if self.not_action else 'Action', [])),
+                                        ignore_case=True)
+        resources = as_list(statement.get('Resource', '*'))
+        self.resources = None if '*' in resources else compile_arn_patterns(resources)
+
+        conditions = [Condition(operator, key, values)
+                      for operator, keys in (statement.get('Condition') or {}).items()
+                      for key, values in keys.items()]
+        self.conditions = [c for c in conditions if c.resolvable]
+        self.unresolvable = sorted({c.key for c in conditions if not c.resolvable})
+
+    def applies_to(self, action: str) -> bool:
+        return bool(self.actions.match(action)) != self.not_action
+
+    def evaluate(self, record: dict, action: str):
+        """True if the statement denies the record, None if the record cannot tell, else False."""
+        if not all(condition.holds(record) for condition in self.conditions):
+            return False
+        if self.resources is not None:
+            resources = resources_of(record, action)
+            if not resources:
+                return None
+            if not any(self.resources.match(arn) for arn in resources):
+                return False
+        return None if self.unresolvable else True
+
+
+class Evaluator:
+    """Deny statements of a set of policies, indexed by action."""
+
+    def __init__(self, policies: list):
+        self.statements = [
+            Statement(policy['name'], index, statement)
+            for policy in policies
+            for index, statement in enumerate(as_list(policy['document'].get('Statement', [])))
+            if statement.get('Effect') == 'Deny'
+        ]
+        self._by_action = {}
+
+    def candidates(self, action: str) -> tuple:
+        """Statements whose Action/NotAction applies to action (cached)."""
+        found = self._by_action.get(action)
+        if found is None:
+            found = self._by_action[action] = tuple(s for s in self.statements if s.applies_to(action))
+        return found
+
+    def evaluate(self, record: dict) -> list:
+        """(statement, denied or None) for every statement matching the record's action."""
+        action = action_of(record)
+        results = []
+        for statement in self.candidates(action):
+            outcome = statement.evaluate(record, action)
+            if outcome is not False:
+                results.append((statement, outcome))
+        return results
+
+
+# --- Bulk evaluation ---------------------------------------------------------
+
+def _empty_totals() -> dict:
+    return {'files': 0, 'records': 0, 'denied': 0, 'indeterminate': 0, 'statements': {}}
+
+
+def _statement_totals(totals: dict, statement: Statement) -> dict:
+    key = f'{statement.policy}/{statement.sid}'
+    entry = totals['statements'].get(key)
+    if entry is None:
+        entry = totals['statements'][key] = {
+            'policy': statement.policy, 'sid': statement.sid, 'denied': 0, 'indeterminate': 0,
+            'already_denied': 0, 'unresolved_keys': statement.unresolvable,
+            'actions': Counter(), 'principals': Counter(), 'samples': [],
+        }
+    return entry
+
+
+def evaluate_records(evaluator: Evaluator, records, totals: dict = None) -> dict:
+    """Evaluate records, accumulating per-statement counts into totals."""
+    totals = totals or _empty_totals()
+    for record in records:
+        totals['records'] += 1
+        results = evaluator.evaluate(record)
+        if not results:
+            continue
+        if any(outcome for _, outcome in results):
+            totals['denied'] += 1
+        else:
+            totals['indeterminate'] += 1
+
+        for statement, outcome in results:
+            entry = _statement_totals(totals, statement)
+            if not outcome:
+                entry['indeterminate'] += 1
+                continue
+            entry['denied'] += 1
+            entry['actions'][action_of(record)] += 1
+            entry['principals'][principal_arn(record) or 'unknown'] += 1
+            if record.get('errorCode') in DENIED_ERRORS:
+                entry['already_denied'] += 1
+            if len(entry['samples']) < SAMPLES_PER_STATEMENT:
+                entry['samples'].append(record.get('eventID'))
+    return totals
+
+
+def merge_totals(into: dict, other: dict) -> dict:
+    for key in ('files', 'records', 'denied', 'indeterminate'):
+        into[key] += other[key]
+    for key, entry in other['statements'].items():
+        target = into['statements'].setdefault(key, {**entry, 'denied': 0, 'indeterminate': 0, 'already_denied': 0,
+                                                      'actions': Counter(), 'principals': Counter(),
+                                                      'samples': []})
+        for field in ('denied', 'indeterminate', 'already_denied'):
+            target[field] += entry[field]
+        target['actions'].update(entry['actions'])
+        target['principals'].update(entry['principals'])
+        target['samples'] = (target['samples'] + entry['samples'])[:SAMPLES_PER_STATEMENT]
+    return into
+
+
+_worker_evaluator = None
+
+
+def _init_worker(policies: list):
+    global _worker_evaluator
+    _worker_evaluator = Evaluator(policies)
+
+
+def _evaluate_file(path: str) -> dict:
+    totals = evaluate_records(_worker_evaluator, iter_records(path))
+    totals['files'] = 1
+    return totals
+
+
+def evaluate_logs(policies: list, paths: list, workers: int = None) -> dict:
+    """
+    Evaluate every CloudTrail log under paths.
+
+    Args:
+        workers: worker processes; 1 evaluates in this process
+    """
+    global _worker_evaluator
+    # Compiled here first so unsupported operators fail before any worker starts
+    evaluator = Evaluator(policies)
+    files = iter_log_files(paths)
+    totals = _empty_totals()
+    if workers == 1:
+        _worker_evaluator = evaluator
+        for path in files:
+            merge_totals(totals, _evaluate_file(path))
+        return totals
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(policies,)) as executor:
+        for result in bounded_map(executor, _evaluate_file, files, workers):
+            merge_totals(totals, result)
+    return totals
+
+
+def build_report(totals: dict) -> dict:
+    """JSON-serialisable report, statements ordered by denied count."""
+    statements = []
+    for entry in sorted(totals['statements'].values(), key=lambda e: (-e['denied'], -e['indeterminate'])):
+        statements.append({
+            **entry,
+            'actions': dict(entry['actions'].most_common(TOP_N)),
+            'principals': dict(entry['principals'].most_common(TOP_N)),
+        })
+    return {**{k: totals[k] for k in ('files', 'records', 'denied', 'indeterminate')}, 'statements': statements}
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"{report['records']} records in {report['files']} files: {report['denied']} denied, "
+        f"{report['indeterminate']} indeterminate",
+        '',
+        f"{'Policy/Sid':<60} {'Denied':>8} {'Already':>8} {'Unknown':>8}",
+    ]
+    for s in report['statements']:
+        lines.append(f"{(s['policy'] + '/' + s['sid'])[:60]:<60} {s['denied']:>8} {s['already_denied']:>8} "
+                     f"{s['indeterminate']:>8}")
+        for action, count in list(s['actions'].items())[:3]:
+            lines.append(f"    {count:>8}  {action}")
+        if s['unresolved_keys']:
+            lines.append(f"    not in CloudTrail: {', '.join(s['unresolved_keys'])}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('policies', nargs='+', help='terraform show -json output or policy JSON files')
+    parser.add_argument('--logs', nargs='+', required=True, metavar='PATH',
+                        help='CloudTrail log files or directories (.json.gz, .json, .jsonl)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='worker processes (default: CPU count)')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    policies = [policy for path in args.policies for policy in load_policies(path)]
+    try:
+        report = build_report(evaluate_logs(policies, args.logs, args.workers))
+    except ValueError as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 2
+
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
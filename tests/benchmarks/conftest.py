@@ -0,0 +1,127 @@
+"""
+Fixtures for the enforcer Lambda benchmarks.
+
+Warm-path benchmarks use in-process stand-in clients (no network, no botocore)
+so they measure the enforcer's own overhead. The first-invocation benchmark
+uses real boto3 clients with botocore's Stubber so client construction and the
+lazy boto3 import are included.
+"""
+import os
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+BENCH_ENV = {
+    'SNS_TOPIC_ARN': 'arn:aws:sns:us-west-2:123456789012:bench-topic',
+    'EXEMPT_TABLE_PREFIXES': 'terraform-,infrastructure-',
+    'EVENT_BUS_NAME': 'default',
+    'EVENTBRIDGE_SOURCE': 'ndx.dynamodb-billing-enforcer',
+    'LOG_LEVEL': 'INFO',
+    'LOG_PAYLOAD_SAMPLE_RATE': '0',
+}
+
+
+def cloudtrail_event(table_name, event_name='CreateTable', billing_mode='PAY_PER_REQUEST',
+                     account_id='123456789012', region='us-west-2'):
+    """
+    Build a CloudTrail event shaped like SAMPLE_CLOUDTRAIL_EVENT in the unit tests.
+
+    Each event gets a new eventID and the current eventTime, so the idempotency
+    store treats it as new rather than a redelivery.
+    """
+    request_params = {'tableName': table_name}
+    if billing_mode:
+        request_params['billingMode'] = billing_mode
+    return {
+        'version': '0',
+        'id': f'bench-{table_name}',
+        'detail-type': 'AWS API Call via CloudTrail',
+        'source': 'aws.dynamodb',
+        'account': account_id,
+        'region': region,
+        'detail': {
+            'userIdentity': {
+                'type': 'AssumedRole',
+                'principalId': 'AROAEXAMPLEID:user@example.com',
+                'arn': f'arn:aws:sts::{account_id}:assumed-role/SandboxUser/user@example.com',
+            },
+            'eventID': str(uuid.uuid4()),
+            'eventTime': datetime.now(timezone.utc).isoformat(),
+            'eventSource': 'dynamodb.amazonaws.com',
+            'eventName': event_name,
+            'awsRegion': region,
+            'sourceIPAddress': '192.168.1.1',
+            'userAgent': 'aws-cli/2.0',
+            'requestParameters': request_params,
+            'recipientAccountId': account_id,
+        },
+    }
+
+
+class StandInDynamoDB:
+    """Minimal DynamoDB client stand-in answering DescribeTable/DeleteTable."""
+
+    class exceptions:
+        ResourceNotFoundException = type('ResourceNotFoundException', (Exception,), {})
+
+    def __init__(self, billing_mode='PAY_PER_REQUEST'):
+        self.billing_mode = billing_mode
+
+    def describe_table(self, TableName):
+        return {'Table': {'TableName': TableName, 'BillingModeSummary': {'BillingMode': self.billing_mode}}}
+
+    def delete_table(self, TableName):
+        return {'TableDescription': {'TableName': TableName, 'TableStatus': 'DELETING'}}
+
+
+class StandInEvents:
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def put_events(self, Entries):
+        if self.fail:
+            raise RuntimeError('EventBridge unavailable')
+        return {'FailedEntryCount': 0, 'Entries': [{'EventId': str(i)} for i in range(len(Entries))]}
+
+
+class StandInSNS:
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def publish(self, **kwargs):
+        if self.fail:
+            raise RuntimeError('SNS unavailable')
+        return {'MessageId': 'bench'}
+
+
+@pytest.fixture
+def enforcer(capsys):
+    """
+    The index module with benchmark configuration and a clean client pool.
+
+    Structured logs go to the captured stdout, as they would to CloudWatch.
+    """
+    import index
+
+    with patch.dict(os.environ, BENCH_ENV):
+        index.reset_config()
+        index.get_config()
+        yield index
+    index.reset_config()
+    index.set_client_factory(None)
+
+
+@pytest.fixture
+def standin_clients(enforcer):
+    """Install stand-in clients; returns a setter to switch behaviour per benchmark."""
+    clients = {
+        'dynamodb': StandInDynamoDB(),
+        'events': StandInEvents(),
+        'sns': StandInSNS(),
+    }
+    enforcer.set_client_factory(lambda service_name, region=None, credentials=None: clients[service_name])
+    return clients
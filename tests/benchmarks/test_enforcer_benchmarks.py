@@ -0,0 +1,170 @@
+"""
+Performance benchmarks for the DynamoDB Billing Mode Enforcer Lambda.
+
+Run with:
+    pytest tests/benchmarks --benchmark-only --benchmark-autosave
+
+Saved runs go to .benchmarks/ and are named after the commit; compare the
+current tree against the last saved run with --benchmark-compare. These
+numbers are what Lambda memory size is tuned from.
+"""
+import importlib
+import json
+import os
+import sys
+
+import pytest
+
+from conftest import StandInDynamoDB, StandInEvents, StandInSNS, cloudtrail_event
+
+LAMBDA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'modules', 'dynamodb-billing-enforcer', 'lambda')
+
+# Every module shipped in the Lambda package, so a cold import re-imports them all
+ENFORCER_MODULES = tuple(sorted(
+    name[:-3] for name in os.listdir(LAMBDA_DIR) if name.endswith('.py')
+))
+
+
+# Rounds for warm-path benchmarks that need a new event per call
+WARM_ROUNDS = 1000
+
+
+def fresh_event(*args, **kwargs):
+    """benchmark.pedantic setup building a new event (new eventID) for every round."""
+    return lambda: ((cloudtrail_event(*args, **kwargs), None), {})
+
+
+def purge_modules(prefixes):
+    """Drop modules from sys.modules so the next import starts cold."""
+    for name in list(sys.modules):
+        if name.split('.')[0] in prefixes:
+            del sys.modules[name]
+
+
+class TestColdStart:
+    """Import and first-invocation cost - the cold start a new container pays."""
+
+    def test_module_import(self, benchmark):
+        """Importing the handler module (boto3 is imported lazily, not here)."""
+        def import_enforcer():
+            purge_modules(ENFORCER_MODULES)
+            return importlib.import_module('index')
+
+        module = benchmark(import_enforcer)
+
+        assert 'boto3' not in module.__dict__
+
+    def test_first_invocation_with_lazy_boto3_import(self, benchmark, enforcer):
+        """First event in a fresh container: boto3 import, client creation, stubbed calls."""
+        pytest.importorskip('boto3')
+
+        def stubbed_client(service_name, region=None, credentials=None):
+            import boto3
+            from botocore.stub import Stubber
+
+            client = boto3.client(service_name, region_name=region or 'us-west-2',
+                                  aws_access_key_id='bench', aws_secret_access_key='bench')
+            stubber = Stubber(client)
+            if service_name == 'dynamodb':
+                stubber.add_response('delete_table', {})
+            elif service_name == 'events':
+                stubber.add_response('put_events', {'FailedEntryCount': 0, 'Entries': [{'EventId': '1'}]})
+            elif service_name == 'sns':
+                stubber.add_response('publish', {'MessageId': '1'})
+            stubber.activate()
+            return client
+
+        def cold_container():
+            purge_modules(('boto3', 'botocore'))
+            enforcer.set_client_factory(stubbed_client)
+            return (cloudtrail_event('bench-table'), None), {}
+
+        result = benchmark.pedantic(
+            enforcer.lambda_handler,
+            setup=cold_container,
+            rounds=5,
+            iterations=1,
+        )
+
+        assert 'TABLE DELETED' in result['body']
+
+
+class TestWarmInvocation:
+    """Per-event latency once the container, config and clients are warm."""
+
+    def test_exempt_table(self, benchmark, enforcer, standin_clients):
+        """Exempt prefix - returns before any AWS call."""
+        result = benchmark(enforcer.lambda_handler, cloudtrail_event('terraform-state-lock'), None)
+
+        assert 'exempt' in result['body']
+
+    def test_provisioned_from_request(self, benchmark, enforcer, standin_clients):
+        """CreateTable without billingMode - decided from the request alone."""
+        result = benchmark.pedantic(enforcer.lambda_handler, setup=fresh_event('orders', billing_mode=None),
+                                    rounds=WARM_ROUNDS)
+
+        assert 'already provisioned' in result['body']
+
+    def test_provisioned_via_describe_table(self, benchmark, enforcer, standin_clients):
+        """UpdateTable without billingMode - needs DescribeTable."""
+        standin_clients['dynamodb'] = StandInDynamoDB(billing_mode='PROVISIONED')
+
+        result = benchmark.pedantic(
+            enforcer.lambda_handler,
+            setup=fresh_event('orders', event_name='UpdateTable', billing_mode=None),
+            rounds=WARM_ROUNDS,
+        )
+
+        assert 'already provisioned' in result['body']
+
+    def test_delete_and_notify(self, benchmark, enforcer, standin_clients):
+        """On-Demand table - DeleteTable plus EventBridge and SNS fan-out."""
+        result = benchmark.pedantic(enforcer.lambda_handler, setup=fresh_event('orders'), rounds=WARM_ROUNDS)
+
+        assert 'TABLE DELETED' in result['body']
+
+    def test_notification_failure(self, benchmark, enforcer, standin_clients):
+        """On-Demand table where both notification channels fail."""
+        standin_clients['events'] = StandInEvents(fail=True)
+        standin_clients['sns'] = StandInSNS(fail=True)
+
+        result = benchmark.pedantic(enforcer.lambda_handler, setup=fresh_event('orders'), rounds=WARM_ROUNDS)
+
+        assert 'TABLE DELETED' in result['body']
+
+    def test_duplicate_delivery(self, benchmark, enforcer, standin_clients):
+        """Redelivered event - answered from the in-container idempotency LRU."""
+        event = cloudtrail_event('orders')
+        enforcer.lambda_handler(event, None)
+
+        result = benchmark(enforcer.lambda_handler, event, None)
+
+        assert result['decision'] == 'duplicate'
+
+
+class TestBatchThroughput:
+    """Throughput of the SQS batch path on a burst of synthetic events."""
+
+    BATCH_SIZE = 100
+
+    def sqs_batch(self):
+        """A mixed burst: mostly On-Demand, some exempt and provisioned tables."""
+        records = []
+        for i in range(self.BATCH_SIZE):
+            if i % 10 == 0:
+                event = cloudtrail_event(f'terraform-lock-{i}')
+            elif i % 5 == 0:
+                event = cloudtrail_event(f'table-{i}', billing_mode='PROVISIONED')
+            else:
+                event = cloudtrail_event(f'table-{i}', account_id=f'1234567890{i % 4:02d}')
+            records.append({'messageId': f'msg-{i}', 'eventSource': 'aws:sqs', 'body': json.dumps(event)})
+        return {'Records': records}
+
+    def test_sqs_batch(self, benchmark, enforcer, standin_clients):
+        """Enforce a batch of new events through batch_handler."""
+        result = benchmark.pedantic(enforcer.batch_handler, setup=lambda: ((self.sqs_batch(), None), {}),
+                                    rounds=50)
+
+        assert result == {'batchItemFailures': []}
+        benchmark.extra_info['records_per_batch'] = self.BATCH_SIZE
+        benchmark.extra_info['records_per_second'] = round(self.BATCH_SIZE / benchmark.stats.stats.mean)
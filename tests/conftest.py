@@ -9,3 +9,6 @@ import sys
 
 # Add lambda directory to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'modules', 'dynamodb-billing-enforcer', 'lambda'))
+
+# Add scripts directory to path for the offline tools
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
@@ -0,0 +1,214 @@
+"""
+Unit tests for the CloudWatch alarm backtester.
+
+Run with: pytest tests/ -v
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+import alarm_backtest as backtester
+from alarm_backtest import ALARM, INSUFFICIENT_DATA, OK
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'modules', 'ou-metrics-alarms')
+NAN = float('nan')
+
+
+def reference_states(datapoints, comparison_operator, threshold, n, m, treat_missing_data):
+    """Period-by-period evaluation, written for clarity rather than speed."""
+    compare = backtester.COMPARISONS[comparison_operator]
+    states, present = [], []
+    for t, value in enumerate(datapoints):
+        missing = np.isnan(value)
+        if treat_missing_data == 'ignore':
+            if missing:
+                states.append(states[-1] if states else INSUFFICIENT_DATA)
+                continue
+            present.append(compare(value, threshold))
+            states.append(ALARM if sum(present[-n:]) >= m else OK)
+            continue
+        window = datapoints[max(0, t - n + 1):t + 1]
+        if treat_missing_data == 'missing' and len(window) == n and np.isnan(window).all():
+            states.append(INSUFFICIENT_DATA)
+            continue
+        breaching = sum(
+            (treat_missing_data == 'breaching') if np.isnan(v) else bool(compare(v, threshold))
+            for v in window
+        )
+        states.append(ALARM if breaching >= m else OK)
+    return states
+
+
+class TestAlarmDefinitions:
+    """Tests for reading alarm definitions."""
+
+    def test_reads_ou_metrics_module(self):
+        alarms = {alarm['alarm_name']: alarm for alarm in backtester.load_alarms(MODULE_DIR)}
+
+        assert alarms['ndx-ou-metrics-low-available-accounts'] == {
+            'alarm_name': 'ndx-ou-metrics-low-available-accounts',
+            'metric_name': 'AvailableAccounts',
+            'comparison_operator': 'LessThanThreshold',
+            'threshold': 30.0,
+            'statistic': 'Minimum',
+            'period': 900,
+            'evaluation_periods': 1,
+            'datapoints_to_alarm': 1,
+            'treat_missing_data': 'missing',
+        }
+        assert alarms['ndx-ou-metrics-stuck-entry-accounts']['evaluation_periods'] == 4
+        assert alarms['ndx-ou-metrics-metrics-stale']['treat_missing_data'] == 'breaching'
+
+    def test_variables_override_defaults(self):
+        alarms = backtester.load_alarms(MODULE_DIR, {'available_accounts_threshold': 12, 'namespace': 'dev'})
+
+        assert alarms[0]['alarm_name'] == 'dev-ou-metrics-low-available-accounts'
+        assert alarms[0]['threshold'] == 12.0
+
+    def test_reads_terraform_show_json(self, tmp_path):
+        state = {'values': {'root_module': {'child_modules': [{'resources': [{
+            'type': 'aws_cloudwatch_metric_alarm',
+            'values': {'alarm_name': 'a', 'metric_name': 'ExitAccounts', 'threshold': 0,
+                       'comparison_operator': 'GreaterThanThreshold', 'statistic': 'Maximum',
+                       'period': 900, 'evaluation_periods': 4, 'datapoints_to_alarm': None,
+                       'treat_missing_data': 'missing'},
+        }]}]}}}
+        path = tmp_path / 'state.json'
+        path.write_text(json.dumps(state))
+
+        [alarm] = backtester.load_alarms(str(path))
+
+        assert alarm['datapoints_to_alarm'] == 4
+
+    def test_rejects_unsupported_statistic(self):
+        with pytest.raises(ValueError, match='statistic'):
+            backtester.validate_alarm({'alarm_name': 'a', 'threshold': 1, 'period': 60, 'evaluation_periods': 1,
+                                       'comparison_operator': 'LessThanThreshold', 'statistic': 'p99'})
+
+
+class TestMetricData:
+    """Tests for loading exported datapoints."""
+
+    def test_long_and_wide_csv(self, tmp_path):
+        (tmp_path / 'long.csv').write_text(
+            'timestamp,metric,value\n'
+            '2025-01-01T00:01:00Z,AvailableAccounts,40\n'
+            '2025-01-01T00:00:00Z,AvailableAccounts,41\n'
+            '2025-01-01T00:00:00Z,EntryAccounts,0\n'
+        )
+        (tmp_path / 'wide.csv').write_text(
+            'Timestamp,ExitAccounts,EntryAccounts\n'
+            '1735689600000,2,\n'
+            '1735689660000,3,1\n'
+        )
+
+        series = backtester.load_series([str(tmp_path / 'long.csv'), str(tmp_path / 'wide.csv')])
+
+        timestamps, values = series['AvailableAccounts']
+        assert timestamps.tolist() == [1735689600, 1735689660]
+        assert values.tolist() == [41, 40]
+        assert series['EntryAccounts'][0].tolist() == [1735689600, 1735689660]
+        assert series['ExitAccounts'][1].tolist() == [2, 3]
+
+    def test_aggregate_statistics(self):
+        timestamps = np.array([0, 30, 60, 200])
+        values = np.array([3.0, 1.0, 5.0, 7.0])
+
+        minimum = backtester.aggregate(timestamps, values, 60, 'Minimum')
+        assert minimum[[0, 1, 3]].tolist() == [1.0, 5.0, 7.0]
+        # Nothing between 120s and 180s: a missing datapoint
+        assert np.isnan(minimum[2])
+        assert backtester.aggregate(timestamps, values, 60, 'Maximum')[[0, 1, 3]].tolist() == [3.0, 5.0, 7.0]
+        assert backtester.aggregate(timestamps, values, 60, 'Average')[0] == 2.0
+        assert backtester.aggregate(timestamps, values, 60, 'Sum')[0] == 4.0
+        assert backtester.aggregate(timestamps, values, 60, 'SampleCount')[[0, 1, 3]].tolist() == [2, 1, 1]
+
+
+class TestEvaluation:
+    """Tests for windowed evaluation."""
+
+    def test_m_of_n(self):
+        datapoints = np.array([1, 5, 5, 1, 5, 5, 5, 1], dtype=float)
+
+        [states] = backtester.evaluate(datapoints, 'GreaterThanThreshold', [3], 3, 2, 'missing')
+
+        assert states.tolist() == [OK, OK, ALARM, ALARM, ALARM, ALARM, ALARM, ALARM]
+
+    def test_treat_missing_data(self):
+        datapoints = np.array([5, NAN, NAN, 1, NAN], dtype=float)
+        states = {
+            treat: backtester.evaluate(datapoints, 'GreaterThanThreshold', [3], 2, 2, treat)[0].tolist()
+            for treat in backtester.TREAT_MISSING
+        }
+
+        assert states['breaching'] == [OK, ALARM, ALARM, OK, OK]
+        assert states['notBreaching'] == [OK, OK, OK, OK, OK]
+        assert states['missing'] == [OK, OK, INSUFFICIENT_DATA, OK, OK]
+        assert states['ignore'] == [OK, OK, OK, OK, OK]
+
+    @pytest.mark.parametrize('treat', backtester.TREAT_MISSING)
+    def test_matches_reference(self, treat):
+        rng = np.random.default_rng(7)
+        datapoints = rng.integers(0, 10, 300).astype(float)
+        datapoints[rng.random(300) < 0.2] = NAN
+        thresholds = [2, 5, 8]
+
+        for n, m in [(1, 1), (3, 2), (4, 4), (5, 1)]:
+            states = backtester.evaluate(datapoints, 'LessThanOrEqualToThreshold', thresholds, n, m, treat)
+            for row, threshold in zip(states, thresholds):
+                expected = reference_states(datapoints, 'LessThanOrEqualToThreshold', threshold, n, m, treat)
+                assert row.tolist() == expected, (n, m, threshold)
+
+    def test_summary_counts_and_latency(self):
+        """Three breaching periods then an alarm on the third: 3 periods of latency."""
+        datapoints = np.array([0, 1, 1, 1, 1, 0, 0, 1, 1, 1], dtype=float)
+        windows = backtester.Windows(datapoints, 'GreaterThanThreshold', [0], 'missing')
+
+        [summary] = windows.summarize(windows.states(3, 3), 60)
+
+        assert summary['alarms'] == 2
+        assert summary['transitions'] == 3
+        assert summary['alarm_pct'] == 30.0
+        assert summary['median_latency_seconds'] == 180
+
+
+class TestBacktest:
+    """Tests for grid sweeps and the CLI."""
+
+    @pytest.fixture
+    def data(self, tmp_path):
+        # A pool dipping below 30 accounts for an hour each day, for a week of 1-minute data
+        minutes = np.arange(7 * 24 * 60)
+        available = np.where(minutes % 1440 < 60, 20, 45)
+        lines = ['timestamp,AvailableAccounts'] + [f'{1735689600 + 60 * i},{v}' for i, v in zip(minutes, available)]
+        path = tmp_path / 'ou-metrics.csv'
+        path.write_text('\n'.join(lines) + '\n')
+        return path
+
+    def test_grid_marks_current_setting(self, data):
+        alarm = backtester.load_alarms(MODULE_DIR)[0]
+        series = backtester.load_series([str(data)])['AvailableAccounts']
+
+        results = backtester.backtest(alarm, series, thresholds=[10, 30], periods=[300, 900],
+                                      evaluation_periods=[1, 2], datapoints_to_alarm=[1, 2])
+
+        assert len(results) == 2 * 2 * 3
+        [current] = [result for result in results if result['current']]
+        assert (current['period'], current['threshold'], current['alarms']) == (900, 30.0, 7)
+        assert all(result['alarms'] == 0 for result in results if result['threshold'] == 10)
+
+    def test_main(self, data, capsys):
+        assert backtester.main([MODULE_DIR, '--data', str(data), '--alarm', 'low-available',
+                                '--threshold', '25:30:5', '--format', 'json']) == 0
+
+        results = json.loads(capsys.readouterr().out)
+        assert [(r['threshold'], r['alarms']) for r in results] == [(25.0, 7), (30.0, 7)]
+
+    def test_main_warns_about_metrics_without_data(self, data, capsys):
+        assert backtester.main([MODULE_DIR, '--data', str(data)]) == 0
+
+        captured = capsys.readouterr()
+        assert 'no data for EntryAccounts' in captured.err
+        assert '* ndx-ou-metrics-low-available-accounts' in captured.out
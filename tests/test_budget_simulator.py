@@ -0,0 +1,262 @@
+"""
+Unit tests for the budget threshold simulator.
+
+Run with: pytest tests/ -v
+"""
+import json
+import os
+import re
+
+import pandas as pd
+import pytest
+
+import budget_simulator as simulator
+
+MAIN_TF = os.path.join(os.path.dirname(__file__), '..', 'modules', 'budgets-manager', 'main.tf')
+
+CUR_HEADER = ('identity/LineItemId,lineItem/UsageAccountId,lineItem/LineItemType,lineItem/UsageStartDate,'
+              'lineItem/UsageEndDate,product/ProductName,lineItem/UsageType,lineItem/UnblendedCost,'
+              'lineItem/BlendedCost')
+
+
+def notification(threshold, notification_type='ACTUAL'):
+    return {'comparison_operator': 'GREATER_THAN', 'threshold': threshold, 'threshold_type': 'PERCENTAGE',
+            'notification_type': notification_type}
+
+
+def budget_resource(index, name, limit, filters, thresholds, notification_type='ACTUAL'):
+    return {
+        'type': 'aws_budgets_budget',
+        'name': 'service',
+        'index': index,
+        'values': {
+            'name': name,
+            'budget_type': 'COST',
+            'limit_amount': str(limit),
+            'time_unit': 'DAILY',
+            'cost_filter': [{'name': key, 'values': values} for key, values in filters.items()],
+            'cost_types': [dict(simulator.STANDARD_COST_TYPES)],
+            'notification': [notification(t, notification_type) for t in thresholds],
+        },
+    }
+
+
+@pytest.fixture
+def state(tmp_path):
+    resources = [
+        budget_resource('bedrock', 'ndx-sandbox-bedrock-daily', 10, {'Service': ['Amazon Bedrock']}, [50, 80, 100]),
+        budget_resource('ec2', 'ndx-sandbox-ec2-daily', 10,
+                        {'Service': ['Amazon Elastic Compute Cloud - Compute']}, [80, 100]),
+        budget_resource('data_transfer', 'ndx-sandbox-data-transfer-daily', 10,
+                        {'UsageType': ['DataTransfer-Out-Bytes', 'DataTransfer-Regional-Bytes']}, [80]),
+        {'type': 'aws_sns_topic', 'name': 'budget_alerts', 'values': {}},
+    ]
+    path = tmp_path / 'state.json'
+    path.write_text(json.dumps({'values': {'root_module': {'child_modules': [{'resources': resources}]}}}))
+    return path
+
+
+def cur_rows(account, day, hour_costs, product='Amazon Bedrock', usage_type='USE1-Claude-input-tokens',
+             line_item_type='Usage'):
+    rows = []
+    for hour, cost in hour_costs:
+        start = pd.Timestamp(day, tz='UTC') + pd.Timedelta(hours=hour)
+        end = start + pd.Timedelta(hours=1)
+        rows.append(f'id,{account},{line_item_type},{start:%Y-%m-%dT%H:%M:%SZ},{end:%Y-%m-%dT%H:%M:%SZ},'
+                    f'{product},{usage_type},{cost},{cost * 2}')
+    return rows
+
+
+@pytest.fixture
+def cur(tmp_path):
+    # Day 1: Bedrock $2/hour from 09:00 to 15:00, crossing $5 at 12:00, $8 at 14:00 and $10 at 15:00
+    # Day 2: $12 of Bedrock at 23:00 and a $9.50 credit that the budget ignores
+    rows = (cur_rows('111111111111', '2025-03-01', [(h, 2.0) for h in range(9, 15)])
+            + cur_rows('111111111111', '2025-03-02', [(23, 12.0)])
+            + cur_rows('111111111111', '2025-03-02', [(0, -9.5)], line_item_type='Credit')
+            + cur_rows('222222222222', '2025-03-01', [(1, 9.0)], product='Amazon Elastic Compute Cloud',
+                       usage_type='USE1-BoxUsage:m5.large')
+            + cur_rows('222222222222', '2025-03-01', [(1, 50.0)], product='Amazon Elastic Compute Cloud',
+                       usage_type='USE1-EBS:VolumeUsage.gp3')
+            + cur_rows('222222222222', '2025-03-01', [(2, 20.0)], product='AWS Data Transfer',
+                       usage_type='USW2-DataTransfer-Out-Bytes'))
+    path = tmp_path / 'cur.csv'
+    path.write_text('\n'.join([CUR_HEADER] + rows) + '\n')
+    return path
+
+
+class TestBudgets:
+    """Tests for reading budget definitions and candidates."""
+
+    def test_reads_terraform_show_json(self, state):
+        budgets = {budget['key']: budget for budget in simulator.load_budgets(str(state))}
+
+        assert set(budgets) == {'bedrock', 'ec2', 'data_transfer'}
+        assert budgets['bedrock']['limit'] == 10.0
+        assert budgets['bedrock']['filters'] == {'Service': ['Amazon Bedrock']}
+        assert [n['threshold'] for n in budgets['bedrock']['notifications']] == [50, 80, 100]
+
+    def test_standard_cost_types_match_module(self):
+        with open(MAIN_TF) as f:
+            block = re.search(r'standard_cost_types = \{(.*?)\}', f.read(), re.S).group(1)
+        declared = {name: value == 'true' for name, value in re.findall(r'(\w+)\s*=\s*(true|false)', block)}
+
+        assert declared == simulator.STANDARD_COST_TYPES
+
+    def test_candidates_replace_limit_and_actual_thresholds(self, state):
+        budgets = simulator.load_budgets(str(state))
+
+        [bedrock] = [b for b in simulator.apply_candidates(budgets, {'bedrock': 20}, {'bedrock': [25, 50]})
+                     if b['key'] == 'bedrock']
+
+        assert bedrock['limit'] == 20.0
+        assert [n['threshold'] for n in bedrock['notifications']] == [25, 50]
+
+    def test_unknown_candidate_rejected(self, state):
+        with pytest.raises(ValueError, match='No budget named lamda'):
+            simulator.apply_candidates(simulator.load_budgets(str(state)), {'lamda': 5})
+
+    def test_unsupported_filter_rejected(self):
+        with pytest.raises(ValueError, match='TagKeyValue'):
+            simulator.validate_budget({'name': 'b', 'limit': 1, 'filters': {'TagKeyValue': ['x']}})
+
+
+class TestReading:
+    """Tests for reading and aggregating exports."""
+
+    def test_aggregates_hourly_spend(self, state, cur):
+        budgets = simulator.load_budgets(str(state))
+
+        spend = simulator.load_spend([str(cur)], budgets, workers=1)
+
+        by_service = spend.groupby('service')['cost'].sum().to_dict()
+        assert by_service == {'Amazon Bedrock': pytest.approx(14.5), 'AWS Data Transfer': 20.0,
+                              'Amazon Elastic Compute Cloud - Compute': 9.0, 'EC2 - Other': 50.0}
+        # Only usage types a budget filters on are kept
+        assert set(spend['usage_type']) == {'', 'USW2-DataTransfer-Out-Bytes'}
+
+    def test_byte_ranges_match_whole_file(self, state, cur, monkeypatch):
+        budgets = simulator.load_budgets(str(state))
+        whole = simulator.load_spend([str(cur)], budgets, workers=1)
+
+        monkeypatch.setattr(simulator, 'MIN_SPLIT_BYTES', 1)
+        tasks = simulator.plan_tasks([str(cur)], workers=4, split_bytes=200)
+        split = simulator.load_spend([str(cur)], budgets, workers=1, split_bytes=200)
+
+        assert len(tasks) > 4
+        key = simulator.GROUP_COLUMNS
+        pd.testing.assert_frame_equal(whole.sort_values(key).reset_index(drop=True),
+                                      split.sort_values(key).reset_index(drop=True))
+
+    def test_cost_explorer_parquet_with_daily_rows(self, state, tmp_path):
+        frame = pd.DataFrame({
+            'date': ['2025-03-01', '2025-03-02'],
+            'account_id': ['111111111111', '111111111111'],
+            'service': ['Amazon Bedrock', 'Amazon Bedrock'],
+            'cost': [4.0, 12.0],
+        })
+        frame.to_parquet(tmp_path / 'ce.parquet', row_group_size=1)
+        budgets = simulator.load_budgets(str(state))
+
+        spend = simulator.load_spend([str(tmp_path)], budgets, workers=1, row_hours=24)
+        summary, events = simulator.simulate(spend, budgets)
+
+        assert len(simulator.plan_tasks([str(tmp_path)], workers=1)) == 2
+        assert events['crossed_at'].tolist() == [pd.Timestamp('2025-03-03', tz='UTC')] * 3
+        assert events['late'].all()
+
+    def test_missing_columns_rejected(self, state, tmp_path):
+        (tmp_path / 'bad.csv').write_text('a,b\n1,2\n')
+
+        with pytest.raises(ValueError, match='account'):
+            simulator.load_spend([str(tmp_path / 'bad.csv')], simulator.load_budgets(str(state)), workers=1)
+
+
+class TestSimulation:
+    """Tests for alert timing."""
+
+    @pytest.fixture
+    def spend_and_budgets(self, state, cur):
+        budgets = simulator.load_budgets(str(state))
+        return simulator.load_spend([str(cur)], budgets, workers=1), budgets
+
+    def test_alert_timing_and_lateness(self, spend_and_budgets):
+        spend, budgets = spend_and_budgets
+        [bedrock] = [b for b in budgets if b['key'] == 'bedrock']
+
+        alerts = simulator.simulate_budget(spend, bedrock, alert_delay_hours=8)
+
+        day1 = alerts[alerts['period'] == pd.Timestamp('2025-03-01', tz='UTC')]
+        assert day1['threshold'].tolist() == [50.0, 80.0, 100.0]
+        assert [t.hour for t in day1['crossed_at']] == [12, 14, 15]
+        assert day1['spend_at_alert'].tolist() == [12.0, 12.0, 12.0]
+        assert not day1['late'].any()
+        # The credit is excluded, so day 2 crosses every threshold at midnight: too late
+        day2 = alerts[alerts['period'] == pd.Timestamp('2025-03-02', tz='UTC')]
+        assert day2['late'].tolist() == [True, True, True]
+
+    def test_summary(self, spend_and_budgets):
+        summary, _ = simulator.simulate(*spend_and_budgets)
+        rows = {(row['budget'], row['threshold']): row for row in summary}
+
+        bedrock = rows[('ndx-sandbox-bedrock-daily', 50.0)]
+        assert (bedrock['periods'], bedrock['alerts'], bedrock['late']) == (2, 2, 1)
+        assert bedrock['max_spend_at_alert_pct'] == 120.0
+        # EC2 - Other spend does not count towards the Compute budget
+        assert rows[('ndx-sandbox-ec2-daily', 100.0)]['alerts'] == 0
+        assert rows[('ndx-sandbox-ec2-daily', 80.0)]['alerts'] == 1
+
+    def test_per_account(self, spend_and_budgets):
+        spend, budgets = spend_and_budgets
+        [bedrock] = [b for b in budgets if b['key'] == 'bedrock']
+
+        alerts = simulator.simulate_budget(spend, bedrock, per_account=True)
+
+        assert set(alerts['scope']) == {'111111111111'}
+
+    def test_usage_type_filter_without_region_prefix_warns(self, spend_and_budgets):
+        spend, budgets = spend_and_budgets
+        summary, _ = simulator.simulate(spend, budgets)
+
+        [warning] = simulator.filter_warnings(spend, budgets)
+
+        assert 'ndx-sandbox-data-transfer-daily' in warning
+        assert 'USW2-DataTransfer-Out-Bytes' in warning
+        [row] = [row for row in summary if row['key'] == 'data_transfer']
+        assert row['alerts'] == 0
+
+    def test_forecasted_notifications_not_simulated(self):
+        budget = simulator.validate_budget({'name': 'b', 'limit': 1,
+                                            'notifications': [notification(100, 'FORECASTED')]})
+        spend = simulator.aggregate([])
+
+        [row] = simulator.summarize(budget, simulator.simulate_budget(spend, budget), 0)
+
+        assert row['simulated'] is False
+
+
+class TestMain:
+    """Tests for the CLI."""
+
+    def test_json_summary_and_events(self, state, cur, tmp_path, capsys):
+        events = tmp_path / 'alerts.csv'
+
+        assert simulator.main([str(state), '--data', str(cur), '--workers', '1', '--limit', 'bedrock=20',
+                               '--thresholds', 'bedrock=25', '--events', str(events), '--json']) == 0
+
+        captured = capsys.readouterr()
+        [row] = [row for row in json.loads(captured.out) if row['key'] == 'bedrock']
+        assert (row['limit'], row['threshold'], row['alerts']) == (20.0, 25.0, 2)
+        assert 'region-prefixed usage' in captured.err
+        # Two Bedrock alerts and one EC2 alert
+        assert len(pd.read_csv(events)) == 3
+
+    def test_table(self, state, cur, capsys):
+        assert simulator.main([str(state), '--data', str(cur), '--workers', '1']) == 0
+
+        assert 'ndx-sandbox-bedrock-daily' in capsys.readouterr().out
+
+    def test_bad_assignment(self, state, cur, capsys):
+        assert simulator.main([str(state), '--data', str(cur), '--limit', 'bedrock']) == 2
+
+        assert 'NAME=VALUE' in capsys.readouterr().err
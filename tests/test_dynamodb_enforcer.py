@@ -8,6 +8,8 @@ No AWS credentials needed - Lambda uses lazy client initialization, fully mockab
 """
 import json
 import os
+import threading
+from datetime import datetime, timedelta, timezone
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -45,6 +47,21 @@ SAMPLE_CLOUDTRAIL_EVENT = {
 }
 
 
+# UpdateTable without billingMode - the request does not prove the billing mode,
+# so the enforcer has to describe the table
+UPDATE_TABLE_EVENT = {
+    **SAMPLE_CLOUDTRAIL_EVENT,
+    'detail': {
+        **SAMPLE_CLOUDTRAIL_EVENT['detail'],
+        'eventName': 'UpdateTable',
+        'requestParameters': {
+            'tableName': 'test-table',
+            'provisionedThroughput': {'readCapacityUnits': 5, 'writeCapacityUnits': 5},
+        },
+    }
+}
+
+
 @pytest.fixture
 def mock_env():
     """Set up environment variables for Lambda."""
@@ -54,19 +71,38 @@ def mock_env():
         'EVENT_BUS_NAME': 'default',
         'EVENTBRIDGE_SOURCE': 'ndx.dynamodb-billing-enforcer',
     }):
+        # Config is cached per container; start each test from this environment
+        import index
+        index.reset_config()
         yield
+        index.reset_config()
+        index.log.configure()
+        index.metrics.configure()
 
 
 @pytest.fixture
 def mock_boto3_clients():
-    """Create mock boto3 clients for DynamoDB, Events, and SNS."""
+    """Create mock boto3 clients for DynamoDB, Kinesis, Lambda, Events, and SNS."""
     mock_dynamodb = MagicMock()
+    mock_kinesis = MagicMock()
+    mock_lambda = MagicMock()
     mock_events = MagicMock()
     mock_sns = MagicMock()
 
-    def mock_get_client(service_name):
+    # Modelled exceptions must be real classes so `except` clauses work
+    for client in (mock_dynamodb, mock_kinesis, mock_lambda):
+        client.exceptions.ResourceNotFoundException = type('ResourceNotFoundException', (Exception,), {})
+    mock_lambda.exceptions.ProvisionedConcurrencyConfigNotFoundException = type(
+        'ProvisionedConcurrencyConfigNotFoundException', (Exception,), {})
+    mock_events.put_events.return_value = {'FailedEntryCount': 0, 'Entries': []}
+
+    def mock_get_client(service_name, account_id=None, region=None):
         if service_name == 'dynamodb':
             return mock_dynamodb
+        elif service_name == 'kinesis':
+            return mock_kinesis
+        elif service_name == 'lambda':
+            return mock_lambda
         elif service_name == 'events':
             return mock_events
         elif service_name == 'sns':
@@ -75,6 +111,8 @@ def mock_boto3_clients():
 
     return {
         'dynamodb': mock_dynamodb,
+        'kinesis': mock_kinesis,
+        'lambda': mock_lambda,
         'events': mock_events,
         'sns': mock_sns,
         'get_client': mock_get_client,
@@ -127,6 +165,113 @@ class TestExtractEventMetadata:
         assert metadata['region'] == 'unknown'
 
 
+class TestConfig:
+    """Tests for get_config caching and validation."""
+
+    def test_parsed_once_per_container(self, mock_env):
+        """Warm invocations should reuse the same config object."""
+        import index
+
+        assert index.get_config() is index.get_config()
+
+    def test_config_is_read_only(self, mock_env):
+        """Config should not be mutable by handler code."""
+        import index
+
+        with pytest.raises(TypeError):
+            index.get_config()['sns_topic_arn'] = 'changed'
+
+    def test_rejects_malformed_settings(self, mock_env):
+        """Should fail at init rather than on the first event."""
+        import index
+
+        for bad_env in (
+            {'SNS_TOPIC_ARN': 'not-an-arn'},
+            {'BATCH_MAX_WORKERS': '0'},
+            {'EXEMPT_TABLE_RULES': '[{"type": "regex", "pattern": ".*"}]'},
+        ):
+            with patch.dict(os.environ, bad_env):
+                with pytest.raises(ValueError):
+                    index.load_config()
+
+    def test_applies_per_account_exemption_rules(self, mock_env):
+        """EXEMPT_TABLE_RULES should only exempt tables in the listed accounts."""
+        import index
+
+        rules = '[{"type": "suffix", "pattern": "-keep", "accounts": ["123456789012"]}]'
+        event = {**SAMPLE_CLOUDTRAIL_EVENT, 'detail': {
+            **SAMPLE_CLOUDTRAIL_EVENT['detail'],
+            'requestParameters': {'tableName': 'demo-keep'},
+        }}
+
+        with patch.dict(os.environ, {'EXEMPT_TABLE_RULES': rules}):
+            index.reset_config()
+            result = index.lambda_handler(event, None)
+
+        assert 'exempt' in result['body']
+
+
+class TestDecisionLogging:
+    """Tests for the structured decision record written per event."""
+
+    @staticmethod
+    def decision_records(capsys):
+        lines = capsys.readouterr().out.splitlines()
+        return [r for r in map(json.loads, lines) if r.get('message') == 'decision']
+
+    def test_one_record_per_decision(self, mock_env, mock_boto3_clients, capsys):
+        """Should write exactly one decision record with the event metadata."""
+        import index
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            index.lambda_handler(SAMPLE_CLOUDTRAIL_EVENT, None)
+
+        [record] = self.decision_records(capsys)
+        assert record['decision'] == 'deleted'
+        assert record['table_name'] == 'test-table'
+        assert record['account_id'] == '123456789012'
+        assert record['region'] == 'us-west-2'
+        assert record['decision_path'] == 'request'
+        assert 'payload' not in record
+
+    def test_exempt_record_names_rule(self, mock_env, capsys):
+        """Exempt decisions should say which rule matched."""
+        import index
+
+        event = {**SAMPLE_CLOUDTRAIL_EVENT, 'detail': {
+            **SAMPLE_CLOUDTRAIL_EVENT['detail'],
+            'requestParameters': {'tableName': 'terraform-state-lock'},
+        }}
+        index.lambda_handler(event, None)
+
+        [record] = self.decision_records(capsys)
+        assert record['decision'] == 'exempt'
+        assert record['exemption'] == 'prefix: terraform-'
+
+    def test_samples_payload_from_config(self, mock_env, mock_boto3_clients, capsys):
+        """LOG_PAYLOAD_SAMPLE_RATE=1 should attach the raw event to every decision."""
+        import index
+
+        with patch.dict(os.environ, {'LOG_PAYLOAD_SAMPLE_RATE': '1'}):
+            index.reset_config()
+            with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+                index.lambda_handler(SAMPLE_CLOUDTRAIL_EVENT, None)
+
+        [record] = self.decision_records(capsys)
+        assert record['payload']['detail']['eventName'] == 'CreateTable'
+
+    def test_log_level_suppresses_info(self, mock_env, mock_boto3_clients, capsys):
+        """LOG_LEVEL=ERROR should drop routine decisions."""
+        import index
+
+        with patch.dict(os.environ, {'LOG_LEVEL': 'ERROR'}):
+            index.reset_config()
+            with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+                index.lambda_handler(UPDATE_TABLE_EVENT, None)
+
+        assert self.decision_records(capsys) == []
+
+
 class TestLambdaHandler:
     """Tests for lambda_handler function."""
 
@@ -140,13 +285,19 @@ class TestLambdaHandler:
         assert result['statusCode'] == 200
         assert 'No table name' in result['body']
 
+    def test_handles_null_request_parameters(self, mock_env):
+        """CloudTrail records null requestParameters for some failed calls."""
+        import index
+
+        event = {'detail': {'eventName': 'CreateTable', 'requestParameters': None}}
+        result = index.lambda_handler(event, None)
+
+        assert result['decision'] == 'no_table_name'
+
     def test_skips_exempt_table_prefixes(self, mock_env):
         """Should skip tables matching exempt prefixes."""
         import index
 
-        # Reload to pick up env vars
-        index.EXEMPT_TABLE_PREFIXES = ['terraform-', 'infrastructure-']
-
         event = SAMPLE_CLOUDTRAIL_EVENT.copy()
         event['detail'] = SAMPLE_CLOUDTRAIL_EVENT['detail'].copy()
         event['detail']['requestParameters'] = {'tableName': 'terraform-state-lock'}
@@ -169,7 +320,7 @@ class TestLambdaHandler:
         mock_dynamodb.describe_table.side_effect = ResourceNotFoundException("Table not found")
 
         with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
-            result = index.lambda_handler(SAMPLE_CLOUDTRAIL_EVENT, None)
+            result = index.lambda_handler(UPDATE_TABLE_EVENT, None)
 
         assert result['statusCode'] == 200
         assert 'not found' in result['body']
@@ -187,7 +338,7 @@ class TestLambdaHandler:
         }
 
         with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
-            result = index.lambda_handler(SAMPLE_CLOUDTRAIL_EVENT, None)
+            result = index.lambda_handler(UPDATE_TABLE_EVENT, None)
 
         assert result['statusCode'] == 200
         assert 'already provisioned' in result['body']
@@ -279,6 +430,330 @@ class TestLambdaHandler:
         assert 'us-west-2' in result['body']
 
 
+class TestBillingModeFastPath:
+    """Tests for deciding from requestParameters without DescribeTable."""
+
+    @staticmethod
+    def event_with(event_name, **request_params):
+        return {
+            **SAMPLE_CLOUDTRAIL_EVENT,
+            'detail': {
+                **SAMPLE_CLOUDTRAIL_EVENT['detail'],
+                'eventName': event_name,
+                'requestParameters': {'tableName': 'test-table', **request_params},
+            },
+        }
+
+    def test_on_demand_request_skips_describe(self, mock_env, mock_boto3_clients):
+        """Should delete straight away when the request says PAY_PER_REQUEST."""
+        import index
+
+        mock_dynamodb = mock_boto3_clients['dynamodb']
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.lambda_handler(SAMPLE_CLOUDTRAIL_EVENT, None)
+
+        assert 'DELETED' in result['body']
+        mock_dynamodb.describe_table.assert_not_called()
+        mock_dynamodb.delete_table.assert_called_once_with(TableName='test-table')
+
+    def test_create_without_billing_mode_is_provisioned(self, mock_env, mock_boto3_clients):
+        """CreateTable defaults to PROVISIONED, so no DescribeTable is needed."""
+        import index
+
+        mock_dynamodb = mock_boto3_clients['dynamodb']
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.lambda_handler(self.event_with('CreateTable'), None)
+
+        assert 'already provisioned' in result['body']
+        mock_dynamodb.describe_table.assert_not_called()
+        mock_dynamodb.delete_table.assert_not_called()
+
+    def test_update_to_provisioned_skips_describe(self, mock_env, mock_boto3_clients):
+        """Should trust an UpdateTable that switches to PROVISIONED."""
+        import index
+
+        mock_dynamodb = mock_boto3_clients['dynamodb']
+        event = self.event_with('UpdateTable', billingMode='PROVISIONED')
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.lambda_handler(event, None)
+
+        assert 'already provisioned' in result['body']
+        mock_dynamodb.describe_table.assert_not_called()
+
+    def test_update_without_billing_mode_describes_table(self, mock_env, mock_boto3_clients):
+        """Should fall back to DescribeTable when UpdateTable omits billingMode."""
+        import index
+
+        mock_dynamodb = mock_boto3_clients['dynamodb']
+        mock_dynamodb.describe_table.return_value = {
+            'Table': {'BillingModeSummary': {'BillingMode': 'PAY_PER_REQUEST'}}
+        }
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.lambda_handler(UPDATE_TABLE_EVENT, None)
+
+        assert 'DELETED' in result['body']
+        mock_dynamodb.describe_table.assert_called_once_with(TableName='test-table')
+
+    def test_fast_path_handles_table_already_gone(self, mock_env, mock_boto3_clients):
+        """Should treat ResourceNotFoundException from DeleteTable as not found."""
+        import index
+
+        mock_dynamodb = mock_boto3_clients['dynamodb']
+        mock_dynamodb.delete_table.side_effect = \
+            mock_dynamodb.exceptions.ResourceNotFoundException('gone')
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.lambda_handler(SAMPLE_CLOUDTRAIL_EVENT, None)
+
+        assert 'not found' in result['body']
+        mock_boto3_clients['sns'].publish.assert_not_called()
+
+    def test_ignores_failed_api_calls(self, mock_env, mock_boto3_clients):
+        """A CreateTable that errored did not create the table."""
+        import index
+
+        event = self.event_with('CreateTable', billingMode='PAY_PER_REQUEST')
+        event['detail']['errorCode'] = 'ResourceInUseException'
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.lambda_handler(event, None)
+
+        assert 'Request failed' in result['body']
+        mock_boto3_clients['dynamodb'].delete_table.assert_not_called()
+
+    def test_counts_decision_paths(self, mock_env, mock_boto3_clients):
+        """Should count fast-path and DescribeTable decisions separately."""
+        import index
+
+        mock_boto3_clients['dynamodb'].describe_table.return_value = {
+            'Table': {'BillingModeSummary': {'BillingMode': 'PROVISIONED'}}
+        }
+        before = dict(index.DECISION_PATH_COUNTS)
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            index.lambda_handler(UPDATE_TABLE_EVENT, None)
+            index.lambda_handler(SAMPLE_CLOUDTRAIL_EVENT, None)
+
+        assert index.DECISION_PATH_COUNTS['request'] == before.get('request', 0) + 1
+        assert index.DECISION_PATH_COUNTS['describe_table'] == before.get('describe_table', 0) + 1
+
+
+class TestNotificationFanOut:
+    """Tests for send_notifications concurrency, failures and timeout budget."""
+
+    EVENT_DETAIL = {
+        'tableName': 'test-table',
+        'action': 'DELETED',
+        'accountId': '123456789012',
+        'region': 'us-west-2',
+    }
+    ACTIONS = [(EVENT_DETAIL, 'msg')]
+
+    @staticmethod
+    def lambda_context(remaining_ms):
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = remaining_ms
+        return context
+
+    def test_sends_both_channels_concurrently(self, mock_env, mock_boto3_clients):
+        """EventBridge and SNS calls should overlap rather than run back to back."""
+        import index
+
+        both_started = threading.Barrier(2, timeout=5)
+
+        def put_events(**kwargs):
+            both_started.wait()
+            return {'FailedEntryCount': 0, 'Entries': []}
+
+        mock_boto3_clients['events'].put_events.side_effect = put_events
+        mock_boto3_clients['sns'].publish.side_effect = lambda **kwargs: both_started.wait()
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            results = index.send_notifications(self.ACTIONS, index.get_config())
+
+        assert results == {'eventbridge': [], 'sns': []}
+
+    def test_reports_each_failure_separately(self, mock_env, mock_boto3_clients):
+        """An EventBridge failure should not hide a successful SNS publish."""
+        import index
+
+        mock_boto3_clients['events'].put_events.side_effect = RuntimeError('bus unavailable')
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            results = index.send_notifications(self.ACTIONS, index.get_config())
+
+        assert results == {'eventbridge': ['bus unavailable'], 'sns': []}
+        mock_boto3_clients['sns'].publish.assert_called_once()
+
+    def test_times_out_within_remaining_lambda_time(self, mock_env, mock_boto3_clients):
+        """A hung channel should be reported as timed out, bounded by the context."""
+        import index
+
+        release = threading.Event()
+        mock_boto3_clients['sns'].publish.side_effect = lambda **kwargs: release.wait(5)
+        context = self.lambda_context(index.NOTIFY_TIMEOUT_MARGIN_MS + 100)
+
+        try:
+            with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+                results = index.send_notifications(self.ACTIONS, index.get_config(), context)
+        finally:
+            release.set()
+
+        assert results == {'eventbridge': [], 'sns': ['timed out']}
+
+    def test_skips_sns_without_topic(self, mock_env, mock_boto3_clients):
+        """Should only broadcast to EventBridge when no SNS topic is configured."""
+        import index
+
+        with patch.dict(os.environ, {'SNS_TOPIC_ARN': ''}):
+            config = index.load_config()
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            results = index.send_notifications(self.ACTIONS, config)
+
+        assert results == {'eventbridge': []}
+        mock_boto3_clients['sns'].publish.assert_not_called()
+
+    def test_timeout_without_context_uses_default(self, mock_env):
+        """Should fall back to NOTIFY_TIMEOUT_SECONDS outside Lambda."""
+        import index
+
+        assert index.notification_timeout(None) == index.NOTIFY_TIMEOUT_SECONDS
+        assert index.notification_timeout(self.lambda_context(3000)) == pytest.approx(
+            (3000 - index.NOTIFY_TIMEOUT_MARGIN_MS) / 1000)
+
+
+class TestBufferedEmission:
+    """Tests for PutEvents batching, partial-failure retry and SNS digests."""
+
+    @staticmethod
+    def actions(count, account_id='123456789012'):
+        return [
+            ({
+                'tableName': f'table-{i}',
+                'action': 'DELETED',
+                'accountId': account_id,
+                'region': 'us-west-2',
+            }, f'Table table-{i} deleted')
+            for i in range(count)
+        ]
+
+    @pytest.fixture(autouse=True)
+    def no_backoff(self):
+        import index
+
+        with patch.object(index, 'PUT_EVENTS_RETRY_BACKOFF_SECONDS', 0):
+            yield
+
+    def test_groups_entries_into_calls_of_ten(self, mock_env, mock_boto3_clients):
+        """25 actions should need three PutEvents calls."""
+        import index
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            results = index.send_notifications(self.actions(25), index.get_config())
+
+        sizes = sorted(len(c[1]['Entries']) for c in mock_boto3_clients['events'].put_events.call_args_list)
+        assert sizes == [5, 10, 10]
+        assert results['eventbridge'] == []
+
+    def test_resends_only_failed_entries(self, mock_env, mock_boto3_clients):
+        """Entries with an ErrorCode should be split out and sent again."""
+        import index
+
+        mock_events = mock_boto3_clients['events']
+        mock_events.put_events.side_effect = [
+            {'FailedEntryCount': 1, 'Entries': [
+                {'EventId': '1'}, {'ErrorCode': 'ThrottlingException'}, {'EventId': '3'},
+            ]},
+            {'FailedEntryCount': 0, 'Entries': [{'EventId': '2'}]},
+        ]
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            results = index.send_notifications(self.actions(3), index.get_config())
+
+        retried = mock_events.put_events.call_args_list[1][1]['Entries']
+        assert [json.loads(e['Detail'])['tableName'] for e in retried] == ['table-1']
+        assert results['eventbridge'] == []
+
+    def test_reports_entries_still_failing(self, mock_env, mock_boto3_clients):
+        """Should give up after PUT_EVENTS_MAX_ATTEMPTS and report the failure."""
+        import index
+
+        mock_boto3_clients['events'].put_events.return_value = {
+            'FailedEntryCount': 1, 'Entries': [{'ErrorCode': 'InternalFailure'}],
+        }
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            results = index.send_notifications(self.actions(1), index.get_config())
+
+        assert mock_boto3_clients['events'].put_events.call_count == index.PUT_EVENTS_MAX_ATTEMPTS
+        assert len(results['eventbridge']) == 1
+        assert 'not delivered' in results['eventbridge'][0]
+
+    def test_one_sns_message_per_action_by_default(self, mock_env, mock_boto3_clients):
+        """Without digest mode every action keeps its own alert."""
+        import index
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            index.send_notifications(self.actions(3), index.get_config())
+
+        assert mock_boto3_clients['sns'].publish.call_count == 3
+
+    def test_digest_mode_combines_actions_per_account(self, mock_env, mock_boto3_clients):
+        """Digest mode should send one SNS message per account."""
+        import index
+
+        actions = self.actions(3) + self.actions(1, account_id='210987654321')
+
+        with patch.dict(os.environ, {'SNS_DIGEST_MODE': 'true'}):
+            config = index.load_config()
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            index.send_notifications(actions, config)
+
+        calls = {c[1]['MessageAttributes']['accountId']['StringValue']: c[1]
+                 for c in mock_boto3_clients['sns'].publish.call_args_list}
+        assert len(calls) == 2
+        digest = calls['123456789012']
+        assert digest['Subject'] == '[COST ALERT] 3 DynamoDB On-Demand Tables Deleted in 123456789012'
+        assert digest['MessageAttributes']['tableName']['StringValue'] == 'table-0,table-1,table-2'
+        assert all(f'table-{i}' in digest['Message'] for i in range(3))
+        single = calls['210987654321']
+        assert single['Subject'] == '[COST ALERT] DynamoDB On-Demand Table Deleted: table-0'
+
+    def test_digest_marks_partial_failures(self, mock_env, mock_boto3_clients):
+        """A digest containing a failed delete should carry action DELETE_FAILED."""
+        import index
+
+        actions = self.actions(2)
+        actions[1][0]['action'] = 'DELETE_FAILED'
+
+        with patch.dict(os.environ, {'SNS_DIGEST_MODE': 'true'}):
+            config = index.load_config()
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            index.send_notifications(actions, config)
+
+        attributes = mock_boto3_clients['sns'].publish.call_args[1]['MessageAttributes']
+        assert attributes['action']['StringValue'] == 'DELETE_FAILED'
+
+    def test_batch_sends_one_put_events_call(self, mock_env, mock_boto3_clients):
+        """A batch of enforcements should share PutEvents calls."""
+        import index
+
+        events = [TestBatchHandler.event_for_table(f'table-{i}') for i in range(5)]
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            index.batch_handler(events, None)
+
+        mock_boto3_clients['events'].put_events.assert_called_once()
+        assert len(mock_boto3_clients['events'].put_events.call_args[1]['Entries']) == 5
+
+
 class TestEventBridgeEventSchema:
     """Tests to document the EventBridge event schema."""
 
@@ -345,3 +820,1112 @@ class TestEventBridgeEventSchema:
         triggered_by_fields = ['userArn', 'userType', 'principalId', 'sourceIp']
         for field in triggered_by_fields:
             assert field in event_detail['triggeredBy'], f"Missing triggeredBy field: {field}"
+
+
+class TestBatchHandler:
+    """Tests for batch_handler and SQS partial batch failure reporting."""
+
+    @staticmethod
+    def sqs_record(message_id, event):
+        return {
+            'messageId': message_id,
+            'eventSource': 'aws:sqs',
+            'body': json.dumps(event),
+        }
+
+    @staticmethod
+    def event_for_table(table_name, billing_mode='PAY_PER_REQUEST'):
+        event = SAMPLE_CLOUDTRAIL_EVENT.copy()
+        event['detail'] = SAMPLE_CLOUDTRAIL_EVENT['detail'].copy()
+        event['detail']['eventName'] = 'UpdateTable' if billing_mode is None else 'CreateTable'
+        event['detail']['requestParameters'] = {'tableName': table_name}
+        if billing_mode:
+            event['detail']['requestParameters']['billingMode'] = billing_mode
+        return event
+
+    def test_enforces_every_record_in_sqs_batch(self, mock_env, mock_boto3_clients):
+        """Should delete each On-Demand table in the batch."""
+        import index
+
+        mock_dynamodb = mock_boto3_clients['dynamodb']
+        mock_dynamodb.describe_table.return_value = {
+            'Table': {'BillingModeSummary': {'BillingMode': 'PAY_PER_REQUEST'}}
+        }
+        sqs_event = {'Records': [
+            self.sqs_record(f'msg-{i}', self.event_for_table(f'table-{i}'))
+            for i in range(5)
+        ]}
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.batch_handler(sqs_event, None)
+
+        assert result == {'batchItemFailures': []}
+        deleted = sorted(c[1]['TableName'] for c in mock_dynamodb.delete_table.call_args_list)
+        assert deleted == [f'table-{i}' for i in range(5)]
+
+    def test_reports_only_failed_records(self, mock_env, mock_boto3_clients):
+        """Should return batchItemFailures for records that raised."""
+        import index
+
+        mock_dynamodb = mock_boto3_clients['dynamodb']
+
+        def describe_table(TableName):
+            if TableName == 'table-bad':
+                raise RuntimeError('Throttled')
+            return {'Table': {'BillingModeSummary': {'BillingMode': 'PROVISIONED'}}}
+
+        mock_dynamodb.describe_table.side_effect = describe_table
+        sqs_event = {'Records': [
+            self.sqs_record('msg-ok', self.event_for_table('table-ok', billing_mode=None)),
+            self.sqs_record('msg-bad', self.event_for_table('table-bad', billing_mode=None)),
+        ]}
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.batch_handler(sqs_event, None)
+
+        assert result == {'batchItemFailures': [{'itemIdentifier': 'msg-bad'}]}
+
+    def test_reports_undecodable_record_as_failure(self, mock_env):
+        """Should report a record with a malformed body instead of dropping it."""
+        import index
+
+        sqs_event = {'Records': [
+            {'messageId': 'msg-garbage', 'eventSource': 'aws:sqs', 'body': 'not json'},
+        ]}
+
+        result = index.batch_handler(sqs_event, None)
+
+        assert result == {'batchItemFailures': [{'itemIdentifier': 'msg-garbage'}]}
+
+    def test_reports_non_object_records_as_failures(self, mock_env, mock_boto3_clients):
+        """Records that are not objects fail alone; the rest of the batch is enforced."""
+        import index
+
+        sqs_event = {'Records': [
+            'not a record',
+            {'messageId': 'msg-list', 'eventSource': 'aws:sqs', 'body': '[1, 2]'},
+            self.sqs_record('msg-ok', self.event_for_table('terraform-lock')),
+        ]}
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.batch_handler(sqs_event, None)
+            events = index.batch_handler([None, self.event_for_table('terraform-lock')], None)
+
+        assert result == {'batchItemFailures': [{'itemIdentifier': ''}, {'itemIdentifier': 'msg-list'}]}
+        assert events == {'batchItemFailures': [{'itemIdentifier': '0'}]}
+
+    def test_accepts_list_of_eventbridge_events(self, mock_env):
+        """Should accept a plain list of events."""
+        import index
+
+        events = [
+            {'id': 'evt-1', 'detail': {'requestParameters': {'tableName': 'terraform-lock'}}},
+            {'id': 'evt-2', 'detail': {'requestParameters': {}}},
+        ]
+
+        result = index.batch_handler(events, None)
+
+        assert result == {'batchItemFailures': []}
+
+    def test_lambda_handler_routes_sqs_batches(self, mock_env):
+        """Should hand SQS batches from lambda_handler to batch_handler."""
+        import index
+
+        sqs_event = {'Records': [
+            self.sqs_record('msg-1', {'detail': {'requestParameters': {}}}),
+        ]}
+
+        result = index.lambda_handler(sqs_event, None)
+
+        assert result == {'batchItemFailures': []}
+
+    def test_lambda_handler_still_raises_on_error(self, mock_env, mock_boto3_clients):
+        """Single-event path should keep raising so EventBridge retries."""
+        import index
+
+        mock_boto3_clients['dynamodb'].describe_table.side_effect = RuntimeError('boom')
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            with pytest.raises(RuntimeError):
+                index.lambda_handler(UPDATE_TABLE_EVENT, None)
+
+
+class TestClientPool:
+    """Tests for the per-(service, account, region) client pool."""
+
+    @pytest.fixture
+    def factory(self):
+        """Record client construction and hand out fresh stand-ins."""
+        import index
+
+        built = []
+        sts = MagicMock()
+        sts.assume_role.side_effect = lambda **kwargs: {'Credentials': {
+            'AccessKeyId': 'AKIA' + kwargs['RoleArn'][13:25],
+            'SecretAccessKey': 'secret',
+            'SessionToken': 'token',
+            'Expiration': datetime.now(timezone.utc) + timedelta(hours=1),
+        }}
+
+        def build(service_name, region=None, credentials=None):
+            built.append((service_name, region, credentials))
+            return sts if service_name == 'sts' else MagicMock(name=service_name)
+
+        index.set_client_factory(build)
+        yield {'built': built, 'sts': sts}
+        index.set_client_factory(None)
+
+    @pytest.fixture
+    def cross_account_env(self, mock_env):
+        import index
+
+        with patch.dict(os.environ, {
+            'SANDBOX_ROLE_NAME': 'EnforcerRole',
+            'HUB_ACCOUNT_ID': '999999999999',
+        }):
+            index.reset_config()
+            yield
+
+    def test_reuses_clients_across_calls(self, mock_env, factory):
+        """Should build a client once per (service, account, region)."""
+        import index
+
+        first = index.get_boto3_client('dynamodb', '123456789012', 'us-west-2')
+        second = index.get_boto3_client('dynamodb', '123456789012', 'us-west-2')
+
+        assert first is second
+        assert len(factory['built']) == 1
+
+    def test_uses_event_region(self, mock_env, factory):
+        """Should build separate clients per region."""
+        import index
+
+        index.get_boto3_client('dynamodb', '123456789012', 'us-west-2')
+        index.get_boto3_client('dynamodb', '123456789012', 'us-east-1')
+
+        assert [b[1] for b in factory['built']] == ['us-west-2', 'us-east-1']
+
+    def test_hub_credentials_without_role(self, mock_env, factory):
+        """Should not call STS when no sandbox role is configured."""
+        import index
+
+        index.get_boto3_client('dynamodb', '123456789012', 'us-west-2')
+
+        factory['sts'].assume_role.assert_not_called()
+        assert factory['built'][0][2] is None
+
+    def test_assumes_sandbox_role(self, cross_account_env, factory):
+        """Should assume the sandbox role and build the client with its credentials."""
+        import index
+
+        index.get_boto3_client('dynamodb', '123456789012', 'us-west-2')
+
+        factory['sts'].assume_role.assert_called_once()
+        assert factory['sts'].assume_role.call_args[1]['RoleArn'] == \
+            'arn:aws:iam::123456789012:role/EnforcerRole'
+        assert factory['built'][-1][2]['SessionToken'] == 'token'
+
+    def test_caches_credentials_per_account(self, cross_account_env, factory):
+        """Should reuse assumed credentials for other services in the same account."""
+        import index
+
+        index.get_boto3_client('dynamodb', '123456789012', 'us-west-2')
+        index.get_boto3_client('dynamodb', '123456789012', 'us-east-1')
+        index.get_boto3_client('dynamodb', '210987654321', 'us-west-2')
+
+        assert factory['sts'].assume_role.call_count == 2
+
+    def test_refreshes_credentials_near_expiry(self, cross_account_env, factory):
+        """Should re-assume the role and rebuild clients once credentials near expiry."""
+        import index
+
+        first = index.get_boto3_client('dynamodb', '123456789012', 'us-west-2')
+        for cached in index._CREDENTIALS_CACHE.values():
+            cached['Expiration'] = datetime.now(timezone.utc) + timedelta(minutes=1)
+        index._CLIENT_POOL[('dynamodb', '123456789012', 'us-west-2')] = (
+            first, datetime.now(timezone.utc) + timedelta(minutes=1))
+
+        second = index.get_boto3_client('dynamodb', '123456789012', 'us-west-2')
+
+        assert second is not first
+        assert factory['sts'].assume_role.call_count == 2
+
+    def test_hub_account_events_use_hub_credentials(self, cross_account_env, factory):
+        """Should not assume a role into the hub account itself."""
+        import index
+
+        index.get_boto3_client('dynamodb', '999999999999', 'us-west-2')
+
+        factory['sts'].assume_role.assert_not_called()
+
+
+class TestIdempotency:
+    """Tests for duplicate and stale event suppression in the handler."""
+
+    @staticmethod
+    def with_event_id(event, event_id='cloudtrail-event-1'):
+        return {**event, 'detail': {**event['detail'], 'eventID': event_id}}
+
+    def test_redelivered_event_is_skipped(self, mock_env, mock_boto3_clients):
+        """A second delivery of the same CloudTrail eventID should not repeat work."""
+        import index
+
+        event = self.with_event_id(UPDATE_TABLE_EVENT)
+        mock_boto3_clients['dynamodb'].describe_table.return_value = {
+            'Table': {'BillingModeSummary': {'BillingMode': 'PROVISIONED'}}
+        }
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            index.lambda_handler(event, None)
+            result = index.lambda_handler(event, None)
+
+        assert result['decision'] == 'duplicate'
+        mock_boto3_clients['dynamodb'].describe_table.assert_called_once()
+
+    def test_failed_event_can_be_retried(self, mock_env, mock_boto3_clients):
+        """A claim should be released when enforcement raises, so the retry runs."""
+        import index
+
+        event = self.with_event_id(UPDATE_TABLE_EVENT)
+        mock_boto3_clients['dynamodb'].describe_table.side_effect = [
+            Exception('Throttled'),
+            {'Table': {'BillingModeSummary': {'BillingMode': 'PROVISIONED'}}},
+        ]
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            with pytest.raises(Exception, match='Throttled'):
+                index.lambda_handler(event, None)
+            result = index.lambda_handler(event, None)
+
+        assert result['decision'] == 'provisioned'
+
+    def test_update_before_deletion_is_skipped(self, mock_env, mock_boto3_clients):
+        """UpdateTable that happened before we deleted the table should not describe it again."""
+        import index
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            index.lambda_handler(self.with_event_id(SAMPLE_CLOUDTRAIL_EVENT, 'create'), None)
+            result = index.lambda_handler(self.with_event_id(UPDATE_TABLE_EVENT, 'update'), None)
+
+        assert result['decision'] == 'already_enforced'
+        mock_boto3_clients['dynamodb'].describe_table.assert_not_called()
+        mock_boto3_clients['sns'].publish.assert_called_once()
+
+    def test_table_recreated_after_deletion_is_enforced(self, mock_env, mock_boto3_clients):
+        """A CreateTable after our deletion must be enforced again."""
+        import index
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            index.lambda_handler(self.with_event_id(SAMPLE_CLOUDTRAIL_EVENT, 'create'), None)
+            recreated = self.with_event_id(SAMPLE_CLOUDTRAIL_EVENT, 'recreate')
+            recreated['detail']['eventTime'] = (datetime.now(timezone.utc) + timedelta(seconds=1)).isoformat()
+            result = index.lambda_handler(recreated, None)
+
+        assert result['decision'] == 'deleted'
+        assert mock_boto3_clients['dynamodb'].delete_table.call_count == 2
+
+    def test_store_errors_fail_open(self, mock_env, mock_boto3_clients):
+        """If the idempotency backend is down, events should still be enforced."""
+        import index
+
+        backend = MagicMock()
+        backend.put_if_absent.side_effect = Exception('ServiceUnavailable')
+        backend.get.side_effect = Exception('ServiceUnavailable')
+        index.get_idempotency_store().backend = backend
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.lambda_handler(self.with_event_id(SAMPLE_CLOUDTRAIL_EVENT), None)
+
+        assert result['decision'] == 'deleted'
+
+    def test_file_backend_from_config(self, mock_env, tmp_path):
+        """IDEMPOTENCY_FILE should select the file-backed store."""
+        import index
+        from idempotency import FileBackend
+
+        with patch.dict(os.environ, {'IDEMPOTENCY_FILE': str(tmp_path / 'store.json')}):
+            index.reset_config()
+            store = index.get_idempotency_store()
+
+        assert isinstance(store.backend, FileBackend)
+
+
+class TestDryRun:
+    """Tests for DRY_RUN, which decides without remediating or notifying."""
+
+    @pytest.fixture
+    def dry_run(self, mock_env):
+        with patch.dict(os.environ, {'DRY_RUN': 'true'}):
+            import index
+            index.reset_config()
+            yield index
+
+    def test_on_demand_table_would_be_deleted(self, dry_run, mock_boto3_clients):
+        """The decision is reported, but nothing is deleted, broadcast or published."""
+        with patch.object(dry_run, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = dry_run.lambda_handler(SAMPLE_CLOUDTRAIL_EVENT, None)
+
+        assert result['decision'] == 'would_delete'
+        mock_boto3_clients['dynamodb'].delete_table.assert_not_called()
+        mock_boto3_clients['events'].put_events.assert_not_called()
+        mock_boto3_clients['sns'].publish.assert_not_called()
+
+    def test_exemptions_and_lookups_still_run(self, dry_run, mock_boto3_clients):
+        """Exemptions and DescribeTable behave exactly as when enforcing."""
+        exempt = {**SAMPLE_CLOUDTRAIL_EVENT, 'detail': {
+            **SAMPLE_CLOUDTRAIL_EVENT['detail'], 'requestParameters': {'tableName': 'terraform-state'}}}
+        mock_boto3_clients['dynamodb'].describe_table.return_value = {
+            'Table': {'BillingModeSummary': {'BillingMode': 'PAY_PER_REQUEST'}}
+        }
+
+        with patch.object(dry_run, 'get_boto3_client', mock_boto3_clients['get_client']):
+            assert dry_run.lambda_handler(exempt, None)['decision'] == 'exempt'
+            assert dry_run.lambda_handler(UPDATE_TABLE_EVENT, None)['decision'] == 'would_delete'
+
+        mock_boto3_clients['dynamodb'].describe_table.assert_called_once()
+
+    def test_idempotency_backend_is_not_used(self, dry_run, tmp_path):
+        """A shadow deployment must not mark events as handled for the real enforcer."""
+        with patch.dict(os.environ, {'IDEMPOTENCY_FILE': str(tmp_path / 'store.json')}):
+            dry_run.reset_config()
+            store = dry_run.get_idempotency_store()
+
+        assert store.backend is None
+
+
+class TestDeferredRetry:
+    """Tests for re-enqueueing deletes of tables that are still CREATING."""
+
+    @staticmethod
+    def resource_in_use():
+        from botocore.exceptions import ClientError
+        return ClientError(
+            {'Error': {'Code': 'ResourceInUseException', 'Message': 'Table is being created'}},
+            'DeleteTable',
+        )
+
+    @pytest.fixture
+    def scheduler(self, mock_env):
+        import index
+        from deferred_retry import LocalRetryScheduler
+
+        scheduler = LocalRetryScheduler()
+        with patch.dict(os.environ, {'RETRY_MAX_ATTEMPTS': '3', 'RETRY_BASE_DELAY_SECONDS': '30'}):
+            index.reset_config()
+            index.get_config()
+        index.set_retry_scheduler(scheduler)
+        yield scheduler
+        index.set_retry_scheduler(None)
+
+    def test_creating_table_is_retried_without_notifying(self, scheduler, mock_boto3_clients):
+        """ResourceInUseException should schedule a retry and send nothing yet."""
+        import index
+
+        mock_boto3_clients['dynamodb'].delete_table.side_effect = self.resource_in_use()
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.lambda_handler(SAMPLE_CLOUDTRAIL_EVENT, None)
+
+        assert result['decision'] == 'retry_scheduled'
+        [(_, delay, event)] = scheduler.scheduled
+        assert delay == 30
+        assert event['enforcerRetry'] == {'attempt': 1}
+        mock_boto3_clients['events'].put_events.assert_not_called()
+        mock_boto3_clients['sns'].publish.assert_not_called()
+
+    def test_retry_deletes_once_table_is_active(self, scheduler, mock_boto3_clients):
+        """The retried event should re-check the table and report DELETED."""
+        import index
+
+        dynamodb = mock_boto3_clients['dynamodb']
+        dynamodb.delete_table.side_effect = [self.resource_in_use(), {}]
+        dynamodb.describe_table.return_value = {
+            'Table': {'TableStatus': 'ACTIVE', 'BillingModeSummary': {'BillingMode': 'PAY_PER_REQUEST'}}
+        }
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            index.lambda_handler(SAMPLE_CLOUDTRAIL_EVENT, None)
+            [retry] = scheduler.due(float('inf'))
+            result = index.lambda_handler(retry, None)
+
+        assert result['decision'] == 'deleted'
+        dynamodb.describe_table.assert_called_once()
+        detail = json.loads(mock_boto3_clients['events'].put_events.call_args[1]['Entries'][0]['Detail'])
+        assert detail['action'] == 'DELETED'
+
+    def test_backoff_grows_and_last_attempt_fails(self, scheduler, mock_boto3_clients):
+        """Delays should double per attempt and only the final attempt report DELETE_FAILED."""
+        import index
+
+        dynamodb = mock_boto3_clients['dynamodb']
+        dynamodb.delete_table.side_effect = self.resource_in_use()
+        dynamodb.describe_table.return_value = {
+            'Table': {'BillingModeSummary': {'BillingMode': 'PAY_PER_REQUEST'}}
+        }
+        delays = []
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.lambda_handler(SAMPLE_CLOUDTRAIL_EVENT, None)
+            while scheduler.scheduled:
+                delays.append(scheduler.scheduled[0][1])
+                [retry] = scheduler.due(float('inf'))
+                result = index.lambda_handler(retry, None)
+
+        assert delays == [30, 60]
+        assert result['decision'] == 'delete_failed'
+        assert 'after 3 attempts' in result['body']
+        mock_boto3_clients['sns'].publish.assert_called_once()
+
+    def test_retry_is_not_a_duplicate_of_the_original(self, scheduler, mock_boto3_clients):
+        """A retry shares the CloudTrail eventID but must not be suppressed as a redelivery."""
+        import index
+
+        event = {**SAMPLE_CLOUDTRAIL_EVENT,
+                 'detail': {**SAMPLE_CLOUDTRAIL_EVENT['detail'], 'eventID': 'cloudtrail-event-1'}}
+        dynamodb = mock_boto3_clients['dynamodb']
+        dynamodb.delete_table.side_effect = [self.resource_in_use(), {}]
+        dynamodb.describe_table.return_value = {
+            'Table': {'BillingModeSummary': {'BillingMode': 'PAY_PER_REQUEST'}}
+        }
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            index.lambda_handler(event, None)
+            [retry] = scheduler.due(float('inf'))
+            assert index.lambda_handler(retry, None)['decision'] == 'deleted'
+            assert index.lambda_handler(retry, None)['decision'] == 'duplicate'
+
+    def test_other_errors_fail_immediately(self, scheduler, mock_boto3_clients):
+        """Non-transient errors (e.g. AccessDenied) should not be retried."""
+        import index
+
+        mock_boto3_clients['dynamodb'].delete_table.side_effect = Exception('AccessDenied')
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.lambda_handler(SAMPLE_CLOUDTRAIL_EVENT, None)
+
+        assert result['decision'] == 'delete_failed'
+        assert not scheduler.scheduled
+
+    def test_without_retry_queue_fails_immediately(self, mock_env, mock_boto3_clients):
+        """With no RETRY_QUEUE_URL the previous DELETE_FAILED behaviour is kept."""
+        import index
+
+        mock_boto3_clients['dynamodb'].delete_table.side_effect = self.resource_in_use()
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.lambda_handler(SAMPLE_CLOUDTRAIL_EVENT, None)
+
+        assert result['decision'] == 'delete_failed'
+
+    def test_sqs_scheduler_sends_delayed_message(self):
+        """SQSRetryScheduler should enqueue the event with DelaySeconds."""
+        from deferred_retry import SQSRetryScheduler
+
+        sqs = MagicMock()
+        SQSRetryScheduler('https://sqs.example/retry', lambda: sqs).schedule({'id': 'e'}, 120)
+
+        sqs.send_message.assert_called_once_with(
+            QueueUrl='https://sqs.example/retry', MessageBody='{"id": "e"}', DelaySeconds=120)
+
+    def test_backoff_is_capped_at_sqs_maximum(self):
+        """Delays should never exceed the 15 minute SQS DelaySeconds limit."""
+        from deferred_retry import backoff_delay
+
+        assert [backoff_delay(n, 30) for n in (1, 2, 5, 10)] == [30, 60, 480, 900]
+
+
+class TestRunawayAccounts:
+    """Tests for per-account rate limiting and the circuit breaker."""
+
+    @staticmethod
+    def event_for_table(table_name, account_id='123456789012'):
+        event = {**SAMPLE_CLOUDTRAIL_EVENT, 'id': f'event-{table_name}', 'account': account_id}
+        event['detail'] = {
+            **SAMPLE_CLOUDTRAIL_EVENT['detail'],
+            'recipientAccountId': account_id,
+            'requestParameters': {'tableName': table_name, 'billingMode': 'PAY_PER_REQUEST'},
+        }
+        return event
+
+    @staticmethod
+    def configure(**env):
+        import index
+        with patch.dict(os.environ, env):
+            index.reset_config()
+            index.get_config()
+
+    def test_rate_limited_account_is_deferred(self, mock_env, mock_boto3_clients):
+        """Events beyond the burst are deferred, other accounts are still enforced."""
+        import index
+        from deferred_retry import LocalRetryScheduler
+
+        self.configure(ACCOUNT_RATE_PER_MINUTE='1', ACCOUNT_BURST='2', THROTTLE_DELAY_SECONDS='120')
+        scheduler = LocalRetryScheduler()
+        index.set_retry_scheduler(scheduler)
+        items = [(f'msg-{i}', self.event_for_table(f'loop-{i}')) for i in range(4)]
+        items.append(('other', self.event_for_table('other', account_id='210987654321')))
+
+        try:
+            with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+                outcomes = index.process_events(items, index.get_config())
+                decisions = [outcome['decision'] for _, outcome in outcomes]
+                [(_, delay, first), _] = scheduler.scheduled
+                # A deferred event is admitted when it comes back
+                assert index.lambda_handler(first, None)['decision'] == 'deleted'
+        finally:
+            index.set_retry_scheduler(None)
+
+        assert [item_id for item_id, _ in outcomes] == [item_id for item_id, _ in items]
+        assert decisions == ['deleted', 'deleted', 'throttled', 'throttled', 'deleted']
+        assert delay == 120
+
+    def test_without_retry_queue_throttled_events_run_last(self, mock_env, mock_boto3_clients):
+        import index
+
+        self.configure(ACCOUNT_RATE_PER_MINUTE='1', ACCOUNT_BURST='1', BATCH_MAX_WORKERS='1')
+        items = [('a', self.event_for_table('loop-a')), ('b', self.event_for_table('loop-b')),
+                 ('c', self.event_for_table('other', account_id='210987654321'))]
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            outcomes = index.process_events(items, index.get_config())
+
+        assert [outcome['decision'] for _, outcome in outcomes] == ['deleted'] * 3
+        deleted = [c[1]['TableName'] for c in mock_boto3_clients['dynamodb'].delete_table.call_args_list]
+        assert deleted == ['loop-a', 'other', 'loop-b']
+
+    def test_exempt_and_duplicate_events_take_no_token(self, mock_env):
+        """Only events that need enforcing count against the account's rate limit."""
+        import index
+        from deferred_retry import LocalRetryScheduler
+
+        self.configure(ACCOUNT_RATE_PER_MINUTE='1', ACCOUNT_BURST='1')
+        index.set_retry_scheduler(LocalRetryScheduler())
+        duplicate = self.event_for_table('loop-a')
+        duplicate['detail']['eventID'] = 'seen-before'
+        index.idempotency_call('claim_event', True, 'seen-before')
+        items = [('exempt', self.event_for_table('terraform-lock')), ('duplicate', duplicate),
+                 ('b', self.event_for_table('loop-b')), ('c', self.event_for_table('loop-c'))]
+
+        try:
+            order, deferred = index.admit_events(items, index.get_config())
+        finally:
+            index.set_retry_scheduler(None)
+
+        assert order == [0, 1, 2]
+        assert list(deferred) == [3]
+
+    def test_breaker_escalates_once_then_suppresses_sns(self, mock_env, mock_boto3_clients):
+        """The threshold-th violation sends one escalated alert; later ones only go to EventBridge."""
+        import index
+
+        self.configure(BREAKER_THRESHOLD='3')
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            for i in range(5):
+                index.lambda_handler(self.event_for_table(f'loop-{i}'), None)
+
+        subjects = [c[1]['Subject'] for c in mock_boto3_clients['sns'].publish.call_args_list]
+        assert subjects == [
+            '[COST ALERT] DynamoDB On-Demand Table Deleted: loop-0',
+            '[COST ALERT] DynamoDB On-Demand Table Deleted: loop-1',
+            '[COST ALERT] ESCALATED: repeated DynamoDB On-Demand Tables in 123456789012',
+        ]
+        assert mock_boto3_clients['dynamodb'].delete_table.call_count == 5
+        details = [json.loads(c[1]['Entries'][0]['Detail'])
+                   for c in mock_boto3_clients['events'].put_events.call_args_list]
+        assert [d.get('circuitBreaker') for d in details] == [None, None, 'OPENED', 'OPEN', 'OPEN']
+
+    def test_guard_errors_fail_open(self, mock_env, mock_boto3_clients):
+        import index
+
+        with patch.object(index.AccountGuard, 'record_violation', side_effect=Exception('table down')):
+            with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+                result = index.lambda_handler(SAMPLE_CLOUDTRAIL_EVENT, None)
+
+        assert result['decision'] == 'deleted'
+        mock_boto3_clients['sns'].publish.assert_called_once()
+
+
+class TestPolicyReload:
+    """Tests for exemptions and rules loaded from a hot-reloadable policy source."""
+
+    @pytest.fixture
+    def source(self, mock_env):
+        import index
+        from policy import LocalPolicySource
+
+        source = LocalPolicySource({'exempt_table_prefixes': ['test-']})
+        index.set_policy_source(source)
+        index.reset_config()
+        yield source
+        index.set_policy_source(None)
+
+    @staticmethod
+    def expire(index):
+        """Move the policy cache's clock past its TTL."""
+        index._POLICY._checked_at -= index.get_config()['policy_ttl_seconds']
+
+    def test_policy_overrides_environment(self, source, mock_boto3_clients):
+        """test-table is exempt by policy, though EXEMPT_TABLE_PREFIXES does not cover it."""
+        import index
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.lambda_handler(SAMPLE_CLOUDTRAIL_EVENT, None)
+
+        assert result['decision'] == 'exempt'
+        # Settings the policy leaves out keep their environment value
+        assert index.get_config()['sns_topic_arn'] == 'arn:aws:sns:us-west-2:123456789012:test-topic'
+
+    def test_new_version_applies_after_ttl(self, source, mock_boto3_clients):
+        import index
+
+        config = index.get_config()
+        source.publish({'exempt_table_prefixes': []})
+
+        assert index.get_config() is config
+        self.expire(index)
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.lambda_handler(SAMPLE_CLOUDTRAIL_EVENT, None)
+
+        assert result['decision'] == 'deleted'
+        assert source.fetches == 2
+
+    def test_unchanged_version_keeps_config_object(self, source):
+        import index
+
+        config = index.get_config()
+        self.expire(index)
+
+        assert index.get_config() is config
+
+    def test_invalid_policy_keeps_last_good_config(self, source):
+        import index
+
+        config = index.get_config()
+        source.publish({'enforced_rules': ['no-such-rule']})
+        self.expire(index)
+
+        assert index.get_config() is config
+
+    def test_rule_not_deployed_keeps_last_good_config(self, source):
+        """A rule outside ENFORCED_RULES has no EventBridge trigger or IAM permissions."""
+        import index
+
+        config = index.get_config()
+        source.publish({'enforced_rules': ['dynamodb-on-demand', 'kinesis-on-demand']})
+        self.expire(index)
+
+        assert index.get_config() is config
+        assert [rule.name for rule in config['rules'].rules] == ['dynamodb-on-demand']
+
+    def test_policy_can_disable_a_deployed_rule(self, source):
+        import index
+
+        with patch.dict(os.environ, {'ENFORCED_RULES': 'dynamodb-on-demand,kinesis-on-demand'}):
+            index.get_config()
+            source.publish({'enforced_rules': ['kinesis-on-demand']})
+            self.expire(index)
+
+            assert [rule.name for rule in index.get_config()['rules'].rules] == ['kinesis-on-demand']
+
+    def test_unavailable_source_falls_back_to_environment(self, mock_env):
+        import index
+        from policy import LocalPolicySource
+
+        index.set_policy_source(LocalPolicySource())
+        try:
+            index.reset_config()
+            assert index.get_config()['exemptions'].match('terraform-state', '123456789012')
+        finally:
+            index.set_policy_source(None)
+
+    def test_ssm_parameter_source(self, mock_env):
+        """POLICY_PARAMETER reads the document through the hub-account SSM client."""
+        import index
+
+        ssm = MagicMock()
+        ssm.get_parameter.return_value = {
+            'Parameter': {'Version': 1, 'Value': json.dumps({'sns_digest_mode': True})}
+        }
+        with patch.dict(os.environ, {'POLICY_PARAMETER': '/ndx/dynamodb-billing-enforcer/policy'}):
+            index.reset_config()
+            with patch.object(index, 'get_boto3_client', lambda service, *args: ssm):
+                config = index.get_config()
+
+        assert config['sns_digest']
+        ssm.get_parameter.assert_called_once()
+
+
+class TestMetrics:
+    """Tests for the EMF metrics written by the handler."""
+
+    @staticmethod
+    def emf_documents(capsys):
+        lines = capsys.readouterr().out.splitlines()
+        return [r for r in map(json.loads, lines) if '_aws' in r]
+
+    def test_deleted_event_emits_outcome_and_phase_timers(self, mock_env, mock_boto3_clients, capsys):
+        """Outcome counters and DeleteTable latency should carry account and region dimensions."""
+        import index
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            index.lambda_handler(SAMPLE_CLOUDTRAIL_EVENT, None)
+
+        documents = self.emf_documents(capsys)
+        [per_table] = [d for d in documents if d.get('AccountId') == '123456789012']
+        assert per_table['Region'] == 'us-west-2'
+        assert per_table['Deleted'] == 1
+        assert per_table['DeleteTableLatency'] >= 0
+        [shared] = [d for d in documents if 'AccountId' not in d]
+        assert {'EnforceLatency', 'PutEventsLatency', 'SNSPublishLatency'} <= set(shared)
+
+    def test_notify_failures_are_counted(self, mock_env, mock_boto3_clients, capsys):
+        """Each failed notification channel should increment NotifyFailed."""
+        import index
+
+        mock_boto3_clients['sns'].publish.side_effect = Exception('SNS down')
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            index.lambda_handler(SAMPLE_CLOUDTRAIL_EVENT, None)
+
+        [failed] = [d for d in self.emf_documents(capsys) if 'NotifyFailed' in d]
+        assert failed['Channel'] == 'sns'
+
+    def test_metrics_can_be_disabled(self, mock_env, mock_boto3_clients, capsys):
+        """METRICS_ENABLED=false should write no EMF lines."""
+        import index
+
+        with patch.dict(os.environ, {'METRICS_ENABLED': 'false'}):
+            index.reset_config()
+            with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+                index.lambda_handler(SAMPLE_CLOUDTRAIL_EVENT, None)
+
+        assert self.emf_documents(capsys) == []
+
+
+def api_call_event(event_source, event_name, request_params):
+    """SAMPLE_CLOUDTRAIL_EVENT recast as another service's API call."""
+    return {**SAMPLE_CLOUDTRAIL_EVENT, 'detail': {
+        **SAMPLE_CLOUDTRAIL_EVENT['detail'],
+        'eventSource': event_source,
+        'eventName': event_name,
+        'requestParameters': request_params,
+    }}
+
+
+class TestRuleDispatch:
+    """Tests for enforcing Kinesis and Lambda rules through the same handler."""
+
+    @pytest.fixture(autouse=True)
+    def all_rules(self, mock_env):
+        """The Kinesis and Lambda rules are opt-in; enable every rule."""
+        import index
+        from rules import RULE_NAMES
+
+        with patch.dict(os.environ, {'ENFORCED_RULES': ','.join(RULE_NAMES)}):
+            index.reset_config()
+            yield
+
+    def test_deletes_on_demand_kinesis_stream(self, mock_env, mock_boto3_clients):
+        """CreateStream in ON_DEMAND mode should delete the stream and notify."""
+        import index
+
+        event = api_call_event('kinesis.amazonaws.com', 'CreateStream', {
+            'streamName': 'clicks', 'streamModeDetails': {'streamMode': 'ON_DEMAND'},
+        })
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.lambda_handler(event, None)
+
+        assert result['decision'] == 'deleted'
+        mock_boto3_clients['kinesis'].delete_stream.assert_called_once_with(
+            StreamName='clicks', EnforceConsumerDeletion=True)
+        mock_boto3_clients['dynamodb'].delete_table.assert_not_called()
+        entry = mock_boto3_clients['events'].put_events.call_args.kwargs['Entries'][0]
+        assert entry['DetailType'] == 'Kinesis On-Demand Stream Deleted'
+        assert json.loads(entry['Detail'])['streamName'] == 'clicks'
+        publish = mock_boto3_clients['sns'].publish.call_args.kwargs
+        assert publish['Subject'] == '[COST ALERT] Kinesis On-Demand Stream Deleted: clicks'
+        assert publish['MessageAttributes']['resourceType']['StringValue'] == 'AWS::Kinesis::Stream'
+
+    def test_update_stream_mode_describes_stream(self, mock_env, mock_boto3_clients):
+        """UpdateStreamMode names the stream by ARN; a PROVISIONED stream is left alone."""
+        import index
+
+        mock_boto3_clients['kinesis'].describe_stream_summary.return_value = {
+            'StreamDescriptionSummary': {'StreamModeDetails': {'StreamMode': 'PROVISIONED'}}}
+        event = api_call_event('kinesis.amazonaws.com', 'UpdateStreamMode', {
+            'streamARN': 'arn:aws:kinesis:us-west-2:123456789012:stream/clicks',
+        })
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.lambda_handler(event, None)
+
+        assert result['decision'] == 'provisioned'
+        mock_boto3_clients['kinesis'].describe_stream_summary.assert_called_once_with(StreamName='clicks')
+
+    def test_decision_path_names_the_rules_lookup(self, mock_env, mock_boto3_clients):
+        """A Kinesis lookup is counted under its own API call, not describe_table."""
+        import index
+
+        mock_boto3_clients['kinesis'].describe_stream_summary.return_value = {
+            'StreamDescriptionSummary': {'StreamModeDetails': {'StreamMode': 'PROVISIONED'}}}
+        event = api_call_event('kinesis.amazonaws.com', 'UpdateStreamMode', {
+            'streamARN': 'arn:aws:kinesis:us-west-2:123456789012:stream/clicks',
+        })
+        before = dict(index.DECISION_PATH_COUNTS)
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            index.lambda_handler(event, None)
+
+        assert index.DECISION_PATH_COUNTS['describe_stream_summary'] == before.get('describe_stream_summary', 0) + 1
+        assert index.DECISION_PATH_COUNTS['describe_table'] == before.get('describe_table', 0)
+
+    def test_removes_provisioned_concurrency_above_limit(self, mock_env, mock_boto3_clients):
+        """PutProvisionedConcurrencyConfig above MAX_PROVISIONED_CONCURRENCY should be removed."""
+        import index
+
+        event = api_call_event('lambda.amazonaws.com', 'PutProvisionedConcurrencyConfig20190930', {
+            'functionName': 'api', 'qualifier': 'live', 'provisionedConcurrentExecutions': 50,
+        })
+
+        with patch.dict(os.environ, {'MAX_PROVISIONED_CONCURRENCY': '10'}):
+            index.reset_config()
+            with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+                result = index.lambda_handler(event, None)
+                within = index.lambda_handler(api_call_event(
+                    'lambda.amazonaws.com', 'PutProvisionedConcurrencyConfig',
+                    {'functionName': 'api', 'qualifier': 'canary', 'provisionedConcurrentExecutions': 5},
+                ), None)
+
+        assert result['decision'] == 'deleted'
+        assert 'PROVISIONED CONCURRENCY REMOVED' in result['body']
+        mock_boto3_clients['lambda'].delete_provisioned_concurrency_config.assert_called_once_with(
+            FunctionName='api', Qualifier='live')
+        assert within['decision'] == 'within_limit'
+
+    def test_exemptions_apply_to_every_rule(self, mock_env, mock_boto3_clients):
+        """Exemption prefixes should match stream and function names too."""
+        import index
+
+        event = api_call_event('kinesis.amazonaws.com', 'CreateStream', {
+            'streamName': 'terraform-audit', 'streamModeDetails': {'streamMode': 'ON_DEMAND'},
+        })
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.lambda_handler(event, None)
+
+        assert result['decision'] == 'exempt'
+        mock_boto3_clients['kinesis'].delete_stream.assert_not_called()
+
+    def test_disabled_rule_is_not_dispatched(self, mock_env, mock_boto3_clients):
+        """Events for rules left out of ENFORCED_RULES should be ignored."""
+        import index
+
+        event = api_call_event('kinesis.amazonaws.com', 'CreateStream', {
+            'streamName': 'clicks', 'streamModeDetails': {'streamMode': 'ON_DEMAND'},
+        })
+
+        with patch.dict(os.environ, {'ENFORCED_RULES': 'dynamodb-on-demand'}):
+            index.reset_config()
+            with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+                result = index.lambda_handler(event, None)
+
+        assert result['decision'] == 'no_rule'
+        mock_boto3_clients['kinesis'].delete_stream.assert_not_called()
+
+    def test_only_dynamodb_rule_by_default(self, mock_env):
+        """Without ENFORCED_RULES the rules that delete other resources stay off."""
+        import index
+
+        with patch.dict(os.environ):
+            del os.environ['ENFORCED_RULES']
+            config = index.load_config()
+
+        assert [rule.name for rule in config['rules'].rules] == ['dynamodb-on-demand']
+
+    def test_batch_digest_is_sent_per_rule(self, mock_env, mock_boto3_clients):
+        """A digest should not mix tables and streams from the same account."""
+        import index
+
+        events = [
+            api_call_event('dynamodb.amazonaws.com', 'CreateTable',
+                           {'tableName': f'table-{i}', 'billingMode': 'PAY_PER_REQUEST'})
+            for i in range(2)
+        ] + [
+            api_call_event('kinesis.amazonaws.com', 'CreateStream',
+                           {'streamName': f'stream-{i}', 'streamModeDetails': {'streamMode': 'ON_DEMAND'}})
+            for i in range(2)
+        ]
+
+        with patch.dict(os.environ, {'SNS_DIGEST_MODE': 'true'}):
+            index.reset_config()
+            with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+                index.batch_handler(events, None)
+
+        subjects = sorted(c.kwargs['Subject'] for c in mock_boto3_clients['sns'].publish.call_args_list)
+        assert subjects == [
+            '[COST ALERT] 2 DynamoDB On-Demand Tables Deleted in 123456789012',
+            '[COST ALERT] 2 Kinesis On-Demand Streams Deleted in 123456789012',
+        ]
+
+
+class TestTagExemptions:
+    """Tests for exempting resources by tag."""
+
+    @staticmethod
+    def configure(**env):
+        import index
+        with patch.dict(os.environ, env):
+            index.reset_config()
+            index.get_config()
+
+    @staticmethod
+    def create_event(tags=None):
+        request_params = {'tableName': 'scenario-orders', 'billingMode': 'PAY_PER_REQUEST'}
+        if tags is not None:
+            request_params['tags'] = [{'key': key, 'value': value} for key, value in tags.items()]
+        return {**SAMPLE_CLOUDTRAIL_EVENT,
+                'detail': {**SAMPLE_CLOUDTRAIL_EVENT['detail'], 'requestParameters': request_params}}
+
+    @staticmethod
+    def update_event(event_id='update-event'):
+        return {**UPDATE_TABLE_EVENT, 'detail': {
+            **UPDATE_TABLE_EVENT['detail'], 'eventID': event_id,
+            'requestParameters': {'tableName': 'scenario-orders'}}}
+
+    def test_tags_in_request_exempt_without_lookup(self, mock_env, mock_boto3_clients):
+        """CreateTable tags are used directly and cached for the table's later events."""
+        import index
+
+        self.configure(EXEMPT_TAGS='ndx:billing-exempt=true')
+        dynamodb = mock_boto3_clients['dynamodb']
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            created = index.lambda_handler(self.create_event({'ndx:billing-exempt': 'true'}), None)
+            updated = index.lambda_handler(self.update_event(), None)
+
+        assert created['decision'] == 'exempt'
+        assert updated['decision'] == 'exempt'
+        dynamodb.list_tags_of_resource.assert_not_called()
+        dynamodb.delete_table.assert_not_called()
+
+    def test_untagged_create_is_enforced(self, mock_env, mock_boto3_clients):
+        """A CreateTable without tags made an untagged table: no lookup needed."""
+        import index
+
+        self.configure(EXEMPT_TAGS='ndx:billing-exempt=true')
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.lambda_handler(self.create_event(), None)
+
+        assert result['decision'] == 'deleted'
+        mock_boto3_clients['dynamodb'].list_tags_of_resource.assert_not_called()
+
+    def test_cache_miss_looks_up_tags_once(self, mock_env, mock_boto3_clients):
+        """Events without tags look them up by table ARN, then use the cache."""
+        import index
+
+        self.configure(EXEMPT_TAGS='ndx:billing-exempt=true')
+        dynamodb = mock_boto3_clients['dynamodb']
+        dynamodb.list_tags_of_resource.return_value = {'Tags': [{'Key': 'ndx:billing-exempt', 'Value': 'true'}]}
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            first = index.lambda_handler(self.update_event('first'), None)
+            second = index.lambda_handler(self.update_event('second'), None)
+
+        assert (first['decision'], second['decision']) == ('exempt', 'exempt')
+        dynamodb.list_tags_of_resource.assert_called_once_with(
+            ResourceArn='arn:aws:dynamodb:us-west-2:123456789012:table/scenario-orders')
+
+    @staticmethod
+    def install_scheduler():
+        """A local retry queue, until mock_env resets the config."""
+        import index
+        from deferred_retry import LocalRetryScheduler
+
+        scheduler = LocalRetryScheduler()
+        index.set_retry_scheduler(scheduler)
+        return scheduler
+
+    def test_slow_lookup_is_retried(self, mock_env, mock_boto3_clients, capsys):
+        """A lookup over TAG_LOOKUP_TIMEOUT_MS is not waited for, and not guessed at either."""
+        import index
+
+        self.configure(EXEMPT_TAGS='ndx:billing-exempt=true', TAG_LOOKUP_TIMEOUT_MS='10')
+        scheduler = self.install_scheduler()
+        release = threading.Event()
+        dynamodb = mock_boto3_clients['dynamodb']
+        dynamodb.list_tags_of_resource.side_effect = lambda **_: release.wait(5) and {'Tags': []}
+        dynamodb.describe_table.return_value = {'Table': {'BillingModeSummary': {'BillingMode': 'PAY_PER_REQUEST'}}}
+
+        try:
+            with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+                result = index.lambda_handler(self.update_event(), None)
+        finally:
+            release.set()
+
+        assert result['decision'] == 'tag_lookup_deferred'
+        assert 'tag_lookup_timeout' in capsys.readouterr().out
+        mock_boto3_clients['dynamodb'].delete_table.assert_not_called()
+        [(_, delay, retry)] = scheduler.scheduled
+        assert retry['detail']['eventID'] == 'update-event'
+
+    def test_failed_lookup_leaves_resource_in_place(self, mock_env, mock_boto3_clients, capsys):
+        """A lookup error (e.g. AccessDenied) defers the event instead of deleting a maybe-exempt table."""
+        import index
+
+        self.configure(EXEMPT_TAGS='ndx:billing-exempt=true')
+        scheduler = self.install_scheduler()
+        dynamodb = mock_boto3_clients['dynamodb']
+        dynamodb.list_tags_of_resource.side_effect = RuntimeError('AccessDenied')
+        dynamodb.describe_table.return_value = {'Table': {'BillingModeSummary': {'BillingMode': 'PAY_PER_REQUEST'}}}
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.lambda_handler(self.update_event(), None)
+
+        assert result['decision'] == 'tag_lookup_deferred'
+        assert 'tag_lookup_failed' in capsys.readouterr().out
+        dynamodb.delete_table.assert_not_called()
+        assert len(scheduler.scheduled) == 1
+
+    def test_failed_lookup_without_retry_queue_fails_event(self, mock_env, mock_boto3_clients):
+        """Without a retry queue the event fails, so it is redelivered rather than enforced."""
+        import index
+        from tags import TagLookupError
+
+        self.configure(EXEMPT_TAGS='ndx:billing-exempt=true')
+        dynamodb = mock_boto3_clients['dynamodb']
+        dynamodb.list_tags_of_resource.side_effect = RuntimeError('AccessDenied')
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            with pytest.raises(TagLookupError):
+                index.lambda_handler(self.update_event(), None)
+
+        dynamodb.delete_table.assert_not_called()
+
+    def test_no_lookup_for_compliant_request(self, mock_env, mock_boto3_clients):
+        """An UpdateTable to PROVISIONED is left alone whatever the tags, so they are not looked up."""
+        import index
+
+        self.configure(EXEMPT_TAGS='ndx:billing-exempt=true')
+        event = self.update_event()
+        event['detail']['requestParameters']['billingMode'] = 'PROVISIONED'
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            result = index.lambda_handler(event, None)
+
+        assert result['decision'] == 'provisioned'
+        mock_boto3_clients['dynamodb'].list_tags_of_resource.assert_not_called()
+
+    def test_no_lookup_without_tag_rules(self, mock_env, mock_boto3_clients):
+        """Name-only exemptions never pay for a tag lookup."""
+        import index
+
+        dynamodb = mock_boto3_clients['dynamodb']
+        dynamodb.describe_table.return_value = {'Table': {'BillingModeSummary': {'BillingMode': 'PROVISIONED'}}}
+
+        with patch.object(index, 'get_boto3_client', mock_boto3_clients['get_client']):
+            index.lambda_handler(self.update_event(), None)
+
+        dynamodb.list_tags_of_resource.assert_not_called()
@@ -0,0 +1,97 @@
+"""
+Unit tests for the synthetic CloudTrail generator and local load-test harness.
+
+Run with: pytest tests/ -v
+"""
+import os
+from collections import Counter
+from unittest.mock import patch
+
+import pytest
+
+import enforcer_loadtest as loadtest
+
+
+@pytest.fixture
+def enforcer():
+    """The enforcer configured by load_enforcer(), restored to defaults afterwards."""
+    with patch.dict(os.environ, {}):
+        import index
+        yield loadtest.load_enforcer()
+        index.set_client_factory(None)
+        index.reset_config()
+        index.log.configure()
+        index.metrics.configure()
+
+
+class TestGenerateEvents:
+    """Tests for the synthetic CloudTrail event stream."""
+
+    def test_is_reproducible_with_seed(self):
+        """The same seed should produce the same events."""
+        first = list(loadtest.generate_events(50, seed=7))
+        second = list(loadtest.generate_events(50, seed=7))
+
+        assert [e['detail']['eventID'] for _, e in first] == [e['detail']['eventID'] for _, e in second]
+
+    def test_mix_follows_ratios(self):
+        """Kinds, event names and accounts should follow the requested mix."""
+        events = list(loadtest.generate_events(
+            4000, seed=1, accounts=10, on_demand_ratio=0.5, update_ratio=0.25, exempt_ratio=0.1))
+        kinds = Counter(kind for kind, _ in events)
+        names = Counter(e['detail']['eventName'] for _, e in events)
+
+        assert kinds['exempt'] / 4000 == pytest.approx(0.1, abs=0.02)
+        assert kinds['on_demand'] / 4000 == pytest.approx(0.45, abs=0.03)
+        assert names['UpdateTable'] / 4000 == pytest.approx(0.25, abs=0.03)
+        assert len({e['account'] for _, e in events}) == 10
+
+    def test_events_match_cloudtrail_shape(self):
+        """Generated events should be readable by the enforcer's metadata extraction."""
+        import index
+
+        _, event = next(loadtest.generate_events(1, seed=1, accounts=1, regions=('eu-west-2',)))
+        metadata = index.extract_event_metadata(event)
+
+        assert metadata['account_id'] == '100000000000'
+        assert metadata['region'] == 'eu-west-2'
+        assert event['detail']['requestParameters']['tableName']
+
+    def test_malformed_events(self):
+        """malformed_ratio=1 should damage every event in one of the known ways."""
+        kinds = {kind for kind, _ in loadtest.generate_events(200, seed=3, malformed_ratio=1.0)}
+
+        assert kinds == {f'malformed:{how}' for how in loadtest.MALFORMED_KINDS}
+
+
+class TestRunLoad:
+    """Tests for driving the enforcer against the local stand-ins."""
+
+    def test_reports_throughput_latency_and_decisions(self, enforcer):
+        """Every event should be enforced and every On-Demand table deleted."""
+        aws = loadtest.LocalAWS()
+        events = list(loadtest.generate_events(300, seed=2, malformed_ratio=0.05))
+        expected_deletes = sum(1 for kind, _ in events if kind == 'on_demand')
+
+        report = loadtest.run_load(events, rate=0, concurrency=8, aws=aws, enforcer=enforcer)
+
+        assert report['events'] == 300
+        assert report['error_rate'] == 0
+        assert report['decisions']['deleted'] == expected_deletes == len(aws.deleted())
+        assert report['aws_calls']['sns_published'] == expected_deletes
+        assert report['latency_ms'][50] <= report['latency_ms'][95] <= report['latency_ms'][99]
+        assert report['throughput_per_second'] > 0
+
+    def test_paces_to_target_rate(self, enforcer):
+        """At a target rate the run should take about events / rate seconds."""
+        report = loadtest.run_load(loadtest.generate_events(20, seed=4), rate=100, concurrency=4,
+                                   aws=loadtest.LocalAWS(), enforcer=enforcer)
+
+        assert report['elapsed_seconds'] >= 0.19
+
+    def test_percentile(self):
+        """Nearest-rank percentiles over a sorted list."""
+        values = list(range(1, 101))
+
+        assert [loadtest.percentile(values, p) for p in (50, 95, 99)] == [50, 95, 99]
+        assert loadtest.percentile([], 99) == 0.0
@@ -0,0 +1,139 @@
+"""
+Unit tests for the dry-run replay of archived CloudTrail logs.
+
+Run with: pytest tests/ -v
+"""
+import gzip
+import io
+import json
+import os
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+
+import enforcer_loadtest as loadtest
+import enforcer_replay as replay
+
+
+@pytest.fixture
+def clean_env():
+    """Environment and enforcer state restored after each replay."""
+    with patch.dict(os.environ, {'EXEMPT_TABLE_PREFIXES': 'terraform-'}):
+        yield
+        import index
+        index.set_client_factory(None)
+        index.reset_config()
+        index.log.configure()
+        index.metrics.configure()
+
+
+def records():
+    on_demand = loadtest.cloudtrail_event('orders', billing_mode='PAY_PER_REQUEST', event_id='a')['detail']
+    provisioned = loadtest.cloudtrail_event('users', billing_mode='PROVISIONED', event_id='b')['detail']
+    exempt = loadtest.cloudtrail_event('terraform-locks', billing_mode='PAY_PER_REQUEST', event_id='c')['detail']
+    update = loadtest.cloudtrail_event('orders-archive', event_name='UpdateTable', event_id='d')['detail']
+    unrelated = {'eventID': 'e', 'eventSource': 'ec2.amazonaws.com', 'eventName': 'RunInstances'}
+    return [on_demand, provisioned, exempt, update, unrelated]
+
+
+@pytest.fixture
+def archive(tmp_path):
+    with gzip.open(tmp_path / 'part-1.json.gz', 'wt') as f:
+        json.dump({'Records': records()[:3]}, f)
+    with gzip.open(tmp_path / 'part-2.json.gz', 'wt') as f:
+        json.dump({'Records': records()[3:]}, f)
+    return tmp_path
+
+
+class TestReplay:
+    """Tests for replaying archives through the dry-run enforcer."""
+
+    def test_decisions(self, clean_env, archive):
+        output = io.StringIO()
+
+        totals = replay.replay([str(archive)], output, workers=1)
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+
+        assert [(line['resource'], line['decision']) for line in lines] == [
+            ('orders', 'would_delete'), ('users', 'provisioned'), ('terraform-locks', 'exempt'),
+            ('orders-archive', 'lookup_skipped'),
+        ]
+        assert totals['files'] == 2
+        assert lines[0]['rule'] == 'dynamodb-on-demand'
+
+    def test_env_overrides_exemptions(self, clean_env, archive):
+        """Proposed exemption settings are what the replay validates."""
+        output = io.StringIO()
+
+        totals = replay.replay([str(archive)], output, env={'EXEMPT_TABLE_PREFIXES': 'orders'}, workers=1)
+
+        # orders and orders-archive are now exempt; terraform-locks no longer is
+        assert totals['exempt'] == 2
+        assert totals['would_delete'] == 1
+
+    def test_process_pool_matches_in_process(self, clean_env, archive):
+        in_process, pooled = io.StringIO(), io.StringIO()
+
+        replay.replay([str(archive)], in_process, workers=1)
+        replay.replay([str(archive)], pooled, workers=2)
+
+        assert pooled.getvalue() == in_process.getvalue()
+
+    def test_later_events_for_the_same_table(self, clean_env):
+        """A dry-run decision does not make later historical events look stale."""
+        events = [
+            loadtest.cloudtrail_event('orders', billing_mode='PAY_PER_REQUEST', event_id=event_id,
+                                      event_time=datetime(2026, month, 1, tzinfo=timezone.utc))['detail']
+            for event_id, month in (('a', 1), ('b', 3))
+        ]
+
+        lines = list(replay.replay_records(replay.load_enforcer(), events))
+
+        assert [line['decision'] for line in lines] == ['would_delete', 'would_delete']
+
+    def test_later_events_for_the_same_table(self, clean_env):
+        """A dry-run decision does not make later historical events look stale."""
+        events = [
+            loadtest.cloudtrail_event('orders', billing_mode='PAY_PER_REQUEST', event_id=event_id,
+                                      event_time=datetime(2026, month, 1, tzinfo=timezone.utc))['detail']
+            for event_id, month in (('a', 1), ('b', 3))
+        ]
+
+        lines = list(replay.replay_records(replay.load_enforcer(), events))
+
+        assert [line['decision'] for line in lines] == ['would_delete', 'would_delete']
+
+    def test_tag_lookup_is_skipped_not_enforced(self, clean_env):
+        """Offline, a resource that may be exempt by tag is not reported as would_delete."""
+        events = [
+            loadtest.cloudtrail_event('orders', event_name='UpdateTable', billing_mode='PAY_PER_REQUEST',
+                                      event_id='a')['detail'],
+        ]
+
+        lines = list(replay.replay_records(replay.load_enforcer({'EXEMPT_TAGS': 'keep=true'}), events))
+
+        assert [line['decision'] for line in lines] == ['lookup_skipped']
+        assert 'error' not in lines[0]
+
+    def test_never_calls_aws_mutations(self, clean_env):
+        """Even with real lookups, clients only allow read calls."""
+        class Client:
+            def describe_table(self, **kwargs):
+                return {}
+
+            def delete_table(self, **kwargs):
+                raise AssertionError('must not be called')
+
+        client = replay.ReadOnlyClient(Client())
+
+        assert client.describe_table(TableName='t') == {}
+        with pytest.raises(PermissionError):
+            client.delete_table(TableName='t')
+
+    def test_main(self, clean_env, archive, tmp_path, capsys):
+        out = tmp_path / 'decisions.jsonl'
+
+        assert replay.main([str(archive), '--workers', '1', '--output', str(out)]) == 0
+        assert len(out.read_text().splitlines()) == 4
+        assert 'would_delete=1' in capsys.readouterr().err
@@ -0,0 +1,295 @@
+"""
+Unit tests for the generated EventBridge pattern, and its conformance with
+the enforcer's decisions.
+
+Run with: pytest tests/ -v
+"""
+import io
+import itertools
+import json
+import os
+import re
+from unittest.mock import patch
+
+import pytest
+
+import enforcer_replay as replay
+import event_pattern
+from exemptions import parse_rules
+from rules import RULE_NAMES
+
+ACCOUNT_A = '111111111111'
+ACCOUNT_B = '222222222222'
+
+# Settings the generator reads, reset for every scenario
+BASE_SETTINGS = {
+    'ENFORCED_RULES': ','.join(RULE_NAMES),
+    'EXEMPT_TABLE_PREFIXES': '',
+    'EXEMPT_TABLE_RULES': '',
+    'EXEMPT_TAGS': '',
+    'MAX_PROVISIONED_CONCURRENCY': '0',
+}
+
+EXEMPTIONS = {
+    'EXEMPT_TABLE_PREFIXES': 'terraform-',
+    'EXEMPT_TABLE_RULES': json.dumps([
+        {'type': 'suffix', 'pattern': '-lock'},
+        {'type': 'glob', 'pattern': 'scenario-*-state'},
+        {'type': 'glob', 'pattern': 'tmp-?'},
+        {'type': 'prefix', 'pattern': 'demo-', 'accounts': [ACCOUNT_A]},
+    ]),
+    'EXEMPT_TAGS': 'ndx:billing-exempt=true',
+    'MAX_PROVISIONED_CONCURRENCY': '5',
+}
+
+# Decisions that leave the resource alone, so the pattern may drop their events
+NO_ACTION = {'provisioned', 'within_limit', 'exempt', 'request_failed',
+             'no_table_name', 'no_stream_name', 'no_function_name'}
+
+_MISSING = object()
+_EVENT_IDS = itertools.count()
+
+
+def _wildcard_regex(wildcard: str):
+    parts, chars = [], iter(wildcard)
+    for char in chars:
+        if char == '\\':
+            parts.append(re.escape(next(chars)))
+        else:
+            parts.append('.*' if char == '*' else re.escape(char))
+    return re.compile(''.join(parts), re.DOTALL)
+
+
+def _matches_value(matcher, value) -> bool:
+    if value is _MISSING:
+        return matcher == {'exists': False}
+    if isinstance(value, list):
+        return any(_matches_value(matcher, item) for item in value)
+    if not isinstance(matcher, dict):
+        return value == matcher
+    [(operator, operand)] = matcher.items()
+    if operator == 'exists':
+        return operand
+    if operator == 'anything-but':
+        if isinstance(operand, dict):
+            return not (isinstance(value, str) and
+                        any(_wildcard_regex(w).fullmatch(value) for w in operand['wildcard']))
+        return value not in operand
+    if operator == 'numeric':
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return False
+        comparisons = {'>': value.__gt__, '>=': value.__ge__, '<': value.__lt__, '<=': value.__le__,
+                       '=': value.__eq__}
+        return all(comparisons[op](n) for op, n in zip(operand[::2], operand[1::2]))
+    raise AssertionError(f'unsupported operator {operator}')
+
+
+def matches(pattern: dict, event: dict) -> bool:
+    """EventBridge's matching, for the operators the generator uses."""
+    for key, expected in pattern.items():
+        if key == '$or':
+            if not any(matches(branch, event) for branch in expected):
+                return False
+        elif isinstance(expected, dict):
+            value = event.get(key)
+            if not matches(expected, value if isinstance(value, dict) else {}):
+                return False
+        elif not any(_matches_value(matcher, event.get(key, _MISSING)) for matcher in expected):
+            return False
+    return True
+
+
+def record(event_source: str, event_name: str, request: dict, account_id: str = ACCOUNT_A,
+           error_code: str = None) -> dict:
+    detail = {
+        'eventID': str(next(_EVENT_IDS)),
+        # After any enforcement the replay records, so no record is decided 'already_enforced'
+        'eventTime': '2099-01-01T00:00:00Z',
+        'eventSource': event_source,
+        'eventName': event_name,
+        'awsRegion': 'us-west-2',
+        'userIdentity': {'type': 'AssumedRole', 'arn': 'arn:aws:sts::111111111111:assumed-role/User/u'},
+        'requestParameters': request,
+        'recipientAccountId': account_id,
+    }
+    if error_code:
+        detail['errorCode'] = error_code
+    return detail
+
+
+def corpus() -> list:
+    """CloudTrail records for every rule, across modes, names, accounts and failures."""
+    records = []
+    names = ['orders', 'terraform-state', 'app-lock', 'scenario-7-state', 'tmp-1', 'demo-data', '']
+    for account_id, error_code in itertools.product((ACCOUNT_A, ACCOUNT_B), (None, 'ResourceInUseException')):
+        def add(event_source, event_name, request):
+            records.append(record(event_source, event_name, request, account_id, error_code))
+
+        for name in names:
+            table = {'tableName': name} if name else {}
+            for billing_mode in (None, 'PROVISIONED', 'PAY_PER_REQUEST', 'ON_DEMAND'):
+                mode = {'billingMode': billing_mode} if billing_mode else {}
+                add('dynamodb.amazonaws.com', 'CreateTable', {**table, **mode})
+                add('dynamodb.amazonaws.com', 'UpdateTable', {**table, **mode})
+            add('dynamodb.amazonaws.com', 'CreateTable', {**table, 'tags': [
+                {'key': 'ndx:billing-exempt', 'value': 'true'}], 'billingMode': 'PAY_PER_REQUEST'})
+
+            stream = {'streamName': name} if name else {}
+            arn = {'streamARN': f'arn:aws:kinesis:us-west-2:{account_id}:stream/{name}'}
+            for stream_mode in (None, 'PROVISIONED', 'ON_DEMAND'):
+                details = {'streamModeDetails': {'streamMode': stream_mode}} if stream_mode else {}
+                add('kinesis.amazonaws.com', 'CreateStream', {**stream, 'shardCount': 1, **details})
+                add('kinesis.amazonaws.com', 'UpdateStreamMode', {**arn, **details})
+            add('kinesis.amazonaws.com', 'CreateStream', {**stream, 'streamModeDetails': {}})
+
+        for executions, event_name in itertools.product(
+                (None, 0, 3, 5, 6, 100),
+                ('PutProvisionedConcurrencyConfig', 'PutProvisionedConcurrencyConfig20190930')):
+            count = {'provisionedConcurrentExecutions': executions} if executions is not None else {}
+            add('lambda.amazonaws.com', event_name, {'functionName': 'api', 'qualifier': 'live', **count})
+
+        # Calls no rule handles
+        add('dynamodb.amazonaws.com', 'DeleteTable', {'tableName': 'orders'})
+        add('s3.amazonaws.com', 'CreateBucket', {'bucketName': 'orders'})
+    return records
+
+
+@pytest.fixture
+def clean_env():
+    """Environment and enforcer state restored after each scenario."""
+    with patch.dict(os.environ, {}):
+        yield
+        import index
+        index.set_client_factory(None)
+        index.reset_config()
+        index.log.configure()
+        index.metrics.configure()
+
+
+def decisions(env: dict, records: list) -> dict:
+    """The dry-run enforcer's decision per eventID, for records an enforced rule handles."""
+    enforcer = replay.load_enforcer({**BASE_SETTINGS, **env})
+    return {line['id']: line['decision'] for line in replay.replay_records(enforcer, records)}
+
+
+def check_conformance(pattern: dict, env: dict) -> dict:
+    """
+    Assert the pattern lets through every event the enforcer might act on, and
+    nothing no enforced rule handles. Returns {decision: events dropped}.
+    """
+    records = corpus()
+    decided = decisions(env, records)
+    dropped = {}
+    for detail in records:
+        matched = matches(pattern, replay.eventbridge_event(detail))
+        decision = decided.get(detail['eventID'])
+        if decision is None:
+            assert not matched, detail
+        elif not matched:
+            assert decision in NO_ACTION, (decision, detail)
+            dropped[decision] = dropped.get(decision, 0) + 1
+    return dropped
+
+
+class TestConformance:
+    """The pattern must never drop an event the enforcer would act on."""
+
+    @pytest.mark.parametrize('env', [
+        {},
+        EXEMPTIONS,
+        {**EXEMPTIONS, 'ENFORCED_RULES': 'kinesis-on-demand,lambda-provisioned-concurrency'},
+    ], ids=['defaults', 'exemptions', 'subset'])
+    def test_agrees_with_enforcer(self, clean_env, env):
+        pattern = event_pattern.pattern_from_settings({**BASE_SETTINGS, **env})
+
+        dropped = check_conformance(pattern, env)
+
+        # Failed calls and compliant requests never reach the function
+        assert dropped['request_failed'] > 0
+        assert dropped.get('provisioned', 0) + dropped.get('within_limit', 0) > 0
+
+    def test_drops_exempt_names(self, clean_env):
+        pattern = event_pattern.pattern_from_settings({**BASE_SETTINGS, **EXEMPTIONS})
+
+        dropped = check_conformance(pattern, EXEMPTIONS)
+
+        assert dropped['exempt'] > 0
+
+    @pytest.mark.parametrize('policy', [
+        {},
+        {'EXEMPT_TABLE_PREFIXES': 'orders', 'MAX_PROVISIONED_CONCURRENCY': '100'},
+    ], ids=['policy-cleared', 'policy-changed'])
+    def test_policy_source_pattern_holds_under_any_policy(self, clean_env, policy):
+        """Exemptions and limits from a policy source can change after the pattern is built."""
+        pattern = event_pattern.pattern_from_settings(
+            {**BASE_SETTINGS, **EXEMPTIONS, 'POLICY_PARAMETER': '/ndx/dynamodb-billing-enforcer/policy'})
+
+        check_conformance(pattern, policy)
+
+
+class TestPattern:
+    """Tests for the generated pattern."""
+
+    def test_triggers_come_from_rules(self):
+        pattern = event_pattern.build_pattern(RULE_NAMES)
+
+        assert pattern['source'] == ['aws.dynamodb', 'aws.kinesis', 'aws.lambda']
+        assert pattern['detail-type'] == ['AWS API Call via CloudTrail']
+        calls = {(call['eventSource'][0], name) for call in pattern['detail']['$or'] for name in call['eventName']}
+        assert ('lambda.amazonaws.com', 'PutProvisionedConcurrencyConfig20190930') in calls
+        assert len(calls) == 6
+
+    def test_single_rule_needs_no_or(self):
+        pattern = event_pattern.build_pattern(('lambda-provisioned-concurrency',), 2)
+
+        assert pattern['detail'] == {
+            'errorCode': [{'exists': False}],
+            'eventSource': ['lambda.amazonaws.com'],
+            'eventName': ['PutProvisionedConcurrencyConfig', 'PutProvisionedConcurrencyConfig20190930'],
+            'requestParameters': {
+                'provisionedConcurrentExecutions': [{'numeric': ['>', 2]}, {'exists': False}],
+            },
+        }
+
+    def test_name_wildcards(self):
+        rules = parse_rules('terraform-,a*b', json.dumps([
+            {'type': 'suffix', 'pattern': '-lock'},
+            {'type': 'glob', 'pattern': 'x**y*'},
+            {'type': 'glob', 'pattern': 'tmp-?'},
+            {'type': 'prefix', 'pattern': 'demo-', 'accounts': [ACCOUNT_A]},
+        ]), 'team')
+
+        assert event_pattern.name_wildcards(rules) == ['*-lock', 'a\\*b*', 'terraform-*', 'x*y*']
+
+    def test_policy_source_keeps_only_mode_filters(self):
+        pattern = event_pattern.pattern_from_settings({
+            **BASE_SETTINGS, **EXEMPTIONS, 'POLICY_APPCONFIG': 'app/env/profile'})
+
+        for call in pattern['detail']['$or']:
+            request = call.get('requestParameters', {})
+            assert 'tableName' not in request and 'streamName' not in request
+            assert 'provisionedConcurrentExecutions' not in request
+        assert pattern['detail']['$or'][0]['requestParameters']['billingMode']
+
+    def test_too_many_exemptions_left_to_function(self):
+        prefixes = ','.join(f'team-{i:03d}-' for i in range(100))
+
+        pattern = event_pattern.pattern_from_settings({**BASE_SETTINGS, 'EXEMPT_TABLE_PREFIXES': prefixes})
+
+        assert 'wildcard' not in json.dumps(pattern)
+        assert len(json.dumps(pattern, separators=(',', ':'))) <= event_pattern.MAX_PATTERN_LENGTH
+
+    def test_main_external_data_source_protocol(self):
+        stdout = io.StringIO()
+
+        assert event_pattern.main(io.StringIO(json.dumps({'ENFORCED_RULES': 'dynamodb-on-demand'})), stdout) == 0
+
+        result = json.loads(stdout.getvalue())
+        assert list(result) == ['pattern']
+        assert json.loads(result['pattern'])['source'] == ['aws.dynamodb']
+
+    def test_main_rejects_unknown_rule(self, capsys):
+        stdin = io.StringIO(json.dumps({'ENFORCED_RULES': 'ec2-spot'}))
+
+        assert event_pattern.main(stdin, io.StringIO()) == 2
+        assert 'Unknown rule' in capsys.readouterr().err
@@ -0,0 +1,132 @@
+"""
+Unit tests for the enforcer's compiled exemption matcher.
+
+Run with: pytest tests/ -v
+"""
+import pytest
+
+from exemptions import ExemptionMatcher, describe_rule, parse_rules
+
+
+class TestParseRules:
+    """Tests for parse_rules."""
+
+    def test_prefixes_become_global_prefix_rules(self):
+        """Should strip whitespace and ignore empty entries."""
+        rules = parse_rules(' terraform-, ,infrastructure- ')
+
+        assert [r['pattern'] for r in rules] == ['terraform-', 'infrastructure-']
+        assert all(r['type'] == 'prefix' and r['accounts'] == () for r in rules)
+
+    def test_parses_json_rules(self):
+        """Should read type, pattern and accounts from EXEMPT_TABLE_RULES."""
+        rules = parse_rules('', '[{"type": "glob", "pattern": "x-*", "accounts": ["111111111111"]}]')
+
+        assert rules == ({'type': 'glob', 'pattern': 'x-*', 'accounts': ('111111111111',)},)
+
+    @pytest.mark.parametrize('rules_json', [
+        'not json',
+        '{"type": "prefix"}',
+        '[{"type": "regex", "pattern": "a"}]',
+        '[{"type": "prefix", "pattern": ""}]',
+        '["terraform-"]',
+    ])
+    def test_rejects_malformed_rules(self, rules_json):
+        """Should raise ValueError for anything it cannot compile."""
+        with pytest.raises(ValueError):
+            parse_rules('', rules_json)
+
+
+class TestExemptionMatcher:
+    """Tests for ExemptionMatcher.match."""
+
+    RULES = (
+        {'type': 'prefix', 'pattern': 'terraform-', 'accounts': ()},
+        {'type': 'suffix', 'pattern': '-lock', 'accounts': ()},
+        {'type': 'glob', 'pattern': 'scenario-*-state', 'accounts': ()},
+        {'type': 'prefix', 'pattern': 'demo-', 'accounts': ('123456789012',)},
+    )
+
+    @pytest.fixture
+    def matcher(self):
+        return ExemptionMatcher(self.RULES)
+
+    @pytest.mark.parametrize('table_name, expected', [
+        ('terraform-state', 'terraform-'),
+        ('app-lock', '-lock'),
+        ('scenario-payments-state', 'scenario-*-state'),
+        ('scenario-payments-statex', None),
+        ('my-terraform-state', None),
+        ('user-table', None),
+    ])
+    def test_matches_global_rules(self, matcher, table_name, expected):
+        """Prefix, suffix and glob rules should apply to every account."""
+        rule = matcher.match(table_name, '210987654321')
+
+        assert (rule['pattern'] if rule else None) == expected
+
+    def test_account_rules_only_apply_to_their_account(self, matcher):
+        """Per-account rules should not leak to other accounts."""
+        assert matcher.match('demo-orders', '123456789012')['pattern'] == 'demo-'
+        assert matcher.match('demo-orders', '210987654321') is None
+        assert matcher.match('demo-orders') is None
+
+    def test_regex_metacharacters_are_literal(self):
+        """Prefix and suffix patterns should not be interpreted as regex."""
+        matcher = ExemptionMatcher(({'type': 'prefix', 'pattern': 'a.b', 'accounts': ()},))
+
+        assert matcher.match('a.b-table')
+        assert matcher.match('axb-table') is None
+
+    def test_empty_matcher(self):
+        """A matcher without rules exempts nothing and is falsy."""
+        matcher = ExemptionMatcher()
+
+        assert not matcher
+        assert matcher.match('terraform-state') is None
+
+    def test_describe_rule(self):
+        """Should render a rule for log lines."""
+        assert describe_rule(self.RULES[3]) == 'prefix: demo- (accounts: 123456789012)'
+
+
+class TestTagRules:
+    """Tests for tag exemption rules."""
+
+    def test_exempt_tags_become_global_tag_rules(self):
+        """EXEMPT_TAGS entries are tag rules for every account."""
+        rules = parse_rules('', '', 'ndx:billing-exempt=true, keep ')
+
+        assert [(r['type'], r['pattern']) for r in rules] == [('tag', 'ndx:billing-exempt=true'), ('tag', 'keep')]
+
+    def test_rejects_tag_rule_without_key(self):
+        """A tag pattern needs a key."""
+        with pytest.raises(ValueError, match='tag key'):
+            parse_rules('', '[{"type": "tag", "pattern": "=true"}]')
+
+    def test_matches_key_and_value(self):
+        """key=value needs that value; a bare key matches any value."""
+        matcher = ExemptionMatcher(parse_rules('', '', 'ndx:billing-exempt=true,keep'))
+
+        assert matcher.match_tags({'ndx:billing-exempt': 'true'})['pattern'] == 'ndx:billing-exempt=true'
+        assert matcher.match_tags({'ndx:billing-exempt': 'false'}) is None
+        assert matcher.match_tags({'keep': ''})['pattern'] == 'keep'
+        assert matcher.match_tags({}) is None
+
+    def test_account_tag_rules(self):
+        """Tag rules scoped to accounts only apply (and only need tags) there."""
+        matcher = ExemptionMatcher(parse_rules('', '[{"type": "tag", "pattern": "keep", '
+                                                   '"accounts": ["123456789012"]}]'))
+
+        assert matcher.has_tag_rules('123456789012')
+        assert not matcher.has_tag_rules('210987654321')
+        assert matcher.match_tags({'keep': 'yes'}, '123456789012')
+        assert matcher.match_tags({'keep': 'yes'}, '210987654321') is None
+
+    def test_tag_rules_do_not_match_names(self):
+        """A tag pattern is never compared with the table name."""
+        matcher = ExemptionMatcher(parse_rules('terraform-', '', 'keep'))
+
+        assert matcher.match('keep') is None
+        assert matcher.match('terraform-state')['pattern'] == 'terraform-'
+        assert not ExemptionMatcher(parse_rules('terraform-')).has_tag_rules()
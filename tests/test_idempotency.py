@@ -0,0 +1,167 @@
+"""
+Unit tests for the enforcer's idempotency store and backends.
+
+Run with: pytest tests/ -v
+"""
+import pytest
+
+from idempotency import DynamoDBBackend, FileBackend, IdempotencyStore, LRUCache
+
+
+class FakeClock:
+    """Settable stand-in for time.time."""
+
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache:
+    """Tests for the in-container LRU."""
+
+    def test_evicts_least_recently_used(self):
+        """Reading an entry should protect it from eviction."""
+        cache = LRUCache(max_entries=2)
+        cache.put('a', 1, float('inf'))
+        cache.put('b', 2, float('inf'))
+        cache.get('a')
+        cache.put('c', 3, float('inf'))
+
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert len(cache) == 2
+
+    def test_entries_expire(self):
+        """Expired entries should read as missing and be claimable again."""
+        clock = FakeClock()
+        cache = LRUCache(clock=clock)
+        cache.put_if_absent('a', 1, clock.now + 10)
+
+        assert not cache.put_if_absent('a', 1, clock.now + 10)
+        clock.now += 10
+        assert cache.get('a') is None
+        assert cache.put_if_absent('a', 1, clock.now + 10)
+
+
+    def test_increment_restarts_after_expiry(self):
+        """Counters keep their first expiry and start again from 1 once it passes."""
+        clock = FakeClock()
+        cache = LRUCache(clock=clock)
+
+        assert [cache.increment('n', clock.now + 10) for _ in range(3)] == [1, 2, 3]
+        clock.now += 10
+        assert cache.increment('n', clock.now + 10) == 1
+
+
+class TestIdempotencyStore:
+    """Tests for event claims and table enforcement records."""
+
+    @pytest.fixture(params=['lru', 'file'])
+    def store(self, request, tmp_path):
+        clock = FakeClock()
+        backend = FileBackend(str(tmp_path / 'idempotency.json'), clock) if request.param == 'file' else None
+        return IdempotencyStore(backend, window_seconds=60, clock=clock)
+
+    def test_second_claim_is_duplicate(self, store):
+        """An event ID should only be claimed once within the window."""
+        assert store.claim_event('evt-1')
+        assert not store.claim_event('evt-1')
+        assert store.claim_event('evt-2')
+
+    def test_released_claim_can_be_retried(self, store):
+        """Releasing a claim (after a failure) should let the event be processed again."""
+        store.claim_event('evt-1')
+        store.release_event('evt-1')
+
+        assert store.claim_event('evt-1')
+
+    def test_claim_expires_after_window(self, store):
+        """A redelivery after the window should be processed again."""
+        store.claim_event('evt-1')
+        store._clock.now += 60
+
+        assert store.claim_event('evt-1')
+
+    def test_only_events_before_enforcement_are_stale(self, store):
+        """Events before the deletion are stale; a later re-create is not."""
+        deleted_at = store._clock.now
+        store.record_enforcement('111111111111', 'us-east-1', 'orders', deleted_at)
+
+        assert store.enforced_since('111111111111', 'us-east-1', 'orders', deleted_at - 5)
+        assert not store.enforced_since('111111111111', 'us-east-1', 'orders', deleted_at + 5)
+        assert not store.enforced_since('111111111111', 'us-west-2', 'orders', deleted_at - 5)
+
+    def test_backend_shares_records_between_containers(self, tmp_path):
+        """A second container (fresh LRU) should see claims made through the backend."""
+        clock = FakeClock()
+        path = str(tmp_path / 'idempotency.json')
+        first = IdempotencyStore(FileBackend(path, clock), clock=clock)
+        second = IdempotencyStore(FileBackend(path, clock), clock=clock)
+
+        first.claim_event('evt-1')
+        first.record_enforcement('111111111111', 'us-east-1', 'orders')
+
+        assert not second.claim_event('evt-1')
+        assert second.enforced_since('111111111111', 'us-east-1', 'orders', clock.now - 1)
+
+
+class TestDynamoDBBackend:
+    """Tests for the DynamoDB backend against moto."""
+
+    @pytest.fixture
+    def backend(self, monkeypatch):
+        moto = pytest.importorskip('moto')
+        import boto3
+
+        monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+        monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+        monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+        with moto.mock_aws():
+            client = boto3.client('dynamodb')
+            client.create_table(
+                TableName='idempotency',
+                KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+                AttributeDefinitions=[{'AttributeName': 'id', 'AttributeType': 'S'}],
+                BillingMode='PROVISIONED',
+                ProvisionedThroughput={'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5},
+            )
+            clock = FakeClock()
+            yield DynamoDBBackend('idempotency', lambda: client, clock), clock
+
+    def test_conditional_put(self, backend):
+        """Only the first put of a key should succeed until it expires."""
+        backend, clock = backend
+
+        assert backend.put_if_absent('event#1', clock.now, clock.now + 60)
+        assert not backend.put_if_absent('event#1', clock.now, clock.now + 60)
+        clock.now += 61
+        assert backend.put_if_absent('event#1', clock.now, clock.now + 60)
+
+    def test_get_ignores_expired_items(self, backend):
+        """Items past expires_at should read as missing before TTL removes them."""
+        backend, clock = backend
+        backend.put('table#1', 123.5, clock.now + 60)
+
+        assert backend.get('table#1') == 123.5
+        clock.now += 60
+        assert backend.get('table#1') is None
+
+    def test_delete(self, backend):
+        """Deleted keys should be claimable again."""
+        backend, clock = backend
+        backend.put_if_absent('event#1', clock.now, clock.now + 60)
+        backend.delete('event#1')
+
+        assert backend.put_if_absent('event#1', clock.now, clock.now + 60)
+
+    def test_increment(self, backend):
+        """Counters should be atomic adds that keep the expiry they were created with."""
+        backend, clock = backend
+
+        assert backend.increment('violations#1', clock.now + 60) == 1
+        assert backend.increment('violations#1', clock.now + 999) == 2
+        assert backend.get('violations#1') == 2
+        clock.now += 60
+        assert backend.get('violations#1') is None
@@ -0,0 +1,102 @@
+"""
+Unit tests for the enforcer's EMF metrics logger.
+
+Run with: pytest tests/ -v
+"""
+import io
+import json
+
+import pytest
+
+from metrics import MAX_VALUES_PER_METRIC, MetricsLogger
+
+
+@pytest.fixture
+def stream():
+    return io.StringIO()
+
+
+def documents(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+class TestMetricsLogger:
+    """Tests for MetricsLogger buffering and EMF output."""
+
+    def test_flush_writes_emf_document_per_dimension_set(self, stream):
+        """Values should be grouped by dimensions with matching metric definitions."""
+        metrics = MetricsLogger('Test/Enforcer', stream=stream)
+        metrics.increment('Deleted', AccountId='111111111111', Region='us-east-1')
+        metrics.increment('Deleted', AccountId='111111111111', Region='us-east-1')
+        metrics.increment('Exempt', AccountId='222222222222', Region='us-east-1')
+
+        metrics.flush()
+
+        first, second = documents(stream)
+        assert first['Deleted'] == [1, 1]
+        assert first['AccountId'] == '111111111111'
+        assert first['_aws']['CloudWatchMetrics'] == [{
+            'Namespace': 'Test/Enforcer',
+            'Dimensions': [['AccountId', 'Region']],
+            'Metrics': [{'Name': 'Deleted', 'Unit': 'Count'}],
+        }]
+        assert second['Exempt'] == 1
+
+    def test_flush_clears_buffer(self, stream):
+        """A second flush with nothing recorded should write nothing."""
+        metrics = MetricsLogger(stream=stream)
+        metrics.increment('Deleted')
+        metrics.flush()
+        metrics.flush()
+
+        assert len(documents(stream)) == 1
+
+    def test_timer_records_milliseconds_even_on_error(self, stream):
+        """The timer should record the block's duration when it raises."""
+        metrics = MetricsLogger(stream=stream)
+
+        with pytest.raises(RuntimeError):
+            with metrics.timer('DeleteTableLatency', Region='us-east-1'):
+                raise RuntimeError('boom')
+        metrics.flush()
+
+        [document] = documents(stream)
+        assert document['DeleteTableLatency'] >= 0
+        assert document['_aws']['CloudWatchMetrics'][0]['Metrics'] == [
+            {'Name': 'DeleteTableLatency', 'Unit': 'Milliseconds'}
+        ]
+
+    def test_timed_decorator_and_flush_after(self, stream):
+        """Decorated functions are timed and the handler decorator flushes once done."""
+        metrics = MetricsLogger(stream=stream)
+
+        @metrics.timed('WorkLatency')
+        def work():
+            return 'done'
+
+        @metrics.flush_after
+        def handler(event, context):
+            return work()
+
+        assert handler({}, None) == 'done'
+        [document] = documents(stream)
+        assert 'WorkLatency' in document
+
+    def test_splits_documents_at_emf_value_limit(self, stream):
+        """More than 100 values for one metric should be split across documents."""
+        metrics = MetricsLogger(stream=stream)
+        for _ in range(MAX_VALUES_PER_METRIC + 5):
+            metrics.increment('Deleted')
+        metrics.flush()
+
+        assert [len(d['Deleted']) for d in documents(stream)] == [MAX_VALUES_PER_METRIC, 5]
+
+    def test_disabled_logger_records_nothing(self, stream):
+        """With metrics disabled nothing is buffered or written."""
+        metrics = MetricsLogger(enabled=False, stream=stream)
+        metrics.increment('Deleted')
+        with metrics.timer('DeleteTableLatency'):
+            pass
+        metrics.flush()
+
+        assert stream.getvalue() == ''
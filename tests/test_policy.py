@@ -0,0 +1,150 @@
+"""
+Unit tests for the hot-reloadable enforcer policy.
+
+Run with: pytest tests/ -v
+"""
+import io
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from policy import (AppConfigPolicySource, LocalPolicySource, PolicyCache, SSMPolicySource,
+                    parse_appconfig, policy_overrides)
+
+
+class FakeClock:
+    """Settable stand-in for time.monotonic."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestPolicyOverrides:
+    """Tests for converting policy documents to environment overrides."""
+
+    def test_values_use_environment_formats(self):
+        overrides = policy_overrides({
+            'exempt_table_prefixes': ['terraform-', 'hackathon-'],
+            'exempt_table_rules': [{'type': 'suffix', 'pattern': '-lock'}],
+            'exempt_tags': ['ndx:billing-exempt=true'],
+            'enforced_rules': ['dynamodb-on-demand'],
+            'max_provisioned_concurrency': 5,
+            'sns_digest_mode': True,
+        })
+
+        assert overrides == {
+            'EXEMPT_TABLE_PREFIXES': 'terraform-,hackathon-',
+            'EXEMPT_TABLE_RULES': '[{"type": "suffix", "pattern": "-lock"}]',
+            'EXEMPT_TAGS': 'ndx:billing-exempt=true',
+            'ENFORCED_RULES': 'dynamodb-on-demand',
+            'MAX_PROVISIONED_CONCURRENCY': '5',
+            'SNS_DIGEST_MODE': 'true',
+        }
+
+    def test_rejects_unknown_settings(self):
+        """Infrastructure settings such as the idempotency table stay in the environment."""
+        with pytest.raises(ValueError, match='idempotency_table'):
+            policy_overrides({'idempotency_table': 'other'})
+
+    def test_rejects_sns_topic(self):
+        """sns:Publish is only granted on the deployed topic."""
+        with pytest.raises(ValueError, match='sns_topic_arn'):
+            policy_overrides({'sns_topic_arn': 'arn:aws:sns:us-west-2:123456789012:other'})
+
+    def test_rejects_non_objects(self):
+        with pytest.raises(ValueError, match='JSON object'):
+            policy_overrides(['terraform-'])
+
+
+class TestPolicyCache:
+    """Tests for TTL and version checks."""
+
+    def test_source_checked_once_per_ttl(self):
+        clock = FakeClock()
+        source = LocalPolicySource({'exempt_table_prefixes': ['a-']})
+        cache = PolicyCache(source, ttl_seconds=60, clock=clock)
+
+        assert cache.refresh()
+        assert not cache.refresh()
+        clock.now += 59
+        assert not cache.refresh()
+        assert source.fetches == 1
+
+        source.publish({'exempt_table_prefixes': ['b-']})
+        clock.now += 1
+        assert cache.refresh()
+        assert cache.overrides == {'EXEMPT_TABLE_PREFIXES': 'b-'}
+        assert cache.version == 2
+
+    def test_unchanged_version_is_not_reloaded(self):
+        clock = FakeClock()
+        cache = PolicyCache(LocalPolicySource({}), ttl_seconds=1, clock=clock)
+        cache.refresh()
+        clock.now += 1
+
+        assert not cache.refresh()
+
+    def test_bad_document_keeps_previous_overrides(self):
+        """An invalid version is reported once and not parsed again."""
+        clock = FakeClock()
+        source = LocalPolicySource({'enforced_rules': ['dynamodb-on-demand']})
+        cache = PolicyCache(source, ttl_seconds=1, clock=clock)
+        cache.refresh()
+        source.publish({'bogus': 1})
+        clock.now += 1
+
+        with pytest.raises(ValueError):
+            cache.refresh()
+        clock.now += 1
+        assert not cache.refresh()
+        assert cache.overrides == {'ENFORCED_RULES': 'dynamodb-on-demand'}
+
+    def test_failing_source_waits_for_ttl(self):
+        clock = FakeClock()
+        source = LocalPolicySource()
+        cache = PolicyCache(source, ttl_seconds=30, clock=clock)
+
+        with pytest.raises(LookupError):
+            cache.refresh()
+        assert not cache.refresh()
+        assert source.fetches == 1
+
+
+class TestSources:
+    """Tests for the SSM and AppConfig sources against mocked clients."""
+
+    def test_ssm_compares_parameter_version(self):
+        client = MagicMock()
+        client.get_parameter.return_value = {
+            'Parameter': {'Version': 3, 'Value': json.dumps({'sns_digest_mode': True})}
+        }
+        source = SSMPolicySource('/ndx/policy', lambda: client)
+
+        assert source.fetch(None) == (3, {'sns_digest_mode': True})
+        assert source.fetch(3) == (3, None)
+        client.get_parameter.assert_called_with(Name='/ndx/policy', WithDecryption=True)
+
+    def test_appconfig_reuses_session_token(self):
+        client = MagicMock()
+        client.start_configuration_session.return_value = {'InitialConfigurationToken': 't0'}
+        client.get_latest_configuration.side_effect = [
+            {'NextPollConfigurationToken': 't1', 'VersionLabel': 'v1',
+             'Configuration': io.BytesIO(b'{"enforced_rules": ["kinesis-on-demand"]}')},
+            {'NextPollConfigurationToken': 't2', 'Configuration': io.BytesIO(b'')},
+        ]
+        source = AppConfigPolicySource('isb/prod/enforcer-policy', lambda: client)
+
+        assert source.fetch(None) == ('v1', {'enforced_rules': ['kinesis-on-demand']})
+        assert source.fetch('v1') == ('v1', None)
+        client.start_configuration_session.assert_called_once_with(
+            ApplicationIdentifier='isb', EnvironmentIdentifier='prod',
+            ConfigurationProfileIdentifier='enforcer-policy')
+        assert client.get_latest_configuration.call_args[1] == {'ConfigurationToken': 't1'}
+
+    def test_appconfig_identifier_is_validated(self):
+        with pytest.raises(ValueError, match='application/environment/profile'):
+            parse_appconfig('isb/prod')
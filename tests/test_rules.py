@@ -0,0 +1,148 @@
+"""
+Unit tests for the enforcement rules and the rule-dispatch index.
+
+Run with: pytest tests/ -v
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+from rules import (RULE_NAMES, DynamoDBOnDemandRule, KinesisOnDemandRule,
+                   LambdaProvisionedConcurrencyRule, RuleEngine, build_engine)
+
+
+class TestRuleEngine:
+    """Tests for dispatching CloudTrail calls to rules."""
+
+    def test_dispatches_on_event_source_and_name(self):
+        """Each registered (eventSource, eventName) pair should map to its rule."""
+        engine = build_engine()
+
+        for rule in engine.rules:
+            for event_source, event_name in rule.triggers:
+                assert engine.rule_for({'eventSource': event_source, 'eventName': event_name}) is rule
+
+    def test_unknown_calls_have_no_rule(self):
+        """Calls no rule declares (e.g. DeleteTable) should not be dispatched."""
+        engine = build_engine()
+
+        assert engine.rule_for({'eventSource': 'dynamodb.amazonaws.com', 'eventName': 'DeleteTable'}) is None
+        assert engine.rule_for({'eventSource': 's3.amazonaws.com', 'eventName': 'CreateTable'}) is None
+
+    def test_events_without_source_use_dynamodb_rule(self):
+        """Sweep and hand-built events carry no eventSource and keep the original policy."""
+        engine = build_engine()
+
+        assert isinstance(engine.rule_for({'eventName': 'ReconciliationSweep'}), DynamoDBOnDemandRule)
+        assert build_engine(('kinesis-on-demand',)).rule_for({}) is None
+
+    def test_rejects_overlapping_triggers(self):
+        """Two rules claiming the same API call would make dispatch ambiguous."""
+        with pytest.raises(ValueError):
+            RuleEngine([DynamoDBOnDemandRule(), DynamoDBOnDemandRule()])
+
+    def test_build_engine_validates_names(self):
+        """Only known rule names may be enabled."""
+        assert [rule.name for rule in build_engine(RULE_NAMES).rules] == list(RULE_NAMES)
+        with pytest.raises(ValueError):
+            build_engine(('dynamodb-on-demand', 'ec2-spot'))
+
+    def test_triggers_by_source(self):
+        """triggers() should list the API calls of the enabled rules only."""
+        assert build_engine(('kinesis-on-demand',)).triggers() == {
+            'kinesis.amazonaws.com': ['CreateStream', 'UpdateStreamMode'],
+        }
+
+
+class TestRules:
+    """Tests for each rule's request parsing and violation check."""
+
+    @pytest.mark.parametrize('event_name, request_params, expected', [
+        ('CreateTable', {'billingMode': 'PAY_PER_REQUEST'}, 'PAY_PER_REQUEST'),
+        ('CreateTable', {}, 'PROVISIONED'),
+        ('UpdateTable', {}, None),
+        ('UpdateTable', {'billingMode': 'PROVISIONED'}, 'PROVISIONED'),
+    ])
+    def test_dynamodb_mode_from_request(self, event_name, request_params, expected):
+        """Only requests that prove the billing mode skip DescribeTable."""
+        detail = {'eventName': event_name, 'requestParameters': request_params}
+
+        assert DynamoDBOnDemandRule().mode_from_request(detail) == expected
+
+    @pytest.mark.parametrize('event_name, request_params, expected', [
+        ('CreateStream', {'streamModeDetails': {'streamMode': 'ON_DEMAND'}}, 'ON_DEMAND'),
+        ('CreateStream', {'shardCount': 1}, 'PROVISIONED'),
+        ('UpdateStreamMode', {'streamModeDetails': {'streamMode': 'PROVISIONED'}}, 'PROVISIONED'),
+        ('UpdateStreamMode', {}, None),
+    ])
+    def test_kinesis_mode_from_request(self, event_name, request_params, expected):
+        """A CreateStream without a mode gets the PROVISIONED default."""
+        detail = {'eventName': event_name, 'requestParameters': request_params}
+
+        assert KinesisOnDemandRule().mode_from_request(detail) == expected
+
+    def test_kinesis_resource_name_from_arn(self):
+        """UpdateStreamMode requests carry only the stream ARN."""
+        rule = KinesisOnDemandRule()
+
+        assert rule.resource_name({'streamARN': 'arn:aws:kinesis:us-east-1:111111111111:stream/a/b'}) == 'a/b'
+        assert rule.resource_name({}) == ''
+
+    def test_lambda_rule_compares_against_limit(self):
+        """Provisioned concurrency above the limit violates, at the limit does not."""
+        rule = LambdaProvisionedConcurrencyRule(max_executions=5)
+
+        assert rule.resource_name({'functionName': 'api', 'qualifier': 'live'}) == 'api:live'
+        assert rule.resource_name({'functionName': 'api'}) == ''
+        assert rule.violates(6) and not rule.violates(5)
+        assert rule.notification_fields('arn:aws:lambda:us-east-1:111111111111:function:api:live') == {
+            'functionName': 'arn:aws:lambda:us-east-1:111111111111:function:api', 'qualifier': 'live'}
+
+    def test_dynamodb_records_plain_table_names(self):
+        """Enforcement records for tables keep their pre-rules key; others are namespaced."""
+        assert DynamoDBOnDemandRule().record_key('orders') == 'orders'
+        assert KinesisOnDemandRule().record_key('orders') == 'kinesis-on-demand/orders'
+
+    def test_tags_from_create_requests(self):
+        """Create calls carry the new resource's tags; other calls do not tell."""
+        rule = DynamoDBOnDemandRule()
+        create = {'eventName': 'CreateTable',
+                  'requestParameters': {'tags': [{'key': 'ndx:billing-exempt', 'value': 'true'}]}}
+
+        assert rule.tags_from_request(create) == {'ndx:billing-exempt': 'true'}
+        assert rule.tags_from_request({'eventName': 'CreateTable', 'requestParameters': {}}) == {}
+        assert rule.tags_from_request({'eventName': 'UpdateTable', 'requestParameters': {}}) is None
+        assert KinesisOnDemandRule().tags_from_request(
+            {'eventName': 'CreateStream', 'requestParameters': {'tags': {'team': 'a'}}}) == {'team': 'a'}
+        assert LambdaProvisionedConcurrencyRule().tags_from_request(
+            {'eventName': 'PutProvisionedConcurrencyConfig'}) is None
+
+    def test_resource_arns(self):
+        """Tags are cached per resource ARN; a function's tags ignore the qualifier."""
+        assert DynamoDBOnDemandRule().resource_arn('orders', '111111111111', 'us-east-1') == \
+            'arn:aws:dynamodb:us-east-1:111111111111:table/orders'
+        assert KinesisOnDemandRule().resource_arn('clicks', '111111111111', 'us-east-1') == \
+            'arn:aws:kinesis:us-east-1:111111111111:stream/clicks'
+        rule = LambdaProvisionedConcurrencyRule()
+        assert rule.resource_arn('api:live', '111111111111', 'us-east-1') == \
+            'arn:aws:lambda:us-east-1:111111111111:function:api'
+        assert rule.resource_arn('arn:aws:lambda:us-east-1:111111111111:function:api:live', '', '') == \
+            'arn:aws:lambda:us-east-1:111111111111:function:api'
+
+    def test_list_tags_follows_pages(self):
+        """ListTagsOfResource and ListTagsForStream results are paginated."""
+        dynamodb = MagicMock()
+        dynamodb.list_tags_of_resource.side_effect = [
+            {'Tags': [{'Key': 'a', 'Value': '1'}], 'NextToken': 't'},
+            {'Tags': [{'Key': 'b', 'Value': '2'}]},
+        ]
+        kinesis = MagicMock()
+        kinesis.list_tags_for_stream.side_effect = [
+            {'Tags': [{'Key': 'a', 'Value': '1'}], 'HasMoreTags': True},
+            {'Tags': [{'Key': 'b', 'Value': '2'}], 'HasMoreTags': False},
+        ]
+
+        assert DynamoDBOnDemandRule().list_tags(dynamodb, 'orders', 'arn') == {'a': '1', 'b': '2'}
+        dynamodb.list_tags_of_resource.assert_called_with(ResourceArn='arn', NextToken='t')
+        assert KinesisOnDemandRule().list_tags(kinesis, 'clicks', 'arn') == {'a': '1', 'b': '2'}
+        kinesis.list_tags_for_stream.assert_called_with(StreamName='clicks', ExclusiveStartTagKey='a')
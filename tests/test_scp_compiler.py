@@ -0,0 +1,244 @@
+"""
+Unit tests for the SCP compiler (size report, minification and packing).
+
+Run with: pytest tests/ -v
+"""
+import json
+
+import pytest
+
+import scp_compiler as compiler
+
+
+def deny(actions, sid=None, **extra):
+    statement = {'Effect': 'Deny', 'Action': actions, 'Resource': '*', **extra}
+    if sid:
+        statement['Sid'] = sid
+    return statement
+
+
+REGION_CONDITION = {'StringNotEquals': {'aws:RequestedRegion': ['us-east-1', 'us-west-2']}}
+
+
+class TestSize:
+    """Tests for the serialized size measurement."""
+
+    def test_matches_minified_json(self):
+        """Size should be the length of the jsonencode-style serialization."""
+        document = compiler.document([deny(['ec2:RunInstances'])])
+
+        assert compiler.policy_size(document) == len(json.dumps(document, separators=(',', ':')))
+
+
+class TestCovers:
+    """Tests for wildcard coverage."""
+
+    @pytest.mark.parametrize('wildcard,pattern,expected', [
+        ('ec2:Purchase*', 'ec2:PurchaseHostReservation', True),
+        ('ec2:Purchase*', 'ec2:purchasehostreservation', True),
+        ('ec2:Purchase*', 'ec2:PurchaseReserved*', True),
+        ('ec2:Purchase*', 'ec2:RunInstances', False),
+        ('ec2:*Reservation', 'ec2:Purchase*', False),
+        ('ec2:Get?', 'ec2:GetX', True),
+    ])
+    def test_actions(self, wildcard, pattern, expected):
+        assert compiler.covers(wildcard, pattern) is expected
+
+    def test_case_sensitive_for_resources(self):
+        """ARNs and condition values compare case-sensitively."""
+        assert not compiler.covers('arn:aws:iam::*:role/Admin*', 'arn:aws:iam::1:role/admin', case_sensitive=True)
+
+
+class TestCompress:
+    """Tests for statement-level rewrites."""
+
+    def test_drops_duplicate_and_covered_actions(self):
+        statement = compiler.compress_statement(
+            deny(['ec2:PurchaseHostReservation', 'ec2:Purchase*', 'EC2:purchase*', 'ec2:RunInstances']))
+
+        assert statement['Action'] == ['ec2:Purchase*', 'ec2:RunInstances']
+
+    def test_deduplicates_conditions_but_only_folds_like_operators(self):
+        """StringEquals values are literals, so '*' in them must not cover anything."""
+        statement = compiler.compress_statement(deny('ec2:*', Condition={
+            'StringEquals': {'ec2:InstanceType': ['t3.*', 't3.micro', 't3.micro']},
+            'StringLike': {'aws:PrincipalArn': ['arn:aws:iam::111122223333:role/Admin*',
+                                               'arn:aws:iam::111122223333:role/AdminX']},
+        }))
+
+        assert statement['Condition'] == {
+            'StringEquals': {'ec2:InstanceType': ['t3.*', 't3.micro']},
+            'StringLike': {'aws:PrincipalArn': 'arn:aws:iam::111122223333:role/Admin*'},
+        }
+
+    def test_not_action_is_never_folded(self):
+        """Folding a NotAction list would exempt actions AWS adds later."""
+        catalog = {'s3': ['GetObject', 'GetBucketPolicy', 'PutObject']}
+        statement = {'Effect': 'Deny', 'NotAction': ['s3:GetObject', 's3:GetBucketPolicy'], 'Resource': '*'}
+
+        assert compiler.compress_statement(statement, catalog)['NotAction'] == ['s3:GetObject', 's3:GetBucketPolicy']
+
+
+class TestFoldActions:
+    """Tests for catalog-driven wildcard folding."""
+
+    CATALOG = {'textract': ['AnalyzeDocument', 'GetDocumentAnalysis', 'GetExpenseAnalysis', 'StartDocumentAnalysis']}
+
+    def test_folds_when_wildcard_matches_only_listed_actions(self):
+        actions = ['textract:GetDocumentAnalysis', 'textract:GetExpenseAnalysis', 'textract:AnalyzeDocument']
+
+        assert compiler.fold_actions(actions, self.CATALOG) == ['textract:AnalyzeDocument', 'textract:Get*']
+
+    def test_does_not_fold_when_wildcard_would_widen(self):
+        actions = ['textract:GetDocumentAnalysis', 'textract:StartDocumentAnalysis']
+
+        assert compiler.fold_actions(actions, self.CATALOG) == actions
+
+    def test_whole_service(self):
+        actions = [f'textract:{name}' for name in self.CATALOG['textract']]
+
+        assert compiler.fold_actions(actions, self.CATALOG) == ['textract:*']
+
+
+class TestStatements:
+    """Tests for merging and redundancy removal across statements."""
+
+    def test_merges_statements_with_equal_condition(self):
+        statements = compiler.compile_statements([
+            deny(['ec2:RunInstances'], sid='A', Condition=REGION_CONDITION),
+            deny(['rds:CreateDBInstance'], sid='B', Condition=REGION_CONDITION),
+        ])
+
+        assert statements == [deny(['ec2:RunInstances', 'rds:CreateDBInstance'], sid='A', Condition=REGION_CONDITION)]
+
+    def test_drops_statement_covered_by_broader_one(self):
+        statements = compiler.compile_statements([
+            deny('ec2:*', sid='Broad'),
+            deny('ec2:RunInstances', sid='Narrow', Condition=REGION_CONDITION),
+            deny('ec2:RunInstances', sid='Same'),
+        ], merge=False)
+
+        assert [s['Sid'] for s in statements] == ['Broad', 'Narrow']
+
+    def test_allow_does_not_cover_deny(self):
+        statements = compiler.compile_statements([
+            {'Effect': 'Allow', 'Action': '*', 'Resource': '*'},
+            deny('ec2:RunInstances'),
+        ])
+
+        assert len(statements) == 2
+
+    def test_repeated_sids_are_made_unique(self):
+        statements = compiler.compile_statements([deny('ec2:A', sid='X'), deny('rds:B', sid='X')], merge=False)
+
+        assert [s['Sid'] for s in statements] == ['X', 'X2']
+
+
+class TestPack:
+    """Tests for bin-packing statements into policies."""
+
+    def test_every_policy_fits(self):
+        statements = [deny([f'svc{i}:Action{j}' for j in range(40)], sid=f'S{i}') for i in range(10)]
+
+        packed = compiler.pack(statements, max_chars=2000)
+
+        assert all(compiler.policy_size(p) <= 2000 for p in packed)
+        assert sum(len(p['Statement']) for p in packed) >= len(statements)
+
+    def test_splits_oversized_deny_statement(self):
+        statement = deny([f'svc:Action{j:03d}' for j in range(200)], sid='Big', Condition=REGION_CONDITION)
+
+        packed = compiler.pack([statement], max_chars=1500)
+        parts = [s for p in packed for s in p['Statement']]
+
+        assert len(parts) > 1
+        assert sorted(a for s in parts for a in compiler.as_list(s['Action'])) == statement['Action']
+        assert all(s['Condition'] == REGION_CONDITION for s in parts)
+
+    def test_oversized_not_action_raises(self):
+        statement = {'Effect': 'Deny', 'NotAction': [f'svc:Action{j:03d}' for j in range(200)], 'Resource': '*'}
+
+        with pytest.raises(ValueError, match='cannot be split'):
+            compiler.pack([statement], max_chars=1500)
+
+
+class TestReport:
+    """Tests for loading Terraform output and the per-target report."""
+
+    @staticmethod
+    def terraform_state(policies):
+        resources = [{
+            'address': f'aws_organizations_policy.{name}', 'type': 'aws_organizations_policy',
+            'values': {'id': f'p-{name}', 'name': name, 'type': 'SERVICE_CONTROL_POLICY',
+                       'content': json.dumps(document)},
+        } for name, document in policies.items()]
+        resources += [{
+            'address': f'aws_organizations_policy_attachment.{name}', 'type': 'aws_organizations_policy_attachment',
+            'values': {'policy_id': f'p-{name}', 'target_id': 'ou-sandbox'},
+        } for name in policies]
+        return {'values': {'root_module': {'child_modules': [{'resources': resources}]}}}
+
+    def test_loads_terraform_state_with_targets(self, tmp_path):
+        path = tmp_path / 'state.json'
+        path.write_text(json.dumps(self.terraform_state({'restrictions': compiler.document([deny('ec2:*')])})))
+
+        policies = compiler.load_policies(str(path))
+
+        assert policies[0]['name'] == 'restrictions'
+        assert policies[0]['targets'] == ['ou-sandbox']
+        assert policies[0]['rendered_size'] == len(json.dumps(compiler.document([deny('ec2:*')])))
+
+    def test_packs_policies_sharing_a_target(self, tmp_path):
+        path = tmp_path / 'state.json'
+        path.write_text(json.dumps(self.terraform_state({
+            'restrictions': compiler.document([deny(['ec2:Purchase*'], sid='A', Condition=REGION_CONDITION)]),
+            'cost_avoidance': compiler.document([deny(['rds:CreateDBInstance'], sid='B', Condition=REGION_CONDITION)]),
+        })))
+
+        report = compiler.compile_policies(compiler.load_policies(str(path)))
+        target = report['targets'][0]
+
+        assert target['target'] == 'ou-sandbox'
+        assert len(target['sizes_before']) == 2
+        assert len(target['sizes_after']) == 1
+        assert target['fits']
+        assert 'ou-sandbox' in compiler.format_report(report)
+
+    @staticmethod
+    def allowed(policies, action):
+        """
+        Every policy with Allow statements must allow the action, and no policy
+        may deny it (Deny-only policies sit next to FullAWSAccess).
+        """
+        def matches(statement):
+            return any(compiler.covers(pattern, action) for pattern in compiler.as_list(statement['Action']))
+        statements = [s for p in policies for s in compiler.as_list(p['Statement'])]
+        allows = [[s for s in compiler.as_list(p['Statement']) if s['Effect'] == 'Allow'] for p in policies]
+        return (all(any(matches(s) for s in group) for group in allows if group)
+                and not any(s['Effect'] == 'Deny' and matches(s) for s in statements))
+
+    def test_allow_statements_of_different_policies_are_not_pooled(self, tmp_path):
+        policies = {
+            'storage': compiler.document([{'Effect': 'Allow', 'Action': 's3:*', 'Resource': '*'}]),
+            'compute': compiler.document([{'Effect': 'Allow', 'Action': ['ec2:*', 's3:GetObject'], 'Resource': '*'},
+                                          deny('ec2:PurchaseReservedInstancesOffering')]),
+            'guardrails': compiler.document([deny('s3:DeleteBucket', sid='A')]),
+        }
+        path = tmp_path / 'state.json'
+        path.write_text(json.dumps(self.terraform_state(policies)))
+
+        target = compiler.compile_policies(compiler.load_policies(str(path)))['targets'][0]
+
+        assert len(target['packed']) == 2
+        for action in ('s3:GetObject', 's3:PutObject', 's3:DeleteBucket', 'ec2:RunInstances',
+                       'ec2:PurchaseReservedInstancesOffering', 'iam:CreateUser'):
+            assert self.allowed(target['packed'], action) == self.allowed(policies.values(), action), action
+
+    def test_main_exit_code_reflects_fit(self, tmp_path, capsys):
+        path = tmp_path / 'policy.json'
+        path.write_text(json.dumps(compiler.document(
+            [deny([f'svc{i}:Action{j:03d}'], sid=f'S{i}{j}') for i in range(5) for j in range(40)])))
+
+        assert compiler.main([str(path)]) == 0
+        assert compiler.main([str(path), '--max-chars', '1000', '--max-policies', '2']) == 1
+        assert 'DOES NOT FIT' in capsys.readouterr().out
@@ -0,0 +1,211 @@
+"""
+Unit tests for the offline SCP evaluator and the CloudTrail log readers.
+
+Run with: pytest tests/ -v
+"""
+import gzip
+import json
+from concurrent.futures import Future
+
+import pytest
+
+import cloudtrail_logs
+import scp_evaluator as evaluator
+
+SANDBOX_ROLE = 'arn:aws:iam::123456789012:role/aws-reserved/sso.amazonaws.com/AWSReservedSSO_ndx_IsbUsersPS_abc'
+ADMIN_ROLE = 'arn:aws:iam::123456789012:role/InnovationSandbox-Admin'
+EXEMPT = {'ArnNotLike': {'aws:PrincipalARN': ['arn:aws:iam::*:role/InnovationSandbox*']}}
+
+POLICY = {'Version': '2012-10-17', 'Statement': [
+    {'Sid': 'DenyRegionAccess', 'Effect': 'Deny', 'NotAction': ['bedrock:*'], 'Resource': ['*'],
+     'Condition': {'StringNotEquals': {'aws:RequestedRegion': ['us-east-1', 'us-west-2']}, **EXEMPT}},
+    {'Sid': 'DenyUnallowedEC2', 'Effect': 'Deny', 'Action': ['ec2:RunInstances'],
+     'Resource': ['arn:aws:ec2:*:*:instance/*'],
+     'Condition': {'ForAnyValue:StringNotLike': {'ec2:InstanceType': ['t3.*', 't2.micro']}, **EXEMPT}},
+    {'Sid': 'DenyLargeEBS', 'Effect': 'Deny', 'Action': ['ec2:CreateVolume', 'ec2:RunInstances'],
+     'Resource': ['arn:aws:ec2:*:*:volume/*'],
+     'Condition': {'NumericGreaterThan': {'ec2:VolumeSize': '500'}, **EXEMPT}},
+    {'Sid': 'DenyExpensiveBedrockModels', 'Effect': 'Deny', 'Action': ['bedrock:InvokeModel'],
+     'Resource': ['arn:aws:bedrock:*::foundation-model/anthropic.claude*opus*'], 'Condition': EXEMPT},
+    {'Sid': 'DenyTaggedOnly', 'Effect': 'Deny', 'Action': ['s3:CreateBucket'], 'Resource': '*',
+     'Condition': {'StringEquals': {'aws:RequestTag/team': 'x'}}},
+    {'Sid': 'AllowAll', 'Effect': 'Allow', 'Action': '*', 'Resource': '*'},
+]}
+
+
+def record(event_name, source='ec2', region='us-east-1', role=SANDBOX_ROLE, event_id='e1', **params):
+    return {
+        'eventID': event_id, 'eventSource': f'{source}.amazonaws.com', 'eventName': event_name,
+        'awsRegion': region, 'recipientAccountId': '123456789012',
+        'userIdentity': {'type': 'AssumedRole', 'accountId': '123456789012',
+                         'sessionContext': {'sessionIssuer': {'arn': role}}},
+        'requestParameters': params,
+    }
+
+
+@pytest.fixture
+def engine():
+    return evaluator.Evaluator([{'name': 'scp', 'document': POLICY}])
+
+
+def denied_sids(engine, rec):
+    return sorted(s.sid for s, outcome in engine.evaluate(rec) if outcome)
+
+
+class TestActionOf:
+    """Tests for mapping CloudTrail records to IAM actions."""
+
+    @pytest.mark.parametrize('source,name,expected', [
+        ('ec2', 'RunInstances', 'ec2:RunInstances'),
+        ('lambda', 'CreateFunction20150331', 'lambda:CreateFunction'),
+        ('lambda', 'UpdateFunctionConfiguration20150331v2', 'lambda:UpdateFunctionConfiguration'),
+        ('monitoring', 'PutMetricData', 'cloudwatch:PutMetricData'),
+    ])
+    def test_action(self, source, name, expected):
+        assert evaluator.action_of(record(name, source=source)) == expected
+
+
+class TestEvaluator:
+    """Tests for statement evaluation against single records."""
+
+    def test_region_lock(self, engine):
+        assert denied_sids(engine, record('DescribeInstances', region='eu-central-1')) == ['DenyRegionAccess']
+        assert denied_sids(engine, record('DescribeInstances', region='us-west-2')) == []
+
+    def test_not_action_exempts_bedrock(self, engine):
+        rec = record('InvokeModel', source='bedrock', region='eu-central-1', modelId='amazon.nova-lite-v1:0')
+
+        assert denied_sids(engine, rec) == []
+
+    def test_exempt_principal(self, engine):
+        assert denied_sids(engine, record('DescribeInstances', region='eu-central-1', role=ADMIN_ROLE)) == []
+
+    def test_instance_type_allowlist(self, engine):
+        assert denied_sids(engine, record('RunInstances', instanceType='p4d.24xlarge')) == ['DenyUnallowedEC2']
+        assert denied_sids(engine, record('RunInstances', instanceType='t3.large')) == []
+
+    def test_absent_key_fails_for_any_value(self, engine):
+        """ForAnyValue over an absent key is false, so the statement does not apply."""
+        assert denied_sids(engine, record('RunInstances')) == []
+
+    def test_block_device_volume_size(self, engine):
+        rec = record('RunInstances', instanceType='t3.micro',
+                     blockDeviceMapping={'items': [{'ebs': {'volumeSize': 100}}, {'ebs': {'volumeSize': 1000}}]})
+
+        assert denied_sids(engine, rec) == ['DenyLargeEBS']
+
+    def test_bedrock_model_resource(self, engine):
+        opus = record('InvokeModel', source='bedrock', modelId='anthropic.claude-3-opus-20240229-v1:0')
+        haiku = record('InvokeModel', source='bedrock', modelId='anthropic.claude-3-haiku-20240307-v1:0')
+
+        assert denied_sids(engine, opus) == ['DenyExpensiveBedrockModels']
+        assert denied_sids(engine, haiku) == []
+
+    def test_unknown_condition_key_is_indeterminate(self, engine):
+        results = engine.evaluate(record('CreateBucket', source='s3'))
+
+        assert [(s.sid, outcome) for s, outcome in results] == [('DenyTaggedOnly', None)]
+
+    def test_candidates_are_cached_per_action(self, engine):
+        first = engine.candidates('ec2:RunInstances')
+
+        assert engine.candidates('ec2:RunInstances') is first
+        assert [s.sid for s in first] == ['DenyRegionAccess', 'DenyUnallowedEC2', 'DenyLargeEBS']
+
+    def test_unsupported_operator(self):
+        policy = {'Statement': [{'Effect': 'Deny', 'Action': '*', 'Resource': '*',
+                                 'Condition': {'DateGreaterThan': {'aws:CurrentTime': '2020-01-01'}}}]}
+
+        with pytest.raises(ValueError, match='DateGreaterThan'):
+            evaluator.Evaluator([{'name': 'p', 'document': policy}])
+
+
+class TestConditions:
+    """Tests for IAM condition operator semantics."""
+
+    @pytest.mark.parametrize('operator,policy_values,request_value,expected', [
+        ('StringEquals', ['a'], 'a', True),
+        ('StringNotEquals', ['a'], None, True),
+        ('StringEquals', ['a'], None, False),
+        ('StringEqualsIfExists', ['a'], None, True),
+        ('ForAllValues:StringLike', ['t3.*'], ['t3.micro', 't3.large'], True),
+        ('ForAllValues:StringLike', ['t3.*'], ['t3.micro', 'p4d.24xlarge'], False),
+        ('ForAnyValue:StringNotEqualsIgnoreCase', ['CACHE.T3.MICRO'], 'cache.t3.micro', False),
+        ('Bool', ['true'], True, True),
+        ('NumericGreaterThan', ['5'], '10', True),
+        ('NumericGreaterThan', ['5'], 'x', False),
+        ('Null', ['true'], None, True),
+        ('ArnLike', ['arn:aws:iam::*:role/Admin*'], 'arn:aws:iam::1:role/AdminX', True),
+        ('ArnLike', ['arn:aws:iam::*:role/Admin*'], 'arn:aws:iam::1:x:role/AdminX', False),
+    ])
+    def test_operator(self, operator, policy_values, request_value, expected):
+        condition = evaluator.Condition(operator, 'rds:MultiAz', policy_values)
+
+        assert condition.holds(record('X', multiAZ=request_value)) is expected
+
+
+class TestEvaluateLogs:
+    """Tests for bulk evaluation over log files."""
+
+    @pytest.fixture
+    def logs(self, tmp_path):
+        logs = tmp_path / 'logs'
+        logs.mkdir()
+        batch = [record('DescribeInstances', region='eu-central-1', event_id=f'r{i}') for i in range(3)]
+        batch.append(record('RunInstances', instanceType='p4d.24xlarge', event_id='big'))
+        batch[-1]['errorCode'] = 'Client.UnauthorizedOperation'
+        with gzip.open(logs / 'a.json.gz', 'wt') as f:
+            json.dump({'Records': batch}, f)
+        nested = logs / 'nested'
+        nested.mkdir()
+        (nested / 'b.jsonl').write_text('\n'.join(json.dumps({'detail': r}) for r in [
+            record('CreateBucket', source='s3', event_id='bucket'),
+            record('DescribeInstances', event_id='ok'),
+        ]))
+        return logs
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_report(self, logs, workers):
+        totals = evaluator.evaluate_logs([{'name': 'scp', 'document': POLICY}], [str(logs)], workers=workers)
+        report = evaluator.build_report(totals)
+        by_sid = {s['sid']: s for s in report['statements']}
+
+        assert (report['files'], report['records'], report['denied'], report['indeterminate']) == (2, 6, 4, 1)
+        assert by_sid['DenyRegionAccess']['denied'] == 3
+        assert by_sid['DenyRegionAccess']['actions'] == {'ec2:DescribeInstances': 3}
+        assert by_sid['DenyUnallowedEC2']['already_denied'] == 1
+        assert by_sid['DenyUnallowedEC2']['samples'] == ['big']
+        assert by_sid['DenyTaggedOnly']['unresolved_keys'] == ['aws:RequestTag/team']
+        assert 'DenyRegionAccess' in evaluator.format_report(report)
+
+    def test_bounded_map_limits_files_in_flight(self):
+        """Results are consumed in order with at most FILES_AHEAD_PER_WORKER files per worker pending."""
+        class Executor:
+            def __init__(self):
+                self.pending = self.most_pending = 0
+
+            def submit(self, func, item):
+                self.pending += 1
+                self.most_pending = max(self.most_pending, self.pending)
+                future = Future()
+                future.set_result(func(item))
+                return future
+
+        executor = Executor()
+
+        def consume(results):
+            for result in results:
+                executor.pending -= 1
+                yield result
+
+        results = list(consume(cloudtrail_logs.bounded_map(executor, str, range(20), workers=2)))
+
+        assert results == [str(i) for i in range(20)]
+        assert executor.most_pending == 2 * cloudtrail_logs.FILES_AHEAD_PER_WORKER
+
+    def test_main(self, logs, tmp_path, capsys):
+        policy_path = tmp_path / 'scp.json'
+        policy_path.write_text(json.dumps(POLICY))
+
+        assert evaluator.main([str(policy_path), '--logs', str(logs), '--workers', '1', '--json']) == 0
+        assert json.loads(capsys.readouterr().out)['denied'] == 4
@@ -0,0 +1,91 @@
+"""
+Unit tests for the enforcer's structured JSON logger.
+
+Run with: pytest tests/ -v
+"""
+import io
+import json
+from unittest.mock import patch
+
+import pytest
+
+from structured_log import StructuredLogger
+
+
+def records(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+class TestStructuredLogger:
+    """Tests for StructuredLogger."""
+
+    def test_writes_one_compact_json_line(self):
+        """Should write a single JSON object per call without spaces."""
+        stream = io.StringIO()
+        StructuredLogger(stream=stream).info('decision', decision='deleted', table_name='t')
+
+        line = stream.getvalue()
+        assert line.count('\n') == 1
+        assert ': ' not in line
+        assert json.loads(line) == {
+            'level': 'INFO', 'message': 'decision', 'decision': 'deleted', 'table_name': 't',
+        }
+
+    def test_drops_records_below_level(self):
+        """Nothing should be written below the configured level."""
+        stream = io.StringIO()
+        logger = StructuredLogger(level='WARNING', stream=stream)
+
+        logger.info('ignored')
+        logger.warning('kept')
+
+        assert [r['message'] for r in records(stream)] == ['kept']
+
+    def test_disabled_records_are_never_built(self):
+        """Callable fields and payloads should not be evaluated when disabled."""
+        stream = io.StringIO()
+        logger = StructuredLogger(level='ERROR', stream=stream)
+        expensive = []
+
+        with patch('structured_log.json.dumps') as dumps:
+            logger.info('decision', detail=lambda: expensive.append(1), payload={'big': 'event'})
+
+        assert expensive == []
+        dumps.assert_not_called()
+
+    def test_callable_fields_evaluated_when_written(self):
+        """Lazy fields should be resolved at write time."""
+        stream = io.StringIO()
+        StructuredLogger(stream=stream).info('decision', exemption=lambda: 'prefix: terraform-')
+
+        assert records(stream)[0]['exemption'] == 'prefix: terraform-'
+
+    def test_payload_omitted_unless_sampled(self):
+        """With a zero sample rate the payload should not be attached."""
+        stream = io.StringIO()
+        StructuredLogger(payload_sample_rate=0.0, stream=stream).info('decision', payload={'a': 1})
+
+        assert 'payload' not in records(stream)[0]
+
+    def test_payload_attached_when_sampled(self):
+        """A record inside the sample should carry the payload."""
+        stream = io.StringIO()
+        logger = StructuredLogger(payload_sample_rate=0.01, stream=stream)
+
+        with patch('structured_log.random.random', return_value=0.005):
+            logger.info('decision', payload={'a': 1})
+
+        assert records(stream)[0]['payload'] == {'a': 1}
+
+    def test_payload_always_attached_on_error(self):
+        """Errors should always include the payload for debugging."""
+        stream = io.StringIO()
+        StructuredLogger(stream=stream).error('error', payload={'a': 1})
+
+        assert records(stream)[0]['payload'] == {'a': 1}
+
+    @pytest.mark.parametrize('level, rate', [('VERBOSE', 0.0), ('INFO', 1.5)])
+    def test_rejects_bad_settings(self, level, rate):
+        """Should refuse unknown levels and rates outside [0, 1]."""
+        with pytest.raises(ValueError):
+            StructuredLogger(level=level, payload_sample_rate=rate)
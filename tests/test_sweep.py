@@ -0,0 +1,241 @@
+"""
+Unit tests for the enforcer's scheduled reconciliation sweep.
+
+Run with: pytest tests/ -v
+"""
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+class FakeDynamoDB:
+    """DynamoDB client for one account and region holding {table_name: billing_mode}."""
+
+    class ResourceNotFoundException(Exception):
+        pass
+
+    def __init__(self, tables, page_size=2, list_error=None):
+        self.tables = dict(tables)
+        self.page_size = page_size
+        self.list_error = list_error
+        self.deleted = []
+        self.exceptions = self
+
+    def get_paginator(self, operation):
+        assert operation == 'list_tables'
+        paginator = MagicMock()
+        paginator.paginate.side_effect = lambda **kwargs: self._pages()
+        return paginator
+
+    def _pages(self):
+        if self.list_error:
+            raise self.list_error
+        names = sorted(self.tables)
+        for i in range(0, max(len(names), 1), self.page_size):
+            yield {'TableNames': names[i:i + self.page_size]}
+
+    def describe_table(self, TableName):
+        if TableName not in self.tables:
+            raise self.ResourceNotFoundException(TableName)
+        return {'Table': {'BillingModeSummary': {'BillingMode': self.tables[TableName]}}}
+
+    def delete_table(self, TableName):
+        self.deleted.append(TableName)
+        del self.tables[TableName]
+
+
+@pytest.fixture
+def sweep_env():
+    """Environment for the sweep Lambda, with the cached config reset around each test."""
+    with patch.dict(os.environ, {
+        'SNS_TOPIC_ARN': 'arn:aws:sns:us-west-2:123456789012:test-topic',
+        'EXEMPT_TABLE_PREFIXES': 'terraform-',
+        'SANDBOX_ACCOUNT_IDS': '111111111111, 222222222222',
+        'MANAGED_REGIONS': 'us-east-1,us-west-2',
+        'SWEEP_MAX_WORKERS': '4',
+        'SANDBOX_ROLE_NAME': 'ndx-billing-enforcer',
+    }):
+        import index
+        index.reset_config()
+        yield
+        index.reset_config()
+        index.log.configure()
+        index.metrics.configure()
+
+
+@pytest.fixture
+def inventory():
+    """Tables per (account, region) and the shared notification clients."""
+    clients = {
+        ('111111111111', 'us-east-1'): FakeDynamoDB({
+            'orders': 'PAY_PER_REQUEST',
+            'users': 'PROVISIONED',
+            'terraform-lock': 'PAY_PER_REQUEST',
+        }),
+        ('111111111111', 'us-west-2'): FakeDynamoDB({}),
+        ('222222222222', 'us-east-1'): FakeDynamoDB({'sessions': 'PROVISIONED'}),
+        ('222222222222', 'us-west-2'): FakeDynamoDB({'events': 'PAY_PER_REQUEST'}),
+    }
+    events = MagicMock()
+    events.put_events.return_value = {'FailedEntryCount': 0, 'Entries': []}
+    sns = MagicMock()
+
+    def get_client(service_name, account_id=None, region=None):
+        if service_name == 'dynamodb':
+            return clients[(account_id, region)]
+        return {'events': events, 'sns': sns}[service_name]
+
+    return {'dynamodb': clients, 'events': events, 'sns': sns, 'get_client': get_client}
+
+
+class TestRunSweep:
+    """Tests for the sweep across accounts and regions."""
+
+    def test_enforces_every_account_and_region(self, sweep_env, inventory):
+        """Should delete On-Demand tables everywhere and leave the rest."""
+        import index
+        import sweep
+
+        with patch.object(index, 'get_boto3_client', inventory['get_client']):
+            summary = sweep.sweep_handler({}, None)
+
+        assert inventory['dynamodb'][('111111111111', 'us-east-1')].deleted == ['orders']
+        assert inventory['dynamodb'][('222222222222', 'us-west-2')].deleted == ['events']
+        assert summary['targets'] == 4
+        assert summary['targets_scanned'] == 4
+        assert summary['tables_scanned'] == 5
+        assert summary['decisions'] == {'deleted': 2, 'provisioned': 2, 'exempt': 1}
+
+    def test_follows_list_tables_pagination(self, sweep_env, inventory):
+        """Tables beyond the first ListTables page should be enforced too."""
+        import index
+        import sweep
+
+        clients = inventory['dynamodb']
+        clients[('111111111111', 'us-east-1')] = FakeDynamoDB(
+            {f'table-{i:02d}': 'PAY_PER_REQUEST' for i in range(7)}, page_size=3)
+
+        with patch.object(index, 'get_boto3_client', inventory['get_client']):
+            summary = sweep.run_sweep(['111111111111'], ['us-east-1'], index.get_config())
+
+        assert len(clients[('111111111111', 'us-east-1')].deleted) == 7
+        assert summary['decisions'] == {'deleted': 7}
+
+    def test_notifications_are_sent_once_for_the_sweep(self, sweep_env, inventory):
+        """Deletions found by the sweep should share batched PutEvents calls."""
+        import index
+        import sweep
+
+        with patch.object(index, 'get_boto3_client', inventory['get_client']):
+            sweep.sweep_handler({}, None)
+
+        inventory['events'].put_events.assert_called_once()
+        assert len(inventory['events'].put_events.call_args.kwargs['Entries']) == 2
+        assert inventory['sns'].publish.call_count == 2
+
+    def test_failed_target_does_not_stop_the_sweep(self, sweep_env, inventory):
+        """A ListTables error in one account should be reported, others still swept."""
+        import index
+        import sweep
+
+        inventory['dynamodb'][('222222222222', 'us-east-1')].list_error = RuntimeError('AccessDenied')
+
+        with patch.object(index, 'get_boto3_client', inventory['get_client']):
+            summary = sweep.sweep_handler({}, None)
+
+        assert summary['targets_failed'] == [
+            {'account_id': '222222222222', 'region': 'us-east-1', 'error': 'AccessDenied'}
+        ]
+        assert summary['targets_scanned'] == 3
+        assert summary['decisions']['deleted'] == 2
+
+    def test_event_overrides_accounts_and_regions(self, sweep_env, inventory):
+        """A scheduled event can narrow the sweep to specific accounts and regions."""
+        import index
+        import sweep
+
+        with patch.object(index, 'get_boto3_client', inventory['get_client']):
+            summary = sweep.sweep_handler({'accounts': ['222222222222'], 'regions': ['us-west-2']}, None)
+
+        assert summary['targets'] == 1
+        assert summary['decisions'] == {'deleted': 1}
+
+    def test_findings_do_not_open_the_circuit_breaker(self, sweep_env, inventory):
+        """Leftover tables found in bulk are not an account running away."""
+        import index
+        import sweep
+
+        with patch.dict(os.environ, {'BREAKER_THRESHOLD': '1'}):
+            index.reset_config()
+            with patch.object(index, 'get_boto3_client', inventory['get_client']):
+                summary = sweep.sweep_handler({}, None)
+
+        assert summary['decisions']['deleted'] == 2
+        for call in inventory['sns'].publish.call_args_list:
+            assert not call.kwargs['Message'].startswith('ESCALATED')
+        for entry in inventory['events'].put_events.call_args.kwargs['Entries']:
+            assert 'circuitBreaker' not in json.loads(entry['Detail'])
+
+    def test_refuses_to_run_without_sandbox_role(self, sweep_env, inventory):
+        """Without a sandbox role every client is the hub's, so nothing may be swept."""
+        import index
+        import sweep
+
+        with patch.dict(os.environ, {'SANDBOX_ROLE_NAME': ''}):
+            index.reset_config()
+            with patch.object(index, 'get_boto3_client', inventory['get_client']):
+                with pytest.raises(ValueError, match='SANDBOX_ROLE_NAME'):
+                    sweep.sweep_handler({}, None)
+
+        assert all(not client.deleted for client in inventory['dynamodb'].values())
+
+    def test_skips_work_after_deadline(self, sweep_env, inventory):
+        """With no time left, queued work should be cancelled and reported as skipped."""
+        import index
+        import sweep
+
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 0
+
+        with patch.object(index, 'get_boto3_client', inventory['get_client']):
+            summary = sweep.sweep_handler({}, context)
+
+        assert summary['targets_skipped'] + summary['targets_scanned'] == 4
+        assert summary['tables_skipped'] + sum(summary['decisions'].values()) == summary['tables_scanned']
+        assert not inventory['dynamodb'][('111111111111', 'us-east-1')].deleted
+
+
+class TestListSandboxAccounts:
+    """Tests for account discovery."""
+
+    def test_walks_nested_ous_and_skips_inactive_accounts(self, sweep_env):
+        """Should include ACTIVE accounts from the OU and every child OU."""
+        import index
+        import sweep
+
+        accounts = {
+            'ou-root': [{'Id': '333333333333', 'Status': 'ACTIVE'}],
+            'ou-child': [{'Id': '444444444444', 'Status': 'ACTIVE'},
+                         {'Id': '555555555555', 'Status': 'SUSPENDED'}],
+        }
+        children = {'ou-root': [{'Id': 'ou-child'}], 'ou-child': []}
+
+        def paginator(operation):
+            pages = MagicMock()
+            if operation == 'list_accounts_for_parent':
+                pages.paginate.side_effect = lambda ParentId: [{'Accounts': accounts[ParentId]}]
+            else:
+                pages.paginate.side_effect = lambda ParentId: [{'OrganizationalUnits': children[ParentId]}]
+            return pages
+
+        organizations = MagicMock()
+        organizations.get_paginator.side_effect = paginator
+
+        with patch.dict(os.environ, {'SANDBOX_OU_ID': 'ou-root'}):
+            config = index.load_config()
+        with patch.object(index, 'get_boto3_client', lambda service_name: organizations):
+            result = sweep.list_sandbox_accounts(config)
+
+        assert result == ['111111111111', '222222222222', '333333333333', '444444444444']
@@ -0,0 +1,83 @@
+"""
+Unit tests for the resource tag cache.
+
+Run with: pytest tests/ -v
+"""
+import threading
+import time
+
+import pytest
+
+from tags import TagCache, tags_to_dict
+
+
+class FakeClock:
+    """Settable stand-in for time.time."""
+
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestTagsToDict:
+    """Tests for tag normalisation."""
+
+    def test_accepts_api_and_cloudtrail_shapes(self):
+        assert tags_to_dict([{'Key': 'a', 'Value': '1'}]) == {'a': '1'}
+        assert tags_to_dict([{'key': 'a', 'value': '1'}, {'key': 'b'}]) == {'a': '1', 'b': ''}
+        assert tags_to_dict({'a': 1}) == {'a': '1'}
+        assert tags_to_dict(None) == {}
+
+
+class TestTagCache:
+    """Tests for TTL caching and bounded lookups."""
+
+    def test_entries_expire_after_ttl(self):
+        clock = FakeClock()
+        cache = TagCache(ttl_seconds=60, clock=clock)
+
+        cache.put('arn', {})
+        assert cache.get('arn') == {}
+        clock.now += 60
+        assert cache.get('arn') is None
+
+    def test_lookup_fills_cache(self):
+        cache = TagCache()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            return {'keep': 'yes'}
+
+        assert cache.lookup('arn', fetch, 1) == {'keep': 'yes'}
+        assert cache.lookup('arn', fetch, 1) == {'keep': 'yes'}
+        assert len(calls) == 1
+
+    def test_slow_lookup_times_out_and_fills_cache_later(self):
+        cache = TagCache()
+        release = threading.Event()
+
+        def fetch():
+            release.wait(5)
+            return {'keep': 'yes'}
+
+        assert cache.lookup('arn', fetch, 0.01) is None
+        # A second caller joins the pending call instead of starting another
+        assert cache.lookup('arn', lambda: pytest.fail('second call'), 0.01) is None
+        release.set()
+        deadline = time.monotonic() + 5
+        while cache.get('arn') is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert cache.get('arn') == {'keep': 'yes'}
+
+    def test_failed_lookup_raises_and_is_not_cached(self):
+        cache = TagCache()
+
+        def fetch():
+            raise RuntimeError('AccessDenied')
+
+        with pytest.raises(RuntimeError, match='AccessDenied'):
+            cache.lookup('arn', fetch, 1)
+        assert cache.lookup('arn', lambda: {'a': '1'}, 1) == {'a': '1'}
@@ -0,0 +1,112 @@
+"""
+Unit tests for the per-account token buckets and circuit breaker.
+
+Run with: pytest tests/ -v
+"""
+from idempotency import FileBackend
+from throttle import CLOSED, OPEN, OPENED, AccountGuard, TokenBucket, deferred_event, was_deferred
+
+
+class FakeClock:
+    """Settable stand-in for time.time / time.monotonic."""
+
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket:
+    """Tests for per-account token buckets."""
+
+    def test_burst_then_refill(self):
+        """An account can send burst events at once, then one per refill interval."""
+        clock = FakeClock()
+        buckets = TokenBucket(rate_per_second=0.5, burst=3, clock=clock)
+
+        assert [buckets.take('a') for _ in range(4)] == [True, True, True, False]
+        clock.now += 2
+        assert buckets.take('a')
+        assert not buckets.take('a')
+
+    def test_accounts_are_independent(self):
+        """One account draining its bucket must not affect another."""
+        buckets = TokenBucket(rate_per_second=0, burst=1, clock=FakeClock())
+
+        assert buckets.take('a')
+        assert not buckets.take('a')
+        assert buckets.take('b')
+
+    def test_refill_is_capped_at_burst(self):
+        clock = FakeClock()
+        buckets = TokenBucket(rate_per_second=1, burst=2, clock=clock)
+        buckets.take('a')
+        clock.now += 1000
+
+        assert [buckets.take('a') for _ in range(3)] == [True, True, False]
+
+
+class TestAccountGuard:
+    """Tests for the circuit breaker and its shared state."""
+
+    def test_breaker_opens_once_per_period(self):
+        """The threshold-th violation opens the breaker; later ones are suppressed until it expires."""
+        clock = FakeClock()
+        guard = AccountGuard(breaker_threshold=3, breaker_window_seconds=300,
+                             breaker_open_seconds=600, clock=clock)
+
+        assert [guard.record_violation('a') for _ in range(5)] == [CLOSED, CLOSED, OPENED, OPEN, OPEN]
+        assert guard.record_violation('b') == CLOSED
+        clock.now += 600
+        assert guard.record_violation('a') == CLOSED
+
+    def test_violations_outside_window_do_not_add_up(self):
+        clock = FakeClock(now=0.0)
+        guard = AccountGuard(breaker_threshold=2, breaker_window_seconds=300, clock=clock)
+
+        assert guard.record_violation('a') == CLOSED
+        clock.now += 600
+        assert guard.record_violation('a') == CLOSED
+
+    def test_burst_straddling_window_boundary_opens_breaker(self):
+        """Violations just before and just after a boundary are in the same sliding window."""
+        clock = FakeClock(now=290.0)
+        guard = AccountGuard(breaker_threshold=4, breaker_window_seconds=300, clock=clock)
+
+        assert [guard.record_violation('a') for _ in range(3)] == [CLOSED] * 3
+        clock.now = 310.0
+        assert [guard.record_violation('a') for _ in range(3)] == [CLOSED, OPENED, OPEN]
+
+    def test_shared_backend_rate_limits_across_containers(self, tmp_path):
+        """Two containers share one account limit of burst + rate per minute."""
+        clock = FakeClock(now=0.0)
+        backend = FileBackend(str(tmp_path / 'store.json'), clock)
+        first, second = (AccountGuard(backend, rate_per_minute=2, burst=2, clock=clock) for _ in range(2))
+
+        assert [guard.admit('a') for guard in (first, second) * 3] == [True] * 4 + [False] * 2
+        assert second.admit('b')
+        clock.now += 120
+        assert first.admit('a')
+
+    def test_shared_backend_sends_one_escalation(self, tmp_path):
+        """Two containers sharing a backend count together and only one escalates."""
+        clock = FakeClock()
+        backend = FileBackend(str(tmp_path / 'store.json'), clock)
+        first, second = (AccountGuard(backend, breaker_threshold=2, clock=clock) for _ in range(2))
+
+        assert first.record_violation('a') == CLOSED
+        assert second.record_violation('a') == OPENED
+        assert first.record_violation('a') == OPEN
+
+    def test_disabled(self):
+        guard = AccountGuard(rate_per_minute=0, breaker_threshold=0)
+
+        assert all(guard.admit('a') for _ in range(1000))
+        assert all(guard.record_violation('a') == CLOSED for _ in range(100))
+
+    def test_deferred_marker(self):
+        event = {'id': 'x'}
+
+        assert not was_deferred(event)
+        assert was_deferred(deferred_event(event))